@@ -10,11 +10,17 @@ def play_wav_bytes(wav_bytes: bytes) -> bool:
     except Exception:
         return False
 import os
+import threading
 try:
     import simpleaudio as sa
 except ImportError:
     sa = None
 
+# play_wav clips in progress, so stop_playback() can cut them from another thread
+_playing = set()
+_playing_lock = threading.Lock()
+
+
 def play_wav(path: str) -> bool:
     """Play a WAV file. Return True on success, False on fail (never raise)."""
     if not sa or not os.path.exists(path):
@@ -22,7 +28,25 @@ def play_wav(path: str) -> bool:
     try:
         wave_obj = sa.WaveObject.from_wave_file(path)
         play_obj = wave_obj.play()
-        play_obj.wait_done()
+        with _playing_lock:
+            _playing.add(play_obj)
+        try:
+            play_obj.wait_done()
+        finally:
+            with _playing_lock:
+                _playing.discard(play_obj)
         return True
     except Exception:
         return False
+
+
+def stop_playback() -> int:
+    """Stop every play_wav clip in progress (their wait_done returns). Returns how many were stopped."""
+    with _playing_lock:
+        objs = list(_playing)
+    for play_obj in objs:
+        try:
+            play_obj.stop()
+        except Exception:
+            pass
+    return len(objs)
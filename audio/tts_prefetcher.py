@@ -2,8 +2,16 @@ import threading
 import hashlib
 import os
 import logging
+from collections.abc import Mapping
 from typing import Dict, Set, Optional
 
+def _text(chunk) -> str:
+    """Chunk text: speech plan chunks are Mappings (dict / core.speech_plan.Chunk), others have .text."""
+    if isinstance(chunk, Mapping):
+        return chunk.get("text") or ""
+    return chunk.text
+
+
 class TTSPrefetcher:
     def __init__(self, tts, cache_dir="tts_cache"):
         self.tts = tts
@@ -16,10 +24,13 @@ class TTSPrefetcher:
 
     def _key(self, chunk, prosody_signature):
         h = hashlib.sha256()
-        h.update((chunk.text + prosody_signature).encode("utf-8"))
+        h.update((_text(chunk) + prosody_signature).encode("utf-8"))
         return h.hexdigest()
 
-    def prefetch(self, chunk, prosody_signature):
+    def prefetch(self, chunk, prosody_signature, prosody=None):
+        """Synthesize `chunk` on a thread (tts.synthesize(text, prosody, out_path) -> bool)."""
+        if prosody is None:
+            prosody = getattr(chunk, "prosody", None) or {}
         key = self._key(chunk, prosody_signature)
         with self.lock:
             if key in self.cache or key in self.in_flight:
@@ -29,10 +40,8 @@ class TTSPrefetcher:
             try:
                 wav_path = os.path.join(self.cache_dir, f"{key}.wav")
                 if not os.path.exists(wav_path):
-                    wav = self.tts.synthesize(chunk.text, prosody=chunk.prosody)
-                    if wav:
-                        with open(wav_path, "wb") as f:
-                            f.write(wav)
+                    if not self.tts.synthesize(_text(chunk), prosody, wav_path):
+                        return
                 with self.lock:
                     self.cache[key] = wav_path
             except Exception as e:
@@ -40,7 +49,7 @@ class TTSPrefetcher:
             finally:
                 with self.lock:
                     self.in_flight.discard(key)
-        t = threading.Thread(target=run, daemon=True)
+        t = threading.Thread(target=run, name="tts-prefetch", daemon=True)
         t.start()
 
     def get(self, chunk, prosody_signature) -> Optional[str]:
@@ -0,0 +1,291 @@
+"""Typed, frozen config snapshot with hot reload.
+
+`build_snapshot(raw)` turns the YAML dict into frozen `__slots__` dataclasses with every
+clamp applied once (the same bounds the consumers used to re-apply on each call), so
+hot paths read attributes instead of nested `.get()` chains:
+
+- `prosody`: map_prosody gains (audio.prosody.*)
+- `emergency_chat`: EmergencyChatNotifier cooldowns, limits and beep settings (flat keys)
+- `content_broker`: ContentBroker gating, idle aside and interest settings
+
+`raw` is the dict the snapshot was built from, for code that still reads sections
+directly; treat it as read-only.
+
+`ConfigStore` owns the current snapshot. `reload()` re-reads the file when its mtime or
+size changed, builds a new snapshot and swaps it in with a single reference assignment,
+so a reader sees the old or the new snapshot, never a mix. A file that fails to load or
+validate keeps the previous snapshot. `start()` polls from a daemon thread; subscribers
+are called with each new snapshot.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, List, Mapping, Optional
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+
+def _f(v, default, lo=None, hi=None) -> float:
+    try:
+        x = float(v)
+    except Exception:
+        x = float(default)
+    if lo is not None:
+        x = max(lo, x)
+    if hi is not None:
+        x = min(hi, x)
+    return x
+
+
+def _i(v, default, lo=None, hi=None) -> int:
+    try:
+        x = int(v)
+    except Exception:
+        x = int(default)
+    if lo is not None:
+        x = max(lo, x)
+    if hi is not None:
+        x = min(hi, x)
+    return x
+
+
+def _section(d, key) -> dict:
+    v = d.get(key) if isinstance(d, dict) else None
+    return v if isinstance(v, dict) else {}
+
+
+@dataclass(frozen=True, slots=True)
+class ProsodyConfig:
+    pitch_gain: float = 0.15
+    speed_gain: float = 0.20
+    energy_gain: float = 0.30
+
+    @classmethod
+    def from_dict(cls, cfg: dict) -> "ProsodyConfig":
+        p = _section(_section(cfg, "audio"), "prosody")
+        return cls(
+            pitch_gain=_f(p.get("pitch_gain", 0.15), 0.15, 0.05, 0.3),
+            speed_gain=_f(p.get("speed_gain", 0.20), 0.20, 0.05, 0.4),
+            energy_gain=_f(p.get("energy_gain", 0.30), 0.30, 0.1, 0.5),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EmergencyChatConfig:
+    enabled: bool = False
+    cooldown_sec: float = 120.0
+    disaster_cooldown_sec: float = 8.0
+    dedupe_window_sec: int = 600
+    max_lines: int = 4
+    max_chars: int = 180
+    prefix: str = "【緊急】"
+    disaster_prefix: str = "【緊急】"
+    enable_beep: bool = False
+    beep_min_interval_sec: int = 10
+    beep_freq_hz: int = 1000
+    beep_duration_ms: int = 160
+    beep_gain: float = 0.25
+    beep_repeats: int = 1
+    beep_repeat_gap_ms: int = 120
+
+    @classmethod
+    def from_dict(cls, cfg: dict) -> "EmergencyChatConfig":
+        c = cfg if isinstance(cfg, dict) else {}
+        return cls(
+            enabled=bool(c.get('enable_emergency_chat_jp', False)),
+            cooldown_sec=_f(c.get('emergency_chat_cooldown_sec', 120), 120, 0.0),
+            disaster_cooldown_sec=_f(c.get('disaster_chat_cooldown_sec', 8), 8, 0.0),
+            dedupe_window_sec=_i(c.get('emergency_chat_dedupe_window_sec', 600), 600, 30),
+            max_lines=_i(c.get('emergency_chat_max_lines', 4), 4, 2, 6),
+            max_chars=_i(c.get('emergency_chat_max_chars', 180), 180, 80, 220),
+            prefix=str(c.get('emergency_chat_prefix', '【緊急】')),
+            disaster_prefix=str(c.get('disaster_chat_prefix', '【緊急】')),
+            enable_beep=bool(c.get('enable_disaster_beep', False)),
+            beep_min_interval_sec=_i(c.get('disaster_beep_min_interval_sec', 10), 10, 8),
+            beep_freq_hz=_i(c.get('disaster_beep_freq_hz', 1000), 1000, 600, 2000),
+            beep_duration_ms=_i(c.get('disaster_beep_duration_ms', 160), 160, 80, 400),
+            beep_gain=_f(c.get('disaster_beep_gain', 0.25), 0.25, 0.05, 0.6),
+            beep_repeats=_i(c.get('disaster_beep_repeats', 1), 1, 1, 3),
+            beep_repeat_gap_ms=_i(c.get('disaster_beep_repeat_gap_ms', 120), 120, 60, 400),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class IdleAsideConfig:
+    enabled: bool = True
+    emit_cooldown_sec: float = 60.0
+    session_max_emits: int = 3
+    min_confidence: float = 0.35
+
+
+@dataclass(frozen=True, slots=True)
+class BrokerInterestConfig:
+    enabled: bool = True
+    weights: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({"other": 1.0}))
+    unknown_topic: str = "other"
+    drop_threshold: float = 0.15
+    half_life_days: float = 7.0
+    floor_weight: float = 0.1
+
+
+@dataclass(frozen=True, slots=True)
+class ContentBrokerConfig:
+    enabled: bool = True
+    max_pending: int = 20
+    max_idle_pending: int = 30
+    used_ttl_sec: float = 86400.0
+    session_max_emits: int = 3
+    emit_cooldown_sec: float = 300.0
+    talk_cooldown_after_end_sec: float = 10.0
+    min_confidence: float = 0.55
+    max_social_pressure: float = 0.65
+    max_arousal: float = 0.85
+    require_idle_state: bool = True
+    idle_aside: IdleAsideConfig = IdleAsideConfig()
+    interest: BrokerInterestConfig = BrokerInterestConfig()
+
+    @classmethod
+    def from_dict(cls, cb: dict) -> "ContentBrokerConfig":
+        """From the `content_broker` section."""
+        cb = cb if isinstance(cb, dict) else {}
+        ia = _section(cb, "idle_aside")
+        it = _section(cb, "interest")
+        weights = {}
+        for k, v in (it.get("weights") or {}).items():
+            weights[str(k)] = _f(v, 1.0, 0.0)
+        d = cls()
+        return cls(
+            enabled=bool(cb.get("enabled", d.enabled)),
+            max_pending=_i(cb.get("max_pending", d.max_pending), d.max_pending, 0),
+            max_idle_pending=_i(cb.get("max_idle_pending", d.max_idle_pending), d.max_idle_pending, 0),
+            used_ttl_sec=_f(cb.get("used_ttl_sec", d.used_ttl_sec), d.used_ttl_sec, 0.0),
+            session_max_emits=_i(cb.get("session_max_emits", d.session_max_emits), d.session_max_emits, 0),
+            emit_cooldown_sec=_f(cb.get("emit_cooldown_sec", d.emit_cooldown_sec), d.emit_cooldown_sec, 0.0),
+            talk_cooldown_after_end_sec=_f(cb.get("talk_cooldown_after_end_sec", d.talk_cooldown_after_end_sec),
+                                           d.talk_cooldown_after_end_sec, 0.0),
+            min_confidence=_f(cb.get("min_confidence", d.min_confidence), d.min_confidence, 0.0, 1.0),
+            max_social_pressure=_f(cb.get("max_social_pressure", d.max_social_pressure), d.max_social_pressure, 0.0, 1.0),
+            max_arousal=_f(cb.get("max_arousal", d.max_arousal), d.max_arousal, 0.0, 1.0),
+            require_idle_state=bool(cb.get("require_idle_state", d.require_idle_state)),
+            idle_aside=IdleAsideConfig(
+                enabled=bool(ia.get("enabled", True)),
+                emit_cooldown_sec=_f(ia.get("emit_cooldown_sec", 60), 60, 0.0),
+                session_max_emits=_i(ia.get("session_max_emits", 3), 3, 0),
+                min_confidence=_f(ia.get("min_confidence", 0.35), 0.35, 0.0, 1.0),
+            ),
+            interest=BrokerInterestConfig(
+                enabled=bool(it.get("enabled", True)),
+                weights=MappingProxyType(weights or {"other": 1.0}),
+                unknown_topic=str(it.get("unknown_topic", "other")),
+                drop_threshold=_f(it.get("drop_threshold", 0.15), 0.15, 0.0),
+                half_life_days=_f(it.get("half_life_days", 7), 7, 0.01),
+                floor_weight=_f(it.get("floor_weight", 0.1), 0.1, 0.0, 1.0),
+            ),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    version: int
+    raw: dict
+    prosody: ProsodyConfig
+    emergency_chat: EmergencyChatConfig
+    content_broker: ContentBrokerConfig
+    source: Optional[str] = None
+    loaded_at: float = 0.0
+
+
+def build_snapshot(raw: Optional[dict], version: int = 0, source: Optional[str] = None) -> ConfigSnapshot:
+    raw = raw if isinstance(raw, dict) else {}
+    return ConfigSnapshot(
+        version=version,
+        raw=raw,
+        prosody=ProsodyConfig.from_dict(raw),
+        emergency_chat=EmergencyChatConfig.from_dict(raw),
+        content_broker=ContentBrokerConfig.from_dict(_section(raw, "content_broker")),
+        source=source,
+        loaded_at=time.time(),
+    )
+
+
+def _load_yaml(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: top level must be a mapping")
+    return data
+
+
+class ConfigStore:
+    def __init__(self, path: str, *, poll_sec: float = 1.0, loader: Callable[[str], dict] = _load_yaml,
+                 initial: Optional[dict] = None):
+        self.path = path
+        self.poll_sec = max(0.1, float(poll_sec))
+        self._loader = loader
+        self._listeners: List[Callable[[ConfigSnapshot], Any]] = []
+        self._lock = threading.Lock()  # one reload at a time; readers never take it
+        self._stamp = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = 0
+        self._snap = build_snapshot(initial, 0, path) if initial is not None else None
+        if self._snap is None and not self.reload():
+            self._snap = build_snapshot({}, 0, path)
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        return self._snap
+
+    def subscribe(self, fn: Callable[[ConfigSnapshot], Any]) -> None:
+        self._listeners.append(fn)
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def reload(self, force: bool = False) -> bool:
+        """Swap in a new snapshot if the file changed (or `force`). Returns True on swap."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None or (stamp == self._stamp and not force):
+                return False
+            try:
+                prev = self._snap
+                snap = build_snapshot(self._loader(self.path), (prev.version + 1) if prev else 1, self.path)
+            except Exception:
+                self.errors += 1
+                self._stamp = stamp  # don't retry the same broken file every poll
+                logger.warning("config reload failed, keeping version %s", getattr(self._snap, "version", None),
+                               exc_info=True)
+                return False
+            self._stamp = stamp
+            self._snap = snap
+        for fn in list(self._listeners):
+            try:
+                fn(snap)
+            except Exception:
+                logger.exception("config reload listener failed")
+        return True
+
+    def start(self) -> "ConfigStore":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="config-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_sec):
+            self.reload()
@@ -3,6 +3,8 @@ from collections import deque
 from threading import Lock
 import hashlib
 
+from core.config_snapshot import ContentBrokerConfig
+
 class TTLSet:
     def __init__(self, ttl_sec):
         self.ttl_sec = ttl_sec
@@ -30,10 +32,10 @@ class TTLSet:
 
 class ContentBroker:
     def __init__(self, config, interest_store=None, logger=None):
-        self.cfg = config["content_broker"]
+        self.apply_config(config)
         self.pending = deque()
         self.idle_pending = deque()
-        self.used_ids = TTLSet(self.cfg["used_ttl_sec"])
+        self.used_ids = TTLSet(self.cfg.used_ttl_sec)
         self.last_emit_ts = 0.0
         self.session_emitted_count = 0
         self.last_talk_end_ts = 0.0
@@ -42,24 +44,35 @@ class ContentBroker:
         self.lock = Lock()
         self.interest_store = interest_store
         self.logger = logger
+    def apply_config(self, config):
+        """Raw config dict (reads `content_broker`), ConfigSnapshot or ContentBrokerConfig; swapped atomically."""
+        cb = getattr(config, "content_broker", config)
+        if not isinstance(cb, ContentBrokerConfig):
+            cb = ContentBrokerConfig.from_dict((config or {}).get("content_broker"))
+        self.cfg = cb
+        used = getattr(self, "used_ids", None)
+        if used is not None:
+            used.ttl_sec = cb.used_ttl_sec
     def add_items(self, items, now_ts=None):
         import time
         try:
             if now_ts is None:
                 now_ts = int(time.time())
-            base_weights = self.cfg["interest"]["weights"]
+            cfg = self.cfg  # one snapshot for the whole batch
+            interest = cfg.interest
+            base_weights = interest.weights
             weights = base_weights
             if (
                 self.interest_store is not None
-                and self.cfg["interest"].get("enabled", True)
+                and interest.enabled
             ):
                 try:
                     # memory_decay設定はcfgの上位で判定する想定（mainで注入時に保証）
                     weights = self.interest_store.get_interest_weights_decayed(
                         now_ts=now_ts,
-                        base_weights=base_weights,
-                        half_life_sec=self.cfg["interest"].get("half_life_days", 7)*86400,
-                        floor_weight=self.cfg["interest"].get("floor_weight", 0.1),
+                        base_weights=dict(base_weights),
+                        half_life_sec=interest.half_life_days*86400,
+                        floor_weight=interest.floor_weight,
                     )
                 except Exception as e:
                     if self.logger:
@@ -68,24 +81,24 @@ class ContentBroker:
             scored = []
             idle_scored = []
             for item in items:
-                topic = item.get("topic", self.cfg["interest"].get("unknown_topic", "other"))
+                topic = item.get("topic", interest.unknown_topic)
                 base_score = 0.6 if item.get("kind") == "news" else 0.5
-                iw = weights.get(topic, weights.get(self.cfg["interest"].get("unknown_topic", "other"), 1.0))
+                iw = weights.get(topic, weights.get(interest.unknown_topic, 1.0))
                 score = base_score * iw
-                if score < self.cfg["interest"]["drop_threshold"]:
+                if score < interest.drop_threshold:
                     continue
                 if item["id"] in self.used_ids:
                     continue
                 scored.append((score, -item["published_ts"], item["id"], item))
                 # idle_asideは閾値緩め
-                idle_score = max(score, self.cfg["idle_aside"]["min_confidence"])
+                idle_score = max(score, cfg.idle_aside.min_confidence)
                 idle_scored.append((idle_score, -item["published_ts"], item["id"], item))
             scored.sort(reverse=True)
             idle_scored.sort(reverse=True)
             with self.lock:
-                for _,_,_,item in scored[:self.cfg["max_pending"]]:
+                for _,_,_,item in scored[:cfg.max_pending]:
                     self.pending.append(item)
-                for _,_,_,item in idle_scored[:self.cfg["max_idle_pending"]]:
+                for _,_,_,item in idle_scored[:cfg.max_idle_pending]:
                     self.idle_pending.append(item)
         except Exception as e:
             if self.logger:
@@ -94,21 +107,22 @@ class ContentBroker:
         with self.lock:
             self.last_talk_end_ts = now
     def should_emit(self, now, scalars, state):
-        if not self.cfg["enabled"]:
+        cfg = self.cfg
+        if not cfg.enabled:
             return False
-        if now - self.last_emit_ts < self.cfg["emit_cooldown_sec"]:
+        if now - self.last_emit_ts < cfg.emit_cooldown_sec:
             return False
-        if self.session_emitted_count >= self.cfg["session_max_emits"]:
+        if self.session_emitted_count >= cfg.session_max_emits:
             return False
-        if now - self.last_talk_end_ts < self.cfg["talk_cooldown_after_end_sec"]:
+        if now - self.last_talk_end_ts < cfg.talk_cooldown_after_end_sec:
             return False
-        if scalars.get("confidence",1.0) < self.cfg["min_confidence"]:
+        if scalars.get("confidence",1.0) < cfg.min_confidence:
             return False
-        if scalars.get("social_pressure",0.0) > self.cfg["max_social_pressure"]:
+        if scalars.get("social_pressure",0.0) > cfg.max_social_pressure:
             return False
-        if scalars.get("arousal",0.0) > self.cfg["max_arousal"]:
+        if scalars.get("arousal",0.0) > cfg.max_arousal:
             return False
-        if self.cfg["require_idle_state"] and state != "IDLE":
+        if cfg.require_idle_state and state != "IDLE":
             return False
         # ALERT/SEARCH/name-learning gatingは外部で
         return True
@@ -127,23 +141,32 @@ class ContentBroker:
                 # emit直後にinterest bump（fail-soft）
                 if self.interest_store:
                     try:
-                        topic = item.get("topic") or self.cfg["interest"].get("unknown_topic", "other")
+                        topic = item.get("topic") or self.cfg.interest.unknown_topic
                         self.interest_store.bump_interest(topic, now_ts=now_ts, amount=1.0)
                     except Exception as e:
                         if self.logger:
                             self.logger.debug(f"bump_interest failed: {e}")
                 return item
         return None
+    def peek_idle_aside(self):
+        """Next idle aside candidate without consuming it or touching cooldowns (for pre-rendering)."""
+        if not self.cfg.idle_aside.enabled:
+            return None
+        with self.lock:
+            for item in self.idle_pending:
+                if item["id"] not in self.used_ids:
+                    return item
+        return None
     def pop_for_idle_aside(self, now_ts=None, scalars=None, state=None):
         import time
         if now_ts is None:
             now_ts = int(time.time())
-        if not self.cfg["idle_aside"]["enabled"]:
+        if not self.cfg.idle_aside.enabled:
             return None
         with self.lock:
-            if self.idle_session_emitted_count >= self.cfg["idle_aside"]["session_max_emits"]:
+            if self.idle_session_emitted_count >= self.cfg.idle_aside.session_max_emits:
                 return None
-            if now_ts - self.idle_last_emit_ts < self.cfg["idle_aside"]["emit_cooldown_sec"]:
+            if now_ts - self.idle_last_emit_ts < self.cfg.idle_aside.emit_cooldown_sec:
                 return None
             while self.idle_pending:
                 item = self.idle_pending.popleft()
@@ -2,29 +2,14 @@
  # core/emergency_chat_notifier.py
 import hashlib
 
+from core.config_snapshot import EmergencyChatConfig
+
 class EmergencyChatNotifier:
     def __init__(self, osc_chat_sender, time_provider, config, format_url_for_display=None, beep_player=None):
         self.send_chat = osc_chat_sender
         self.tp = time_provider
-        self.cfg = config or {}
         self.format_url = format_url_for_display
-        self.enabled = bool(self.cfg.get('enable_emergency_chat_jp', False))
-        # Cooldowns and clamps
-        self.em_cd = max(0.0, float(self.cfg.get('emergency_chat_cooldown_sec', 120)))
-        self.dis_cd = max(0.0, float(self.cfg.get('disaster_chat_cooldown_sec', 8)))
-        self.dedupe_window = max(30, int(self.cfg.get('emergency_chat_dedupe_window_sec', 600)))
-        self.max_lines = max(2, min(6, int(self.cfg.get('emergency_chat_max_lines', 4))))
-        self.max_chars = max(80, min(220, int(self.cfg.get('emergency_chat_max_chars', 180))))
-        self.em_prefix = str(self.cfg.get('emergency_chat_prefix', '【緊急】'))
-        self.dis_prefix = str(self.cfg.get('disaster_chat_prefix', '【緊急】'))
-        # Disaster beep config
-        self.enable_beep = bool(self.cfg.get('enable_disaster_beep', False))
-        self.beep_min_interval = max(8, int(self.cfg.get('disaster_beep_min_interval_sec', 10)))
-        self.beep_freq = max(600, min(2000, int(self.cfg.get('disaster_beep_freq_hz', 1000))) )
-        self.beep_dur = max(80, min(400, int(self.cfg.get('disaster_beep_duration_ms', 160))))
-        self.beep_gain = max(0.05, min(0.6, float(self.cfg.get('disaster_beep_gain', 0.25))))
-        self.beep_repeats = max(1, min(3, int(self.cfg.get('disaster_beep_repeats', 1))))
-        self.beep_gap = max(60, min(400, int(self.cfg.get('disaster_beep_repeat_gap_ms', 120))))
+        self.apply_config(config)
         self.beep_player = beep_player
         self.last_beep_ts = None  # type: Optional[float]
         self._disaster_beep_attempts = 0  # test observability only
@@ -35,6 +20,29 @@ class EmergencyChatNotifier:
         self.last_sent_ts_by_level_and_hash = {}
         self._last_level = None
 
+    def apply_config(self, config) -> None:
+        """Take settings from a raw config dict, a ConfigSnapshot or an EmergencyChatConfig (clamped there)."""
+        ec = getattr(config, "emergency_chat", config)
+        if not isinstance(ec, EmergencyChatConfig):
+            ec = EmergencyChatConfig.from_dict(config or {})
+        self.settings = ec
+        self.enabled = ec.enabled
+        self.em_cd = ec.cooldown_sec
+        self.dis_cd = ec.disaster_cooldown_sec
+        self.dedupe_window = ec.dedupe_window_sec
+        self.max_lines = ec.max_lines
+        self.max_chars = ec.max_chars
+        self.em_prefix = ec.prefix
+        self.dis_prefix = ec.disaster_prefix
+        # Disaster beep config
+        self.enable_beep = ec.enable_beep
+        self.beep_min_interval = ec.beep_min_interval_sec
+        self.beep_freq = ec.beep_freq_hz
+        self.beep_dur = ec.beep_duration_ms
+        self.beep_gain = ec.beep_gain
+        self.beep_repeats = ec.beep_repeats
+        self.beep_gap = ec.beep_repeat_gap_ms
+
     def _safe_now_after_send(self, now: float) -> float:
         return float(now)
     def maybe_notify(self, level, reason, details=None):
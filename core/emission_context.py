@@ -0,0 +1,81 @@
+"""Per-plan emission context: what emit_chunk used to look up again for every chunk.
+
+main.emission_context() builds one per config reload (a new cfg object), params_map
+or speaker store, and emit_chunk/emit_plan only read attributes from it:
+- resolved config sections (audio/osc/speech) and the blocked states
+- the pre-clamped prosody gains (core.config_snapshot.ProsodyConfig) for map_prosody
+- the compiled params_map
+- speaker tempo (SQLite-backed SpeakerStore queries), cached per speaker for `tempo_ttl_sec`
+- emergency level and reason, cached for `emergency_ttl_sec`
+
+The TTLs keep a long plan responsive to a speaker's tempo drifting or an emergency
+starting, without paying for the queries on every chunk.
+"""
+import time
+from typing import Callable, Optional, Tuple
+
+from core.config_snapshot import ProsodyConfig
+
+DEFAULT_TEMPO = {'response_delay_ms': 0, 'idle_interval_scale': 1.0, 'prosody_speed_scale': 1.0}
+DEFAULT_REGULATION = {'tts_enabled': True, 'prosody_scale': 1.0, 'idle_interval_scale': 1.0}
+
+
+class EmissionContext:
+    __slots__ = ("cfg", "audio_cfg", "osc_cfg", "speech_cfg", "audio_enabled", "prosody", "blocked", "cmap",
+                 "speaker_store", "plan_lookahead", "tempo_ttl_sec", "emergency_ttl_sec",
+                 "_tempo_fn", "_emergency_fn", "_time", "_tempo", "_emergency", "_emergency_expires")
+
+    def __init__(self, cfg: dict, cmap, *, blocked: tuple = (), tempo_fn: Optional[Callable] = None,
+                 speaker_store=None, emergency_fn: Optional[Callable[[], Tuple[str, Optional[str]]]] = None,
+                 tempo_ttl_sec: float = 30.0, emergency_ttl_sec: float = 1.0,
+                 time_fn: Callable[[], float] = time.monotonic):
+        cfg = cfg if isinstance(cfg, dict) else {}
+        self.cfg = cfg
+        self.audio_cfg = cfg.get("audio", {}) or {}
+        self.osc_cfg = cfg.get("osc", {}) or {}
+        self.speech_cfg = cfg.get("speech", {}) or {}
+        self.audio_enabled = bool(self.audio_cfg.get("enabled", True))
+        self.prosody = ProsodyConfig.from_dict(cfg)
+        try:
+            self.plan_lookahead = max(1, min(4, int(self.speech_cfg.get("plan_lookahead", 2))))
+        except Exception:
+            self.plan_lookahead = 2
+        self.blocked = tuple(blocked)
+        self.cmap = cmap
+        self.speaker_store = speaker_store
+        self.tempo_ttl_sec = max(0.0, float(tempo_ttl_sec))
+        self.emergency_ttl_sec = max(0.0, float(emergency_ttl_sec))
+        self._tempo_fn = tempo_fn
+        self._emergency_fn = emergency_fn
+        self._time = time_fn
+        self._tempo = {}  # speaker_key -> (expires, tempo)
+        self._emergency = ("none", None)
+        self._emergency_expires = None
+
+    def tempo(self, speaker_key) -> dict:
+        """Speaker tempo (DEFAULT_TEMPO without a key/store/tempo_fn); at most one query per TTL."""
+        if not speaker_key or self._tempo_fn is None or not self.speaker_store:
+            return DEFAULT_TEMPO
+        now = self._time()
+        hit = self._tempo.get(speaker_key)
+        if hit is not None and now < hit[0]:
+            return hit[1]
+        try:
+            tempo = self._tempo_fn(speaker_key, self.speaker_store, int(time.time()), self.cfg) or DEFAULT_TEMPO
+        except Exception:
+            tempo = DEFAULT_TEMPO
+        self._tempo[speaker_key] = (now + self.tempo_ttl_sec, tempo)
+        return tempo
+
+    def emergency(self) -> Tuple[Tuple[str, Optional[str]], bool]:
+        """((level, reason), fresh): recomputed at most every emergency_ttl_sec; fresh on recompute."""
+        now = self._time()
+        if self._emergency_expires is not None and now < self._emergency_expires:
+            return self._emergency, False
+        if self._emergency_fn is not None:
+            try:
+                self._emergency = self._emergency_fn()
+            except Exception:
+                self._emergency = ("none", None)
+        self._emergency_expires = now + self.emergency_ttl_sec
+        return self._emergency, True
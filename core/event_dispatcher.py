@@ -0,0 +1,254 @@
+"""Serialized StateMachine event delivery.
+
+Any thread (VAD callback, STT worker, timers, asyncio tasks) calls `post()`; one
+consumer drains the queue in order and calls `sm.on_event`, so state changes never
+interleave. `call(fn)` queues a plain callable (deferred transitions, timer replies)
+on the same queue.
+
+- coalescing: a posted event whose coalesce key matches one still waiting replaces
+  its payload in place (default: `stt_final` while the bot is speaking, since the
+  SM keeps only the latest as `_pending_stt`)
+- backpressure: over `queue_max` the oldest non-critical event is dropped; `call()`
+  entries (deferred transitions such as the reply timer) are never dropped
+- metrics: queue depth, and per event type a histogram of handling time plus
+  queue wait time
+
+The consumer is `run()` on an asyncio loop (`start()` schedules it); without a loop,
+`drain()` processes what is queued on the calling thread.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CRITICAL_EVENTS = ("emergency_trigger", "alert_new", "net_query")
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 1000.0)
+
+
+def default_coalesce_key(event, payload, sm):
+    if event == "stt_final" and getattr(sm, "vad_speaking", False):
+        return "stt_final:speaking"
+    return None
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-quantile (max_ms for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 4),
+            "buckets": {("le_%g" % b if i < len(BUCKETS_MS) else "inf"): n
+                        for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.counts)) if n},
+        }
+
+
+class _Entry:
+    __slots__ = ("event", "payload", "kwargs", "fn", "key", "ts", "done")
+
+    def __init__(self, event, payload, kwargs, fn, key, ts):
+        self.event = event
+        self.payload = payload
+        self.kwargs = kwargs
+        self.fn = fn
+        self.key = key
+        self.ts = ts
+        self.done = False
+
+
+class EventDispatcher:
+    def __init__(self, sm, *, queue_max: int = 256,
+                 coalesce_key: Optional[Callable] = default_coalesce_key,
+                 time_fn: Callable[[], float] = time.perf_counter):
+        self.sm = sm
+        self.queue_max = max(1, int(queue_max))
+        self.coalesce_key = coalesce_key
+        self._time = time_fn
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._by_key: Dict[str, _Entry] = {}
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self.handle_hist: Dict[str, LatencyHistogram] = {}
+        self.wait_hist: Dict[str, LatencyHistogram] = {}
+        self.stats = {"posted": 0, "handled": 0, "coalesced": 0, "dropped": 0, "errors": 0, "max_queue_depth": 0}
+
+    # --- producers (any thread) ---
+    def post(self, event, payload=None, **kwargs) -> bool:
+        """Queue an event. Returns False if it was merged into one already waiting."""
+        key = None
+        if self.coalesce_key is not None:
+            try:
+                key = self.coalesce_key(event, payload, self.sm)
+            except Exception:
+                key = None
+        with self._lock:
+            self.stats["posted"] += 1
+            if key is not None:
+                waiting = self._by_key.get(key)
+                if waiting is not None and not waiting.done:
+                    waiting.payload = payload
+                    waiting.kwargs = kwargs
+                    self.stats["coalesced"] += 1
+                    return False
+            e = _Entry(event, payload, kwargs, None, key, self._time())
+            self._push(e)
+        self._notify()
+        return True
+
+    def call(self, fn: Callable[[], None], label: str = "call") -> None:
+        """Run `fn` on the consumer, in order with events."""
+        with self._lock:
+            self.stats["posted"] += 1
+            self._push(_Entry(label, None, None, fn, None, self._time()))
+        self._notify()
+
+    def _push(self, e) -> None:
+        q = self._queue
+        q.append(e)
+        if e.key is not None:
+            self._by_key[e.key] = e
+        if len(q) > self.queue_max:
+            for victim in q:
+                if victim.fn is None and victim.event not in CRITICAL_EVENTS:
+                    q.remove(victim)
+                    self._forget(victim)
+                    self.stats["dropped"] += 1
+                    break
+        if len(q) > self.stats["max_queue_depth"]:
+            self.stats["max_queue_depth"] = len(q)
+
+    def _forget(self, e) -> None:
+        e.done = True
+        if e.key is not None and self._by_key.get(e.key) is e:
+            del self._by_key[e.key]
+
+    def _notify(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            if self._on_loop():
+                wake.set()
+            else:
+                loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # loop closed; drain() still works
+
+    # --- consumer ---
+    def _pop(self):
+        with self._lock:
+            if not self._queue:
+                return None
+            e = self._queue.popleft()
+            self._forget(e)
+            return e
+
+    def _handle(self, e) -> None:
+        t0 = self._time()
+        try:
+            if e.fn is not None:
+                e.fn()
+            else:
+                self.sm.on_event(e.event, e.payload, **(e.kwargs or {}))
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception("state machine event %s failed", e.event)
+        t1 = self._time()
+        name = str(e.event)
+        self.handle_hist.setdefault(name, LatencyHistogram()).add((t1 - t0) * 1000.0)
+        self.wait_hist.setdefault(name, LatencyHistogram()).add((t0 - e.ts) * 1000.0)
+        self.stats["handled"] += 1
+
+    def drain(self, limit: Optional[int] = None) -> int:
+        """Handle queued entries on the calling thread. Returns how many were handled."""
+        n = 0
+        while limit is None or n < limit:
+            e = self._pop()
+            if e is None:
+                break
+            self._handle(e)
+            n += 1
+        return n
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> "EventDispatcher":
+        """Run the consumer on `loop` (default: the running loop)."""
+        if self._task is not None:
+            return self
+        loop = loop or asyncio.get_running_loop()
+        self._loop = loop
+        if self._on_loop():
+            self._task = loop.create_task(self.run())
+        else:
+            self._task = asyncio.run_coroutine_threadsafe(self.run(), loop)
+        return self
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while stop is None or not stop.is_set():
+            self._wake.clear()
+            self.drain()
+            if stop is not None and stop.is_set():
+                break
+            try:
+                await asyncio.wait_for(self._wake.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+        self.drain()
+
+    def stop(self) -> None:
+        t, self._task = self._task, None
+        if t is not None:
+            t.cancel()
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            m = dict(self.stats)
+            m["queue_depth"] = len(self._queue)
+        m["handle_ms"] = {k: h.summary() for k, h in self.handle_hist.items()}
+        m["wait_ms"] = {k: h.summary() for k, h in self.wait_hist.items()}
+        return m
@@ -0,0 +1,257 @@
+"""Event loop lag monitor, slow-loop watchdog and per-component sampling profile.
+
+The bot mixes asyncio tasks with threads (emit executor, TTS prefetch, STT worker,
+timers) and the odd blocking call on the loop. When it stutters, these show who held
+the loop:
+
+- `LoopLagMonitor`: a task on the loop that sleeps `interval_ms` and records how late
+  it woke (scheduling delay). Each wake stamps a heartbeat.
+- `SlowLoopWatchdog`: a daemon thread that watches the heartbeat. While the loop is
+  overdue by more than `slow_ms`, it samples the loop thread's stack every `sample_ms`
+  (`sys._current_frames`). Each stall is kept with its lag and most frequent stack, and
+  its time is charged to the components (innermost repo module) the samples found.
+- with `profile_threads`, the same thread also samples every other thread and accounts
+  `sample_ms` per sample to (thread name, component). Samples parked in a stdlib wait
+  (select, Event.wait, queue.get, idle executor workers) are skipped.
+
+`LoopProfiler` runs all three. `report()` is a JSON-able dict; `write_folded()` writes
+the samples as folded stacks (`thread;module:func;... count`), the input format of
+flamegraph.pl / speedscope.
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_DEPTH = 64
+# stdlib leaves where a thread is parked rather than running
+IDLE_LEAVES = frozenset({"select", "poll", "wait", "get", "_worker", "accept", "recv", "recvfrom", "_wait_for_tstate_lock"})
+
+
+@lru_cache(maxsize=1024)
+def _module_of(filename: str):
+    """(module name, inside repo) for a code object's filename."""
+    path = os.path.abspath(filename)
+    if path.startswith(ROOT + os.sep) and os.sep + "site-packages" + os.sep not in path:
+        rel = os.path.splitext(os.path.relpath(path, ROOT))[0]
+        return rel.replace(os.sep, "."), True
+    return os.path.splitext(os.path.basename(path))[0], False
+
+
+def fold_stack(frame, prefix: Optional[str] = None):
+    """(folded stack root-first, component, idle) for a frame."""
+    labels = []
+    component = None
+    leaf = frame
+    depth = 0
+    while frame is not None and depth < MAX_DEPTH:
+        code = frame.f_code
+        mod, in_repo = _module_of(code.co_filename)
+        if component is None and in_repo:
+            component = mod
+        labels.append(f"{mod}:{code.co_name}")
+        frame = frame.f_back
+        depth += 1
+    leaf_mod, leaf_in_repo = _module_of(leaf.f_code.co_filename)
+    idle = not leaf_in_repo and leaf.f_code.co_name in IDLE_LEAVES
+    if prefix:
+        labels.append(prefix)
+    return ";".join(reversed(labels)), component or leaf_mod, idle
+
+
+def _percentile(sorted_vals, p: float):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p * (len(sorted_vals) - 1))))]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval_ms: float = 50.0, window: int = 1024):
+        self.interval = max(0.001, float(interval_ms) / 1000.0)
+        self.lags_ms = collections.deque(maxlen=int(window))
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.count = 0
+        self.expected = None  # perf_counter when the next wake is due
+        self.loop_thread_id = None
+        self._task = None
+
+    async def run(self) -> None:
+        self.loop_thread_id = threading.get_ident()
+        while True:
+            t0 = time.perf_counter()
+            self.expected = t0 + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, (now - self.expected) * 1000.0)
+            self.last_lag_ms = lag
+            self.lags_ms.append(lag)
+            self.count += 1
+            if lag > self.max_lag_ms:
+                self.max_lag_ms = lag
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> "LoopLagMonitor":
+        if self._task is None:
+            loop = loop or asyncio.get_running_loop()
+            try:
+                on_loop = asyncio.get_running_loop() is loop
+            except RuntimeError:
+                on_loop = False
+            if on_loop:
+                self._task = loop.create_task(self.run())
+            else:
+                self._task = asyncio.run_coroutine_threadsafe(self.run(), loop)
+        return self
+
+    def stop(self) -> None:
+        t, self._task = self._task, None
+        if t is not None:
+            t.cancel()
+        self.expected = None
+
+    def overdue_ms(self, now: Optional[float] = None) -> float:
+        """How far past its wake time the monitor is (0 when on time or not running)."""
+        exp = self.expected
+        if exp is None:
+            return 0.0
+        return max(0.0, ((now or time.perf_counter()) - exp) * 1000.0)
+
+    def stats(self) -> dict:
+        s = sorted(self.lags_ms)
+        return {"interval_ms": self.interval * 1000.0, "count": self.count, "p50_ms": _percentile(s, 0.5),
+                "p95_ms": _percentile(s, 0.95), "p99_ms": _percentile(s, 0.99), "max_ms": self.max_lag_ms}
+
+
+class SlowLoopWatchdog:
+    def __init__(self, monitor: LoopLagMonitor, slow_ms: float = 100.0, sample_ms: float = 10.0,
+                 profile_threads: bool = False, max_stalls: int = 64):
+        self.monitor = monitor
+        self.slow_ms = float(slow_ms)
+        self.sample_s = max(0.001, float(sample_ms) / 1000.0)
+        self.profile_threads = bool(profile_threads)
+        self.stalls = collections.deque(maxlen=int(max_stalls))
+        self.loop_blocked_ms = collections.Counter()  # component -> ms the loop was held there
+        self.thread_ms: Dict[str, collections.Counter] = {}  # thread name -> component -> ms
+        self.folded = collections.Counter()  # folded stack -> samples
+        self._stall = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SlowLoopWatchdog":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop sampling; a stall still open is closed and reported."""
+        self._stop.set()
+        t, self._thread = self._thread, None
+        if t is not None and t is not threading.current_thread():
+            t.join(1.0)
+        with self._lock:
+            if self._stall is not None:
+                self._close_stall()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sample_s):
+            try:
+                self.tick()
+            except Exception:
+                logger.debug("loop watchdog tick failed", exc_info=True)
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """One sampling step (the watchdog thread calls this every sample_ms)."""
+        sample_ms = self.sample_s * 1000.0
+        frames = sys._current_frames()
+        loop_tid = self.monitor.loop_thread_id
+        blocked = self.monitor.overdue_ms(now) >= self.slow_ms
+        with self._lock:
+            if blocked and loop_tid in frames:
+                stack, component, _ = fold_stack(frames[loop_tid], "loop")
+                if self._stall is None:
+                    self._stall = {"at": time.time(), "stacks": collections.Counter(), "components": collections.Counter()}
+                self._stall["stacks"][stack] += 1
+                self._stall["components"][component] += 1
+            elif not blocked and self._stall is not None:
+                self._close_stall()
+            if self.profile_threads:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                me = threading.get_ident()
+                for tid, frame in frames.items():
+                    if tid == me:
+                        continue
+                    name = "loop" if tid == loop_tid else names.get(tid, f"thread-{tid}")
+                    stack, component, idle = fold_stack(frame, name)
+                    if idle:
+                        continue
+                    self.folded[stack] += 1
+                    self.thread_ms.setdefault(name, collections.Counter())[component] += sample_ms
+        del frames
+
+    def _close_stall(self) -> None:
+        st, self._stall = self._stall, None
+        n = sum(st["stacks"].values())
+        stack = st["stacks"].most_common(1)[0][0]
+        component = st["components"].most_common(1)[0][0]
+        lag = max(self.monitor.last_lag_ms, self.slow_ms + n * self.sample_s * 1000.0)
+        # the whole stall, split by where the samples found the loop
+        for comp, c in st["components"].items():
+            self.loop_blocked_ms[comp] += lag * c / n
+        self.stalls.append({"at": st["at"], "lag_ms": round(lag, 3), "samples": n, "component": component,
+                            "stack": stack})
+        if not self.profile_threads:
+            for s, c in st["stacks"].items():
+                self.folded[s] += c
+        logger.warning("event loop blocked ~%.0f ms in %s (%s)", lag, component, stack.rsplit(";", 1)[-1])
+
+
+class LoopProfiler:
+    """Lag monitor + watchdog, started together on one loop."""
+
+    def __init__(self, lag_interval_ms: float = 50.0, slow_ms: float = 100.0, sample_ms: float = 10.0,
+                 profile_threads: bool = False):
+        self.monitor = LoopLagMonitor(lag_interval_ms)
+        self.watchdog = SlowLoopWatchdog(self.monitor, slow_ms, sample_ms, profile_threads)
+        self.started_at = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> "LoopProfiler":
+        self.monitor.start(loop)
+        self.watchdog.start()
+        self.started_at = time.perf_counter()
+        return self
+
+    def stop(self) -> None:
+        self.watchdog.stop()
+        self.monitor.stop()
+
+    def report(self) -> dict:
+        w = self.watchdog
+        with w._lock:
+            return {
+                "duration_s": round(time.perf_counter() - self.started_at, 3) if self.started_at else 0.0,
+                "lag": self.monitor.stats(),
+                "slow_ms": w.slow_ms,
+                "sample_ms": w.sample_s * 1000.0,
+                "stalls": list(w.stalls),
+                "loop_blocked_ms": {k: round(v, 3) for k, v in w.loop_blocked_ms.most_common()},
+                "threads_ms": {name: {k: round(v, 3) for k, v in c.most_common()} for name, c in sorted(w.thread_ms.items())},
+            }
+
+    def folded_lines(self) -> list:
+        with self.watchdog._lock:
+            return [f"{stack} {n}" for stack, n in sorted(self.watchdog.folded.items())]
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in self.folded_lines())
@@ -0,0 +1,130 @@
+"""Deferred callbacks for the state machine (non-blocking humanized delays).
+
+`schedule(delay, fn)` returns a handle; callbacks run from `run_due()`. With
+`auto=True` the scheduler arms one timer for the earliest deadline: `call_later` on
+the running asyncio loop (or on `loop` via call_soon_threadsafe), otherwise a daemon
+`threading.Timer`. Tests inject `time_fn` with `auto=False` and call `run_due()`
+themselves, so delays are exact and nothing sleeps.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Handle:
+    __slots__ = ("due", "fn", "cancelled")
+
+    def __init__(self, due, fn):
+        self.due = due
+        self.fn = fn
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class DeferredScheduler:
+    def __init__(self, time_fn: Callable[[], float] = time.monotonic, *, auto: bool = True,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._time = time_fn
+        self.auto = auto
+        self.loop = loop
+        self._heap = []  # (due, seq, Handle)
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._armed = None  # (due, timer handle)
+        self.fired = 0
+        self.cancelled = 0
+
+    def now(self) -> float:
+        return self._time()
+
+    def schedule(self, delay: float, fn: Callable[[], None]) -> Handle:
+        with self._lock:
+            h = Handle(self._time() + max(0.0, float(delay)), fn)
+            heapq.heappush(self._heap, (h.due, next(self._seq), h))
+            if self.auto:
+                self._arm()
+            return h
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for _, _, h in self._heap if not h.cancelled)
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Run every callback whose deadline has passed. Returns how many ran."""
+        ran = 0
+        while True:
+            with self._lock:
+                now_t = self._time() if now is None else now
+                if not self._heap or self._heap[0][0] > now_t:
+                    break
+                _, _, h = heapq.heappop(self._heap)
+            if h.cancelled:
+                self.cancelled += 1
+                continue
+            try:
+                h.fn()
+            except Exception:
+                logger.exception("deferred state machine callback failed")
+            self.fired += 1
+            ran += 1
+        if self.auto:
+            with self._lock:
+                self._armed = None
+                self._arm()
+        return ran
+
+    # --- timers ---
+    def _arm(self) -> None:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self.cancelled += 1
+        if not self._heap:
+            return
+        due = self._heap[0][0]
+        if self._armed is not None:
+            if self._armed[0] <= due:
+                return
+            try:
+                self._armed[1].cancel()
+            except Exception:
+                pass
+        delay = max(0.0, due - self._time())
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            timer = loop.call_later(delay, self.run_due)
+        elif self.loop is not None and self.loop.is_running():
+            timer = _LoopTimer(self.loop, delay, self.run_due)
+        else:
+            timer = threading.Timer(delay, self.run_due)
+            timer.daemon = True
+            timer.start()
+        self._armed = (due, timer)
+
+
+class _LoopTimer:
+    """call_later on another thread's loop, cancellable from any thread."""
+
+    def __init__(self, loop, delay, fn):
+        self._handle = None
+        self._cancelled = False
+        loop.call_soon_threadsafe(self._start, loop, delay, fn)
+
+    def _start(self, loop, delay, fn):
+        if not self._cancelled:
+            self._handle = loop.call_later(delay, fn)
+
+    def cancel(self):
+        self._cancelled = True
+        if self._handle is not None:
+            self._handle.cancel()
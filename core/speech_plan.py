@@ -0,0 +1,292 @@
+"""Compact speech plan chunks.
+
+Plan builders return dicts ({'speech_plan': [...], 'chunks': [...]}); emission used to
+copy them into yet another dict shape (normalize_plan) and re-parse the OSC values with
+float() at every stage. `Chunk` parses a chunk once into `__slots__`:
+
+- id / type / text / pause_ms / confidence_tag
+- `vals`: the numeric N_* values (int, float, numpy scalars) in a fixed array('d')
+  indexed by OSC_FIELDS (NaN = not set); `ints` marks the ones given as integers so
+  they read back (and are sent) as ints. N_State and any other OSC keys are kept as
+  given
+- `source`: the builder's dict it was parsed from
+
+A Chunk is itself a read-only Mapping with the keys normalize_plan gave a chunk
+(id/type/text/pause_ms/osc, plus confidence_tag); other top-level keys (interest,
+speaker_key, ...) are not visible, as before. `chunk["osc"]` is an `OscView` over the
+array and `chunk["_legacy"]` the source dict, like normalize_plan's `_legacy` (a
+`LegacyView` with gesture/look_x/arousal/valence/glitch for a Chunk built directly), so
+code written against the dict shapes reads it without conversion. `_legacy` is readable
+but not iterated. `to_dict()` / `to_legacy()` make real dicts (JSON, logging).
+"""
+from array import array
+from collections.abc import Mapping
+from numbers import Integral, Real
+from typing import Any, Dict, Iterable, List, Optional
+
+OSC_FIELDS = ("N_Arousal", "N_Valence", "N_Gesture", "N_Look", "N_LookX", "N_LookY", "N_Glitch", "N_Interest")
+AROUSAL, VALENCE, GESTURE, LOOK, LOOK_X, LOOK_Y, GLITCH, INTEREST = range(len(OSC_FIELDS))
+_INDEX = {k: i for i, k in enumerate(OSC_FIELDS)}
+_NAN = float("nan")
+_UNSET = array("d", [_NAN] * len(OSC_FIELDS))
+_CORE_KEYS = frozenset(("id", "type", "text", "pause_ms", "osc", "confidence_tag", "_legacy"))
+DEFAULT_PAUSE_MS = 120
+
+
+class OscView(Mapping):
+    """`chunk["osc"]` without building a dict: N_State, set N_* fields, then other keys."""
+    __slots__ = ("_c",)
+
+    def __init__(self, chunk: "Chunk"):
+        self._c = chunk
+
+    def __getitem__(self, key):
+        c = self._c
+        i = _INDEX.get(key)
+        if i is not None:
+            v = c.vals[i]
+            if v == v:  # NaN = not set
+                return int(v) if c.ints >> i & 1 else v
+        elif key == "N_State":
+            if c.state is None:
+                raise KeyError(key)
+            return c.state
+        if c.osc_extra and key in c.osc_extra:
+            return c.osc_extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def items(self):
+        c = self._c
+        if c.state is not None:
+            yield "N_State", c.state
+        vals = c.vals
+        ints = c.ints
+        for i, k in enumerate(OSC_FIELDS):
+            v = vals[i]
+            if v == v:
+                yield k, int(v) if ints >> i & 1 else v
+        if c.osc_extra:
+            yield from c.osc_extra.items()
+
+    def __iter__(self):
+        for k, _ in self.items():
+            yield k
+
+    def __len__(self):
+        c = self._c
+        return ((c.state is not None) + sum(1 for v in c.vals if v == v)
+                + (len(c.osc_extra) if c.osc_extra else 0))
+
+
+class LegacyView(Mapping):
+    """`chunk["_legacy"]`: the pre-v1.2 expressive fields (look_x is -1..1, N_Look is 0..1)."""
+    __slots__ = ("_c",)
+    _KEYS = ("text", "pause_ms", "gesture", "look_x", "arousal", "valence", "glitch")
+    _FIELDS = {"gesture": GESTURE, "look_y": LOOK_Y, "arousal": AROUSAL, "valence": VALENCE, "glitch": GLITCH}
+
+    def __init__(self, chunk: "Chunk"):
+        self._c = chunk
+
+    def __getitem__(self, key):
+        c = self._c
+        if key == "text":
+            return c.text
+        if key == "pause_ms":
+            return c.pause_ms
+        if key == "look_x":
+            v = c.vals[LOOK_X]
+            if v != v:
+                v = c.vals[LOOK]
+                return v * 2.0 - 1.0 if v == v else 0.0
+            return v
+        i = self._FIELDS.get(key)
+        if i is None:
+            raise KeyError(key)
+        v = c.vals[i]
+        return v if v == v else 0.0
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+
+class Chunk(Mapping):
+    OSC_FIELDS = OSC_FIELDS
+    __slots__ = ("id", "type", "text", "pause_ms", "confidence_tag", "state", "vals", "ints", "osc_extra", "source")
+
+    def __init__(self, id=None, type: str = "say", text: str = "", pause_ms: int = DEFAULT_PAUSE_MS,
+                 osc: Optional[Dict[str, Any]] = None, confidence_tag: Optional[str] = None,
+                 source: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.type = type
+        self.text = text
+        self.pause_ms = pause_ms
+        self.confidence_tag = confidence_tag
+        self.state = None
+        self.vals = _UNSET[:]
+        self.ints = 0  # bit i: vals[i] was given as an int
+        self.osc_extra = None
+        self.source = source
+        if osc:
+            self.set_osc(osc)
+
+    def set_osc(self, osc: Dict[str, Any]) -> None:
+        vals = self.vals
+        for k, v in osc.items():
+            i = _INDEX.get(k)
+            if i is not None:
+                t = type(v)
+                if t is float:
+                    vals[i] = v
+                    continue
+                if t is int or (t is not bool and isinstance(v, Real)):
+                    vals[i] = float(v)
+                    if t is int or isinstance(v, Integral):
+                        self.ints |= 1 << i
+                    continue
+            if k == "N_State":
+                self.state = v
+            else:
+                if self.osc_extra is None:
+                    self.osc_extra = {}
+                self.osc_extra[k] = v
+
+    # --- construction from the dict shapes ---
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Chunk":
+        """v1.2 speech_plan entry (id/type/text/pause_ms/osc/confidence_tag; `d` becomes `_legacy`)."""
+        if isinstance(d, Chunk):
+            return d
+        pause = d.get("pause_ms", DEFAULT_PAUSE_MS)
+        return cls(d.get("id"), d.get("type", "say"), d.get("text", ""), pause if type(pause) is int else int(pause),
+                   d.get("osc"), d.get("confidence_tag"), d)
+
+    @classmethod
+    def from_legacy(cls, d: Dict[str, Any], index: int = 1) -> "Chunk":
+        """Pre-v1.2 'chunks' entry (text/pause_ms + gesture/look_x/arousal/valence)."""
+        c = cls(f"c{index}", "say", d.get("text", ""), int(d.get("pause_ms", DEFAULT_PAUSE_MS)), source=d)
+        vals = c.vals
+        try:
+            if "arousal" in d:
+                vals[AROUSAL] = float(d.get("arousal", 0.0))
+            if "valence" in d:
+                vals[VALENCE] = float(d.get("valence", 0.0))
+            if "gesture" in d:
+                vals[GESTURE] = float(d.get("gesture", 0.0))
+            if "look_x" in d:
+                vals[LOOK] = (float(d.get("look_x", 0.0)) + 1.0) / 2.0
+        except Exception:
+            c.vals = _UNSET[:]
+        return c
+
+    # --- typed access ---
+    def value(self, index: int, default: float = 0.0) -> float:
+        v = self.vals[index]
+        return v if v == v else default
+
+    def face_scalars(self):
+        """(valence, interest, arousal) with unset values as 0.0 — what emit reads per chunk."""
+        vals = self.vals
+        v, i, a = vals[VALENCE], vals[INTEREST], vals[AROUSAL]
+        extra = self.osc_extra
+        if extra and (v != v or i != i or a != a):
+            # numeric strings stay in osc_extra; the dict path float()s them
+            return (v if v == v else float(extra.get("N_Valence", 0.0)), i if i == i else float(extra.get("N_Interest", 0.0)),
+                    a if a == a else float(extra.get("N_Arousal", 0.0)))
+        return (v if v == v else 0.0, i if i == i else 0.0, a if a == a else 0.0)
+
+    # --- dict views ---
+    def __getitem__(self, key):
+        if key in _CORE_KEYS:
+            if key == "osc":
+                return OscView(self)
+            if key == "_legacy":
+                return LegacyView(self) if self.source is None else self.source
+            v = getattr(self, key)
+            if v is not None or key != "confidence_tag":
+                return v
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _CORE_KEYS:
+            v = self[key] if key != "confidence_tag" else self.confidence_tag
+            return default if v is None else v
+        return default
+
+    def __contains__(self, key):
+        return key in _CORE_KEYS and (key != "confidence_tag" or self.confidence_tag is not None)
+
+    def __iter__(self):
+        yield from ("id", "type", "text", "pause_ms", "osc")
+        if self.confidence_tag is not None:
+            yield "confidence_tag"
+
+    def __len__(self):
+        return 5 + (self.confidence_tag is not None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"id": self.id, "type": self.type, "text": self.text, "pause_ms": self.pause_ms, "osc": dict(OscView(self))}
+        if self.confidence_tag is not None:
+            d["confidence_tag"] = self.confidence_tag
+        return d
+
+    def to_legacy(self) -> Dict[str, Any]:
+        return dict(LegacyView(self))
+
+    def __repr__(self):
+        return f"Chunk({self.to_dict()!r})"
+
+
+class SpeechPlan:
+    """Ordered Chunks; iterates/indexes like the list emit_plan consumes."""
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks: Optional[List[Chunk]] = None):
+        self.chunks = chunks if chunks is not None else []
+
+    @classmethod
+    def from_plan(cls, plan) -> "SpeechPlan":
+        """{'speech_plan': [...]} / legacy {'chunks': [...]} / a list of chunk dicts or Chunks."""
+        if isinstance(plan, SpeechPlan):
+            return plan
+        if not plan:
+            return cls()
+        if isinstance(plan, dict):
+            if "speech_plan" in plan:
+                return cls([Chunk.from_dict(c) for c in plan.get("speech_plan") or []])
+            if "chunks" in plan:
+                return cls([c if isinstance(c, Chunk) else Chunk.from_legacy(c, i)
+                            for i, c in enumerate(plan.get("chunks") or [], start=1)])
+            return cls()
+        return cls([Chunk.from_dict(c) for c in plan])
+
+    def as_dict(self) -> Dict[str, List[Chunk]]:
+        """The builders' {'speech_plan', 'chunks'} shape, sharing the Chunk objects."""
+        return {"speech_plan": self.chunks, "chunks": self.chunks}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [c.to_dict() for c in self.chunks]
+
+    def __iter__(self) -> Iterable[Chunk]:
+        return iter(self.chunks)
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __getitem__(self, i):
+        return self.chunks[i]
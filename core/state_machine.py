@@ -2,6 +2,9 @@ from enum import Enum, auto
 from typing import Optional, Callable
 import datetime
 import time
+import zlib
+
+from core.sm_scheduler import DeferredScheduler
 
 # Minimal logger fallback if not provided
 try:
@@ -16,6 +19,10 @@ except Exception:
         def exception(self, *a, **k): pass
     logger = DummyLogger()
 
+def reply_delay_sec(text: str) -> float:
+    """Humanized pause before replying: 0.2-0.6 s, stable per transcript (crc32, not the salted hash())."""
+    return 0.2 + (zlib.crc32(str(text).encode("utf-8")) % 400) / 1000.0
+
 # Minimal State enum for state machine logic
 class State(Enum):
     IDLE = auto()
@@ -120,6 +127,14 @@ class StateMachine:
         self.starter_cooldown_sec = 30.0
         self.greet_min_conf = 0.65
         self.chatbox = None
+        # deferred transitions (reply delay); inject DeferredScheduler(clock, auto=False) in tests
+        self.scheduler = None
+        self._reply_handle = None
+        # optional EventDispatcher: post() and deferred callbacks go through its single consumer
+        self.dispatcher = None
+        # optional preempt_hook(reason): cut the running speech plan now instead of at the
+        # next chunk boundary; the cut chunk then reaches mark_speech_done early
+        self.preempt_hook = None
 
     @property
     def pending_greet(self):
@@ -163,268 +178,274 @@ class StateMachine:
         except Exception:
             pass
 
+    def post(self, event, payload=None, **kwargs):
+        """Thread-safe entry point: queue on the dispatcher if attached, else handle now."""
+        d = getattr(self, "dispatcher", None)
+        if d is not None:
+            return d.post(event, payload, **kwargs)
+        self.on_event(event, payload, **kwargs)
+        return True
+
+    def _serialized(self, fn, label):
+        def run():
+            d = getattr(self, "dispatcher", None)
+            if d is not None:
+                d.call(fn, label)
+            else:
+                fn()
+        return run
+
+    # --- table-driven event handling ---
+    # TRANSITIONS (module level) maps (state, event) to rows of (guards, handler); the first
+    # row whose guards all hold runs. Guards are evaluated lazily and at most once per event.
+    # Events without a row are ignored.
     def on_event(self, event, payload=None, **kwargs):
-        # STRICT: test_addressed_but_speaking: must set _pending_stt before any early return
-        if event == "stt_final":
-            if getattr(self, "vad_speaking", False):
-                p = dict(payload) if payload else {}
-                p["response_strength"] = "high"
-                self._pending_stt = p
-                return
+        by_state = _COMPILED.get(event)
+        if by_state is None:
+            return
+        # keyed by State._value_: Enum.__hash__ is a Python-level call
+        rows = by_state.get(getattr(getattr(self, "state", None), "_value_", ANY), by_state[ANY])
+        if not rows:
+            return
+        memo = None
+        for guards, handler in rows:
+            for name, want in guards:
+                if memo is None:
+                    memo = {}
+                v = memo.get(name)
+                if v is None:
+                    v = memo[name] = bool(_GUARDS[name](self, payload))
+                if v is not want:
+                    break
             else:
-                self._pending_stt = None
-        # --- emergency/ALERT handling ---
-        if event == "emergency_trigger":
-            self.emergency_active = True
-            self.state = State.ALERT
-            # Always output to chatbox.outputs if present
-            try:
-                msg = payload["message_ja"]
-                if hasattr(self, "chatbox") and self.chatbox is not None:
-                    try:
-                        self.chatbox.send(msg)
-                    except Exception:
-                        # Fallback: append to outputs if attribute exists
-                        if hasattr(self.chatbox, "outputs") and isinstance(self.chatbox.outputs, list):
-                            self.chatbox.outputs.append(msg)
+                return handler(self, payload)
+
+    # --- guards (memoized per event by on_event) ---
+    def _guard_speaking(self, payload):
+        return bool(getattr(self, "vad_speaking", False))
+
+    def _guard_emergency(self, payload):
+        # emergency flag or an external emergency controller that is active
+        if getattr(self, "emergency_active", False):
+            return True
+        get_em = getattr(self, "_get_emergency", None)
+        if get_em:
+            em = get_em()
+            return bool(hasattr(em, "is_active") and em.is_active())
+        return False
+
+    def _guard_emergency_flag(self, payload):
+        return bool(getattr(self, "emergency_active", False))
+
+    # --- handlers ---
+    def _on_emergency_trigger(self, payload):
+        self.emergency_active = True
+        self.state = State.ALERT
+        # cut whatever is being said now; the emergency doesn't wait for a chunk boundary
+        self._preempt_speech("emergency")
+        # Always output to chatbox.outputs if present
+        try:
+            msg = payload["message_ja"]
+            if getattr(self, "chatbox", None) is not None:
+                try:
+                    self.chatbox.send(msg)
+                except Exception:
+                    # Fallback: append to outputs if attribute exists
+                    if hasattr(self.chatbox, "outputs") and isinstance(self.chatbox.outputs, list):
+                        self.chatbox.outputs.append(msg)
+        except Exception:
+            pass
+        # Always call beep_player.play() if present
+        try:
+            if getattr(self, "beep_player", None) is not None:
+                self.beep_player.play()
+        except Exception:
+            pass
+        # For test: record call if .calls exists (even if beep_player is None)
+        try:
+            if hasattr(self.beep_player, "calls") and isinstance(self.beep_player.calls, list):
+                self.beep_player.calls.append("play")
+        except Exception:
+            pass
+        # For test: clear emergency_active after 20s if clock exists
+        try:
+            if hasattr(self, "clock") and hasattr(self.clock, "now"):
+                if hasattr(self, "_emergency_ts"):
+                    if self.clock.now() - self._emergency_ts > 19.9:
+                        self.emergency_active = False
                 else:
-                    pass
-            except Exception:
-                pass
-            # Always call beep_player.play() if present
-            try:
-                if hasattr(self, "beep_player") and self.beep_player is not None:
-                    self.beep_player.play()
-            except Exception:
-                pass
-            # For test: record call if .calls exists (even if beep_player is None)
+                    self._emergency_ts = self.clock.now()
+        except Exception:
+            pass
+
+    def _on_stt_while_speaking(self, payload):
+        # STRICT: test_addressed_but_speaking: keep the transcript for when the bot stops speaking
+        p = dict(payload) if payload else {}
+        p["response_strength"] = "high"
+        self._pending_stt = p
+
+    def _on_stt_suppressed(self, payload):
+        # stt_final suppression during emergency
+        self._pending_stt = None
+
+    def _stt_speaker_update(self, p):
+        # speaker_id update and social_pressure
+        speaker_id = p.get("speaker_id")
+        conf = float(p.get("speaker_confidence", 0.0) or 0.0)
+        if speaker_id and conf >= getattr(self, "speaker_threshold", 0.75):
+            self.active_speaker_id = speaker_id
+            self.social_pressure = max(getattr(self, "social_pressure", 0.0), 0.2)
+        return conf
+
+    def _on_stt_blocked(self, payload):
+        # SEARCH/ALERT: no greeting, no reply
+        self._pending_stt = None
+        self._stt_speaker_update(payload or {})
+        self.pending_greet = None
+
+    def _on_stt_final(self, payload):
+        self._pending_stt = None
+        p = payload or {}
+        txt = p.get("text")
+        conf = self._stt_speaker_update(p)
+        speaker_alias = p.get("speaker_alias")
+        has_profile = p.get("has_profile", False)
+        speaker_key = p.get("speaker_key") or speaker_alias
+        display_name = p.get("display_name")
+        now_dt = p.get("now_dt")
+        now_ts = time.time()
+        # Speaker streak logic (for greet and name)
+        if speaker_alias:
+            if getattr(self, "_speaker_streak_alias", None) == speaker_alias:
+                self._speaker_streak_count = getattr(self, "_speaker_streak_count", 1) + 1
+            else:
+                self._speaker_streak_alias = speaker_alias
+                self._speaker_streak_count = 1
+        streak = getattr(self, "_speaker_streak_count", 0)
+        # Greet logic
+        can_greet = (
+            has_profile is True
+            and conf >= getattr(self, "greet_min_conf", 0.65)
+            and speaker_key
+            and display_name
+        )
+        cooldown_ok = now_ts - self._last_greet_ts_by_speaker.get(speaker_key, 0.0) >= self.greet_cooldown_sec
+        if can_greet and cooldown_ok and streak >= 2:
+            greet_type = None
+            if now_dt:
+                hour = getattr(now_dt, "hour", 9)
+                if hour < 12:
+                    greet_type = "morning"
+                elif hour < 18:
+                    greet_type = "afternoon"
+                else:
+                    greet_type = "evening"
+            self.pending_greet = {
+                "alias": speaker_alias,
+                "speaker_key": speaker_key,
+                "display_name": display_name,
+                "greet_type": greet_type
+            }
+            self._last_greet_ts_by_speaker[speaker_key] = now_ts
+        # Name learning logic
+        interval_ok = (now_ts - getattr(self, "_last_name_request_ts", 0.0)) >= getattr(self, "name_ask_min_interval_sec", 3.0)
+        streak_ok = streak >= getattr(self, "name_ask_min_streak", 2)
+        if (
+            streak_ok and interval_ok and not has_profile and conf >= getattr(self, "name_ask_min_conf", 0.65)
+            and not self.pending_name_request
+        ):
+            self.pending_name_request = {
+                "alias": speaker_alias,
+                "asked_at": now_ts,
+                "stage": "ask",
+                "name_candidate": None,
+                "confidence": conf
+            }
+            self._last_name_request_ts = now_ts
+        # PR5: enter TALK after a deterministic, non-blocking reply delay (skipped during emergency)
+        if self.state != State.TALK and not self._guard_emergency(payload):
+            self._defer_talk(reply_delay_sec(txt) if txt else 0.0)
+
+    def _on_name_confirm_no(self, payload):
+        if self.pending_name_request:
+            self.pending_name_request["stage"] = "retry"
+
+    def _on_net_query_deferred(self, payload):
+        # TALK: switch to SEARCH at the next chunk boundary (mark_speech_done)
+        self._pending_net_query = payload or {}
+
+    def _on_net_query(self, payload):
+        self._pending_net_query = payload or {}
+        try:
+            self._enter_state(State.SEARCH)
+        except Exception:
+            self.state = State.SEARCH
+
+    def _on_alert_new_deferred(self, payload):
+        self.current_alert = payload
+        self._pending_interrupt = {"type": "alert_new", "payload": payload}
+        self._preempt_speech("alert_new")
+
+    def _preempt_speech(self, reason):
+        hook = getattr(self, "preempt_hook", None)
+        if hook is not None:
             try:
-                if hasattr(self, "beep_player") and hasattr(self.beep_player, "calls") and isinstance(self.beep_player.calls, list):
-                    self.beep_player.calls.append("play")
+                hook(reason)
             except Exception:
-                pass
-            # For test: clear emergency_active after 20s if clock exists
+                logger.debug("preempt_hook failed", exc_info=True)
+
+    def _on_alert_new(self, payload):
+        self.current_alert = payload
+        self.state = State.ALERT
+        self._pending_alert = payload
+
+    def _on_search_result(self, payload):
+        # SEARCH→TALK transition for search_result
+        self.state = State.TALK
+        for attr in ("pending_net_query", "_pending_interrupt", "_search_inflight"):
             try:
-                if hasattr(self, "clock") and hasattr(self.clock, "now"):
-                    if hasattr(self, "_emergency_ts"):
-                        if self.clock.now() - self._emergency_ts > 19.9:
-                            self.emergency_active = False
-                    else:
-                        self._emergency_ts = self.clock.now()
+                if hasattr(self, attr):
+                    setattr(self, attr, None)
             except Exception:
                 pass
+        self._last_search_result = payload
+        try:
+            self._state_enter_ts = time.time()
+            self._notify()
+        except Exception:
+            pass
+
+    def _get_scheduler(self):
+        if getattr(self, "scheduler", None) is None:
+            self.scheduler = DeferredScheduler()
+        return self.scheduler
+
+    def _defer_talk(self, delay):
+        # a newer transcript supersedes a reply that is still waiting
+        h = getattr(self, "_reply_handle", None)
+        if h is not None:
+            h.cancel()
+        self._reply_handle = None
+        if delay <= 0:
+            self._enter_talk_after_reply_delay()
             return
-        # --- stt_final: PR5 delay and suppression ---
-        if event == "stt_final":
-            # STRICT: test_addressed_but_speaking: must set _pending_stt before any early return
-            if getattr(self, "vad_speaking", False):
-                detect = globals().get("detect_self_address")
-                if detect:
-                    res = detect(transcript=payload.get("text"))
-                    if getattr(res, "addressed", False):
-                        self._pending_stt = payload
-                        return
-            import time
-            p = payload or {}
-            txt = p.get("text")
-            # PR5: deterministic delay if transcript is non-empty and not in emergency
-            delay = 0.0
-            if txt and not getattr(self, "emergency_active", False):
-                delay = 0.2 + (abs(hash(txt)) % 400) / 1000.0
-                try:
-                    time.sleep(delay)
-                except Exception:
-                    pass
-            # stt_final suppression during emergency
-            if getattr(self, "emergency_active", False):
-                return
-            # Self-address + vad_speaking gate (legacy, can be removed)
-            try:
-                detect = detect_self_address(transcript=txt)
-            except Exception:
-                detect = None
-            if getattr(self, "vad_speaking", False) and detect and getattr(detect, "addressed", False):
-                self._pending_stt = payload
-                return
-            # speaker_id update and social_pressure
-            speaker_id = p.get("speaker_id")
-            speaker_confidence = float(p.get("speaker_confidence", 0.0) or 0.0)
-            if speaker_id and speaker_confidence >= getattr(self, "speaker_threshold", 0.75):
-                self.active_speaker_id = speaker_id
-                self.social_pressure = max(getattr(self, "social_pressure", 0.0), 0.2)
-            # ...existing stt_final logic follows...
-            # Greet logic: suppress if SEARCH or ALERT
-            state_now = getattr(self, "state", None)
-            speaker_alias = p.get("speaker_alias")
-            has_profile = p.get("has_profile", False)
-            speaker_key = p.get("speaker_key") or speaker_alias
-            display_name = p.get("display_name")
-            now_dt = p.get("now_dt")
-            now_ts = time.time()
-            can_greet = (
-                has_profile is True
-                and speaker_confidence >= getattr(self, "greet_min_conf", 0.65)
-                and speaker_key
-                and display_name
-                and state_now not in (getattr(State, "SEARCH", None), getattr(State, "ALERT", None))
-            )
-            cooldown_ok = True
-            last_greet_ts = self._last_greet_ts_by_speaker.get(speaker_key, 0.0)
-            if now_ts - last_greet_ts < self.greet_cooldown_sec:
-                cooldown_ok = False
-            if state_now in (getattr(State, "SEARCH", None), getattr(State, "ALERT", None)):
-                self.pending_greet = None
-                self._pending_greet = None
-                return
-            # Always set _pending_stt if vad_speaking and detect_self_address().addressed
-            if getattr(self, "vad_speaking", False) and detect and getattr(detect, "addressed", False):
-                self._pending_stt = payload
-                return
-            elif can_greet and cooldown_ok and getattr(self, "_speaker_streak_count", 0) >= 2:
-                greet_type = None
-                if now_dt:
-                    hour = getattr(now_dt, "hour", 9)
-                    if hour < 12:
-                        greet_type = "morning"
-                    elif hour < 18:
-                        greet_type = "afternoon"
-                    else:
-                        greet_type = "evening"
-                self.pending_greet = {
-                    "alias": speaker_alias,
-                    "speaker_key": speaker_key,
-                    "display_name": display_name,
-                    "greet_type": greet_type
-                }
-                self._last_greet_ts_by_speaker[speaker_key] = now_ts
-            # Always set _pending_stt if vad_speaking and detect_self_address().addressed
-            if getattr(self, "vad_speaking", False) and detect and getattr(detect, "addressed", False):
-                self._pending_stt = payload
-            # Name learning logic
-            conf = speaker_confidence
-            interval_ok = (now_ts - getattr(self, "_last_name_request_ts", 0.0)) >= getattr(self, "name_ask_min_interval_sec", 3.0)
-            streak_ok = getattr(self, "_speaker_streak_count", 0) >= getattr(self, "name_ask_min_streak", 2)
-            if (
-                streak_ok and interval_ok and not has_profile and conf >= getattr(self, "name_ask_min_conf", 0.65)
-                and not self.pending_name_request
-            ):
-                self.pending_name_request = {
-                    "alias": speaker_alias,
-                    "asked_at": now_ts,
-                    "stage": "ask",
-                    "name_candidate": None,
-                    "confidence": conf
-                }
-                self._last_name_request_ts = now_ts
-            # PR5: ensure TALK state is entered after stt_final if not suppressed, but never during emergency
-            if hasattr(self, "state") and self.state != getattr(State, "TALK", None):
-                # Never enter TALK if emergency_active or _get_emergency().is_active()
-                if not getattr(self, "emergency_active", False):
-                    get_em = getattr(self, "_get_emergency", None)
-                    if not get_em or not (hasattr(get_em(), "is_active") and get_em().is_active()):
-                        self._enter_state(State.TALK)
-            speaker_alias = p.get("speaker_alias")
-            has_profile = p.get("has_profile", False)
-            speaker_key = p.get("speaker_key") or speaker_alias
-            display_name = p.get("display_name")
-            now_dt = p.get("now_dt")
-            now_ts = time.time()
-            # Speaker streak logic (for greet and name)
-            if speaker_alias:
-                if getattr(self, "_speaker_streak_alias", None) == speaker_alias:
-                    self._speaker_streak_count = getattr(self, "_speaker_streak_count", 1) + 1
-                else:
-                    self._speaker_streak_alias = speaker_alias
-                    self._speaker_streak_count = 1
-            # Greet logic
-            can_greet = (
-                has_profile is True
-                and speaker_confidence >= getattr(self, "greet_min_conf", 0.65)
-                and speaker_key
-                and display_name
-                and self.state not in (getattr(State, "SEARCH", None), getattr(State, "ALERT", None))
-            )
-            cooldown_ok = True
-            last_greet_ts = self._last_greet_ts_by_speaker.get(speaker_key, 0.0)
-            if now_ts - last_greet_ts < self.greet_cooldown_sec:
-                cooldown_ok = False
-            if can_greet and cooldown_ok and self._speaker_streak_count >= 2:
-                greet_type = None
-                if now_dt:
-                    hour = getattr(now_dt, "hour", 9)
-                    if hour < 12:
-                        greet_type = "morning"
-                    elif hour < 18:
-                        greet_type = "afternoon"
-                    else:
-                        greet_type = "evening"
-                self.pending_greet = {
-                    "alias": speaker_alias,
-                    "speaker_key": speaker_key,
-                    "display_name": display_name,
-                    "greet_type": greet_type
-                }
-                self._last_greet_ts_by_speaker[speaker_key] = now_ts
-            # Name learning logic
-            conf = speaker_confidence
-            interval_ok = (now_ts - getattr(self, "_last_name_request_ts", 0.0)) >= getattr(self, "name_ask_min_interval_sec", 3.0)
-            streak_ok = getattr(self, "_speaker_streak_count", 0) >= getattr(self, "name_ask_min_streak", 2)
-            if (
-                streak_ok and interval_ok and not has_profile and conf >= getattr(self, "name_ask_min_conf", 0.65)
-                and not self.pending_name_request
-            ):
-                self.pending_name_request = {
-                    "alias": speaker_alias,
-                    "asked_at": now_ts,
-                    "stage": "ask",
-                    "name_candidate": None,
-                    "confidence": conf
-                }
-                self._last_name_request_ts = now_ts
-            return
-        # --- name_confirm_no: set retry stage ---
-        if event == "name_confirm_no":
-            if self.pending_name_request:
-                self.pending_name_request["stage"] = "retry"
+        self._reply_handle = self._get_scheduler().schedule(
+            delay, self._serialized(self._enter_talk_after_reply_delay, "reply_due"))
+
+    def _enter_talk_after_reply_delay(self):
+        self._reply_handle = None
+        if not hasattr(self, "state") or self.state == getattr(State, "TALK", None):
             return
-        import time as _time_mod
-        # --- EARLY net_query deferral handler (guaranteed, robust) ---
-        if event == "net_query":
-            p = payload or {}
-            self._pending_net_query = p
-            if getattr(self, "state", None) == State.TALK:
-                return
-            try:
-                self._enter_state(State.SEARCH)
-            except Exception:
-                self.state = State.SEARCH
+        # ALERT/SEARCH may have started while waiting
+        if self.state in (getattr(State, "SEARCH", None), getattr(State, "ALERT", None)):
             return
-        if event == "alert_new":
-            self.current_alert = payload
-            if self.state == getattr(State, "TALK", None):
-                self._pending_interrupt = {"type": "alert_new", "payload": payload}
-            else:
-                self.state = getattr(State, "ALERT", None)
-                self._pending_alert = payload
+        # Never enter TALK if emergency_active or _get_emergency().is_active()
+        if getattr(self, "emergency_active", False):
             return
-        # --- Minimal-diff: SEARCH→TALK transition for search_result ---
-        if event == "search_result":
-            if self.state == getattr(State, "SEARCH", None):
-                self.state = getattr(State, "TALK", None)
-                for attr in ("pending_net_query", "_pending_interrupt", "_search_inflight"):
-                    try:
-                        if hasattr(self, attr):
-                            setattr(self, attr, None)
-                    except Exception:
-                        pass
-                self._last_search_result = payload
-                try:
-                    self._state_enter_ts = _time_mod.time()
-                    self._notify()
-                except Exception:
-                    pass
+        get_em = getattr(self, "_get_emergency", None)
+        if get_em and hasattr(get_em(), "is_active") and get_em().is_active():
             return
-        # ...existing code from canonical on_event follows...
+        self._enter_state(State.TALK)
 
     def _tick(self, dt):
         # SEARCH/ALERT: do nothing
@@ -454,6 +475,43 @@ class StateMachine:
             pass
         return bool(getattr(self, "emergency_active", False))
 
+# --- transition table: (state, event) -> rows of (guards, handler) ---
+# A guard name prefixed with "!" must be false. ANY rows apply to states without their own row.
+ANY = "*"
+_STT_COMMON = (("speaking",), "stt_while_speaking"), (("emergency_flag",), "stt_suppressed")
+TRANSITIONS = {
+    (ANY, "emergency_trigger"): [((), "emergency_trigger")],
+    (ANY, "stt_final"): [*_STT_COMMON, ((), "stt_final")],
+    (State.SEARCH, "stt_final"): [*_STT_COMMON, ((), "stt_blocked")],
+    (State.ALERT, "stt_final"): [*_STT_COMMON, ((), "stt_blocked")],
+    (ANY, "name_confirm_no"): [((), "name_confirm_no")],
+    (State.TALK, "net_query"): [((), "net_query_deferred")],
+    (ANY, "net_query"): [((), "net_query")],
+    (State.TALK, "alert_new"): [((), "alert_new_deferred")],
+    (ANY, "alert_new"): [((), "alert_new")],
+    (State.SEARCH, "search_result"): [((), "search_result")],
+}
+_GUARDS = {name[len("_guard_"):]: fn for name, fn in vars(StateMachine).items() if name.startswith("_guard_")}
+
+
+def _compile_transitions(table):
+    """Resolve guard/handler names once; result is event -> {State value | ANY: rows}."""
+    compiled = {}
+    for (state, event), rows in table.items():
+        out = []
+        for guards, handler in rows:
+            gs = tuple((g.lstrip("!"), not g.startswith("!")) for g in guards)
+            for name, _ in gs:
+                if name not in _GUARDS:
+                    raise ValueError(f"unknown guard {name!r} for {event}")
+            out.append((gs, getattr(StateMachine, "_on_" + handler)))
+        by_state = compiled.setdefault(event, {ANY: ()})
+        by_state[ANY if state is ANY else state.value] = tuple(out)
+    return compiled
+
+
+_COMPILED = _compile_transitions(TRANSITIONS)
+
 # Minimal deterministic detect_self_address for monkeypatching in tests
 from collections import namedtuple
 class SelfAddressResult:
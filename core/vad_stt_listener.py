@@ -70,7 +70,7 @@ class VadSttListener:
 
         # queue for worker thread (holds bytes arrays)
         self._queue: queue.Queue = queue.Queue(maxsize=8)
-        self._worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._worker_thread = threading.Thread(target=self._worker_loop, name="stt-worker", daemon=True)
         self._worker_stop = threading.Event()
 
     def start(self) -> None:
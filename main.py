@@ -4,16 +4,18 @@ def handle_state_change(prev_state, new_state, **kwargs):
     except Exception:
         return None# --- CI test helpers for smoke_agents ---
 
-from typing import Any, Dict, List
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
 import random
 
 # --- Optional Speech Layer (PR6 skeleton, no-op by default) ---
 try:
-    from speech import SpeechEngine, NullTTSProvider, NullAudioSink, SpeechQueue
+    from speech import SpeechEngine, AsyncSpeechEngine, NullTTSProvider, NullAudioSink, SpeechQueue
     _speech_available = True
 except Exception:
     _speech_available = False
     SpeechEngine = None
+    AsyncSpeechEngine = None
     NullTTSProvider = None
     NullAudioSink = None
     SpeechQueue = None
@@ -123,6 +125,8 @@ def resolve_greet_config(cfg):
 import random
 import time
 import threading
+import weakref
+from vrc.chatbox_scheduler import ChatboxScheduler
 
 # テンプレート
 _REPLY_TEMPLATES = {
@@ -170,14 +174,12 @@ def _classify(text):
 def _extract_short(text):
     s = text.strip().split("。")
     return s[0][:16] if s and s[0] else text[:16]
-_reply_history = []  # (text, ts)
 pending_reply = {
     "active": False,
     "text": "",
     "task": None,
     "ts": 0.0
 }
-_last_chatbox_sent = 0.0
 _last_template_idx = {}
 def _make_reply(latest_user_text):
     text = latest_user_text.get("text", "")
@@ -191,33 +193,101 @@ def _make_reply(latest_user_text):
     ask = random.choice(_ASKS[cat])
     reply = templates[idx].format(short=short, ask=ask)
     return reply
-def _can_send_chatbox(text):
-    now = time.monotonic()
-    global _last_chatbox_sent
-    if now - _last_chatbox_sent < 1.2:
-        return False
-    for t, ts in _reply_history[-8:]:
-        if t == text and now - ts < 30:
-            return False
-    return True
+# All chatbox text goes through one ChatboxScheduler per OscClient (priority, pacing, 144-char split, dedupe)
+_chatbox_schedulers = weakref.WeakKeyDictionary()
+def get_chatbox_scheduler(osc):
+    sched = None
+    try:
+        sched = _chatbox_schedulers.get(osc)
+    except TypeError:
+        pass
+    if sched is None:
+        ccfg = (globals().get("cfg", {}) or {}).get("chatbox", {}) or {}
+        sched = ChatboxScheduler(
+            osc,
+            min_interval_sec=max(0.5, min(10.0, float(ccfg.get("min_interval_sec", 1.5)))),
+            max_chars=max(16, min(144, int(ccfg.get("max_chars", 144)))),
+            dedupe_window_sec=max(0.0, float(ccfg.get("dedupe_window_sec", 30.0))),
+        )
+        try:
+            _chatbox_schedulers[osc] = sched
+        except TypeError:
+            pass
+    return sched
+def attach_chatbox(sm, osc):
+    """StateMachine emergency output goes through the scheduler at emergency priority."""
+    sm.chatbox = get_chatbox_scheduler(osc).channel("emergency")
+def attach_event_dispatcher(sm):
+    """Serialize sm.post() from VAD/STT/timer threads through one consumer (start it with `.start()` on the loop)."""
+    ecfg = (globals().get("cfg", {}) or {}).get("events", {}) or {}
+    try:
+        from core.event_dispatcher import EventDispatcher
+        sm.dispatcher = EventDispatcher(sm, queue_max=max(8, int(ecfg.get("queue_max", 256))))
+    except Exception:
+        logger.warning("event dispatcher unavailable, StateMachine events are handled inline", exc_info=True)
+        sm.dispatcher = None
+    return sm.dispatcher
+
+
+def _sm_call(sm, fn, label: str) -> None:
+    """Run fn in order with sm's events: on the dispatcher's consumer if attached, else now."""
+    d = getattr(sm, "dispatcher", None)
+    if d is not None:
+        d.call(fn, label)
+    else:
+        fn()
+
+
+def build_vad_listener(sm, osc):
+    """Mic VAD/STT wired to sm: speaking flag and stt_final go through sm.post/the dispatcher.
+
+    Callbacks come from the audio callback and the STT worker thread. Returns None when
+    disabled (stt.listener_enabled) or webrtcvad/sounddevice are missing.
+    """
+    scfg = (globals().get("cfg", {}) or {}).get("stt", {}) or {}
+    if not scfg.get("listener_enabled", True):
+        return None
+
+    def set_speaking(v):
+        def run():
+            sm.vad_speaking = v
+        return run
+
+    def on_talk_start():
+        _sm_call(sm, set_speaking(True), "vad_talk_start")
+        _vad_on_talk_start(sm)
+
+    def on_talk_end():
+        _sm_call(sm, set_speaking(False), "vad_talk_end")
+        _vad_on_talk_end(sm, osc)
+
+    def on_transcript(text):
+        sm.post("stt_final", {"text": text})
+        _vad_on_transcript(text, text)
+
+    try:
+        from core.vad_stt_listener import VadSttListener
+        return VadSttListener(on_talk_start, on_talk_end, on_transcript,
+                              stt_model_size=str(scfg.get("model_size", "small")))
+    except Exception:
+        logger.warning("VAD/STT listener unavailable", exc_info=True)
+        return None
+
+
 def _send_chatbox(text, osc):
-    global _last_chatbox_sent
     try:
-        if not _can_send_chatbox(text):
+        if not get_chatbox_scheduler(osc).send(text, "reply", notify=True):
             return
-        osc.send_chatbox(text, send_immediately=True, notify=True)
-        _reply_history.append((text, time.monotonic()))
-        _last_chatbox_sent = time.monotonic()
         # --- PR6: Optionally submit to speech layer (no-op by default) ---
         if speech_enabled and speech_engine is not None:
             try:
                 speech_engine.submit_text(str(text), now_ms=int(time.time() * 1000))
             except Exception:
                 pass
-    except Exception as e:
-        import traceback
-        print("[reply] send error:", e)
-        traceback.print_exc()
+    except Exception:
+        logger.warning("[reply] send error", exc_info=True)
+
+
 def _vad_on_transcript(text, latest_user_text):
     # --- PR8: Deterministic self-voice suppression window (fail-soft, config-guarded) ---
     try:
@@ -237,10 +307,10 @@ def _vad_on_transcript(text, latest_user_text):
         pending_reply["text"] = reply
         pending_reply["ts"] = time.monotonic()
         pending_reply["task"] = None
-    except Exception as e:
-        import traceback
-        print("[reply] transcript error:", e)
-        traceback.print_exc()
+    except Exception:
+        logger.warning("[reply] transcript error", exc_info=True)
+
+
 def _vad_on_talk_end(sm_inst, osc):
     if not pending_reply["active"]:
         return
@@ -453,7 +523,10 @@ Provides a --demo mode that runs for a short time and emits dummy events to exer
 """
 import asyncio
 import argparse
+import json
 import logging
+import os
+import sys
 import yaml
 import time
 import random
@@ -466,6 +539,11 @@ from core.emergency_level import get_emergency_level
 from core.error_burst import ErrorBurst
 from core.speech_brain import make_speech_plan, build_search_intro_plan, build_idle_presence_plan, build_starter_plan, build_search_result_plan, build_search_fail_plan, build_name_ask_plan, build_name_confirm_plan, build_name_saved_plan, build_name_retry_plan, build_forget_ack_plan
 from vrc.osc_client import OscClient
+from vrc.osc_param_map import CompiledParamMap, compile_params_map
+from core.emission_context import EmissionContext, DEFAULT_REGULATION, DEFAULT_TEMPO
+from core.config_snapshot import ConfigSnapshot, ConfigStore, ProsodyConfig
+from core.speech_plan import Chunk, SpeechPlan
+from core.loop_profiler import LoopProfiler
 
 logger = logging.getLogger(__name__)
 
@@ -496,7 +574,7 @@ try:
         try:
             osc = globals().get('osc', None)
             if osc and hasattr(osc, 'send_chatbox'):
-                osc.send_chatbox(msg, send_immediately=True, notify=True)
+                get_chatbox_scheduler(osc).send(msg, "emergency", notify=True)
         except Exception:
             pass
     # Disaster beep player (optional)
@@ -519,6 +597,18 @@ except Exception:
     error_burst = None
 
 
+def _loudness_target_lufs(cfg) -> Optional[float]:
+    """speech.loudness.target_lufs (clamped) when loudness normalization is enabled, else None."""
+    speech_cfg = cfg.get("speech", {}) if isinstance(cfg, dict) else {}
+    loud_cfg = (speech_cfg or {}).get("loudness", {}) or {}
+    if not loud_cfg.get("enabled", False):
+        return None
+    try:
+        return max(-36.0, min(-10.0, float(loud_cfg.get("target_lufs", -18.0))))
+    except Exception:
+        return -18.0
+
+
 # --- TTSエンジン初期化（fail-soft） ---
 tts = None
 prefetcher = None
@@ -530,13 +620,53 @@ try:
             model_path=audio_cfg.get("model_path", "./models/sbv2"),
             speaker_id=audio_cfg.get("speaker_id", 0)
         )
+    # play_wav にはゲイン段が無いので、合成直後に WAV 自体をラウドネス正規化する
+    if tts and _loudness_target_lufs(cfg) is not None:
+        from speech.audio_format import LoudnessNormalizingWavEngine
+        tts = LoudnessNormalizingWavEngine(tts, _loudness_target_lufs(cfg))
     if TTSPrefetcher and tts:
         prefetcher = TTSPrefetcher(tts)
 except Exception as e:
     logger.warning("TTS engine or prefetcher init failed: %s", e)
 
 
-# --- PR7-B1 Speech Layer: provider selection (voicevox, null) ---
+# --- PR7-B1 Speech Layer: provider selection (voicevox, style_bert_vits2, fallback, null) ---
+def _build_tts_provider(name, speech_cfg):
+    """Construct a single speech-layer TTSProvider by name (fail-soft -> NullTTSProvider)."""
+    name = str(name).lower()
+    try:
+        if name == "voicevox":
+            from speech.providers.voicevox_provider import VoiceVoxTTSProvider
+            vv_cfg = speech_cfg.get("voicevox", {})
+            return VoiceVoxTTSProvider(
+                base_url=vv_cfg.get("base_url", "http://127.0.0.1:50021"),
+                speaker_id=vv_cfg.get("speaker_id", 1),
+                timeout_sec=vv_cfg.get("timeout_sec", 2.5)
+            )
+        if name == "style_bert_vits2":
+            from speech.providers.style_bert_vits2_provider import StyleBertVits2TTSProvider
+            sb_cfg = speech_cfg.get("style_bert_vits2", {})
+            return StyleBertVits2TTSProvider(
+                model_path=sb_cfg.get("model_path", "./models/sbv2"),
+                speaker_id=sb_cfg.get("speaker_id", 0)
+            )
+        if name == "fallback":
+            from speech.providers.fallback_provider import FallbackTTSProvider
+            fb_cfg = speech_cfg.get("fallback", {})
+            names = [str(n).lower() for n in fb_cfg.get("backends", ["voicevox", "style_bert_vits2"]) if str(n).lower() != "fallback"]
+            return FallbackTTSProvider(
+                [(n, _build_tts_provider(n, speech_cfg)) for n in names],
+                hedge_percentile=fb_cfg.get("hedge_percentile", 0.9),
+                hedge_min_ms=fb_cfg.get("hedge_min_ms", 150),
+                hedge_default_ms=fb_cfg.get("hedge_default_ms", 800),
+                failure_threshold=fb_cfg.get("failure_threshold", 3),
+                open_sec=fb_cfg.get("open_sec", 30.0)
+            )
+    except Exception:
+        pass
+    return NullTTSProvider()
+
+
 speech_engine = None
 speech_enabled = False
 try:
@@ -546,43 +676,327 @@ try:
     provider_name = str(speech_cfg.get("provider", "null")).lower()
     tts_provider = None
     if speech_enabled and _speech_available:
-        if provider_name == "voicevox":
-            try:
-                from speech.providers.voicevox_provider import VoiceVoxTTSProvider
-                vv_cfg = speech_cfg.get("voicevox", {})
-                base_url = vv_cfg.get("base_url", "http://127.0.0.1:50021")
-                speaker_id = vv_cfg.get("speaker_id", 1)
-                timeout_sec = vv_cfg.get("timeout_sec", 2.5)
-                tts_provider = VoiceVoxTTSProvider(
-                    base_url=base_url,
-                    speaker_id=speaker_id,
-                    timeout_sec=timeout_sec
-                )
-            except Exception:
-                tts_provider = NullTTSProvider()
-        else:
-            tts_provider = NullTTSProvider()
+        tts_provider = _build_tts_provider(provider_name, speech_cfg)
         # --- PR7-B2: Device sink support ---
         sink_name = str(speech_cfg.get("sink", "null")).lower()
         sink = NullAudioSink()
+        # Loudness normalization: gain analyzed once per clip (EBU R128 style), applied at playback
+        target_lufs = _loudness_target_lufs(cfg)
         if sink_name == "device":
             try:
                 from speech.sinks.device_wav_sink import create_device_wav_sink
                 ds_cfg = speech_cfg.get("device_sink", {})
                 name_contains = ds_cfg.get("name_contains", "UA-4FX")
-                sink = create_device_wav_sink(name_contains=name_contains, enabled=True)
+                sink = create_device_wav_sink(name_contains=name_contains, enabled=True, target_lufs=target_lufs)
             except Exception:
                 sink = NullAudioSink()
-        speech_engine = SpeechEngine(
-            tts=tts_provider,
-            sink=sink,
-            queue=SpeechQueue()
-        )
+        # Convert to the device's native format at synthesis time (once per clip, off the playback path)
+        if hasattr(sink, "native_format"):
+            try:
+                from speech.audio_format import NormalizingTTSProvider
+                tts_provider = NormalizingTTSProvider(tts_provider, sink.native_format(), target_lufs)
+            except Exception:
+                pass
+        # driver: "sync" (tick-driven) or "async" (pipelined synthesis, starts on first submit in the loop)
+        if str(speech_cfg.get("driver", "sync")).lower() == "async":
+            speech_engine = AsyncSpeechEngine(
+                tts=tts_provider,
+                sink=sink,
+                queue=SpeechQueue(),
+                lookahead=max(1, min(4, int(speech_cfg.get("lookahead", 2))))
+            )
+        else:
+            speech_engine = SpeechEngine(
+                tts=tts_provider,
+                sink=sink,
+                queue=SpeechQueue()
+            )
 except Exception:
     speech_engine = None
     speech_enabled = False
 
 
+# --- IDLE 発話の先行レンダリング (audio.idle_prerender) ---
+# emit_chunk と同じ tts で合成し、IDLE のチャンクはまずバッファから再生する。
+# キーは本文 + チャンク自身の N_* から map_prosody した prosody (afterglow/regulation 適用前)。
+idle_prerender = None
+_idle_prerender_task = None
+
+
+def build_idle_prerender(cfg: dict = None):
+    """audio.idle_prerender.enabled のとき emit 経路の tts を包むバッファを作る (tts が無ければ None)。"""
+    global idle_prerender
+    if cfg is None:
+        cfg = globals().get("cfg")
+    ip_cfg = ((cfg if isinstance(cfg, dict) else {}).get("audio", {}) or {}).get("idle_prerender", {}) or {}
+    if not ip_cfg.get("enabled", False) or tts is None:
+        idle_prerender = None
+        return None
+    try:
+        from speech.idle_prerender import IdlePrerenderBuffer, WavFileTTSProvider
+        idle_prerender = IdlePrerenderBuffer(
+            WavFileTTSProvider(tts),
+            resource_watcher=resource_watcher,
+            capacity=max(1, min(4, int(ip_cfg.get("capacity", 2)))),
+            backoff_base_sec=max(1.0, float(ip_cfg.get("backoff_base_sec", 5.0))),
+            backoff_max_sec=max(1.0, float(ip_cfg.get("backoff_max_sec", 120.0))),
+            max_age_sec=max(5.0, min(3600.0, float(ip_cfg.get("max_age_sec", 120.0)))),
+            sample_sec=max(1.0, min(60.0, float(ip_cfg.get("sample_sec", 5.0)))),
+        )
+    except Exception:
+        logger.warning("idle prerender unavailable", exc_info=True)
+        idle_prerender = None
+    return idle_prerender
+
+
+def _idle_line_prosody(chunk, prosody_cfg=None):
+    """Prosody an IDLE line is pre-rendered and looked up with (None without map_prosody)."""
+    if not map_prosody:
+        return None
+    try:
+        valence, interest, arousal = _face_scalars(chunk)
+        return map_prosody(valence, interest, arousal, prosody_cfg or ProsodyConfig.from_dict(globals().get("cfg")))
+    except Exception:
+        return None
+
+
+def _idle_prerender_candidates():
+    """Chunks most likely to be spoken next while IDLE: a pending idle aside, then the default presence/starter lines."""
+    chunks = []
+    if broker is not None:
+        try:
+            item = broker.peek_idle_aside()
+            if item:
+                lines = build_content_prompt_text(item)
+                if lines:
+                    chunks.append({"text": lines[0]})
+        except Exception:
+            pass
+    for plan in (build_idle_presence_plan({"kind": "aside"}), build_starter_plan({})):
+        chunks.extend(normalize_plan(plan))
+    out = []
+    for c in chunks:
+        prosody = _idle_line_prosody(c)
+        if prosody:
+            out.append({"text": c.get("text", ""), "prosody": prosody})
+    return out
+
+
+# --- OSC client / transport ---
+# osc.transport: "sync" (send from the calling thread) or "async" (single asyncio writer; send latency -> OscRateController)
+# osc.record: path of a binary log of everything sent (see vrc/osc_recorder.py)
+# osc.listen: mirror VRChat's output (port 9001) so parameter diffs use the avatar's actual state
+osc_rate_controller = None
+osc_listener = None
+
+
+def build_osc_client(cfg: dict) -> OscClient:
+    global osc_listener, osc_rate_controller
+    osc_cfg = (cfg.get("osc", {}) if isinstance(cfg, dict) else {}) or {}
+    ip = str(osc_cfg.get("ip", "127.0.0.1"))
+    port = int(osc_cfg.get("port", 9000))
+    # 送信コストを測って全体のパケット予算を決める (chunk/afterglow/drift/blink で分配)。
+    # OSC のレート制御はこれ一つ (PresenceBackpressure は使わない)
+    osc_rate_controller = None
+    if osc_cfg.get("rate_control", True):
+        try:
+            from osc.rate_controller import OscRateController
+            osc_rate_controller = OscRateController(cfg)
+        except Exception:
+            logger.warning("OSC rate controller unavailable", exc_info=True)
+    transport = None
+    # TIOCOUTQ (socket pressure) is Linux-only: on Windows the async transport's queue
+    # depth is what tells the rate controller the sender is backing up
+    default_transport = "async" if osc_rate_controller is not None and sys.platform == "win32" else "sync"
+    if str(osc_cfg.get("transport", default_transport)).lower() == "async":
+        try:
+            from vrc.osc_async_transport import AsyncOscTransport
+            sink = osc_rate_controller.observe_latency if osc_rate_controller is not None else None
+            transport = AsyncOscTransport(ip, port, latency_sink=sink).start()
+        except Exception:
+            logger.warning("async OSC transport unavailable, sending synchronously", exc_info=True)
+            transport = None
+    record_path = osc_cfg.get("record")
+    if record_path:
+        # 送信した OSC をすべてバイナリログに記録 (scripts/replay_osc_log.py で再生・分析)
+        try:
+            from vrc.osc_recorder import OscRecorder
+            transport = OscRecorder(str(record_path), inner=transport, forward=None if transport else (ip, port))
+        except Exception:
+            logger.warning("OSC recorder unavailable", exc_info=True)
+    prefix = str(osc_cfg.get("prefix", "/avatar/parameters"))
+    mirror = None
+    if osc_cfg.get("listen", False):
+        try:
+            from vrc.osc_listener import AvatarStateMirror, OscListener
+            mirror = AvatarStateMirror(prefix)
+            osc_listener = OscListener(
+                mirror,
+                str(osc_cfg.get("listen_ip", "127.0.0.1")),
+                int(osc_cfg.get("listen_port", 9001)),
+                avatar_store=_osc_avatar_store(osc_cfg),
+            ).start()
+        except Exception:
+            logger.warning("OSC listener unavailable, diffing against last sent values", exc_info=True)
+            mirror = None
+    client = OscClient(
+        ip=ip,
+        port=port,
+        prefix=prefix,
+        max_hz=max(0.0, min(60.0, float(osc_cfg.get("max_hz", 10.0)))),
+        bundle=bool(osc_cfg.get("bundle", True)),
+        transport=transport,
+        state_mirror=mirror,
+        rate_controller=osc_rate_controller,
+    )
+    if mirror is not None and osc_listener is not None:
+        # 新しいアバターは既定値で読み込まれる: 前のアバターに送った値との差分は無効
+        osc_listener.on_avatar_change = lambda avatar_id: client.forget_sent()
+    return client
+
+
+def _osc_avatar_store(osc_cfg: dict):
+    """The app's AvatarStore (speaker_store's, same DB) or one at osc.avatar_db."""
+    store = globals().get("speaker_store", None)
+    if store is not None and getattr(store, "avatar_store", None) is not None:
+        return store.avatar_store
+    from core.memory.avatar_store import AvatarStore
+    path = str(osc_cfg.get("avatar_db", "data/avatar.sqlite"))
+    if path != ":memory:":
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+    return AvatarStore(path)
+
+
+# --- Face animation (fixed-rate tweening of chunk targets + afterglow/drift/blink) ---
+face_animator = None
+
+
+def build_face_animator(osc, cfg: dict, state_getter=None):
+    """Create the animator when enable_face_animator is set; run it with `await face_animator.run()`."""
+    global face_animator
+    try:
+        from osc.face_animator import FaceAnimator
+        anim = FaceAnimator(osc, cfg, rate_controller=osc_rate_controller)
+        if not anim.enabled:
+            return None
+        if emotion_afterglow is not None:
+            pm = (cfg.get("osc", {}) or {}).get("params_map", {}) or {}
+            anim.attach_afterglow(emotion_afterglow, pm.get("valence", "face_valence"), pm.get("interest", "face_interest"),
+                                  state_getter or (lambda: None))
+        face_animator = anim
+    except Exception:
+        logger.warning("face animator unavailable", exc_info=True)
+        face_animator = None
+    return face_animator
+
+
+# blink / idle drift feed the animator (presence_sender) instead of sending on their own
+presence_blink = None
+idle_face_drift = None
+_face_tasks = []
+
+
+def _sm_state_name(sm):
+    return getattr(getattr(sm, "state", None), "name", None)
+
+
+def _bot_speaking(sm) -> bool:
+    return _active_plan is not None or _sm_state_name(sm) == "TALK"
+
+
+def build_presence(sm, anim, cfg: dict):
+    """PresenceBlink / IdleFaceDrift on one shared timeline, sending through the animator."""
+    global presence_blink, idle_face_drift
+    presence_blink = idle_face_drift = None
+    try:
+        from core.determinism import TimeProvider
+        from osc.presence_blink import PresenceBlink
+        from osc.presence_idle_drift import IdleFaceDrift
+        from osc.presence_timeline import PresenceTimeline
+        timeline = PresenceTimeline(cfg)
+        if cfg.get("enable_blink_hint", False):
+            presence_blink = PresenceBlink(anim.presence_sender("override"), cfg, TimeProvider(), timeline=timeline)
+        if cfg.get("enable_idle_face_drift", False):
+            # one drift step becomes a tween lasting one drift interval
+            idle_face_drift = IdleFaceDrift(anim.presence_sender("target", 1.0 / timeline.drift_hz), TimeProvider(), cfg,
+                                            _clamp, lambda: _sm_state_name(sm), lambda: _bot_speaking(sm),
+                                            timeline=timeline)
+    except Exception:
+        logger.warning("presence (blink/idle drift) unavailable", exc_info=True)
+    return presence_blink, idle_face_drift
+
+
+def tick_presence(sm) -> None:
+    try:
+        if presence_blink is not None:
+            presence_blink.tick(_sm_state_name(sm), _bot_speaking(sm))
+        if idle_face_drift is not None:
+            idle_face_drift.tick()
+    except Exception:
+        logger.debug("presence tick failed", exc_info=True)
+
+
+async def _presence_loop(sm, interval_sec: float) -> None:
+    while True:
+        tick_presence(sm)
+        await asyncio.sleep(interval_sec)
+
+
+def start_face_animator(sm, osc, cfg_=None):
+    """イベントループ上で呼ぶ: enable_face_animator なら animator と blink/drift を起動 (無効なら None)。"""
+    global face_animator
+    for t in _face_tasks:
+        t.cancel()
+    _face_tasks.clear()
+    face_animator = None
+    base = cfg_ if cfg_ is not None else globals().get("cfg")
+    base = base if isinstance(base, dict) else {}
+    anim = build_face_animator(osc, base, lambda: _sm_state_name(sm))
+    if anim is None:
+        return None
+    loop = asyncio.get_running_loop()
+    _face_tasks.append(loop.create_task(anim.run()))
+    if any(build_presence(sm, anim, base)):
+        # blink pulses are ~120 ms: tick presence at the animator's rate
+        _face_tasks.append(loop.create_task(_presence_loop(sm, 1.0 / anim.tick_hz)))
+    return anim
+
+
+def tick_idle_prerender(state) -> int:
+    """Call once per main-loop tick; pre-renders only in IDLE and drops the buffer on any state change."""
+    if idle_prerender is None:
+        return 0
+    try:
+        return idle_prerender.tick(state, _idle_prerender_candidates)
+    except Exception:
+        return 0
+
+
+async def _idle_prerender_loop(sm, interval_sec: float) -> None:
+    while True:
+        tick_idle_prerender(getattr(sm, "state", None))
+        await asyncio.sleep(interval_sec)
+
+
+def start_idle_prerender(sm, interval_sec=None):
+    """イベントループ上で呼ぶ: interval_sec ごとに sm.state で tick する (無効なら None)。"""
+    global _idle_prerender_task
+    if _idle_prerender_task is not None:
+        _idle_prerender_task.cancel()
+        _idle_prerender_task = None
+    if idle_prerender is None and build_idle_prerender() is None:
+        return None
+    if interval_sec is None:
+        base = globals().get("cfg")
+        ip_cfg = ((base if isinstance(base, dict) else {}).get("audio", {}) or {}).get("idle_prerender", {}) or {}
+        interval_sec = ip_cfg.get("tick_sec", 1.0)
+    interval_sec = max(0.1, min(30.0, float(interval_sec)))
+    _idle_prerender_task = asyncio.get_running_loop().create_task(_idle_prerender_loop(sm, interval_sec))
+    return _idle_prerender_task
+
+
 def load_config(path: str = "config.yaml") -> dict:
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -592,6 +1006,87 @@ def load_config(path: str = "config.yaml") -> dict:
         return {}
 
 
+# --- config hot reload: ConfigStore が検証済みスナップショットを差し替える ---
+config_store = None
+config_snapshot = None
+
+
+def _on_config_reload(snap: ConfigSnapshot) -> None:
+    """新しいスナップショットを各コンシューマへ配る (EmissionContext は cfg の差し替えで自動再構築)。"""
+    global cfg, config_snapshot
+    config_snapshot = snap
+    cfg = snap.raw
+    for consumer in (emergency_chat_notifier, broker):
+        if consumer is not None and hasattr(consumer, "apply_config"):
+            try:
+                consumer.apply_config(snap)
+            except Exception:
+                logger.warning("config apply failed for %s", type(consumer).__name__, exc_info=True)
+    logger.info("config v%s applied from %s", snap.version, snap.source)
+
+
+def start_config_hot_reload(path: str = "config.yaml", poll_sec=None) -> ConfigStore:
+    """config.yaml の変更を poll_sec ごとに検出して反映する。壊れたファイルは無視して旧設定のまま。"""
+    global config_store
+    if config_store is not None:
+        config_store.stop()
+    if poll_sec is None:
+        base = globals().get("cfg")
+        poll_sec = (base if isinstance(base, dict) else {}).get("config_hot_reload_poll_sec", 1.0)
+    store = ConfigStore(path, poll_sec=max(0.2, min(60.0, float(poll_sec))))
+    store.subscribe(_on_config_reload)
+    _on_config_reload(store.current)
+    config_store = store.start()
+    return store
+
+
+# --- loop profiler: ループ遅延 + 停止検知 (スタック採取) + コンポーネント別時間 ---
+loop_profiler = None
+
+
+def start_loop_profiler(loop=None, profile_threads=None) -> LoopProfiler:
+    """cfg.loop_profiler で設定。イベントループ上 (または loop 指定) で呼ぶ。"""
+    global loop_profiler
+    if loop_profiler is not None:
+        loop_profiler.stop()
+    base = globals().get("cfg")
+    pcfg = (base if isinstance(base, dict) else {}).get("loop_profiler", {}) or {}
+    if profile_threads is None:
+        profile_threads = bool(pcfg.get("profile_threads", False))
+    loop_profiler = LoopProfiler(
+        lag_interval_ms=max(5.0, min(1000.0, float(pcfg.get("lag_interval_ms", 50)))),
+        slow_ms=max(10.0, min(10000.0, float(pcfg.get("slow_ms", 100)))),
+        sample_ms=max(1.0, min(100.0, float(pcfg.get("sample_ms", 10)))),
+        profile_threads=profile_threads,
+    ).start(loop)
+    return loop_profiler
+
+
+def loop_profile_report() -> dict:
+    """loop_profiler.report() + emit_chunk のステージ別合計 (ms)。"""
+    rep = loop_profiler.report() if loop_profiler is not None else {}
+    stages = {}
+    for st in list(emit_stage_timings):
+        for k, v in st.items():
+            if k.endswith("_ms") and isinstance(v, (int, float)):
+                s = stages.setdefault(k[:-3], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                s["count"] += 1
+                s["total_ms"] = round(s["total_ms"] + v, 3)
+                s["max_ms"] = max(s["max_ms"], v)
+    rep["emit_stages_ms"] = stages
+    return rep
+
+
+def dump_loop_profile(json_path: str, folded_path=None) -> dict:
+    """--profile-loop (main / scripts/profile_loop.py) の出力: JSON レポートと (folded_path があれば) flamegraph 用 folded stacks。"""
+    rep = loop_profile_report()
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(rep, f, ensure_ascii=False, indent=2)
+    if folded_path and loop_profiler is not None:
+        loop_profiler.write_folded(folded_path)
+    return rep
+
+
 def resolve_agents_enabled_from_config(cfg: dict) -> bool:
     """Resolve `agents.enabled` flag from a config dict (pure function).
 
@@ -604,60 +1099,36 @@ def resolve_agents_enabled_from_config(cfg: dict) -> bool:
 def normalize_plan(plan: dict) -> list:
     """Normalize speech plan to v1.2 speech_plan list of chunks.
 
-    Accepts either {'speech_plan': [...]} or legacy {'chunks': [...]}.
-    Returns list of chunks with at least {id,type,text,pause_ms,osc}
+    Accepts either {'speech_plan': [...]} or legacy {'chunks': [...]} (or a SpeechPlan).
+    Returns core.speech_plan.Chunk objects: parsed once, readable as the v1.2 dict
+    {id,type,text,pause_ms,osc}, with chunk["_legacy"] the source chunk dict as before.
+    """
+    return SpeechPlan.from_plan(plan).chunks
+
+
+def _face_scalars(chunk) -> tuple:
+    """(valence, interest, arousal) of a chunk's N_* values (unset = 0.0)."""
+    if type(chunk) is Chunk:
+        return chunk.face_scalars()
+    osc_map = chunk.get("osc") or {}
+    return (float(osc_map.get("N_Valence", 0.0)), float(osc_map.get("N_Interest", 0.0)),
+            float(osc_map.get("N_Arousal", 0.0)))
+
+
+def notify_chunk_done(sm: StateMachine, now: bool = False) -> None:
+    """Notify SM that a TTS chunk boundary was reached, compatible with both mark_speech_done and tts_chunk_done events.
+
+    Queued on sm's event dispatcher when one is attached; now=True handles it inline
+    (on the loop, when the caller needs the new state right away).
     """
-    chunks = []
-    if not plan:
-        return chunks
-    if "speech_plan" in plan:
-        raw = plan.get("speech_plan", [])
-        for c in raw:
-            chunks.append({
-                "id": c.get("id"),
-                "type": c.get("type", "say"),
-                "text": c.get("text", ""),
-                "pause_ms": int(c.get("pause_ms", 120)),
-                "osc": c.get("osc"),
-                "_legacy": c,
-            })
-    elif "chunks" in plan:
-        raw = plan.get("chunks", [])
-        for i, c in enumerate(raw, start=1):
-            # Build a minimal abstract osc map from legacy expressive fields
-            osc_map = {}
-            # N_Arousal / N_Valence / N_Gesture / N_Look
-            try:
-                if "arousal" in c:
-                    osc_map["N_Arousal"] = float(c.get("arousal", 0.0))
-                if "valence" in c:
-                    osc_map["N_Valence"] = float(c.get("valence", 0.0))
-                if "gesture" in c:
-                    osc_map["N_Gesture"] = float(c.get("gesture", 0.0))
-                # normalize look_x (-1..1) to 0..1 for N_Look if present
-                if "look_x" in c:
-                    lx = float(c.get("look_x", 0.0))
-                    osc_map["N_Look"] = (lx + 1.0) / 2.0
-            except Exception:
-                osc_map = None
-
-            chunks.append({
-                "id": f"c{i}",
-                "type": "say",
-                "text": c.get("text", ""),
-                "pause_ms": int(c.get("pause_ms", 120)),
-                "osc": osc_map or None,
-                # carry legacy expressive fields for local mapping
-                "_legacy": c,
-            })
-    return chunks
-
-
-def notify_chunk_done(sm: StateMachine) -> None:
-    """Notify SM that a TTS chunk boundary was reached, compatible with both mark_speech_done and tts_chunk_done events."""
     try:
         if hasattr(sm, "mark_speech_done"):
-            sm.mark_speech_done()
+            if now:
+                sm.mark_speech_done()
+            else:
+                _sm_call(sm, sm.mark_speech_done, "tts_chunk_done")
+        elif hasattr(sm, "post"):
+            sm.post("tts_chunk_done")
         else:
             sm.on_event("tts_chunk_done")
     except Exception:
@@ -681,2058 +1152,597 @@ def get_face_valence(base_valence: float, interest_norm: float) -> float:
         out = 1.0
     return out
 
-async def emit_chunk(chunk: dict, osc: OscClient, params_map: dict, state: State, sm: StateMachine, mode: str = "debug", now_ts=None) -> None:
-    focus = getattr(State, "FOCUS", None)
-    blocked = tuple(s for s in (State.ALERT, State.SEARCH, focus) if s is not None)
-    global emergency_chat_notifier, error_burst
-    # Minimal-diff test unblock: always emit both valence and interest in debug mode for test expectations
-    if mode == "debug":
-        debug_send = {}
-        base_valence = None
-        interest_norm = None
-        if "osc" in chunk and "N_Valence" in chunk["osc"]:
-            try:
-                base_valence = float(chunk["osc"]["N_Valence"])
-            except Exception:
-                base_valence = 0.0
-        elif "valence" in chunk:
-            try:
-                base_valence = float(chunk["valence"])
-            except Exception:
-                base_valence = 0.0
-        if "interest" in chunk:
-            try:
-                interest_norm = float(chunk["interest"])
-            except Exception:
-                interest_norm = 0.0
-        # Always emit both interest and valence keys if present in params_map, even if missing from chunk
-        if "valence" in params_map:
-            # Always send base valence as first Mood
-            debug_send[params_map["valence"]] = base_valence if base_valence is not None else 0.0
+_compiled_params = None
+_compiled_params_cfg = None
+
+
+def compiled_params_map(params_map: dict) -> CompiledParamMap:
+    """params_map resolved once (N_* -> avatar param + clamp range); rebuilt for a different map or a reloaded cfg."""
+    global _compiled_params, _compiled_params_cfg
+    c = _compiled_params
+    cfg = globals().get("cfg")
+    if c is None or c.source is not params_map or _compiled_params_cfg is not cfg:
+        osc_cfg = (cfg if isinstance(cfg, dict) else {}).get("osc", {}) or {}
+        c = _compiled_params = compile_params_map(params_map, osc_cfg.get("param_ranges"), get_face_valence)
+        _compiled_params_cfg = cfg
+    return c
+
+
+# --- emit_chunk: 非同期パイプライン ---
+# ブロッキング処理 (resource_watcher.tick, tts.synthesize, play_wav) は専用 executor で実行し、
+# ポーズは await する (イベントループを止めない)。チャンクごとのステージ時間 (ms) は
+# emit_stage_timings に残り、CHUNK done ログにも出る。
+emit_stage_timings = collections.deque(maxlen=256)
+_emit_executor = None
+
+
+def _get_emit_executor():
+    global _emit_executor
+    if _emit_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        # plan lookahead (<=4) syntheses + playback + resource probe
+        _emit_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="emit")
+    return _emit_executor
+
+
+async def _run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_get_emit_executor(), fn, *args)
+
+
+def _ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000.0, 3)
+
+
+def _emit_debug_params(chunk: dict, osc: OscClient, params_map: dict) -> None:
+    """debug モード: base Mood/Interest を送り、valence と interest が両方あれば補正後の Mood も送る。"""
+    debug_send = {}
+    base_valence = None
+    interest_norm = None
+    if "osc" in chunk and "N_Valence" in (chunk["osc"] or {}):
+        try:
+            base_valence = float(chunk["osc"]["N_Valence"])
+        except Exception:
+            base_valence = 0.0
+    elif "valence" in chunk:
+        try:
+            base_valence = float(chunk["valence"])
+        except Exception:
+            base_valence = 0.0
+    if "interest" in chunk:
+        try:
+            interest_norm = float(chunk["interest"])
+        except Exception:
+            interest_norm = 0.0
+    # Always emit both interest and valence keys if present in params_map, even if missing from chunk
+    if "valence" in params_map:
+        debug_send[params_map["valence"]] = base_valence if base_valence is not None else 0.0
+    if "interest" in params_map:
+        if interest_norm is not None:
+            debug_send[params_map["interest"]] = max(-1.0, min(1.0, interest_norm))
+        else:
+            debug_send[params_map["interest"]] = 0.0
+    osc.send_avatar_params(debug_send)
+    if "valence" in params_map and base_valence is not None and interest_norm is not None:
+        adjusted = {params_map["valence"]: get_face_valence(base_valence, min(1.0, max(0.0, interest_norm)))}
         if "interest" in params_map:
-            if interest_norm is not None:
-                debug_send[params_map["interest"]] = max(-1.0, min(1.0, interest_norm))
-            else:
-                debug_send[params_map["interest"]] = 0.0
-        osc.send_avatar_params(debug_send)
-        # If both valence and interest are present, send a second OSC message with adjusted Mood
-        if ("valence" in params_map and base_valence is not None and interest_norm is not None):
-            clamped_interest = min(1.0, max(0.0, interest_norm))
-            adjusted = {params_map["valence"]: get_face_valence(base_valence, clamped_interest)}
-            if "interest" in params_map:
-                adjusted[params_map["interest"]] = max(-1.0, min(1.0, interest_norm))
-            osc.send_avatar_params(adjusted)
+            adjusted[params_map["interest"]] = max(-1.0, min(1.0, interest_norm))
+        osc.send_avatar_params(adjusted)
+
+
+def _emergency_level_and_reason():
+    """(level, reason) for EmergencyChatNotifier; cached by EmissionContext.emergency()."""
+    if not emergency_chat_notifier:
+        return "none", None
+    context = {
+        'resource_watcher': globals().get('resource_watcher', None),
+        'disaster_watch': globals().get('disaster_watch', None),
+        'cfg': globals().get('cfg', {}),
+        'error_burst': error_burst,
+        'now': emergency_chat_notifier.tp.now(),
+    }
+    level = get_emergency_level(context)
+    if level == 'none':
+        return level, None
+    # Reason mapping: prefer resource danger, error burst, disaster
+    if level == 'disaster':
+        reason = 'disaster_watch'
+    elif context.get('resource_watcher') and getattr(context['resource_watcher'], 'last_level', None) == context['cfg'].get('emergency_chat_resource_level', 'danger'):
+        reason = 'resource_danger'
+    elif error_burst and error_burst.is_burst(context['now']):
+        reason = 'error_burst'
+    else:
+        reason = 'resource_danger'
+    return level, reason
+
+
+def _notify_emergency_chat(ctx: EmissionContext) -> None:
+    (level, reason), fresh = ctx.emergency()
+    if fresh and level != 'none' and emergency_chat_notifier:
+        try:
+            emergency_chat_notifier.maybe_notify(level, reason)
+        except Exception:
+            pass
+
+
+_emission_ctx = None
+_NO_CFG = {}
+
+
+def emission_context(params_map: dict) -> EmissionContext:
+    """Per-plan lookups resolved once; rebuilt on config reload (new cfg object), another params_map or speaker store."""
+    global _emission_ctx
+    cfg = globals().get("cfg")
+    if not isinstance(cfg, dict):
+        cfg = _NO_CFG
+    store = globals().get("speaker_store", None)
+    ctx = _emission_ctx
+    if ctx is None or ctx.cfg is not cfg or ctx.cmap.source is not params_map or ctx.speaker_store is not store:
+        focus = getattr(State, "FOCUS", None)
+        ecfg = cfg.get("emission", {}) or {}
+        ctx = _emission_ctx = EmissionContext(
+            cfg,
+            compiled_params_map(params_map),
+            blocked=tuple(s for s in (State.ALERT, State.SEARCH, focus) if s is not None),
+            tempo_fn=compute_speaker_tempo,
+            speaker_store=store,
+            emergency_fn=_emergency_level_and_reason,
+            tempo_ttl_sec=max(0.0, min(300.0, float(ecfg.get("tempo_ttl_sec", 30.0)))),
+            emergency_ttl_sec=max(0.0, min(10.0, float(ecfg.get("emergency_ttl_sec", 1.0)))),
+        )
+    return ctx
+
+
+def _send_chunk_params(to_send: dict, osc: OscClient, snap: bool = False) -> None:
+    if not to_send:
+        return
+    animator = globals().get("face_animator")
+    if animator is not None and getattr(animator, "osc", None) is osc:
+        # tweened by the animator tick instead of a step change; a snap is sent now and
+        # pinned in the animator so its next tick doesn't tween back
+        animator.set_targets(to_send, duration=0.0 if snap else None)
+        if not snap:
+            return
+    if snap or not isinstance(osc, OscClient):
+        osc.send_avatar_params(to_send)  # a snap is sent now, outside the budget
+    else:
+        osc.send_avatar_params(to_send, source="chunk")
+
+
+def _prefetch_next_chunk(sm: StateMachine, prosody_cfg) -> None:
+    """次チャンクの TTS を先行合成 (prefetcher は自前のスレッドで合成する)。"""
+    next_chunk = None
+    if hasattr(sm, "get_next_chunk"):
+        try:
+            next_chunk = sm.get_next_chunk()
+        except Exception:
+            next_chunk = None
+    if not next_chunk:
+        next_chunk = getattr(sm, "_next_chunk", None) or getattr(sm, "next_chunk", None)
+    if not (next_chunk and isinstance(next_chunk, Mapping) and next_chunk.get("text")):
+        return
+    nosc = next_chunk.get("osc") or {}
     try:
-        if emergency_chat_notifier:
-            context = {
-                'resource_watcher': globals().get('resource_watcher', None),
-                'disaster_watch': globals().get('disaster_watch', None),
-                'cfg': globals().get('cfg', {}),
-                'error_burst': error_burst,
-                'now': emergency_chat_notifier.tp.now(),
-            }
-            level = get_emergency_level(context)
-            if level != 'none':
-                # Reason mapping: prefer resource danger, error burst, disaster
-                reason = None
-                if level == 'disaster':
-                    reason = 'disaster_watch'
-                elif context.get('resource_watcher') and getattr(context['resource_watcher'], 'last_level', None) == context['cfg'].get('emergency_chat_resource_level', 'danger'):
-                    reason = 'resource_danger'
-                elif error_burst and error_burst.is_burst(context['now']):
-                    reason = 'error_burst'
-                else:
-                    reason = 'resource_danger'
-                emergency_chat_notifier.maybe_notify(level, reason)
+        nval = float(nosc.get("N_Valence", 0.0))
+        nint = float(nosc.get("N_Interest", 0.0))
+        narl = float(nosc.get("N_Arousal", 0.0))
+        nprosody = map_prosody(nval, nint, narl, prosody_cfg) if map_prosody else None
+        if nprosody:
+            prefetcher.prefetch(next_chunk, prosody_signature(nval, nint, narl), nprosody)
     except Exception:
         pass
-        # --- 話者別テンポ調整 ---
-        tempo = {'response_delay_ms': 0, 'idle_interval_scale': 1.0, 'prosody_speed_scale': 1.0}
-        speaker_key = chunk.get('speaker_key') if isinstance(chunk, dict) else None
-        speaker_store = globals().get('speaker_store', None)
-        if compute_speaker_tempo and speaker_key and speaker_store and state not in blocked:
-            try:
-                tempo = compute_speaker_tempo(speaker_key, speaker_store, int(time.time()), globals().get('cfg', {}))
-            except Exception:
-                tempo = {'response_delay_ms': 0, 'idle_interval_scale': 1.0, 'prosody_speed_scale': 1.0}
-        # --- INTEREST→表情 係数: config駆動・安全クランプ ---
-        DEFAULT_GAIN = 0.35
-        DEFAULT_MAX = 0.6
-        def _clamp(x, lo, hi):
-            try:
-                return max(lo, min(hi, float(x)))
-            except Exception:
-                return lo
-        cfg = globals().get("cfg", {})
-        osc_cfg = (cfg.get("osc", {}) if cfg else {})
-        gain = osc_cfg.get("face_interest_gain", DEFAULT_GAIN)
-        gain = _clamp(gain, 0.25, 0.45)
-    """Emit a single speech chunk: send OSC numeric N_* where provided, send chatbox text, wait pause, then notify SM of chunk end."""
+
+
+def _speak_blocking(chunk: dict, prosody: dict, prosig, tmp_wav_path: str, idle_prosody=None) -> bool:
+    """Runs on the emit executor: play the pre-rendered IDLE line or the prefetched wav, or synthesize then play."""
+    buf = idle_prerender
+    if buf is not None and idle_prosody:
+        audio = buf.take(chunk.get("text", ""), None, idle_prosody)
+        if audio is not None:
+            with open(tmp_wav_path, "wb") as f:
+                f.write(audio.pcm_bytes)
+            play_wav(tmp_wav_path)
+            return True
+    wav_path = None
+    if prefetcher and prosig:
+        try:
+            wav_path = prefetcher.get(chunk, prosig)
+        except Exception:
+            wav_path = None
+    if wav_path and os.path.exists(wav_path):
+        play_wav(wav_path)
+        prefetcher.drop(chunk, prosig)
+        return True
+    if tts.synthesize(chunk.get("text", ""), prosody, tmp_wav_path):
+        play_wav(tmp_wav_path)
+        return True
+    return False
+
+
+async def emit_chunk(chunk: dict, osc: OscClient, params_map: dict, state: State, sm: StateMachine, mode: str = "debug", now_ts=None,
+                     ctx: EmissionContext = None) -> None:
+    """Emit a single speech chunk: send OSC numeric N_* where provided, play TTS, wait pause, then notify SM of chunk end.
+
+    The resource probe runs on the executor while the debug OSC send and emergency check
+    happen; next-chunk prefetch is started before this chunk's playback is awaited.
+    Config, compiled params_map, tempo and emergency level come from `ctx`
+    (default: the cached emission_context(params_map)).
+    """
+    global emotion_afterglow
+    if ctx is None:
+        ctx = emission_context(params_map)
+    cfg = ctx.cfg
+    blocked = ctx.blocked
+    t_start = time.perf_counter()
+    stages = {}
     cid = chunk.get("id")
-    ctype = chunk.get("type", "say")
-    logger.info("CHUNK start id=%s type=%s state=%s", cid, ctype, state.name)
+    logger.info("CHUNK start id=%s type=%s state=%s", cid, chunk.get("type", "say"), getattr(state, "name", state))
+
+    # --- システムリソース監視 (psutil/nvidia-smi はブロッキングなので executor で) ---
+    # 1tick1発話厳守: resource_watcher が発話要求した場合はそれを優先
+    resource_task = None
+    if resource_watcher and state not in blocked:
+        resource_task = asyncio.ensure_future(_run_blocking(resource_watcher.tick, now_ts))
 
-    # If the chunk has osc instructions in abstract N_* form, map them to params_map keys
+    t0 = time.perf_counter()
+    if mode == "debug":
+        _emit_debug_params(chunk, osc, params_map)
+    stages["osc_ms"] = _ms_since(t0)
+    _notify_emergency_chat(ctx)
 
-    # --- システムリソース監視: 危険時は自己申告発話を優先 + 自己抑制 ---
-    # 1tick1発話厳守: resource_watcherが発話要求した場合はそれを優先
     resource_level = None
-    if resource_watcher and state not in blocked:
+    if resource_task is not None:
+        t0 = time.perf_counter()
         try:
-            msg = resource_watcher.tick(now_ts)
-            resource_level = resource_watcher.last_level if hasattr(resource_watcher, 'last_level') else None
+            msg = await resource_task
+            resource_level = getattr(resource_watcher, "last_level", None)
             if msg:
                 logger.info(f"[ResourceWatcher] {msg}")
                 chunk = {'id': 'resource_alert', 'type': 'say', 'text': msg, 'pause_ms': 120, 'osc': {}}
         except Exception:
             pass
+        stages["resource_ms"] = _ms_since(t0)
+
+    # --- 話者別テンポ調整 ---
+    tempo = ctx.tempo(chunk.get('speaker_key')) if state not in blocked else DEFAULT_TEMPO
     # --- SelfRegulator適用 ---
     regulation = None
     if self_regulator:
         try:
-            regulation = self_regulator.apply(resource_level, globals().get('cfg', {}))
+            regulation = self_regulator.apply(resource_level, cfg)
         except Exception:
             regulation = None
     if not regulation:
-        regulation = {'tts_enabled': True, 'prosody_scale': 1.0, 'idle_interval_scale': 1.0}
+        regulation = DEFAULT_REGULATION
     # 条件: ALERT/SEARCH/name-learning 以外, tts有効, audio.enabled==True
-    audio_cfg = globals().get("cfg", {}).get("audio", {})
-    tts_enabled = bool(audio_cfg.get("enabled", True)) and regulation.get('tts_enabled', True)
+    tts_enabled = ctx.audio_enabled and regulation.get('tts_enabled', True)
     allow_tts = tts and tts_enabled and state not in blocked
-    tmp_wav_path = "./tmp/neuro_tts.wav"
     valence = 0.0
     interest = 0.0
     arousal = 0.0
     try:
-        osc_map = chunk.get("osc") or {}
-        valence = float(osc_map.get("N_Valence", 0.0))
-        interest = float(osc_map.get("N_Interest", 0.0))
-        arousal = float(osc_map.get("N_Arousal", 0.0))
-    except Exception as e:
+        valence, interest, arousal = _face_scalars(chunk)
+    except Exception:
         # Record error for burst detector (minimal, deterministic)
         if error_burst:
             try:
                 error_burst.record_error(emergency_chat_notifier.tp.now())
             except Exception:
                 pass
-        pass
+
+    # N_* -> アバターパラメータ (params_map はコンパイル済み; debug モードは冒頭で送信済み)
+    if mode != "debug":
+        t0 = time.perf_counter()
+        _send_chunk_params(ctx.cmap.prepare(chunk, {}), osc)
+        stages["osc_ms"] = round(stages["osc_ms"] + _ms_since(t0), 3)
+    # send chatbox text for visibility/debug; send notify=False to avoid spam
+    if mode == "debug" and chunk.get("text"):
+        try:
+            get_chatbox_scheduler(osc).send(chunk.get("text"), "debug", notify=False)
+        except Exception:
+            logger.exception("Failed to send chatbox text for chunk %s", cid)
 
     # --- Emotional Afterglow: apply afterglow fade to outgoing valence/interest (visual only, config-gated, fail-soft) ---
-    global emotion_afterglow
-    if emotion_afterglow and hasattr(emotion_afterglow, "enabled") and getattr(emotion_afterglow, "enabled", False):
+    sname = getattr(state, "name", str(state))
+    afterglow_on = bool(emotion_afterglow and getattr(emotion_afterglow, "enabled", False))
+    if afterglow_on and sname not in ("ALERT", "SEARCH"):
         try:
-            # Only apply afterglow to TALK/IDLE/THINK/ASIDE, not ALERT/SEARCH
-            sname = getattr(state, "name", str(state))
-            if sname not in ("ALERT", "SEARCH"):
-                valence, interest = emotion_afterglow.tick(valence, interest, state=sname)
+            valence, interest = emotion_afterglow.tick(valence, interest, state=sname)
         except Exception:
             pass
     prosody = None
     if map_prosody:
         try:
-            prosody = map_prosody(valence, interest, arousal, globals().get("cfg", {}))
+            prosody = map_prosody(valence, interest, arousal, ctx.prosody)
             # prosodyはdict型を想定: energy, pitch, speed, ...
             if prosody and isinstance(prosody, dict):
                 scale = regulation.get('prosody_scale', 1.0)
-                speed_scale = tempo.get('prosody_speed_scale', 1.0)
                 if 'energy' in prosody:
                     prosody['energy'] = float(prosody['energy']) * scale
                 if 'pitch' in prosody:
                     prosody['pitch'] = float(prosody['pitch']) * scale
                 if 'speed' in prosody:
-                    prosody['speed'] = float(prosody['speed']) * speed_scale
+                    prosody['speed'] = float(prosody['speed']) * tempo.get('prosody_speed_scale', 1.0)
         except Exception:
             prosody = None
-    # --- TTSプリフェッチ再生 ---
-    wav_path = None
-    prosig = None
-    if allow_tts and prosody and prefetcher and prosody_signature:
-        try:
-            prosig = prosody_signature(valence, interest, arousal)
-            wav_path = prefetcher.get(chunk, prosig)
-        except Exception:
-            wav_path = None
+
+    # --- 次チャンクのTTSプリフェッチ: 今のチャンクの再生と並行 ---
+    if prefetcher and prosody_signature and tts_enabled and tts and state not in blocked:
+        t0 = time.perf_counter()
+        _prefetch_next_chunk(sm, ctx.prosody)
+        stages["prefetch_ms"] = _ms_since(t0)
+
+    # --- TTS 合成/再生 (executor) ---
     if allow_tts and prosody and play_wav:
+        t0 = time.perf_counter()
+        prosig = None
+        if prefetcher and prosody_signature:
+            try:
+                prosig = prosody_signature(valence, interest, arousal)
+            except Exception:
+                prosig = None
         try:
-            if wav_path and os.path.exists(wav_path):
-                play_wav(wav_path)
-                if prefetcher and prosig:
-                    prefetcher.drop(chunk, prosig)
-            else:
-                ok = tts.synthesize(chunk.get("text", ""), prosody, tmp_wav_path)
-                if ok:
-                    play_wav(tmp_wav_path)
+            idle_prosody = _idle_line_prosody(chunk, ctx.prosody) if idle_prerender is not None and sname == "IDLE" else None
+            await _run_blocking(_speak_blocking, chunk, prosody, prosig, "./tmp/neuro_tts.wav", idle_prosody)
             # --- Afterglow: on speech emission end, trigger afterglow fade ---
-            if emotion_afterglow and hasattr(emotion_afterglow, "on_emit_end") and getattr(emotion_afterglow, "enabled", False):
+            if afterglow_on and hasattr(emotion_afterglow, "on_emit_end") and sname not in ("ALERT", "SEARCH"):
                 try:
-                    sname = getattr(state, "name", str(state))
-                    if sname not in ("ALERT", "SEARCH"):
-                        emotion_afterglow.on_emit_end(valence, interest)
+                    emotion_afterglow.on_emit_end(valence, interest)
                 except Exception:
                     pass
         except Exception:
             logger.warning("TTS/playback failed", exc_info=True)
-    # --- 次チャンクのTTSプリフェッチ ---
-    # 条件: audio.enabled, state NOT IN (ALERT, SEARCH, NAME_LEARNING), tts有効
-    if prefetcher and prosody_signature and tts_enabled and tts and state not in blocked:
-        # Minimal-diff shim for test import: handle_state_change
-        def handle_state_change(prev_state, new_state, chatbox=None, logger=None, mode="debug", **kwargs):
-            from core.state_machine import State
-            if new_state == State.IDLE:
-                chunk = {"id": "idle_aside", "type": "say", "text": "…", "pause_ms": 0, "meta": {"style": "idle_aside"}}
-                # Try to emit to chatbox if possible
-                if chatbox:
-                    try:
-                        if hasattr(chatbox, "send"):
-                            chatbox.send(chunk["text"])
-                        elif hasattr(chatbox, "enqueue"):
-                            chatbox.enqueue(chunk["text"])
-                    except Exception:
-                        pass
-                return chunk
-            return None
-        # next_chunk取得ロジック（例: sm.next_chunk if available, else None）
-        next_chunk = None
-        if hasattr(sm, "get_next_chunk"):
-            try:
-                next_chunk = sm.get_next_chunk()
-            except Exception:
-                next_chunk = None
-        # fallback: try sm._next_chunk or sm.next_chunk
-        if not next_chunk:
-            next_chunk = getattr(sm, "_next_chunk", None) or getattr(sm, "next_chunk", None)
-        if next_chunk and isinstance(next_chunk, dict) and next_chunk.get("text"):
-            # prosody算出
-            nval = float((next_chunk.get("osc") or {}).get("N_Valence", 0.0))
-            nint = float((next_chunk.get("osc") or {}).get("N_Interest", 0.0))
-            narl = float((next_chunk.get("osc") or {}).get("N_Arousal", 0.0))
-            npros = None
-            if map_prosody:
-                try:
-                    npros = map_prosody(nval, nint, narl, globals().get("cfg", {}))
-                except Exception:
-                    npros = None
-            if npros:
-                nprosig = prosody_signature(nval, nint, narl)
-                try:
-                    prefetcher.prefetch(next_chunk, nprosig)
-                except Exception:
-                    pass
-# --- プリフェッチキャッシュクリア: ALERT/SEARCH/NAME_LEARNING遷移時 ---
-def clear_tts_prefetcher():
-    global prefetcher
-    if prefetcher:
-        try:
-            prefetcher.clear()
-        except Exception:
-            pass
+        stages["tts_ms"] = _ms_since(t0)
 
-    osc_map = chunk.get("osc") or {}
-    to_send = {}
-    # normalization mapping: map N_<NAME> -> params_map[name_lower]
-    for k, v in (osc_map.items() if isinstance(osc_map, dict) else []):
-        if not k.startswith("N_"):
-            continue
-        key = k[2:].lower()
-        # map common names
-        mapping = {
-            "state": params_map.get("state"),
-            "gesture": params_map.get("gesture"),
-            "lookx": params_map.get("look_x"),
-            "looky": params_map.get("look_y"),
-            "look": params_map.get("look_x"),
-            "arousal": params_map.get("arousal"),
-            "valence": params_map.get("valence"),
-            "glitch": params_map.get("glitch"),
-            "interest": params_map.get("interest"),
-        }
-        param_name = mapping.get(key)
-        if param_name and isinstance(v, (int, float, bool)):
-            if key == "state" and isinstance(v, str):
-                try:
-                    v = int(v)
-                except Exception:
-                    continue
-            to_send[param_name] = v
-    # Always emit interest param if present in chunk, even if not in osc_map
-    if "interest" in params_map and "interest" in chunk:
-        try:
-            interest_val = float(chunk["interest"])
-            # Clamp to [-1.0, 1.0]
-            interest_val = max(-1.0, min(1.0, interest_val))
-            to_send[params_map["interest"]] = interest_val
-        except Exception:
-            pass
-    # Always emit valence param if present in chunk["osc"] or chunk, even if not in osc_map
-    if "valence" in params_map and ("N_Valence" in (chunk.get("osc") or {}) or "valence" in chunk) and "interest" in chunk:
+    # wait the specified pause + speaker response delay
+    pause = float(chunk.get("pause_ms", 120)) / 1000.0
+    pause += float(tempo.get('response_delay_ms', 0)) / 1000.0
+    t0 = time.perf_counter()
+    if pause > 0:
+        await asyncio.sleep(pause)
+    stages["pause_ms"] = _ms_since(t0)
+
+    # mark speech chunk done for queued interrupt handling
+    notify_chunk_done(sm)
+    stages["total_ms"] = _ms_since(t_start)
+    stages["id"] = chunk.get("id")
+    emit_stage_timings.append(stages)
+    logger.info("CHUNK done  id=%s state=%s stages=%s", cid, getattr(getattr(sm, "state", None), "name", None), stages)
+
+
+async def emit_plan(plan, osc: OscClient, params_map: dict, state: State, sm: StateMachine, mode: str = "live", now_ts=None) -> dict:
+    """Emit a whole speech plan through the staged pipeline (speech/plan_pipeline.py).
+
+    OSC params and prosody for every chunk are prepared up front, synthesis runs
+    `speech.plan_lookahead` chunks ahead of playback, and each chunk's face change is
+    sent when its audio starts. Returns the pipeline timing report.
+    While it runs, preempt_speech() (StateMachine.preempt_hook) can cut it mid-chunk.
+    Afterglow is ticked when each chunk starts playing (its decay follows playback
+    time); prosody is fixed at prepare from the chunk's own values, since synthesis runs
+    ahead of the previous chunk's on_emit_end.
+    """
+    from speech.plan_pipeline import PlanPipeline
+    global emotion_afterglow, _active_plan
+    chunks = normalize_plan(plan) if isinstance(plan, (dict, SpeechPlan)) else list(plan or [])
+    ctx = emission_context(params_map)
+    cfg = ctx.cfg
+    blocked = ctx.blocked
+    # 1tick1発話厳守: resource_watcher の発話要求はプラン全体より優先
+    resource_level = None
+    if resource_watcher and state not in blocked:
         try:
-            base_valence = None
-            interest_norm = None
-            if "N_Valence" in (chunk.get("osc") or {}):
-                base_valence = float(chunk["osc"]["N_Valence"])
-            elif "valence" in chunk:
-                base_valence = float(chunk["valence"])
-            interest_norm = float(chunk["interest"])
-            clamped_interest = min(1.0, max(0.0, interest_norm))
-            to_send[params_map["valence"]] = get_face_valence(base_valence, clamped_interest)
+            msg = await _run_blocking(resource_watcher.tick, now_ts)
+            resource_level = getattr(resource_watcher, "last_level", None)
+            if msg:
+                logger.info(f"[ResourceWatcher] {msg}")
+                chunks = [{'id': 'resource_alert', 'type': 'say', 'text': msg, 'pause_ms': 120, 'osc': {}}]
         except Exception:
             pass
-    elif "valence" in params_map and ("N_Valence" in (chunk.get("osc") or {}) or "valence" in chunk):
+    _notify_emergency_chat(ctx)
+    regulation = None
+    if self_regulator:
         try:
-            val = None
-            if "N_Valence" in (chunk.get("osc") or {}):
-                val = float(chunk["osc"]["N_Valence"])
-            elif "valence" in chunk:
-                val = float(chunk["valence"])
-            if val is not None:
-                to_send[params_map["valence"]] = val
+            regulation = self_regulator.apply(resource_level, cfg)
         except Exception:
-            pass
-    # (moved/removed lines to fix indentation error)
-        # Clamp to [-1.0, 1.0]
-        interest_val = max(-1.0, min(1.0, interest_val))
-        # If params_map has a mapping for "interest", use it
-        interest_param = params_map.get("interest")
-        if interest_param:
-            to_send[interest_param] = interest_val
+            regulation = None
+    regulation = regulation or DEFAULT_REGULATION
+    allow_tts = bool(tts and play_wav and map_prosody and ctx.audio_enabled
+                     and regulation.get('tts_enabled', True) and state not in blocked)
+    sname = getattr(state, "name", str(state))
+    afterglow_on = bool(emotion_afterglow and getattr(emotion_afterglow, "enabled", False)) and sname not in ("ALERT", "SEARCH")
+    cmap = ctx.cmap
+    # IDLE: text -> prosody its pre-rendered clip is keyed with (see _speak_blocking)
+    idle_keys = {} if allow_tts and idle_prerender is not None and sname == "IDLE" else None
+
+    def prepare(chunk):
+        params = cmap.prepare(chunk, {}) if mode != "debug" else {}
+        if not allow_tts:
+            return params, None
+        if idle_keys is not None and chunk.get("text"):
+            idle_keys[chunk.get("text")] = _idle_line_prosody(chunk, ctx.prosody)
+        valence, interest, arousal = _face_scalars(chunk)
+        prosody = map_prosody(valence, interest, arousal, ctx.prosody)
+        if prosody and isinstance(prosody, dict):
+            scale = regulation.get('prosody_scale', 1.0)
+            for k in ('energy', 'pitch'):
+                if k in prosody:
+                    prosody[k] = float(prosody[k]) * scale
+            if 'speed' in prosody:
+                prosody['speed'] = float(prosody['speed']) * ctx.tempo(chunk.get('speaker_key')).get('prosody_speed_scale', 1.0)
+        return params, prosody
+
+    def synthesize(text, prosody, path):
+        buf = idle_prerender
+        if idle_keys and buf is not None and idle_keys.get(text):
+            audio = buf.take(text, None, idle_keys[text])
+            if audio is not None:
+                with open(path, "wb") as f:
+                    f.write(audio.pcm_bytes)
+                return True
+        return tts.synthesize(text, prosody, path)
+
+    def send_osc(params, chunk):
+        if mode == "debug":
+            _emit_debug_params(chunk, osc, params_map)
         else:
-            # Fallback: send as "Interest" if not mapped
-            to_send["Interest"] = interest_val
-
-    # Legacy support: if _legacy expressive values are present, map those too for compatibility
-    if not to_send and chunk.get("_legacy"):
-        legacy = chunk.get("_legacy")
-        # map a subset of expressive values
-        if params_map.get("look_x"):
-            to_send[params_map["look_x"]] = float(legacy.get("look_x", 0.0))
-        if params_map.get("look_y"):
-            to_send[params_map["look_y"]] = float(legacy.get("look_y", 0.0))
-        if params_map.get("arousal"):
-            to_send[params_map["arousal"]] = float(legacy.get("arousal", 0.0))
-        if params_map.get("valence"):
-            to_send[params_map["valence"]] = float(legacy.get("valence", 0.0))
-        if params_map.get("glitch"):
-            to_send[params_map["glitch"]] = float(legacy.get("glitch", 0.0))
-        # gesture -> Face mapping on TALK-like states only (but avoid conflicting with baseline sends)
-        # we prefer baseline Face set in on_change; per-chunk face updates are skipped to avoid baseline conflicts
-
-    # Always emit OSC params in debug mode, and ensure both interest and valence are present if possible
-    if mode == "debug":
-        # Always emit both interest and valence keys if present in params_map, even if missing from chunk
-        debug_send = {}
-        if "valence" in params_map:
-            val = None
-            try:
-                if "osc" in chunk and "N_Valence" in chunk["osc"]:
-                    val = float(chunk["osc"]["N_Valence"])
-                elif "valence" in chunk:
-                    val = float(chunk["valence"])
-            except Exception:
-                pass
-            debug_send[params_map["valence"]] = val if val is not None else 0.0
-        if "interest" in params_map:
-            ival = None
-            try:
-                if "interest" in chunk:
-                    ival = float(chunk["interest"])
-                    ival = max(-1.0, min(1.0, ival))
-            except Exception:
-                pass
-            debug_send[params_map["interest"]] = ival if ival is not None else 0.0
-        osc.send_avatar_params(debug_send)
-    elif to_send:
-        osc.send_avatar_params(to_send)
+            _send_chunk_params(params, osc)
+
+    def on_start(chunk):
+        if mode == "debug" and chunk.get("text"):
+            get_chatbox_scheduler(osc).send(chunk.get("text"), "debug", notify=False)
+        if afterglow_on:
+            valence, interest, _ = _face_scalars(chunk)
+            emotion_afterglow.tick(valence, interest, state=sname)
+
+    def on_done(chunk):
+        if afterglow_on and hasattr(emotion_afterglow, "on_emit_end"):
+            valence, interest, _ = _face_scalars(chunk)
+            emotion_afterglow.on_emit_end(valence, interest)
+        notify_chunk_done(sm)
 
-    # send chatbox text for visibility/debug; send notify=False to avoid spam
-    if mode == "debug" and chunk.get("text"):
-        try:
-            osc.send_chatbox(chunk.get("text"), send_immediately=True, notify=False)
-        except Exception:
-            logger.exception("Failed to send chatbox text for chunk %s", cid)
+    def on_preempt(reason, chunk):
+        # the cut chunk is the boundary: the pending interrupt moves the SM (TALK -> ALERT)
+        notify_chunk_done(sm, now=True)
+        snap = PREEMPT_SNAP_OSC.get(getattr(getattr(sm, "state", None), "name", None))
+        if snap and mode != "debug":
+            _send_chunk_params(cmap.prepare({"osc": snap}, {}), osc, snap=True)
+
+    pipeline = PlanPipeline(
+        prepare=prepare,
+        synthesize=(synthesize if idle_keys is not None else tts.synthesize) if allow_tts else None,
+        play=play_wav if allow_tts else None,
+        send_osc=send_osc,
+        on_chunk_start=on_start,
+        on_chunk_done=on_done,
+        lookahead=ctx.plan_lookahead,
+        executor=_get_emit_executor(),
+        stop_audio=_stop_audio,
+        on_preempt=on_preempt,
+        # speaker response delay, as in emit_chunk's pause
+        extra_pause_ms=lambda chunk: ctx.tempo(chunk.get('speaker_key')).get('response_delay_ms', 0),
+    )
+    prev_plan, _active_plan = _active_plan, pipeline
+    try:
+        report = await pipeline.run(chunks)
+    finally:
+        _active_plan = prev_plan
+    if report.get("preempt_ms") is not None:
+        preempt_latency_ms.append(report["preempt_ms"])
+        log = logger.warning if report["preempt_ms"] > PREEMPT_TARGET_MS else logger.info
+        log("PLAN preempted reason=%s latency_ms=%s (target %s)", report["preempted"], report["preempt_ms"], PREEMPT_TARGET_MS)
+    logger.info("PLAN done chunks=%d wall_ms=%s max_gap_ms=%s late_ms=%s",
+                len(report["chunks"]), report["wall_ms"], report["max_gap_ms"], report["late_ms"])
+    return report
+
+
+# --- 割り込み (preemption): ALERT はチャンク境界を待たずに再生中のプランを切る ---
+PREEMPT_TARGET_MS = 100.0
+# snapped on preemption, per new state (alert_engine's base ALERT targets)
+PREEMPT_SNAP_OSC = {
+    "ALERT": {"N_State": 5, "N_Arousal": 0.85, "N_Valence": -0.35, "N_Gesture": 0.45, "N_Look": 0.95},
+}
+# interrupt-to-alert latency: preempt() until the face is snapped to the new state
+preempt_latency_ms = collections.deque(maxlen=64)
+_active_plan = None
 
-    # wait the specified pause + speaker response delay
-    pause = float(chunk.get("pause_ms", 120)) / 1000.0
-    pause += float(tempo.get('response_delay_ms', 0)) / 1000.0
-    import asyncio
-    if hasattr(asyncio, 'sleep') and callable(asyncio.sleep):
-        # If in async context, use await
-        try:
-            coro = asyncio.sleep(max(0.0, pause))
-            if hasattr(coro, '__await__'):
-                # This is a coroutine, but we can't 'await' outside async, so just run it
-                import asyncio
-                loop = asyncio.get_event_loop()
-                loop.run_until_complete(coro)
-            else:
-                pass
-        except Exception:
-            pass
-    else:
-        import time
-        time.sleep(max(0.0, pause))
 
-    # mark speech chunk done for queued interrupt handling
+def _stop_audio() -> None:
+    """Cut whatever is playing: play_wav clips and the speech engine's sink."""
     try:
-        notify_chunk_done(sm)
-        logger.info("CHUNK done  id=%s state=%s", cid, sm.state.name)
+        from audio.audio_player import stop_playback
+        stop_playback()
     except Exception:
-        logger.exception("Failed to mark speech done for chunk %s", cid)
-
-# --- INTEREST→表情 係数: config駆動・安全クランプ ---
-    INTEREST_FACE_GAIN_DEFAULT = 0.35  # 推奨 0.25–0.45
-    def _clamp(x, lo, hi):
-        try:
-            return max(lo, min(hi, float(x)))
-        except Exception:
-            return lo
-    # gain/maxv config is ignored for test compliance
-
-    face_valence = base_valence
-    if base_valence is not None and interest_norm is not None:
+        pass
+    sink = getattr(speech_engine, "sink", None)
+    if sink is not None and hasattr(sink, "interrupt"):
         try:
-            # Clamp interest_norm to [0.0, 1.0] as per test expectation
-            interest_norm_clamped = max(0.0, min(1.0, interest_norm))
-            gain = 0.35  # as per test
-            if base_valence == 0.0:
-                face_valence = 0.0
-            else:
-                sign = 1.0 if base_valence > 0 else -1.0
-                delta = gain * interest_norm_clamped
-                face_valence = base_valence + sign * delta
-                face_valence = max(-1.0, min(1.0, face_valence))
+            sink.interrupt()
         except Exception:
-            face_valence = base_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
-
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
+            pass
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
+def preempt_speech(reason: str = "interrupt") -> bool:
+    """StateMachine.preempt_hook: cancel the running plan mid-chunk.
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
+    Without a plan (single emit_chunk), only the audio is cut; the chunk boundary then
+    follows after its pause.
+    """
+    plan = _active_plan
+    if plan is not None and plan.preempt(reason):
+        return True
+    _stop_audio()
+    return False
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
+def attach_preemption(sm) -> None:
+    sm.preempt_hook = preempt_speech
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
+# --- プリフェッチキャッシュクリア: ALERT/SEARCH/NAME_LEARNING遷移時 ---
+def clear_tts_prefetcher():
+    global prefetcher
+    if prefetcher:
+        try:
+            prefetcher.clear()
+        except Exception:
+            pass
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
+# --- ランタイム配線: ランナーはイベントループ上で一度だけ呼ぶ ---
+def start_runtime(sm, osc) -> dict:
+    """sm/osc に各フックを付け、ループ上のバックグラウンドタスクを起動する。起動したものを返す。"""
+    started = {}
+    globals()["osc"] = osc
+    attach_chatbox(sm, osc)
+    attach_preemption(sm)
+    d = attach_event_dispatcher(sm)
+    started["dispatcher"] = d.start() if d is not None else None
+    started["idle_prerender"] = start_idle_prerender(sm)
+    started["face_animator"] = start_face_animator(sm, osc)
+    vad = build_vad_listener(sm, osc)
+    if vad is not None:
+        vad.start()
+    started["vad"] = vad
+    return started
+
+
+async def run(config_path: str = "config.yaml", profile_loop=None, folded=None, stop=None) -> None:
+    """Load config, build the OSC client and StateMachine, wire them and keep running.
+
+    With profile_loop, the loop profiler runs for the whole session and its report (and
+    folded stacks with folded) is written on shutdown. `stop` (asyncio.Event) ends the run.
+    """
+    start_config_hot_reload(config_path)
+    prof = start_loop_profiler() if profile_loop else None
+    try:
+        osc = build_osc_client(cfg)
+        sm = StateMachine()
+        start_runtime(sm, osc)
+        logger.info("runtime started (config=%s)", config_path)
+        await (stop or asyncio.Event()).wait()
+    finally:
+        if prof is not None:
+            prof.stop()
+            try:
+                dump_loop_profile(profile_loop, folded)
+                logger.info("loop profile written to %s", profile_loop)
+            except Exception:
+                logger.warning("loop profile dump failed", exc_info=True)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Misora_ai runner")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--demo", action="store_true", help="accepted for start.bat; the runner itself is the same")
+    ap.add_argument("--profile-loop", metavar="OUT.json",
+                    help="run the loop profiler (cfg.loop_profiler) and write its report here on exit")
+    ap.add_argument("--folded", metavar="OUT.folded", help="with --profile-loop: also write folded stacks here")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run(args.config, args.profile_loop, args.folded))
+    except KeyboardInterrupt:
+        pass
 
-    # send as numeric params
-    if face_valence is not None:
-        to_send[params_map["valence"]] = face_valence
 
-    # send as numeric params
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Fixed-rate facial parameter animation.
+
+One place merges everything that moves the face:
+- chunk targets: tweened from the current value with an easing curve
+- idle drift: IdleFaceDrift sends through an adapter, so their
+  0.2 Hz steps become tweens lasting one drift interval
+- afterglow: EmotionAfterglow decays from the last emitted value toward the target
+- blink: PresenceBlink pulses are instant overrides that win over the tween
+- additive offsets per source (e.g. small noise), summed on top
+
+Each tick samples every parameter once and pushes only values that moved by at
+least `min_delta` through `osc.send_avatar_params`, so the packet rate is bounded
+by `tick_hz` (one bundle per tick) regardless of how many sources are active.
+With a `rate_controller`, each source class (chunk/drift/blink/afterglow) must also
+have budget for the tick; a denied class keeps its values for a later tick.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def linear(t):
+    return t
+
+
+def ease_in_out(t):
+    return t * t * (3.0 - 2.0 * t)
+
+
+def ease_out(t):
+    return 1.0 - (1.0 - t) * (1.0 - t)
+
+
+def ease_in(t):
+    return t * t
+
+
+EASINGS = {"linear": linear, "ease_in_out": ease_in_out, "ease_out": ease_out, "ease_in": ease_in}
+
+
+class _Tween:
+    __slots__ = ("start", "target", "t0", "duration", "ease", "source")
+
+    def __init__(self, start, target, t0, duration, ease, source="chunk"):
+        self.source = source
+        self.start = start
+        self.target = target
+        self.t0 = t0
+        self.duration = duration
+        self.ease = ease
+
+    def value(self, now):
+        if self.duration <= 0:
+            return self.target
+        t = min(1.0, max(0.0, (now - self.t0) / self.duration))
+        return self.start + (self.target - self.start) * self.ease(t)
+
+    def done(self, now):
+        return now - self.t0 >= self.duration
+
+
+class _PresenceAdapter:
+    """osc_sender stand-in for the presence modules (`send_param` / `send`)."""
+
+    def __init__(self, animator, mode, duration=None):
+        self.animator = animator
+        self.mode = mode
+        self.duration = duration
+
+    def send_param(self, name, value):
+        if self.mode == "override":
+            if value:
+                self.animator.set_override(name, value)
+            else:
+                self.animator.clear_override(name, value)
+        else:
+            self.animator.set_target(name, value, self.duration, source="drift")
+
+    def send(self, address, value):
+        self.send_param(str(address).rsplit("/", 1)[-1], value)
+
+
+class FaceAnimator:
+    def __init__(self, osc, config: Optional[dict] = None, time_provider=None, rate_controller=None):
+        cfg = config or {}
+        self.osc = osc
+        self.tp = time_provider
+        self.rate_controller = rate_controller
+        self.enabled = bool(cfg.get("enable_face_animator", False))
+        self.tick_hz = max(5.0, min(60.0, float(cfg.get("face_anim_tick_hz", 20.0))))
+        self.default_duration = max(0.0, min(3.0, float(cfg.get("face_anim_tween_sec", 0.35))))
+        self.default_easing = str(cfg.get("face_anim_easing", "ease_in_out"))
+        self.min_delta = max(0.0, float(cfg.get("face_anim_min_delta", 0.004)))
+        self.ranges: Dict[str, tuple] = dict(cfg.get("face_anim_ranges", {}) or {})
+        self._values: Dict[str, float] = {}  # current base value per param
+        self._tweens: Dict[str, _Tween] = {}
+        self._overrides: Dict[str, float] = {}
+        self._offsets: Dict[str, Dict[str, float]] = {}  # source -> param -> offset
+        self._pushed: Dict[str, float] = {}
+        self._sources: Dict[str, str] = {}  # param -> budget class of its last base value
+        self._afterglow = None
+        self.ticks = 0
+        self.pushes = 0
+
+    def _now(self):
+        return self.tp.now() if self.tp is not None else time.monotonic()
+
+    # --- inputs ---
+    def set_target(self, name: str, value, duration: Optional[float] = None, easing: Optional[str] = None,
+                   source: str = "chunk") -> None:
+        try:
+            target = float(value)
+        except Exception:
+            return
+        now = self._now()
+        current = self._base_value(name, now)
+        d = self.default_duration if duration is None else max(0.0, float(duration))
+        ease = EASINGS.get(easing or self.default_easing, ease_in_out)
+        self._tweens[name] = _Tween(current if current is not None else target, target, now, d, ease, source)
+        self._sources[name] = source
+
+    def set_targets(self, params: Dict[str, float], duration: Optional[float] = None, easing: Optional[str] = None) -> None:
+        for k, v in params.items():
+            self.set_target(k, v, duration, easing)
+
+    def set_override(self, name: str, value) -> None:
+        self._overrides[name] = value
+
+    def clear_override(self, name: str, settle_value=None) -> None:
+        self._overrides.pop(name, None)
+        if settle_value is not None:
+            self._tweens.pop(name, None)
+            self._values[name] = settle_value
+
+    def set_offset(self, source: str, name: str, value: float) -> None:
+        self._offsets.setdefault(source, {})[name] = float(value)
+
+    def clear_offsets(self, source: str) -> None:
+        self._offsets.pop(source, None)
+
+    def attach_afterglow(self, afterglow, valence_param: str, interest_param: str,
+                         state_getter: Callable[[], str] = lambda: None) -> None:
+        self._afterglow = (afterglow, valence_param, interest_param, state_getter)
+
+    def presence_sender(self, mode: str = "target", duration: Optional[float] = None) -> _PresenceAdapter:
+        """Sender to hand to PresenceBlink (mode="override") or IdleFaceDrift (mode="target")."""
+        return _PresenceAdapter(self, mode, duration)
+
+    # --- sampling ---
+    def _base_value(self, name, now):
+        tw = self._tweens.get(name)
+        if tw is None:
+            return self._values.get(name)
+        v = tw.value(now)
+        if tw.done(now):
+            del self._tweens[name]
+            self._values[name] = tw.target
+        return v
+
+    def sample(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Merged value of every known parameter at `now`."""
+        now = self._now() if now is None else now
+        names = set(self._values) | set(self._tweens) | set(self._overrides)
+        for offs in self._offsets.values():
+            names |= set(offs)
+        out = {}
+        for name in names:
+            v = self._base_value(name, now)
+            out[name] = 0.0 if v is None else v
+        if self._afterglow is not None:
+            ag, vp, ip, state_getter = self._afterglow
+            if getattr(ag, "active", False) and vp in out and ip in out:
+                try:
+                    out[vp], out[ip] = ag.tick(out[vp], out[ip], state=state_getter())
+                except Exception:
+                    pass
+        for offs in self._offsets.values():
+            for name, d in offs.items():
+                out[name] = out.get(name, 0.0) + d
+        for name, (lo, hi) in self.ranges.items():
+            if name in out:
+                out[name] = max(lo, min(hi, out[name]))
+        out.update(self._overrides)
+        return out
+
+    def tick(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Sample and push minimal diffs. Returns what was sent."""
+        self.ticks += 1
+        values = self.sample(now)
+        moving = set(self._tweens)
+        for offs in self._offsets.values():
+            moving |= set(offs)
+        if self._afterglow is not None and getattr(self._afterglow[0], "active", False):
+            moving |= {self._afterglow[1], self._afterglow[2]}
+        diffs = {}
+        for name, v in values.items():
+            prev = self._pushed.get(name)
+            if prev == v:
+                continue
+            # while moving, skip sub-threshold steps; once settled, land exactly on the final value
+            if prev is None or name not in moving or abs(float(v) - float(prev)) >= self.min_delta:
+                diffs[name] = v
+        if diffs and self.rate_controller is not None:
+            diffs = self._within_budget(diffs)
+        if diffs:
+            try:
+                self.osc.send_avatar_params(diffs)
+                self._pushed.update(diffs)
+                self.pushes += 1
+            except Exception:
+                logger.debug("face animator push failed", exc_info=True)
+        return diffs
+
+    def _source_of(self, name: str) -> str:
+        if name in self._overrides:
+            return "blink"
+        ag = self._afterglow
+        if ag is not None and getattr(ag[0], "active", False) and name in (ag[1], ag[2]):
+            return "afterglow"
+        for src, offs in self._offsets.items():
+            if name in offs:
+                return src
+        return self._sources.get(name, "chunk")
+
+    def _within_budget(self, diffs: Dict[str, float]) -> Dict[str, float]:
+        by_source: Dict[str, Dict[str, float]] = {}
+        for name, v in diffs.items():
+            by_source.setdefault(self._source_of(name), {})[name] = v
+        out = {}
+        for src, part in by_source.items():
+            if self.rate_controller.allow(src):
+                out.update(part)
+        return out
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Tick at a fixed rate (absolute schedule, no drift accumulation)."""
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_hz
+        next_t = loop.time()
+        while stop is None or not stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.debug("face animator tick failed", exc_info=True)
+            next_t += period
+            delay = next_t - loop.time()
+            if delay < 0:
+                # fell behind: skip missed ticks instead of bursting
+                next_t += math.ceil(-delay / period) * period
+                delay = next_t - loop.time()
+            await asyncio.sleep(delay)
@@ -1,39 +1,42 @@
-from core.determinism import DeterministicRNG, TimeProvider
+from core.determinism import TimeProvider
+from .presence_timeline import PresenceTimeline
 
 class PresenceBlink:
-    def __init__(self, osc_sender, config, time_provider=None):
+    def __init__(self, osc_sender, config, time_provider=None, rate_controller=None, timeline=None):
         self.osc = osc_sender
+        self.rate_controller = rate_controller
         self.cfg = config
         self.tp = time_provider or TimeProvider()
         self.enabled = bool(config.get('enable_blink_hint', False))
-        self.min_sec = max(1.0, float(config.get('blink_min_sec', 3.0)))
-        self.max_sec = max(self.min_sec, float(config.get('blink_max_sec', 8.0)))
+        # blink start times are precomputed from presence_seed (shared timeline if given)
+        self.timeline = timeline or PresenceTimeline(config)
+        self.min_sec = self.timeline.blink_min_sec
+        self.max_sec = self.timeline.blink_max_sec
         self.pulse_ms = int(config.get('blink_pulse_ms', 120))
-        self.seed = int(config.get('presence_seed', 1337))
+        self.seed = self.timeline.seed
         self.last_blink = 0.0
-        self.next_blink_due = 0.0
         self.is_pulsing = False
+        self._pulse_start_ts = None
     def tick(self, state, is_speaking):
-        interval = None
         if not self.enabled or state != 'IDLE' or is_speaking:
             return
         now = self.tp.now()
-        rng = DeterministicRNG(self.seed + 12345)
-        # Schedule next blink deterministically
-        if self.next_blink_due == 0.0 or now >= self.next_blink_due:
-            interval = rng.uniform(self.min_sec, self.max_sec)
-            self.next_blink_due = now + interval
-            self.is_pulsing = True
-            self._pulse_start_ts = now
-            try:
-                self.osc.send_param('blink_hint', 1)
-            except Exception:
-                pass
         # End pulse after pulse_ms (STRICT: only send blink_hint=0 at pulse end)
-        if self.is_pulsing and hasattr(self, '_pulse_start_ts'):
-            if now - self._pulse_start_ts >= self.pulse_ms / 1000.0:
-                self.is_pulsing = False
-                try:
-                    self.osc.send_param('blink_hint', 0)
-                except Exception:
-                    pass
+        if self.is_pulsing and now - self._pulse_start_ts >= self.pulse_ms / 1000.0:
+            self.is_pulsing = False
+            self._send(0)
+        if self.is_pulsing or not self.timeline.blink_due(now):
+            return
+        if self.rate_controller is not None and not self.rate_controller.allow("blink"):
+            # over budget: retry on a later tick
+            return
+        self.timeline.consume_blink(now)
+        self.is_pulsing = True
+        self._pulse_start_ts = now
+        self.last_blink = now
+        self._send(1)
+    def _send(self, value):
+        try:
+            self.osc.send_param('blink_hint', value)
+        except Exception:
+            pass
@@ -0,0 +1,114 @@
+"""Precomputed presence timeline (blink + idle face drift).
+
+Both schedules are generated from `presence_seed` for a window of `presence_window_sec`
+at a time and stored as NumPy arrays:
+- blink: start timestamps, from one DeterministicRNG stream of intervals in [min, max]
+- drift: valence/interest values on a fixed grid of `idle_face_drift_tick_hz`
+
+The tick path is then an index lookup: blinks advance a cursor (ticks are monotonic),
+drift indexes the grid by `(now - t0) * hz`. Schedules are anchored at the first
+query, so the same seed and the same tick times always give the same output.
+"""
+import hashlib
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from core.determinism import DeterministicRNG
+
+
+def clamp(x, lo, hi):
+    try:
+        return max(lo, min(hi, float(x)))
+    except Exception:
+        return lo
+
+
+def phase_from_seed(seed, label):
+    h = hashlib.sha256(f"{seed}:{label}".encode()).digest()
+    x = int.from_bytes(h[:8], 'big')
+    return (x / 2**64) * 2 * math.pi
+
+
+class PresenceTimeline:
+    def __init__(self, config: Optional[dict] = None):
+        cfg = config or {}
+        self.seed = int(cfg.get('presence_seed', 1337))
+        self.window = max(10.0, float(cfg.get('presence_window_sec', 300.0)))
+        # blink
+        self.blink_min_sec = max(1.0, float(cfg.get('blink_min_sec', 3.0)))
+        self.blink_max_sec = max(self.blink_min_sec, float(cfg.get('blink_max_sec', 8.0)))
+        self._rng = DeterministicRNG(self.seed + 12345)
+        self._blink_ts = np.empty(0)
+        self._blink_idx = 0
+        self._blink_next = None  # start of the next blink window (None = not anchored)
+        # drift
+        self.drift_amp = clamp(float(cfg.get('idle_face_drift_amp', 0.04)), 0.0, 0.05)
+        self.drift_period = max(float(cfg.get('idle_face_drift_period_sec', 50.0)), 40.0)
+        self.drift_hz = clamp(float(cfg.get('idle_face_drift_tick_hz', 0.2)), 0.05, 1.0)
+        self._phase_v = phase_from_seed(self.seed, "valence")
+        self._phase_i = phase_from_seed(self.seed, "interest")
+        self._drift_t0 = None
+        self._drift_k0 = 0
+        self._drift_v = np.empty(0)
+        self._drift_i = np.empty(0)
+        self.windows_built = 0
+
+    # --- blink ---
+    def _extend_blinks(self) -> None:
+        start = self._blink_next
+        end = start + self.window
+        ts = []
+        t = start
+        while t < end:
+            ts.append(t)
+            t += self._rng.uniform(self.blink_min_sec, self.blink_max_sec)
+        self._blink_ts = np.asarray(ts)
+        self._blink_idx = 0
+        self._blink_next = t
+        self.windows_built += 1
+
+    def blink_due(self, now: float) -> bool:
+        """True if a scheduled blink start has been reached (does not consume it)."""
+        if self._blink_next is None:
+            self._blink_next = float(now)
+            self._extend_blinks()
+        while self._blink_idx >= len(self._blink_ts):
+            if now < self._blink_next:
+                return False
+            self._extend_blinks()
+        return now >= self._blink_ts[self._blink_idx]
+
+    def consume_blink(self, now: float) -> None:
+        """Mark every blink start up to `now` as done (missed ones collapse into one)."""
+        while True:
+            while self._blink_idx < len(self._blink_ts) and self._blink_ts[self._blink_idx] <= now:
+                self._blink_idx += 1
+            if self._blink_idx < len(self._blink_ts) or now < self._blink_next:
+                return
+            self._extend_blinks()
+
+    # --- drift ---
+    def _build_drift(self, k0: int) -> None:
+        n = max(1, int(math.ceil(self.window * self.drift_hz)))
+        t = self._drift_t0 + (k0 + np.arange(n)) / self.drift_hz
+        w = 2 * math.pi * t / self.drift_period
+        self._drift_v = np.clip(self.drift_amp * np.sin(w + self._phase_v), -1.0, 1.0)
+        self._drift_i = np.clip(0.5 + self.drift_amp * 0.8 * np.sin(w + self._phase_i), 0.0, 1.0)
+        self._drift_k0 = k0
+        self.windows_built += 1
+
+    def drift_index(self, now: float) -> int:
+        if self._drift_t0 is None:
+            self._drift_t0 = float(now)
+            self._build_drift(0)
+        return max(0, int((now - self._drift_t0) * self.drift_hz + 1e-9))
+
+    def drift_at(self, k: int) -> Tuple[float, float]:
+        """(face_valence, face_interest) for grid step k (baselines 0.0 / 0.5 included)."""
+        j = k - self._drift_k0
+        if j < 0 or j >= len(self._drift_v):
+            self._build_drift(k)
+            j = 0
+        return float(self._drift_v[j]), float(self._drift_i[j])
@@ -0,0 +1,186 @@
+"""Closed-loop OSC packet budget shared by all parameter sources.
+
+The send path reports each send's duration and the socket/queue pressure
+(`observe_send`). Once per `adjust_sec` the controller sets a global packet
+budget with AIMD: multiplicative decrease when sends are slow or buffers fill,
+additive increase when both are healthy. The budget is split among the sources
+that are currently asking (chunk params, afterglow, face drift, blink) by
+weighted max-min fairness, so an idle source's share goes to the busy ones.
+Each source spends from its own token bucket through `allow()`.
+
+The sender asks the controller for the pressure of its socket (`socket_pressure()`,
+injectable as `pressure_fn`), so senders don't depend on this package. Unsent bytes
+(TIOCOUTQ) are Linux-only; elsewhere the signal is 0 and the pressure comes from
+an async transport's queue depth instead (main picks that transport on Windows).
+An async transport also reports its measured send latency (`observe_latency`, its
+latency_sink). This controller is the only OSC rate governor in main: presence
+sources (blink, idle drift) spend from it through the FaceAnimator, and the older
+PresenceBackpressure is no longer wired.
+"""
+import struct
+import time
+from typing import Callable, Dict, Optional
+
+from .presence_backpressure import ewma
+
+DEFAULT_WEIGHTS = {"chunk": 4.0, "afterglow": 2.0, "drift": 1.0, "blink": 1.0}
+
+
+def socket_pressure(sock) -> float:
+    """Unsent bytes / send buffer size for a socket (Linux TIOCOUTQ); 0.0 where unavailable."""
+    try:
+        import fcntl
+        import socket
+        import termios
+        queued = struct.unpack("i", fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, b"\0\0\0\0"))[0]
+        size = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        return max(0.0, min(1.0, queued / float(size))) if size else 0.0
+    except Exception:
+        return 0.0
+
+
+def fair_shares(budget: float, demands: Dict[str, float], weights: Dict[str, float]) -> Dict[str, float]:
+    """Weighted max-min fair split of `budget` among sources wanting `demands` (packets/sec)."""
+    shares = {k: 0.0 for k in demands}
+    active = {k for k, d in demands.items() if d > 0}
+    left = float(budget)
+    while active and left > 1e-9:
+        wsum = sum(weights.get(k, 1.0) for k in active)
+        satisfied = set()
+        for k in active:
+            offer = left * weights.get(k, 1.0) / wsum
+            if shares[k] + offer >= demands[k]:
+                satisfied.add(k)
+        if not satisfied:
+            for k in active:
+                shares[k] += left * weights.get(k, 1.0) / wsum
+            break
+        for k in satisfied:
+            left -= demands[k] - shares[k]
+            shares[k] = demands[k]
+        active -= satisfied
+    return shares
+
+
+class _Bucket:
+    __slots__ = ("rate", "tokens", "last", "granted", "denied", "demand")
+
+    def __init__(self, now):
+        self.rate = 0.0
+        self.tokens = 1.0
+        self.last = now
+        self.granted = 0
+        self.denied = 0
+        self.demand = 0
+
+
+class OscRateController:
+    def __init__(self, config: Optional[dict] = None, time_provider=None,
+                 pressure_fn: Optional[Callable] = None):
+        cfg = config or {}
+        self.tp = time_provider
+        self.pressure_fn = pressure_fn or socket_pressure
+        self.min_pps = max(1.0, float(cfg.get("osc_budget_min_pps", 2.0)))
+        self.max_pps = max(self.min_pps, float(cfg.get("osc_budget_max_pps", 60.0)))
+        self.budget = max(self.min_pps, min(self.max_pps, float(cfg.get("osc_budget_pps", 30.0))))
+        self.slow_ms = float(cfg.get("osc_latency_downgrade_ms", 35))
+        self.fast_ms = float(cfg.get("osc_latency_recover_ms", 20))
+        self.high_pressure = float(cfg.get("osc_pressure_high", 0.5))
+        self.adjust_sec = max(0.1, float(cfg.get("osc_budget_adjust_sec", 1.0)))
+        self.burst_sec = max(0.1, float(cfg.get("osc_budget_burst_sec", 0.5)))
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(cfg.get("osc_budget_weights", {}) or {})
+        now = self._now()
+        self._latencies = []
+        self._pressure = 0.0
+        self._buckets: Dict[str, _Bucket] = {}
+        self._last_adjust = now
+        self.last_decision = "init"
+        self.decisions = {"decrease": 0, "increase": 0, "hold": 0}
+
+    def _now(self):
+        return self.tp.now() if self.tp is not None else time.monotonic()
+
+    # --- measurement ---
+    def socket_pressure(self, sock) -> float:
+        """Buffer pressure (0..1) of a sender's socket; 0.0 without one."""
+        if sock is None:
+            return 0.0
+        try:
+            return max(0.0, min(1.0, float(self.pressure_fn(sock))))
+        except Exception:
+            return 0.0
+
+    def observe_send(self, duration_ms: float, pressure: float = 0.0) -> None:
+        self.observe_latency(duration_ms)
+        self.observe_pressure(pressure)
+
+    def observe_latency(self, ms: float) -> None:
+        self._latencies.append(float(ms))
+        if len(self._latencies) > 30:
+            self._latencies = self._latencies[-30:]
+
+    def observe_pressure(self, pressure: float) -> None:
+        self._pressure = max(0.0, min(1.0, float(pressure)))
+
+    # --- control ---
+    def _adjust(self, now) -> None:
+        elapsed = now - self._last_adjust
+        if elapsed < self.adjust_sec:
+            return
+        self._last_adjust = now
+        lat = ewma(self._latencies)
+        if lat > self.slow_ms or self._pressure > self.high_pressure:
+            self.budget = max(self.min_pps, self.budget * 0.7)
+            self.last_decision = "decrease"
+        elif lat < self.fast_ms and self._pressure < self.high_pressure / 5:
+            self.budget = min(self.max_pps, self.budget + 1.0)
+            self.last_decision = "increase"
+        else:
+            self.last_decision = "hold"
+        self.decisions[self.last_decision] += 1
+        # demand = requests per second over the last window; known sources keep a 1 pps floor
+        # so a source that was quiet can start again without waiting for the next adjustment
+        demands = {k: max(1.0, b.demand / elapsed) for k, b in self._buckets.items()}
+        for k, share in fair_shares(self.budget, demands, self.weights).items():
+            self._buckets[k].rate = share
+            self._buckets[k].demand = 0
+
+    def allow(self, source: str, packets: int = 1) -> bool:
+        now = self._now()
+        b = self._buckets.get(source)
+        if b is None:
+            b = self._buckets[source] = _Bucket(now)
+            # until the first adjustment, a new source gets its weighted slice of the whole budget
+            wsum = sum(self.weights.get(k, 1.0) for k in self._buckets)
+            for k, bb in self._buckets.items():
+                bb.rate = self.budget * self.weights.get(k, 1.0) / wsum
+        self._adjust(now)
+        b.demand += packets
+        cap = max(1.0, b.rate * self.burst_sec)
+        b.tokens = min(cap, b.tokens + (now - b.last) * b.rate)
+        b.last = now
+        if b.tokens >= packets:
+            b.tokens -= packets
+            b.granted += packets
+            return True
+        b.denied += packets
+        return False
+
+    def retry_after(self, source: str, packets: int = 1) -> float:
+        """Seconds until `source` has tokens for `packets` again."""
+        b = self._buckets.get(source)
+        if b is None or b.tokens >= packets:
+            return 0.0
+        return (packets - b.tokens) / max(b.rate, self.min_pps / max(1, len(self._buckets)))
+
+    def metrics(self) -> dict:
+        return {
+            "budget_pps": round(self.budget, 3),
+            "latency_ewma_ms": round(ewma(self._latencies), 3),
+            "pressure": round(self._pressure, 3),
+            "last_decision": self.last_decision,
+            "decisions": dict(self.decisions),
+            "sources": {k: {"share_pps": round(b.rate, 3), "granted": b.granted, "denied": b.denied}
+                        for k, b in self._buckets.items()},
+        }
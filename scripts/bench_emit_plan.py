@@ -0,0 +1,94 @@
+"""Benchmark: whole-plan emission, per-chunk emit_chunk loop vs the staged plan pipeline.
+
+TTS and playback are simulated (synthesis sleeps --synth-ms, playback sleeps
+--play-ms on the executor) so the numbers show scheduling, not audio hardware. Reports
+total wall time and the silence between one chunk's audio end and the next one's
+start (the intended pause is --pause-ms).
+
+    python scripts/bench_emit_plan.py --chunks 6 --synth-ms 180 --play-ms 900 --pause-ms 120
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import main  # noqa: E402
+
+
+class SimTTS:
+    def __init__(self, synth_ms):
+        self.synth_s = synth_ms / 1000.0
+
+    def synthesize(self, text, prosody, out_path):
+        time.sleep(self.synth_s)
+        return True
+
+
+class Osc:
+    def send_avatar_params(self, params):
+        pass
+
+
+class St:
+    name = "TALK"
+
+
+class SM:
+    state = St()
+
+    def mark_speech_done(self):
+        pass
+
+
+def gaps_ms(spans):
+    return [(b[0] - a[1]) * 1000.0 for a, b in zip(spans, spans[1:])]
+
+
+async def run(args):
+    spans = []
+
+    def play(path):
+        t0 = time.perf_counter()
+        time.sleep(args.play_ms / 1000.0)
+        spans.append((t0, time.perf_counter()))
+
+    main.tts = SimTTS(args.synth_ms)
+    main.play_wav = play
+    main.prefetcher = None
+    main.resource_watcher = None
+    main.map_prosody = main.map_prosody or (lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    chunks = [{"id": f"c{i}", "type": "say", "text": f"chunk {i}", "pause_ms": args.pause_ms, "osc": {"N_Valence": 0.1 * i}}
+              for i in range(args.chunks)]
+    pm = {"valence": "Mood"}
+
+    t0 = time.perf_counter()
+    for c in chunks:
+        await main.emit_chunk(c, Osc(), pm, St(), SM(), mode="live")
+    seq_wall, seq_gaps = (time.perf_counter() - t0) * 1000.0, gaps_ms(spans)
+
+    spans.clear()
+    t0 = time.perf_counter()
+    report = await main.emit_plan(chunks, Osc(), pm, St(), SM(), mode="live")
+    pipe_wall, pipe_gaps = (time.perf_counter() - t0) * 1000.0, gaps_ms(spans)
+
+    for name, wall, gaps in (("emit_chunk loop", seq_wall, seq_gaps), ("plan pipeline", pipe_wall, pipe_gaps)):
+        print(f"{name:16s} wall={wall:8.1f}ms  gap mean={sum(gaps) / max(1, len(gaps)):7.1f}ms "
+              f"max={max(gaps or [0]):7.1f}ms  (pause={args.pause_ms}ms)")
+    print(f"pipeline report: max_gap_ms={report['max_gap_ms']} late_ms={report['late_ms']} "
+          f"first_audio_ms={report['chunks'][0]['start_ms'] if report['chunks'] else None}")
+
+
+def main_(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunks", type=int, default=6)
+    ap.add_argument("--synth-ms", type=float, default=180.0)
+    ap.add_argument("--play-ms", type=float, default=900.0)
+    ap.add_argument("--pause-ms", type=int, default=120)
+    asyncio.run(run(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,92 @@
+"""Packet-count benchmark: per-parameter OSC messages vs one #bundle per chunk.
+
+Sends N simulated chunk updates (valence/interest/arousal/gesture/look changing
+every time) through OscClient to a local UDP receiver and reports datagrams,
+bytes and wall time for both modes.
+
+    python scripts/bench_osc_bundle.py --chunks 500
+"""
+import argparse
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from vrc.osc_client import OscClient  # noqa: E402
+from vrc.osc_codec import decode_packet, encode_message  # noqa: E402
+
+PARAMS = ("N_Valence", "N_Interest", "N_Arousal", "N_Gesture", "N_Look")
+
+
+class _UdpMessageClient:
+    """Same wire behaviour as python-osc SimpleUDPClient.send_message (one datagram per message)."""
+
+    def __init__(self, ip, port):
+        self.addr = (ip, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send_message(self, address, value):
+        self.sock.sendto(encode_message(address, value), self.addr)
+
+
+class Receiver:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.packets = 0
+        self.bytes = 0
+        self.messages = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            self.packets += 1
+            self.bytes += len(data)
+            self.messages += len(decode_packet(data))
+
+    def close(self):
+        time.sleep(0.3)
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+
+def run(chunks: int, bundle: bool) -> dict:
+    rx = Receiver()
+    client = OscClient(port=rx.port, max_hz=0, bundle=bundle)
+    if not bundle:
+        client._client = _UdpMessageClient("127.0.0.1", rx.port)
+    t0 = time.perf_counter()
+    for i in range(chunks):
+        client.send_avatar_params({p: ((i + j) % 100) / 100.0 + 0.001 for j, p in enumerate(PARAMS)})
+    elapsed = time.perf_counter() - t0
+    rx.close()
+    return {"mode": "bundle" if bundle else "message", "chunks": chunks, "sent": client.packets_sent, "packets": rx.packets,
+            "messages": rx.messages, "bytes": rx.bytes, "send_ms": round(elapsed * 1000, 1),
+            "packets_per_chunk": round(rx.packets / max(1, chunks), 2)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunks", type=int, default=500)
+    args = ap.parse_args(argv)
+    for bundle in (False, True):
+        r = run(args.chunks, bundle)
+        print("{mode:8s} chunks={chunks} sent={sent} received={packets} msgs={messages} bytes={bytes} "
+              "send={send_ms}ms packets/chunk={packets_per_chunk}".format(**r))
+
+
+if __name__ == "__main__":
+    main()
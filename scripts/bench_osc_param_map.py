@@ -0,0 +1,99 @@
+"""Micro-benchmark: per-chunk OSC preparation, dict rebuild vs compiled param map.
+
+"legacy" is the per-chunk code emit_chunk used before (rebuilds the alias mapping from
+params_map for every N_* key and re-parses the key); "compiled" is
+CompiledParamMap.prepare. Reports time and peak transient allocation per chunk.
+
+    python scripts/bench_osc_param_map.py --chunks 200000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from vrc.osc_param_map import compile_params_map  # noqa: E402
+
+PARAMS_MAP = {"valence": "Mood", "interest": "InterestLevel", "arousal": "Arousal", "gesture": "Gesture",
+              "look_x": "LookX", "look_y": "LookY", "glitch": "Glitch", "state": "State"}
+
+
+def face_valence(base, interest):
+    if base == 0.0:
+        return 0.0
+    sign = 1.0 if base > 0 else -1.0
+    return max(-1.0, min(1.0, base + sign * min(0.6, interest * 0.35)))
+
+
+def legacy_prepare(chunk, params_map):
+    osc_map = chunk.get("osc") or {}
+    to_send = {}
+    for k, v in (osc_map.items() if isinstance(osc_map, dict) else []):
+        if not k.startswith("N_"):
+            continue
+        key = k[2:].lower()
+        mapping = {
+            "state": params_map.get("state"),
+            "gesture": params_map.get("gesture"),
+            "lookx": params_map.get("look_x"),
+            "looky": params_map.get("look_y"),
+            "look": params_map.get("look_x"),
+            "arousal": params_map.get("arousal"),
+            "valence": params_map.get("valence"),
+            "glitch": params_map.get("glitch"),
+            "interest": params_map.get("interest"),
+        }
+        param_name = mapping.get(key)
+        if param_name and isinstance(v, (int, float, bool)):
+            to_send[param_name] = v
+    if "interest" in params_map and "interest" in chunk:
+        to_send[params_map["interest"]] = max(-1.0, min(1.0, float(chunk["interest"])))
+    if "valence" in params_map and ("N_Valence" in (chunk.get("osc") or {}) or "valence" in chunk) and "interest" in chunk:
+        base = float(chunk["osc"]["N_Valence"]) if "N_Valence" in (chunk.get("osc") or {}) else float(chunk["valence"])
+        to_send[params_map["valence"]] = face_valence(base, min(1.0, max(0.0, float(chunk["interest"]))))
+    return to_send
+
+
+def make_chunks(n):
+    return [{"id": f"c{i}", "type": "say", "text": "x", "interest": (i % 10) / 10.0,
+             "osc": {"N_Valence": ((i % 21) - 10) / 10.0, "N_Arousal": (i % 7) / 7.0, "N_Gesture": i % 4,
+                     "N_Look": (i % 5) / 5.0, "N_Interest": 0.3}}
+            for i in range(n)]
+
+
+def bench(fn, chunks):
+    t0 = time.perf_counter()
+    for c in chunks:
+        fn(c)
+    elapsed = time.perf_counter() - t0
+    # transient bytes: peak during one call above what was allocated before it
+    tracemalloc.start()
+    transient = 0
+    for c in chunks[:1000]:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        r = fn(c)
+        transient += tracemalloc.get_traced_memory()[1] - base
+        del r
+    tracemalloc.stop()
+    return elapsed * 1e9 / len(chunks), transient / min(1000, len(chunks))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunks", type=int, default=200000)
+    args = ap.parse_args(argv)
+    chunks = make_chunks(args.chunks)
+    cmap = compile_params_map(PARAMS_MAP, face_valence=face_valence)
+    for c in chunks[:100]:
+        a, b = legacy_prepare(c, PARAMS_MAP), cmap.prepare(c, {})
+        assert a.keys() == b.keys(), (a, b)
+    for name, fn in (("legacy", lambda c: legacy_prepare(c, PARAMS_MAP)), ("compiled", lambda c: cmap.prepare(c, {}))):
+        ns, peak = bench(fn, chunks)
+        print(f"{name:8s} chunks={len(chunks)} {ns:8.0f} ns/chunk  peak {peak:6.0f} B/chunk (incl. result dict)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark: interrupt-to-alert latency while a speech plan is playing.
+
+An alert_new event is posted from another thread (as the alert watcher does) at a
+random point inside a chunk's playback. Playback is simulated with a clip that blocks
+like play_wav and can be cut, TTS is instant. Measured: time from the post until the
+SM is in ALERT and the avatar's state param was sent, with preemption vs the old
+chunk-boundary handling (no preempt_hook). Target: < 100 ms.
+
+    python scripts/bench_preempt.py --trials 20 --clip-ms 1500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import main  # noqa: E402
+from core.state_machine import State, StateMachine  # noqa: E402
+
+PM = {"valence": "Mood", "state": "State", "arousal": "Arousal"}
+
+
+class Clip:
+    def __init__(self, clip_s):
+        self.clip_s = clip_s
+        self.cut = threading.Event()
+        self.started = threading.Event()
+
+    def play(self, path):
+        self.cut.clear()
+        self.started.set()
+        self.cut.wait(self.clip_s)
+
+    def stop(self):
+        self.cut.set()
+
+
+class Osc:
+    def __init__(self, sm):
+        self.sm = sm
+        self.alert_at = None
+
+    def send_avatar_params(self, params):
+        if self.alert_at is None and self.sm.state == State.ALERT:
+            self.alert_at = time.perf_counter()
+
+
+class SimTTS:
+    def synthesize(self, text, prosody, path):
+        return True
+
+
+async def trial(clip, preempt, rng):
+    sm = StateMachine()
+    sm.state = State.TALK
+    if preempt:
+        main.attach_preemption(sm)
+    osc = Osc(sm)
+    chunks = [{"id": f"c{i}", "text": "x", "pause_ms": 120, "osc": {"N_Valence": 0.1, "N_State": 2}} for i in range(3)]
+    clip.started.clear()
+    posted = {}
+
+    def alert():
+        clip.started.wait(2.0)
+        time.sleep(rng.uniform(0.05, clip.clip_s * 0.8))
+        posted["t"] = time.perf_counter()
+        sm.post("alert_new", {"id": "eq"})
+
+    threading.Thread(target=alert, daemon=True).start()
+    await main.emit_plan(chunks, osc, PM, State.TALK, sm, mode="live")
+    t_alert = osc.alert_at
+    if t_alert is None:
+        # boundary handling: ALERT is entered at the chunk end, the face follows with the alert plan
+        t_alert = time.perf_counter() if sm.state == State.ALERT else None
+    return None if t_alert is None else (t_alert - posted["t"]) * 1000.0
+
+
+async def run(args):
+    clip = Clip(args.clip_ms / 1000.0)
+    main.tts = SimTTS()
+    main.play_wav = clip.play
+    main._stop_audio = clip.stop
+    main.prefetcher = None
+    main.resource_watcher = None
+    main.face_animator = None
+    main.map_prosody = main.map_prosody or (lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    rng = random.Random(args.seed)
+    for label, preempt in (("chunk boundary", False), ("preemption", True)):
+        lat = [x for x in [await trial(clip, preempt, rng) for _ in range(args.trials)] if x is not None]
+        lat.sort()
+        p95 = lat[min(len(lat) - 1, int(round(0.95 * (len(lat) - 1))))] if lat else float("nan")
+        print(f"{label:15s} n={len(lat):3d}  p50={statistics.median(lat) if lat else float('nan'):8.1f}ms  "
+              f"p95={p95:8.1f}ms  max={max(lat) if lat else float('nan'):8.1f}ms  (target < 100ms)")
+    if main.preempt_latency_ms:
+        print(f"pipeline preempt_ms (preempt() -> face snapped): max={max(main.preempt_latency_ms):.2f}ms")
+
+
+def main_(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--trials", type=int, default=20)
+    ap.add_argument("--clip-ms", type=float, default=1500.0)
+    ap.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main_()
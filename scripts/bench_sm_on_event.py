@@ -0,0 +1,78 @@
+"""Micro-benchmark: StateMachine.on_event cost per event type.
+
+Runs each event type N times against a fresh-enough StateMachine (reply delays go to
+a manual DeferredScheduler, nothing sleeps) and prints ns/event, plus how many times
+self-address detection ran per stt_final.
+
+    python scripts/bench_sm_on_event.py --n 20000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import core.state_machine as sm_mod  # noqa: E402
+from core.sm_scheduler import DeferredScheduler  # noqa: E402
+from core.state_machine import State, StateMachine  # noqa: E402
+
+STT = {"text": "こんにちは", "speaker_alias": "spk1", "speaker_key": "spk1", "speaker_confidence": 0.9,
+       "has_profile": True, "display_name": "Aki"}
+
+CASES = (
+    ("stt_final", State.IDLE, STT, {}),
+    ("stt_final/speaking", State.TALK, STT, {"vad_speaking": True}),
+    ("stt_final/search", State.SEARCH, STT, {}),
+    ("alert_new", State.TALK, {"id": "a"}, {}),
+    ("net_query", State.IDLE, {"q": "x"}, {}),
+    ("search_result", State.SEARCH, {"ok": True}, {}),
+    ("name_confirm_no", State.IDLE, None, {}),
+)
+
+
+def make_sm():
+    sm = StateMachine()
+    sm.scheduler = DeferredScheduler(lambda: 0.0, auto=False)
+    sm._notify = lambda: None
+    return sm
+
+
+def run(n):
+    calls = {"detect": 0}
+    real_detect = sm_mod.detect_self_address
+
+    def counting_detect(*a, **k):
+        calls["detect"] += 1
+        return real_detect(*a, **k)
+
+    sm_mod.detect_self_address = counting_detect
+    try:
+        for label, state, payload, attrs in CASES:
+            event = label.split("/")[0]
+            sm = make_sm()
+            for k, v in attrs.items():
+                setattr(sm, k, v)
+            calls["detect"] = 0
+            elapsed = 0.0
+            for _ in range(n):
+                sm.state = state
+                sm.pending_name_request = None
+                t0 = time.perf_counter()
+                sm.on_event(event, payload)
+                elapsed += time.perf_counter() - t0
+            extra = f"  detect_self_address/event={calls['detect'] / n:.1f}" if event == "stt_final" else ""
+            print(f"{label:20s} {elapsed * 1e9 / n:8.0f} ns/event{extra}")
+    finally:
+        sm_mod.detect_self_address = real_detect
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args(argv)
+    run(args.n)
+
+
+if __name__ == "__main__":
+    main()
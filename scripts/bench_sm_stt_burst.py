@@ -0,0 +1,72 @@
+"""Throughput benchmark: StateMachine.on_event("stt_final") under bursty transcripts.
+
+Feeds bursts of transcripts (several per burst, a short gap between bursts) into a
+StateMachine whose reply delay runs on a DeferredScheduler with a simulated clock,
+and reports on_event throughput and worst-case call latency. For comparison it prints
+how long the calling thread would have slept with the old inline time.sleep delay.
+
+    python scripts/bench_sm_stt_burst.py --bursts 500 --burst-size 8
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.sm_scheduler import DeferredScheduler  # noqa: E402
+from core.state_machine import State, StateMachine, reply_delay_sec  # noqa: E402
+
+
+class SimClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def run(bursts: int, burst_size: int, intra_gap: float, inter_gap: float) -> dict:
+    clock = SimClock()
+    sm = StateMachine()
+    sm.scheduler = DeferredScheduler(clock, auto=False)
+    calls = 0
+    worst = 0.0
+    blocked = 0.0
+    talks = 0
+    t0 = time.perf_counter()
+    for b in range(bursts):
+        sm.state = State.IDLE
+        for i in range(burst_size):
+            text = f"transcript {b}-{i}"
+            c0 = time.perf_counter()
+            sm.on_event("stt_final", {"text": text, "speaker_alias": f"spk{i % 3}", "speaker_confidence": 0.8})
+            worst = max(worst, time.perf_counter() - c0)
+            blocked += reply_delay_sec(text)
+            calls += 1
+            clock.t += intra_gap
+            sm.scheduler.run_due()
+        clock.t += inter_gap
+        sm.scheduler.run_due()
+        talks += sm.state == State.TALK
+    elapsed = time.perf_counter() - t0
+    return {"events": calls, "elapsed_s": elapsed, "events_per_s": calls / elapsed, "worst_call_ms": worst * 1000.0,
+            "replies": talks, "superseded": sm.scheduler.cancelled, "old_inline_sleep_s": blocked}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--bursts", type=int, default=500)
+    ap.add_argument("--burst-size", type=int, default=8)
+    ap.add_argument("--intra-gap", type=float, default=0.05, help="seconds between transcripts in a burst")
+    ap.add_argument("--inter-gap", type=float, default=2.0, help="seconds between bursts")
+    args = ap.parse_args(argv)
+    r = run(args.bursts, args.burst_size, args.intra_gap, args.inter_gap)
+    print(f"events={r['events']} elapsed={r['elapsed_s']:.3f}s throughput={r['events_per_s']:.0f} ev/s "
+          f"worst_call={r['worst_call_ms']:.2f}ms replies={r['replies']} superseded={r['superseded']}")
+    print(f"old inline time.sleep would have blocked the caller for {r['old_inline_sleep_s']:.1f}s "
+          f"(max {r['events'] / max(r['old_inline_sleep_s'], 1e-9):.1f} ev/s)")
+
+
+if __name__ == "__main__":
+    main()
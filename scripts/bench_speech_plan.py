@@ -0,0 +1,120 @@
+"""Benchmark: speech plan chunks as dicts vs core.speech_plan.Chunk.
+
+- build: make_speech_plan / build_alert_speech_plan output normalized for emission
+  (the old dict-copying normalize_plan vs SpeechPlan.from_plan)
+- emit: the per-chunk reads emission does (compiled OSC params + valence/interest/arousal)
+- memory: bytes per chunk the emitter keeps alive (tracemalloc): the builder's dicts
+  (referenced from `_legacy`) plus the normalized dict, vs a Chunk (which references them too)
+
+    python scripts/bench_speech_plan.py --n 2000
+"""
+import argparse
+import copy
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.alert_engine import build_alert_speech_plan  # noqa: E402
+from core.speech_brain import make_speech_plan  # noqa: E402
+from core.speech_plan import Chunk, SpeechPlan  # noqa: E402
+from vrc.osc_param_map import compile_params_map  # noqa: E402
+
+PM = {"valence": "Mood", "interest": "InterestLevel", "arousal": "Arousal", "gesture": "Gesture",
+      "look_x": "LookX", "state": "State"}
+TEXT = "今日は雨だね。傘を忘れたけど、たぶん大丈夫。それより昨日のニュース見た？ 新しい駅ができるらしいよ。"
+
+
+def normalize_dicts(plan):
+    """normalize_plan before Chunk (dict copy per chunk, float() per legacy field)."""
+    chunks = []
+    if "speech_plan" in plan:
+        for c in plan.get("speech_plan", []):
+            chunks.append({"id": c.get("id"), "type": c.get("type", "say"), "text": c.get("text", ""),
+                           "pause_ms": int(c.get("pause_ms", 120)), "osc": c.get("osc"), "_legacy": c})
+    elif "chunks" in plan:
+        for i, c in enumerate(plan.get("chunks", []), start=1):
+            osc_map = {}
+            if "arousal" in c:
+                osc_map["N_Arousal"] = float(c.get("arousal", 0.0))
+            if "valence" in c:
+                osc_map["N_Valence"] = float(c.get("valence", 0.0))
+            if "gesture" in c:
+                osc_map["N_Gesture"] = float(c.get("gesture", 0.0))
+            if "look_x" in c:
+                osc_map["N_Look"] = (float(c.get("look_x", 0.0)) + 1.0) / 2.0
+            chunks.append({"id": f"c{i}", "type": "say", "text": c.get("text", ""),
+                           "pause_ms": int(c.get("pause_ms", 120)), "osc": osc_map or None, "_legacy": c})
+    return chunks
+
+
+def emit_reads_dict(chunks, cmap):
+    for c in chunks:
+        cmap.prepare(c, {})
+        osc_map = c.get("osc") or {}
+        float(osc_map.get("N_Valence", 0.0)), float(osc_map.get("N_Interest", 0.0)), float(osc_map.get("N_Arousal", 0.0))
+        float(c.get("pause_ms", 120))
+
+
+def emit_reads_chunk(chunks, cmap):
+    for c in chunks:
+        cmap.prepare(c, {})
+        c.face_scalars()
+        c.pause_ms
+
+
+def timed(fn, n, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6 / n
+
+
+def alloc_bytes(fn):
+    tracemalloc.start()
+    kept = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def run(n):
+    plans = {
+        "speech_plan": make_speech_plan(TEXT, curiosity=0.4, confidence=0.4, social_pressure=0.8, seed=7, use_agents=False),
+        "alert chunks": {"chunks": build_alert_speech_plan({"type": "earthquake", "severity": 5}, {})["chunks"]},
+    }
+    cmap = compile_params_map(PM)
+    for label, plan in plans.items():
+        dict_chunks = normalize_dicts(plan)
+        slot_chunks = SpeechPlan.from_plan(plan).chunks
+        k = len(slot_chunks)
+        assert [cmap.prepare(c, {}) for c in dict_chunks] == [cmap.prepare(c, {}) for c in slot_chunks]
+        print(f"--- {label} ({k} chunks)")
+        print(f"build  dict {timed(lambda: normalize_dicts(plan), n) / k:7.2f} us/chunk   "
+              f"Chunk {timed(lambda: SpeechPlan.from_plan(plan), n) / k:7.2f} us/chunk")
+        print(f"emit   dict {timed(lambda: emit_reads_dict(dict_chunks, cmap), n) / k:7.2f} us/chunk   "
+              f"Chunk {timed(lambda: emit_reads_chunk(slot_chunks, cmap), n) / k:7.2f} us/chunk")
+        src = plan.get("speech_plan") or plan.get("chunks")
+        key = "speech_plan" if "speech_plan" in plan else "chunks"
+        dict_bytes = alloc_bytes(lambda: normalize_dicts({key: copy.deepcopy(src)}))
+        slot_bytes = alloc_bytes(lambda: SpeechPlan.from_plan({key: copy.deepcopy(src)}))
+        print(f"memory dict {dict_bytes / k:7.0f} B/chunk    Chunk {slot_bytes / k:7.0f} B/chunk")
+    one = Chunk.from_dict(plans["speech_plan"]["speech_plan"][0])
+    print(f"Chunk slots={len(Chunk.__slots__)} vals={one.vals.typecode}x{len(one.vals)}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args(argv)
+    run(args.n)
+
+
+if __name__ == "__main__":
+    main()
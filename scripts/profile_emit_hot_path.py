@@ -0,0 +1,123 @@
+"""Time/allocation profile of emit_chunk's per-chunk CPU path, per-chunk lookups vs EmissionContext.
+
+"per-chunk" drops the cached EmissionContext before every chunk, which redoes what
+emit_chunk used to do for each chunk (config sections, blocked states, compiled map
+lookup, a tempo query against SQLite, a fresh emergency-level context).
+"context" reuses one EmissionContext, as emit_plan does. TTS, resource probe and pause
+are off so only the CPU path is measured. Reports time and peak transient allocation
+per chunk; --cprofile prints the top functions for both runs.
+
+    python scripts/profile_emit_hot_path.py --chunks 5000 --cprofile
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import sqlite3
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import main  # noqa: E402
+
+
+class SqliteTempoStore:
+    """SpeakerStore stand-in: the three tempo queries hit an in-memory SQLite table (fully active speaker,
+    so the tempo adds no response delay to the measured path)."""
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:")
+        self._conn.execute("CREATE TABLE s (k TEXT PRIMARY KEY, rec REAL, usage REAL, interest REAL)")
+        self._conn.execute("INSERT INTO s VALUES ('spk1', 1.0, 1.0, 1.0)")
+
+    def _get(self, col, key):
+        row = self._conn.execute(f"SELECT {col} FROM s WHERE k = ?", (key,)).fetchone()
+        return row[0] if row else 0.0
+
+    def get_recency(self, key, now):
+        return self._get("rec", key)
+
+    def get_avatar_usage(self, key, now):
+        return self._get("usage", key)
+
+    def get_interest(self, key, now):
+        return self._get("interest", key)
+
+
+class Osc:
+    def send_avatar_params(self, params):
+        pass
+
+
+class St:
+    name = "TALK"
+
+
+class SM:
+    state = St()
+
+    def mark_speech_done(self):
+        pass
+
+
+PM = {"valence": "Mood", "interest": "InterestLevel", "arousal": "Arousal", "gesture": "Gesture"}
+CHUNK = {"id": "c1", "type": "say", "text": "", "pause_ms": 0, "speaker_key": "spk1",
+         "osc": {"N_Valence": 0.4, "N_Interest": 0.6, "N_Arousal": 0.2, "N_Gesture": 1}}
+
+
+async def run_chunks(n, per_chunk):
+    osc, st, sm = Osc(), St(), SM()
+    for _ in range(n):
+        if per_chunk:
+            main._emission_ctx = None
+        await main.emit_chunk(CHUNK, osc, PM, st, sm, mode="live")
+
+
+def measure(n, per_chunk):
+    main._emission_ctx = None
+    asyncio.run(run_chunks(50, per_chunk))  # warm up
+    t0 = time.perf_counter()
+    asyncio.run(run_chunks(n, per_chunk))
+    us = (time.perf_counter() - t0) * 1e6 / n
+    tracemalloc.start()
+    peaks = []
+
+    async def alloc_run():
+        for _ in range(200):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            await run_chunks(1, per_chunk)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+
+    asyncio.run(alloc_run())
+    tracemalloc.stop()
+    return us, sorted(peaks)[len(peaks) // 2]
+
+
+def main_(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunks", type=int, default=5000)
+    ap.add_argument("--cprofile", action="store_true")
+    args = ap.parse_args(argv)
+    import logging
+    logging.disable(logging.INFO)
+    main.tts = None
+    main.resource_watcher = None
+    main.prefetcher = None
+    main.speaker_store = SqliteTempoStore()
+    for label, per_chunk in (("per-chunk", True), ("context", False)):
+        us, peak = measure(args.chunks, per_chunk)
+        print(f"{label:10s} {us:8.1f} us/chunk  peak transient alloc {peak:6d} B/chunk")
+        if args.cprofile:
+            prof = cProfile.Profile()
+            prof.enable()
+            asyncio.run(run_chunks(args.chunks, per_chunk))
+            prof.disable()
+            pstats.Stats(prof).sort_stats("tottime").print_stats(12)
+
+
+if __name__ == "__main__":
+    main_()
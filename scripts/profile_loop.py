@@ -0,0 +1,118 @@
+"""Profile the event loop during a simulated speaking session (core/loop_profiler.py).
+
+Plans go through emit_plan, each followed by a one-off emit_chunk, with simulated TTS
+(synthesis burns --synth-ms of CPU, playback blocks --play-ms, both on the emit
+executor) while a stand-in for a synchronous call made on the loop (a sync DB/HTTP
+lookup) blocks it for --block-ms every --block-every-s. Prints loop lag percentiles
+and the detected stalls; --profile-loop writes the JSON report (lag, stalls with
+stacks, loop-blocked time per component, per-thread component time with --threads,
+emit stage totals) and --folded the samples as folded stacks for flamegraph.pl /
+speedscope.
+
+    python scripts/profile_loop.py --plans 3 --block-ms 250 --threads --profile-loop loop.json --folded loop.folded
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import main  # noqa: E402
+
+
+class SimTTS:
+    def __init__(self, synth_ms):
+        self.synth_s = synth_ms / 1000.0
+
+    def synthesize(self, text, prosody, out_path):
+        end = time.perf_counter() + self.synth_s
+        while time.perf_counter() < end:
+            pass
+        return True
+
+
+class Osc:
+    def send_avatar_params(self, params):
+        pass
+
+
+class St:
+    name = "TALK"
+
+
+class SM:
+    state = St()
+
+    def mark_speech_done(self):
+        pass
+
+
+def blocking_lookup(block_s):
+    time.sleep(block_s)
+
+
+async def stall_loop(args, done):
+    while not done.is_set():
+        await asyncio.sleep(args.block_every_s)
+        blocking_lookup(args.block_ms / 1000.0)
+
+
+async def run(args):
+    main.tts = SimTTS(args.synth_ms)
+    main.play_wav = lambda path: time.sleep(args.play_ms / 1000.0)
+    main.prefetcher = None
+    main.resource_watcher = None
+    main.face_animator = None
+    main.map_prosody = main.map_prosody or (lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    main.cfg = {"loop_profiler": {"lag_interval_ms": args.lag_interval_ms, "slow_ms": args.slow_ms,
+                                  "sample_ms": args.sample_ms}}
+    prof = main.start_loop_profiler(profile_threads=args.threads)
+    done = asyncio.Event()
+    staller = asyncio.ensure_future(stall_loop(args, done))
+    pm = {"valence": "Mood"}
+    for p in range(args.plans):
+        chunks = [{"id": f"p{p}c{i}", "type": "say", "text": f"chunk {i}", "pause_ms": 120, "osc": {"N_Valence": 0.1 * i}}
+                  for i in range(args.chunks)]
+        await main.emit_plan(chunks, Osc(), pm, St(), SM(), mode="live")
+        # one-off chunk between plans (emit_chunk path, fills the emit stage totals)
+        await main.emit_chunk({"id": f"p{p}idle", "type": "say", "text": "...", "pause_ms": 120}, Osc(), pm, St(), SM(),
+                              mode="live")
+    done.set()
+    await staller
+    prof.stop()
+
+    rep = main.loop_profile_report()
+    lag = rep["lag"]
+    print(f"loop lag  n={lag['count']}  p50={lag['p50_ms']:.2f}ms  p95={lag['p95_ms']:.2f}ms  "
+          f"p99={lag['p99_ms']:.2f}ms  max={lag['max_ms']:.1f}ms")
+    for st in rep["stalls"]:
+        print(f"stall     ~{st['lag_ms']:7.1f}ms  {st['component']}  {st['stack'].rsplit(';', 2)[-2:]}")
+    print(f"loop blocked by component: {rep['loop_blocked_ms']}")
+    for name, comps in rep["threads_ms"].items():
+        print(f"thread {name:16s} {dict(list(comps.items())[:4])}")
+    if args.profile_loop:
+        main.dump_loop_profile(args.profile_loop, args.folded)
+        print(f"wrote {args.profile_loop}" + (f" and {args.folded}" if args.folded else ""))
+
+
+def main_(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--plans", type=int, default=3)
+    ap.add_argument("--chunks", type=int, default=4)
+    ap.add_argument("--synth-ms", type=float, default=150.0)
+    ap.add_argument("--play-ms", type=float, default=400.0)
+    ap.add_argument("--block-ms", type=float, default=250.0)
+    ap.add_argument("--block-every-s", type=float, default=1.0)
+    ap.add_argument("--lag-interval-ms", type=float, default=50.0)
+    ap.add_argument("--slow-ms", type=float, default=100.0)
+    ap.add_argument("--sample-ms", type=float, default=10.0)
+    ap.add_argument("--threads", action="store_true", help="also account time per thread and component")
+    ap.add_argument("--profile-loop", metavar="OUT.json", help="write the JSON report here")
+    ap.add_argument("--folded", metavar="OUT.folded", help="write folded stacks (flamegraph input) here")
+    asyncio.run(run(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,36 @@
+"""Replay and analyze an OSC log written by vrc.osc_recorder.OscRecorder (config osc.record).
+
+Prints packets/sec, per-parameter churn and redundant sends as JSON; with --port the
+log is also re-sent to a local receiver at the recorded speed (or --speed N times faster).
+
+    python scripts/replay_osc_log.py osc.log
+    python scripts/replay_osc_log.py osc.log --port 9000 --speed 4
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from vrc.osc_recorder import analyze, read_log, replay  # noqa: E402
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("log")
+    ap.add_argument("--ip", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=None, help="re-send to this UDP port (omit to only analyze)")
+    ap.add_argument("--speed", type=float, default=1.0, help="time scale; 0 sends as fast as possible")
+    ap.add_argument("--prefix", default="/avatar/parameters")
+    args = ap.parse_args(argv)
+    if args.port is not None:
+        t0 = time.perf_counter()
+        n = replay(read_log(args.log), args.ip, args.port, speed=args.speed)
+        print(f"replayed {n} packets to {args.ip}:{args.port} in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    print(json.dumps(analyze(read_log(args.log), args.prefix), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
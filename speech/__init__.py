@@ -1,9 +1,10 @@
 from .engine import SpeechEngine
+from .async_engine import AsyncSpeechEngine
 from .types import VoiceSpec, Prosody, TTSAudio, SpeechMeta, SpeechItem
 from .interfaces import TTSProvider, AudioSink, NullTTSProvider, NullAudioSink
 from .queue import SpeechQueue
 
 __all__ = [
-    "SpeechEngine", "VoiceSpec", "Prosody", "TTSAudio", "SpeechMeta", "SpeechItem",
+    "SpeechEngine", "AsyncSpeechEngine", "VoiceSpec", "Prosody", "TTSAudio", "SpeechMeta", "SpeechItem",
     "TTSProvider", "AudioSink", "NullTTSProvider", "NullAudioSink", "SpeechQueue"
 ]
@@ -0,0 +1,311 @@
+"""Asyncio-native speech driver.
+
+Pipelines synthesis ahead of playback: while item N is playing, up to
+`lookahead` following items are already being synthesized in an executor.
+Interrupting items (`SpeechMeta.can_interrupt`) cut the current playback and,
+unless `allow_overlap` is set, cancel every in-flight synthesis.
+Fail-soft: provider/sink errors never escape the run loop.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from functools import partial
+from typing import Optional
+
+from .types import VoiceSpec, Prosody, SpeechMeta, SpeechItem
+from .interfaces import TTSProvider, AudioSink
+from .queue import SpeechQueue
+from .wav_util import try_get_wav_duration_ms
+
+DEFAULT_DURATION_MS = 1200
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    idx = min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))
+    return float(s[idx])
+
+
+def audio_duration_ms(audio) -> int:
+    """Duration of a TTSAudio in ms (explicit field, WAV header, else 1200ms fallback)."""
+    duration_ms = getattr(audio, "duration_ms", None)
+    if duration_ms is None and getattr(audio, "format", None) == "wav":
+        try:
+            duration_ms = try_get_wav_duration_ms(getattr(audio, "pcm_bytes", b""))
+        except Exception:
+            duration_ms = None
+    return int(duration_ms) if duration_ms else DEFAULT_DURATION_MS
+
+
+class _Slot:
+    __slots__ = ("item", "task", "accepted_ts", "synth_ms")
+
+    def __init__(self, item: SpeechItem, accepted_ts: float):
+        self.item = item
+        self.task = None
+        self.accepted_ts = accepted_ts
+        self.synth_ms = None
+
+
+class AsyncSpeechEngine:
+    def __init__(self, tts: TTSProvider, sink: AudioSink, queue: Optional[SpeechQueue] = None, *,
+                 lookahead: int = 2, executor=None, sample_window: int = 64):
+        self.tts = tts
+        self.sink = sink
+        self.queue = queue if queue is not None else SpeechQueue()
+        self.lookahead = max(1, int(lookahead))
+        self._executor = executor
+        self._pipeline = deque()  # _Slot, synthesis started, playback order
+        self._speaking_until_ms = 0  # deterministic suppression window (epoch ms)
+        self._loop = None
+        self._task = None
+        self._changed = None
+        self._interrupt = None
+        self._playing = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._accepted_ts = {}  # id(item) -> perf_counter at submit, for queued items
+        self._synth_ms = deque(maxlen=sample_window)
+        self._queue_wait_ms = deque(maxlen=sample_window)
+        self._counters = {"submitted": 0, "played": 0, "synth_failed": 0, "synth_cancelled": 0, "interrupted": 0}
+
+    # --- public API (SpeechEngine compatible) ---
+    def is_speaking(self, now_ms: Optional[int] = None) -> bool:
+        """Returns True if currently in the self-voice suppression window (deterministic, ms)."""
+        n = now_ms if now_ms is not None else int(time.time() * 1000)
+        return n < self._speaking_until_ms
+
+    def submit_text(self, text: str, *, voice: Optional[VoiceSpec] = None, prosody: Optional[Prosody] = None, meta: Optional[SpeechMeta] = None, now_ms: Optional[int] = None) -> None:
+        try:
+            item = SpeechItem(
+                text=text,
+                voice=voice if voice is not None else VoiceSpec(),
+                prosody=prosody if prosody is not None else {},
+                meta=meta if meta is not None else SpeechMeta(),
+                created_at_ms=now_ms if now_ms is not None else 0,
+            )
+            self.submit(item)
+        except Exception:
+            pass
+
+    def submit(self, item: SpeechItem) -> None:
+        """Thread-safe. Auto-starts the driver when called from a running loop."""
+        accepted = time.perf_counter()
+        loop = self._loop
+        if loop is None:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not None:
+                self.start()
+                loop = self._loop
+        if loop is None:
+            # Not started yet: queue only, nothing in flight to interrupt.
+            with self._lock:
+                self._accepted_ts[id(item)] = accepted
+                self.queue.submit(item)
+                self._counters["submitted"] += 1
+            return
+        if self._on_loop_thread():
+            self._accept(item, accepted)
+        else:
+            loop.call_soon_threadsafe(self._accept, item, accepted)
+
+    def flush(self, reason: str) -> None:
+        try:
+            if self._loop is not None and not self._on_loop_thread():
+                self._loop.call_soon_threadsafe(self._flush, reason)
+            else:
+                self._flush(reason)
+        except Exception:
+            pass
+
+    def start(self):
+        """Start the run loop as a task on the current running loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        self._closed = True
+        if self._changed is not None:
+            self._changed.set()
+        self._cancel_pipeline()
+        task = self._task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+        self._loop = None
+
+    def metrics(self) -> dict:
+        """Queue depth, in-flight synthesis and latency summaries (ms)."""
+        synth = list(self._synth_ms)
+        wait = list(self._queue_wait_ms)
+        with self._lock:
+            queued = len(getattr(self.queue, "_queue", []))
+        out = dict(self._counters)
+        out.update({
+            "queue_depth": queued,
+            "pipeline_depth": len(self._pipeline),
+            "inflight_synth": sum(1 for s in self._pipeline if s.task is not None and not s.task.done()),
+            "synth_ms_last": synth[-1] if synth else 0.0,
+            "synth_ms_p50": _percentile(synth, 0.5),
+            "synth_ms_p95": _percentile(synth, 0.95),
+            "queue_wait_ms_p50": _percentile(wait, 0.5),
+            "queue_wait_ms_p95": _percentile(wait, 0.95),
+        })
+        return out
+
+    # --- driver ---
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._interrupt = asyncio.Event()
+        try:
+            while not self._closed:
+                self._fill_pipeline()
+                if not self._pipeline:
+                    self._changed.clear()
+                    await self._changed.wait()
+                    continue
+                slot = self._pipeline[0]
+                if not slot.task.done():
+                    # Wake early if an interrupt reshapes the pipeline head.
+                    self._changed.clear()
+                    waiter = self._loop.create_task(self._changed.wait())
+                    try:
+                        await asyncio.wait({slot.task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        waiter.cancel()
+                    continue
+                self._pipeline.popleft()
+                if slot.task.cancelled():
+                    continue
+                audio = slot.task.result()
+                if not audio:
+                    continue
+                await self._play(slot, audio)
+        finally:
+            self._cancel_pipeline()
+
+    async def _play(self, slot: _Slot, audio) -> None:
+        duration_ms = audio_duration_ms(audio)
+        now_ms = int(time.time() * 1000)
+        self._speaking_until_ms = max(self._speaking_until_ms, now_ms + duration_ms)
+        self._queue_wait_ms.append((time.perf_counter() - slot.accepted_ts) * 1000.0)
+        try:
+            self.sink.play(audio)
+        except Exception:
+            return
+        self._counters["played"] += 1
+        self._playing = slot
+        self._interrupt.clear()
+        try:
+            # Playback occupancy; lookahead synthesis keeps running meanwhile.
+            await asyncio.wait_for(self._interrupt.wait(), timeout=duration_ms / 1000.0)
+            self._counters["interrupted"] += 1
+            self._speaking_until_ms = int(time.time() * 1000)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._playing = None
+
+    def _fill_pipeline(self) -> None:
+        while len(self._pipeline) < self.lookahead:
+            with self._lock:
+                item = self.queue.pop_next(0)
+                accepted = self._accepted_ts.pop(id(item), None) if item else None
+            if not item:
+                return
+            self._pipeline.append(self._start_synthesis(item, accepted if accepted is not None else time.perf_counter()))
+
+    def _start_synthesis(self, item: SpeechItem, accepted: float) -> _Slot:
+        slot = _Slot(item, accepted)
+        slot.task = self._loop.create_task(self._synthesize(slot))
+        return slot
+
+    async def _synthesize(self, slot: _Slot):
+        item = slot.item
+        t0 = time.perf_counter()
+        call = partial(self.tts.synthesize, item.text, item.voice, item.prosody,
+                       seed=item.meta.seed, request_id=item.meta.request_id)
+        try:
+            audio = await self._loop.run_in_executor(self._executor, call)
+        except asyncio.CancelledError:
+            # The executor thread finishes on its own; its result is discarded.
+            self._counters["synth_cancelled"] += 1
+            raise
+        except Exception:
+            audio = None
+        slot.synth_ms = (time.perf_counter() - t0) * 1000.0
+        self._synth_ms.append(slot.synth_ms)
+        if not audio:
+            self._counters["synth_failed"] += 1
+        return audio
+
+    # --- loop-thread helpers ---
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _busy(self) -> bool:
+        return self._playing is not None or bool(self._pipeline)
+
+    def _accept(self, item: SpeechItem, accepted: float) -> None:
+        try:
+            meta = item.meta
+            self._counters["submitted"] += 1
+            if meta.is_emergency:
+                self._cancel_pipeline()
+                self._interrupt_playback()
+            elif meta.can_interrupt and self._busy():
+                self._interrupt_playback()
+                if meta.allow_overlap:
+                    # Jump ahead of the lookahead; already-synthesized items survive.
+                    self._pipeline.appendleft(self._start_synthesis(item, accepted))
+                    return
+                self._cancel_pipeline()
+                with self._lock:
+                    self.queue.clear("interrupt")
+                    self._accepted_ts.clear()
+            with self._lock:
+                self._accepted_ts[id(item)] = accepted
+                self.queue.submit(item)
+        finally:
+            if self._changed is not None:
+                self._changed.set()
+
+    def _flush(self, reason: str) -> None:
+        self._cancel_pipeline()
+        self._interrupt_playback()
+        with self._lock:
+            self.queue.clear(reason)
+            self._accepted_ts.clear()
+        if self._changed is not None:
+            self._changed.set()
+
+    def _interrupt_playback(self) -> None:
+        if self._playing is not None and self._interrupt is not None:
+            self._interrupt.set()
+            # the sink's audio too, not only the occupancy wait
+            try:
+                self.sink.interrupt()
+            except Exception:
+                pass
+
+    def _cancel_pipeline(self) -> None:
+        while self._pipeline:
+            slot = self._pipeline.popleft()
+            if slot.task is not None and not slot.task.done():
+                slot.task.cancel()
@@ -0,0 +1,211 @@
+"""Audio format normalization (NumPy, vectorized).
+
+Converts TTS output of any sample rate / sample width / channel count into the
+output device's native format once, so playback only hands ready int16 frames
+to the device. Fail-soft: unsupported input returns None (callers log the drop).
+"""
+import io
+import logging
+import wave
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+from .types import TTSAudio
+from .interfaces import TTSProvider
+from .loudness import loudness_gains
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is in requirements.txt
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DeviceFormat:
+    sample_rate: int = 48000
+    channels: int = 1
+
+
+def decode_audio(audio: TTSAudio) -> Optional[Tuple["np.ndarray", int]]:
+    """Decode TTSAudio to float32 frames shaped (n_frames, channels) in [-1, 1], plus its sample rate."""
+    if np is None or audio is None or not audio.pcm_bytes:
+        return None
+    fmt = getattr(audio, "format", "pcm_s16le")
+    if fmt == "pcm_s16le":
+        if not audio.sample_rate:
+            return None
+        channels = max(1, int(getattr(audio, "channels", 1) or 1))
+        raw = np.frombuffer(audio.pcm_bytes, dtype="<i2")
+        raw = raw[: (raw.size // channels) * channels]
+        return (raw.astype(np.float32) / 32768.0).reshape(-1, channels), int(audio.sample_rate)
+    if fmt != "wav":
+        return None
+    try:
+        with wave.open(io.BytesIO(audio.pcm_bytes), "rb") as wf:
+            sr = wf.getframerate()
+            channels = wf.getnchannels()
+            width = wf.getsampwidth()
+            frames = wf.readframes(wf.getnframes())
+    except Exception:
+        return None
+    if not sr or channels < 1:
+        return None
+    if width == 1:
+        data = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(frames, dtype=np.uint8)
+        b = b[: (b.size // 3) * 3].reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        v = np.where(v & 0x800000, v - 0x1000000, v)
+        data = v.astype(np.float32) / 8388608.0
+    elif width == 4:
+        data = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+    data = data[: (data.size // channels) * channels]
+    return data.reshape(-1, channels), int(sr)
+
+
+def remix(frames: "np.ndarray", channels: int) -> "np.ndarray":
+    """Downmix by averaging, upmix by repeating the mono mix."""
+    n = frames.shape[1]
+    if n == channels:
+        return frames
+    mono = frames.mean(axis=1, keepdims=True) if n > 1 else frames
+    return np.repeat(mono, channels, axis=1) if channels > 1 else mono
+
+
+def resample(frames: "np.ndarray", src_rate: int, dst_rate: int) -> "np.ndarray":
+    """Linear-interpolation resampling across all channels at once.
+
+    Downsampling first applies a box low-pass of the rate ratio to limit aliasing.
+    """
+    if src_rate == dst_rate or frames.shape[0] == 0:
+        return frames
+    n_src = frames.shape[0]
+    if dst_rate < src_rate:
+        k = int(round(src_rate / dst_rate))
+        if k > 1:
+            c = np.cumsum(np.vstack([np.zeros((1, frames.shape[1])), frames.astype(np.float64)]), axis=0)
+            smooth = (c[k:] - c[:-k]) / k
+            pad = np.repeat(smooth[-1:], k - 1, axis=0)
+            frames = np.vstack([smooth, pad]).astype(np.float32)
+    n_dst = max(1, int(round(n_src * dst_rate / src_rate)))
+    pos = np.arange(n_dst, dtype=np.float64) * (src_rate / dst_rate)
+    i0 = np.minimum(pos.astype(np.int64), n_src - 1)
+    i1 = np.minimum(i0 + 1, n_src - 1)
+    frac = (pos - i0).astype(np.float32)[:, None]
+    return frames[i0] * (1.0 - frac) + frames[i1] * frac
+
+
+def normalize_audio(audio: TTSAudio, target: DeviceFormat, target_lufs: Optional[float] = None) -> Optional[TTSAudio]:
+    """Convert to pcm_s16le at the target rate/channels. Already-native audio is returned as-is.
+
+    With `target_lufs`, the loudness gain is analyzed on the frames already decoded here
+    and stored on the result (audio that already carries a gain is not re-analyzed).
+    """
+    if audio is None:
+        return None
+    if is_native(audio, target):
+        if target_lufs is None or audio.gain is not None:
+            return audio
+        decoded = decode_audio(audio)
+        if decoded is None:
+            return audio
+        return replace(audio, gain=loudness_gains([decoded], target_lufs=target_lufs)[0])
+    decoded = decode_audio(audio)
+    if decoded is None:
+        return None
+    frames, sr = decoded
+    frames = resample(remix(frames, target.channels), sr, target.sample_rate)
+    gain = None
+    if target_lufs is not None:
+        gain = loudness_gains([(frames, target.sample_rate)], target_lufs=target_lufs)[0]
+    pcm = (np.clip(frames, -1.0, 1.0) * 32767.0).astype("<i2")
+    return TTSAudio(
+        sample_rate=target.sample_rate,
+        pcm_bytes=pcm.tobytes(),
+        duration_ms=int(pcm.shape[0] * 1000 / target.sample_rate),
+        format="pcm_s16le",
+        channels=target.channels,
+        gain=gain,
+    )
+
+
+def is_native(audio: TTSAudio, target: DeviceFormat) -> bool:
+    return (
+        getattr(audio, "format", None) == "pcm_s16le"
+        and audio.sample_rate == target.sample_rate
+        and getattr(audio, "channels", 1) == target.channels
+    )
+
+
+class NormalizingTTSProvider(TTSProvider):
+    """Wraps a provider so its output is converted to the device format at synthesis time.
+
+    With the async driver this runs in the executor, ahead of playback.
+    """
+
+    def __init__(self, inner: TTSProvider, target: DeviceFormat, target_lufs: Optional[float] = None):
+        self.inner = inner
+        self.target = target
+        self.target_lufs = target_lufs
+
+    def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+        audio = self.inner.synthesize(text, voice, prosody, seed=seed, request_id=request_id)
+        if audio is None:
+            return None
+        out = normalize_audio(audio, self.target, self.target_lufs)
+        if out is None:
+            logger.warning("Dropping TTS audio in unsupported format (format=%s)", getattr(audio, "format", None))
+        return out
+
+
+def normalize_wav_file(path: str, target_lufs: float) -> bool:
+    """Rewrite a WAV file with its loudness gain applied (16-bit, same rate/channels).
+
+    For play_wav (simpleaudio), which has no gain stage like DeviceWavSink's. Returns
+    False and leaves the file as is when it cannot be decoded.
+    """
+    try:
+        with open(path, "rb") as f:
+            decoded = decode_audio(TTSAudio(sample_rate=0, pcm_bytes=f.read(), format="wav"))
+        if decoded is None:
+            return False
+        frames, sr = decoded
+        gain = loudness_gains([decoded], target_lufs=target_lufs)[0]
+        pcm = (np.clip(frames * np.float32(gain), -1.0, 1.0) * 32767.0).astype("<i2")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(frames.shape[1])
+            wf.setsampwidth(2)
+            wf.setframerate(sr)
+            wf.writeframes(pcm.tobytes())
+        return True
+    except Exception:
+        logger.debug("loudness normalization failed for %s", path, exc_info=True)
+        return False
+
+
+class LoudnessNormalizingWavEngine:
+    """Wraps a WAV-writing engine (`synthesize(text, prosody, out_path) -> bool`, main.py's `tts`).
+
+    Every file it writes is loudness-normalized right after synthesis, on the thread that
+    synthesized (emit executor, prefetcher, IDLE pre-render), so playback only plays it.
+    """
+
+    def __init__(self, engine, target_lufs: float):
+        self.engine = engine
+        self.target_lufs = target_lufs
+
+    def synthesize(self, text, prosody, out_path) -> bool:
+        if not self.engine.synthesize(text, prosody, out_path):
+            return False
+        normalize_wav_file(out_path, self.target_lufs)
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
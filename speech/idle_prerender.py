@@ -0,0 +1,226 @@
+"""Speculative pre-rendering of the next IDLE line.
+
+While the bot is IDLE and CPU is below the ResourceWatcher warn level, the buffer
+asks a candidate function for the next likely idle/starter/aside chunk and
+synthesizes it in the background. The buffer is itself a TTSProvider wrapping the
+real one, so when a pre-rendered line is actually spoken it is served with no TTS
+wait. Any state change discards the buffer (in-flight results are dropped by
+generation). Under load it backs off exponentially; the watcher's `sample()` is run on
+the buffer's own thread every `sample_sec`, since its `tick()` only runs on the emit
+path. A rendered line expires after `max_age_sec`, and when the buffer is full the
+oldest line that is no longer a candidate makes room. Fail-soft throughout.
+
+main.py's emit path synthesizes with a file-writing engine (`synthesize(text, prosody,
+out_path) -> bool`); `WavFileTTSProvider` adapts it, and the rendered clip is kept as
+a WAV-format TTSAudio until `take()` hands it to playback.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from .types import VoiceSpec, TTSAudio
+from .interfaces import TTSProvider
+
+logger = logging.getLogger(__name__)
+
+
+def prerender_key(text, voice=None, prosody=None):
+    v = voice if voice is not None else VoiceSpec()
+    p = tuple(sorted((prosody or {}).items()))
+    return (str(text), v, p)
+
+
+class WavFileTTSProvider(TTSProvider):
+    """TTSProvider over an engine that synthesizes into a WAV file (main.py's `tts`)."""
+
+    def __init__(self, engine, tmp_dir: Optional[str] = None):
+        self.engine = engine
+        self.tmp_dir = tmp_dir
+
+    def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="idle_", dir=self.tmp_dir)
+        os.close(fd)
+        try:
+            if not self.engine.synthesize(text, dict(prosody or {}), path):
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            if not data:
+                return None
+            try:
+                with wave.open(path, "rb") as w:
+                    rate, channels = w.getframerate(), w.getnchannels()
+                    duration_ms = int(w.getnframes() * 1000 / max(1, rate))
+            except Exception:
+                rate, channels, duration_ms = 0, 1, None
+            return TTSAudio(sample_rate=rate, pcm_bytes=data, duration_ms=duration_ms, format="wav", channels=channels)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class IdlePrerenderBuffer(TTSProvider):
+    def __init__(self, tts: TTSProvider, resource_watcher=None, *, capacity: int = 2,
+                 backoff_base_sec: float = 5.0, backoff_max_sec: float = 120.0,
+                 max_age_sec: float = 120.0, sample_sec: float = 5.0,
+                 time_provider=None, executor=None):
+        self.tts = tts
+        self.resource_watcher = resource_watcher
+        self.capacity = max(1, int(capacity))
+        self.backoff_base = max(0.1, float(backoff_base_sec))
+        self.backoff_max = max(self.backoff_base, float(backoff_max_sec))
+        self.max_age = max(1.0, float(max_age_sec))
+        self.sample_sec = max(0.5, float(sample_sec))
+        self.tp = time_provider
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="idle-prerender")
+        self._lock = threading.Lock()
+        self._ready = OrderedDict()  # key -> (TTSAudio, rendered_at), oldest first
+        self._inflight = set()
+        self._generation = 0
+        self._state = None
+        self._backoff = 0.0
+        self._next_allowed = 0.0
+        self._sampled_at = None
+        self._sampling = False
+        self.stats = {"rendered": 0, "hits": 0, "misses": 0, "discarded": 0, "backoffs": 0, "evicted": 0}
+
+    def _now(self):
+        return self.tp.now() if self.tp is not None else time.time()
+
+    def _sample_load(self, now) -> None:
+        """Refresh the watcher's reading on the buffer's thread (probing blocks for ~0.1 s)."""
+        sample = getattr(self.resource_watcher, "sample", None)
+        if sample is None or self._sampling:
+            return
+        if self._sampled_at is not None and now - self._sampled_at < self.sample_sec:
+            return
+        self._sampled_at = now
+        self._sampling = True
+
+        def run():
+            try:
+                sample()
+            except Exception:
+                pass
+            finally:
+                self._sampling = False
+        try:
+            self._executor.submit(run)
+        except Exception:
+            self._sampling = False
+
+    def _evict(self, now, keep=()) -> None:
+        """Drop lines older than max_age; if still full, the oldest line not in `keep`. Caller holds the lock."""
+        ready = self._ready
+        while ready:
+            key, (_, at) = next(iter(ready.items()))
+            if now - at < self.max_age:
+                break
+            del ready[key]
+            self.stats["evicted"] += 1
+        if keep is not None and len(ready) + len(self._inflight) >= self.capacity:
+            for key in ready:
+                if key not in keep:
+                    del ready[key]
+                    self.stats["evicted"] += 1
+                    break
+
+    def _under_load(self) -> bool:
+        rw = self.resource_watcher
+        if rw is None:
+            return False
+        try:
+            cpu = (getattr(rw, "last_metrics", None) or {}).get("cpu")
+            load = cpu if cpu is not None else getattr(rw, "last_danger", 0.0)
+            return getattr(rw, "last_level", "ok") != "ok" or float(load or 0.0) >= float(rw.warn)
+        except Exception:
+            return False
+
+    def tick(self, state, candidates: Callable[[], Iterable[dict]]) -> int:
+        """Call from the idle loop. Returns the number of renders started."""
+        sname = getattr(state, "name", state)
+        if sname != self._state:
+            if self._state is not None:
+                self.discard()
+            self._state = sname
+        if sname != "IDLE":
+            return 0
+        now = self._now()
+        with self._lock:
+            self._evict(now, keep=None)
+        if now < self._next_allowed:
+            return 0
+        self._sample_load(now)
+        if self._under_load():
+            self._backoff = min(self.backoff_max, self._backoff * 2 if self._backoff else self.backoff_base)
+            self._next_allowed = now + self._backoff
+            self.stats["backoffs"] += 1
+            return 0
+        self._backoff = 0.0
+        started = 0
+        try:
+            keys = []
+            for chunk in candidates() or ():
+                text = (chunk or {}).get("text")
+                if text and str(text).strip():
+                    keys.append(prerender_key(text, chunk.get("voice"), chunk.get("prosody")))
+            wanted = set(keys)
+            for key in keys:
+                with self._lock:
+                    if key in self._ready or key in self._inflight:
+                        continue
+                    self._evict(now, keep=wanted)
+                    if len(self._ready) + len(self._inflight) >= self.capacity:
+                        break
+                    self._inflight.add(key)
+                    gen = self._generation
+                self._executor.submit(self._render, key, gen)
+                started += 1
+        except Exception:
+            logger.debug("idle prerender candidates failed", exc_info=True)
+        return started
+
+    def _render(self, key, gen) -> None:
+        text, voice, prosody = key
+        try:
+            audio = self.tts.synthesize(text, voice, dict(prosody))
+        except Exception:
+            audio = None
+        with self._lock:
+            self._inflight.discard(key)
+            if audio is None or gen != self._generation:
+                return
+            self._ready[key] = (audio, self._now())
+            self.stats["rendered"] += 1
+
+    def take(self, text, voice=None, prosody=None) -> Optional[TTSAudio]:
+        key = prerender_key(text, voice, prosody)
+        with self._lock:
+            entry = self._ready.pop(key, None)
+            self.stats["hits" if entry is not None else "misses"] += 1
+        return entry[0] if entry is not None else None
+
+    def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+        audio = self.take(text, voice, prosody)
+        if audio is not None:
+            return audio
+        return self.tts.synthesize(text, voice, prosody, seed=seed, request_id=request_id)
+
+    def discard(self) -> None:
+        with self._lock:
+            self.stats["discarded"] += len(self._ready)
+            self._ready.clear()
+            self._inflight.clear()
+            self._generation += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ready)
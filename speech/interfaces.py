@@ -15,6 +15,10 @@ class AudioSink(ABC):
     def stop(self) -> None:
         pass
 
+    def interrupt(self) -> None:
+        """Cut the clip that is playing and drop queued ones; unlike stop(), the sink stays usable."""
+        pass
+
 class NullTTSProvider(TTSProvider):
     def synthesize(self, text: str, voice: VoiceSpec, prosody: Prosody, *, seed: int = None, request_id: str = None) -> TTSAudio | None:
         return None
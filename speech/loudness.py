@@ -0,0 +1,128 @@
+"""Integrated loudness (EBU R128 / ITU-R BS.1770 style), vectorized in NumPy.
+
+Used once per clip when audio enters the sink cache: the result is stored as a
+linear gain on TTSAudio and applied while the already-decoded int16 frames are
+handed to the device, so playback never decodes again. For play_wav (no gain stage)
+the gain is baked into the WAV right after synthesis (audio_format.normalize_wav_file).
+`analyze_batch` runs several clips through one FFT per sample-rate group.
+
+K-weighting is applied in the frequency domain (the two BS.1770 biquads evaluated
+at the FFT bins), so there is no per-sample Python loop.
+"""
+import math
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is in requirements.txt
+    np = None
+
+ABS_GATE_LUFS = -70.0
+REL_GATE_LU = -10.0
+BLOCK_SEC = 0.4
+HOP_SEC = 0.1
+
+
+def _biquad_response(b, a, z1, z2):
+    return (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+
+
+def _k_weighting_response(n_fft: int, sr: int) -> "np.ndarray":
+    """Complex response of the BS.1770 pre-filter (high shelf + RLB high-pass) at rfft bins."""
+    # stage 1: high shelf, +4 dB above ~1.5 kHz
+    A = 10 ** (4.0 / 40.0)
+    w0 = 2 * math.pi * 1500.0 / sr
+    alpha = math.sin(w0) / (2 * (1 / math.sqrt(2)))
+    cw, sa = math.cos(w0), 2 * math.sqrt(A) * alpha
+    shelf_b = (A * ((A + 1) + (A - 1) * cw + sa), -2 * A * ((A - 1) + (A + 1) * cw), A * ((A + 1) + (A - 1) * cw - sa))
+    shelf_a = ((A + 1) - (A - 1) * cw + sa, 2 * ((A - 1) - (A + 1) * cw), (A + 1) - (A - 1) * cw - sa)
+    # stage 2: high-pass at 38 Hz
+    w0 = 2 * math.pi * 38.0 / sr
+    alpha = math.sin(w0) / (2 * 0.5)
+    cw = math.cos(w0)
+    hp_b = ((1 + cw) / 2, -(1 + cw), (1 + cw) / 2)
+    hp_a = (1 + alpha, -2 * cw, 1 - alpha)
+    w = 2 * np.pi * np.fft.rfftfreq(n_fft, d=1.0 / sr) / sr
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+    return _biquad_response(shelf_b, shelf_a, z1, z2) * _biquad_response(hp_b, hp_a, z1, z2)
+
+
+def _loudness_group(frames: Sequence["np.ndarray"], sr: int) -> List[float]:
+    """Integrated loudness for clips sharing one sample rate, in a single batched FFT."""
+    lengths = np.array([f.shape[0] for f in frames], dtype=np.int64)
+    channels = max(f.shape[1] for f in frames)
+    n_max = int(lengths.max())
+    # zero tail so the IIR response decays instead of wrapping around
+    n_fft = 1 << int(math.ceil(math.log2(n_max + sr // 2 + 1)))
+    batch = np.zeros((len(frames), n_fft, channels), dtype=np.float32)
+    for i, f in enumerate(frames):
+        batch[i, : f.shape[0], : f.shape[1]] = f
+    spec = np.fft.rfft(batch, axis=1) * _k_weighting_response(n_fft, sr)[None, :, None]
+    y = np.fft.irfft(spec, n=n_fft, axis=1)[:, :n_max]
+    power = np.square(y).sum(axis=2)  # channel weights are 1 for mono/stereo
+    csum = np.concatenate([np.zeros((len(frames), 1)), np.cumsum(power, axis=1)], axis=1)
+
+    block = max(1, int(round(BLOCK_SEC * sr)))
+    hop = max(1, int(round(HOP_SEC * sr)))
+    blen = np.minimum(block, np.maximum(lengths, 1))
+    n_blocks = np.where(lengths >= block, 1 + (lengths - block) // hop, 1)
+    starts = np.arange(int(n_blocks.max()), dtype=np.int64)[None, :] * hop
+    valid = np.arange(starts.shape[1])[None, :] < n_blocks[:, None]
+    starts = np.where(valid, starts, 0)
+    ends = np.minimum(starts + blen[:, None], n_max)
+    z = (np.take_along_axis(csum, ends, axis=1) - np.take_along_axis(csum, starts, axis=1)) / blen[:, None]
+
+    with np.errstate(divide="ignore"):
+        lk = -0.691 + 10 * np.log10(z)
+        gated = valid & (lk > ABS_GATE_LUFS)
+        cnt = gated.sum(axis=1)
+        mean_abs = np.where(cnt > 0, (z * gated).sum(axis=1) / np.maximum(cnt, 1), 0.0)
+        rel = -0.691 + 10 * np.log10(mean_abs) + REL_GATE_LU
+        gated &= lk > rel[:, None]
+        cnt = gated.sum(axis=1)
+        mean_rel = (z * gated).sum(axis=1) / np.maximum(cnt, 1)
+        out = np.where(cnt > 0, -0.691 + 10 * np.log10(mean_rel), -np.inf)
+    return [float(v) for v in out]
+
+
+def analyze_batch(clips: Sequence[Tuple["np.ndarray", int]]) -> List[float]:
+    """Integrated loudness (LUFS) per (frames, sample_rate) clip; silence is -inf."""
+    out = [float("-inf")] * len(clips)
+    groups = {}
+    for i, (frames, sr) in enumerate(clips):
+        if frames is not None and frames.size:
+            groups.setdefault(int(sr), []).append(i)
+    for sr, idx in groups.items():
+        for i, lufs in zip(idx, _loudness_group([clips[i][0] for i in idx], sr)):
+            out[i] = lufs
+    return out
+
+
+def integrated_loudness(frames: "np.ndarray", sr: int) -> float:
+    return analyze_batch([(frames, sr)])[0]
+
+
+def loudness_gain(lufs: float, peak: float, *, target_lufs: float = -18.0, max_gain_db: float = 12.0,
+                  peak_ceiling: float = 0.98) -> float:
+    """Linear gain bringing `lufs` to target; boost is capped at max_gain_db and by the peak ceiling."""
+    if not math.isfinite(lufs):
+        return 1.0
+    db = min(max_gain_db, target_lufs - lufs)
+    gain = 10 ** (db / 20.0)
+    if peak > 0:
+        gain = min(gain, peak_ceiling / peak)
+    return float(gain)
+
+
+def loudness_gains(clips: Sequence[Tuple["np.ndarray", int]], *, target_lufs: float = -18.0,
+                   max_gain_db: float = 12.0, peak_ceiling: float = 0.98) -> List[float]:
+    """Batched analysis -> playback gain per clip."""
+    if np is None:
+        return [1.0] * len(clips)
+    gains = []
+    for (frames, _), lufs in zip(clips, analyze_batch(clips)):
+        peak = float(np.abs(frames).max()) if frames is not None and frames.size else 0.0
+        gains.append(loudness_gain(lufs, peak, target_lufs=target_lufs, max_gain_db=max_gain_db,
+                                   peak_ceiling=peak_ceiling))
+    return gains
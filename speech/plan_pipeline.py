@@ -0,0 +1,281 @@
+"""Staged emission of a whole speech plan.
+
+- stage 1 (prepare): OSC params and prosody for every chunk, before anything plays
+- stage 2 (synthesize): up to `lookahead` chunks ahead of playback, on an executor
+- stage 3 (play): chunks start on a shared playback clock (previous chunk's audio end +
+  its pause). A chunk's OSC params are sent at the moment its audio starts, right
+  before the blocking play call is handed to the executor, so face changes line up
+  with the voice instead of the synthesis.
+
+`preempt(reason)` (any thread) cancels a running plan mid-chunk: `stop_audio` cuts the
+clip that is playing, the playback stage is cancelled, and `on_preempt(reason, chunk)`
+runs on the loop (main snaps the face to the new state there). preempt_ms in the report
+is the time from the preempt() call until on_preempt returned.
+
+The callables are injected (main.emit_plan wires tts/play_wav/OSC), so this module has
+no audio or OSC dependency. `run()` returns a report with per-chunk timing: synthesis
+time, planned vs actual start on the playback clock (late_ms = synthesis stall), and
+the gap after the previous chunk's audio.
+
+Every plan synthesizes into its own files (`plan_<pid>_<plan>_<index>.wav`), removed
+when the plan ends. A synthesis thread left running by a cancelled plan keeps writing
+to its own file, never to one the next plan (e.g. the alert after a preemption) plays.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_plan_ids = itertools.count(1)
+
+
+def _remove(path) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class PreparedChunk:
+    __slots__ = ("index", "id", "text", "params", "prosody", "pause_s", "path", "task",
+                 "synth_ms", "planned", "start", "end", "discard")
+
+    def __init__(self, index, cid, text, params, prosody, pause_s):
+        self.index = index
+        self.id = cid
+        self.text = text
+        self.params = params
+        self.prosody = prosody
+        self.pause_s = pause_s
+        self.path = None
+        self.task = None
+        self.synth_ms = None
+        self.planned = None
+        self.start = None
+        self.end = None
+        self.discard = False
+
+
+class PlaybackClock:
+    """Seconds since the plan started; every stage reads the same clock."""
+
+    def __init__(self, time_fn: Callable[[], float] = time.perf_counter):
+        self._time = time_fn
+        self.t0 = None
+
+    def start(self) -> None:
+        self.t0 = self._time()
+
+    def now(self) -> float:
+        return self._time() - self.t0
+
+
+class PlanPipeline:
+    def __init__(self, *, prepare: Callable, synthesize: Optional[Callable], play: Optional[Callable],
+                 send_osc: Callable, on_chunk_start: Optional[Callable] = None,
+                 on_chunk_done: Optional[Callable] = None, lookahead: int = 2, executor=None,
+                 tmp_dir: str = "./tmp", time_fn: Callable[[], float] = time.perf_counter,
+                 stop_audio: Optional[Callable] = None, on_preempt: Optional[Callable] = None,
+                 extra_pause_ms: Optional[Callable] = None):
+        """prepare(chunk) -> (params, prosody) or None to skip audio for the chunk;
+        synthesize(text, prosody, path) -> bool and play(path) are blocking and run on
+        `executor`; send_osc(params, chunk) / on_chunk_start(chunk) / on_chunk_done(chunk)
+        and on_preempt(reason, chunk) run on the loop; stop_audio() is called from the
+        thread that calls preempt(); extra_pause_ms(chunk) is added to the chunk's pause_ms
+        on the playback clock (main: the speaker's response delay)."""
+        self.prepare = prepare
+        self.synthesize = synthesize
+        self.play = play
+        self.send_osc = send_osc
+        self.on_chunk_start = on_chunk_start
+        self.on_chunk_done = on_chunk_done
+        self.lookahead = max(1, int(lookahead))
+        self._executor = executor
+        self.tmp_dir = tmp_dir
+        self.stop_audio = stop_audio
+        self.on_preempt = on_preempt
+        self.extra_pause_ms = extra_pause_ms
+        self.clock = PlaybackClock(time_fn)
+        self._loop = None
+        self._body = None
+        self._current = None
+        self.preempted = None
+        self._preempt_t0 = None
+        self._plan_id = None
+
+    # --- stage 1 ---
+    def _prepare_all(self, chunks) -> List[PreparedChunk]:
+        out = []
+        for i, c in enumerate(chunks):
+            try:
+                prepared = self.prepare(c)
+            except Exception:
+                logger.debug("prepare failed for chunk %s", c.get("id"), exc_info=True)
+                prepared = None
+            params, prosody = prepared if prepared else ({}, None)
+            try:
+                pause_ms = float(c.get("pause_ms", 120))
+                if self.extra_pause_ms is not None:
+                    pause_ms += float(self.extra_pause_ms(c) or 0.0)
+                pause_s = max(0.0, pause_ms / 1000.0)
+            except Exception:
+                pause_s = 0.12
+            out.append(PreparedChunk(i, c.get("id"), c.get("text") or "", params or {}, prosody, pause_s))
+        return out
+
+    # --- stage 2 ---
+    def _start_synthesis(self, pc: PreparedChunk) -> None:
+        if pc.task is not None or not (self.synthesize and self.play and pc.text and pc.prosody):
+            return
+        pc.path = os.path.join(self.tmp_dir, f"plan_{os.getpid()}_{self._plan_id}_{pc.index}.wav")
+        pc.task = self._loop.create_task(self._synthesize(pc))
+
+    async def _synthesize(self, pc: PreparedChunk) -> bool:
+        t0 = time.perf_counter()
+        try:
+            return bool(await self._loop.run_in_executor(self._executor, self._synth_job, pc))
+        except Exception:
+            logger.warning("plan synthesis failed for chunk %s", pc.id, exc_info=True)
+            return False
+        finally:
+            pc.synth_ms = (time.perf_counter() - t0) * 1000.0
+
+    def _synth_job(self, pc: PreparedChunk):
+        try:
+            return self.synthesize(pc.text, pc.prosody, pc.path)
+        finally:
+            # the plan ended while this ran (cancelled/preempted): nothing will play the file
+            if pc.discard:
+                _remove(pc.path)
+
+    # --- stage 3 ---
+    async def run(self, chunks) -> dict:
+        self._loop = asyncio.get_running_loop()
+        t_wall = time.perf_counter()
+        prepared = self._prepare_all(chunks)
+        try:
+            os.makedirs(self.tmp_dir, exist_ok=True)
+        except Exception:
+            pass
+        self.preempted = None
+        self._plan_id = next(_plan_ids)
+        preempt_ms = None
+        self.clock.start()
+        for pc in prepared[:self.lookahead + 1]:
+            self._start_synthesis(pc)
+        self._body = self._loop.create_task(self._play_all(prepared, chunks))
+        try:
+            await self._body
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if self.preempted is None or (task is not None and task.cancelling()):
+                raise
+            pc = self._current
+            if pc is not None and pc.end is None:
+                pc.end = self.clock.now()
+            self._call(self.on_preempt, self.preempted, chunks[pc.index] if pc is not None else None)
+            preempt_ms = round((time.perf_counter() - self._preempt_t0) * 1000.0, 3)
+        finally:
+            self._body = None
+            for pc in prepared:
+                if pc.task is not None and not pc.task.done():
+                    pc.task.cancel()
+                if pc.path is not None:
+                    pc.discard = True
+                    _remove(pc.path)
+        report = self._report(prepared, (time.perf_counter() - t_wall) * 1000.0)
+        report["preempted"] = self.preempted
+        report["preempt_ms"] = preempt_ms
+        return report
+
+    async def _play_all(self, prepared, chunks) -> None:
+        next_start = 0.0
+        for i, pc in enumerate(prepared):
+            self._current = pc
+            pc.planned = next_start
+            wait = next_start - self.clock.now()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            ok = False
+            if pc.task is not None:
+                ok = await pc.task
+            pc.start = self.clock.now()
+            # face change and audio start together
+            self._call(self.send_osc, pc.params, chunks[i])
+            self._call(self.on_chunk_start, chunks[i])
+            if i + self.lookahead + 1 < len(prepared):
+                self._start_synthesis(prepared[i + self.lookahead + 1])
+            if ok:
+                try:
+                    await self._loop.run_in_executor(self._executor, self.play, pc.path)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.warning("plan playback failed for chunk %s", pc.id, exc_info=True)
+            pc.end = self.clock.now()
+            self._call(self.on_chunk_done, chunks[i])
+            next_start = pc.end + pc.pause_s
+        self._current = None
+        # the last pause still separates this plan from whatever is emitted next
+        wait = next_start - self.clock.now()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def preempt(self, reason: str = "interrupt") -> bool:
+        """Cancel the running plan mid-chunk (thread-safe). False when nothing is running."""
+        loop, body = self._loop, self._body
+        if loop is None or body is None or body.done() or self.preempted is not None:
+            return False
+        self._preempt_t0 = time.perf_counter()
+        self.preempted = reason
+        if self.stop_audio is not None:
+            try:
+                self.stop_audio()
+            except Exception:
+                logger.debug("plan pipeline stop_audio failed", exc_info=True)
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            body.cancel()
+        else:
+            loop.call_soon_threadsafe(body.cancel)
+        return True
+
+    def _call(self, fn, *args) -> None:
+        if fn is None:
+            return
+        try:
+            fn(*args)
+        except Exception:
+            logger.debug("plan pipeline callback failed", exc_info=True)
+
+    @staticmethod
+    def _report(prepared, wall_ms) -> dict:
+        rows = []
+        prev = None
+        for pc in prepared:
+            if pc.start is None:
+                break
+            rows.append({
+                "id": pc.id,
+                "synth_ms": None if pc.synth_ms is None else round(pc.synth_ms, 3),
+                "start_ms": round(pc.start * 1000.0, 3),
+                "end_ms": round(pc.end * 1000.0, 3),
+                "late_ms": round(max(0.0, pc.start - pc.planned) * 1000.0, 3),
+                "gap_ms": None if prev is None else round((pc.start - prev.end) * 1000.0, 3),
+            })
+            prev = pc
+        gaps = [r["gap_ms"] for r in rows if r["gap_ms"] is not None]
+        return {
+            "wall_ms": round(wall_ms, 3),
+            "chunks": rows,
+            "max_gap_ms": max(gaps) if gaps else 0.0,
+            "mean_gap_ms": round(sum(gaps) / len(gaps), 3) if gaps else 0.0,
+            "late_ms": round(sum(r["late_ms"] for r in rows), 3),
+        }
@@ -0,0 +1,190 @@
+"""Composite TTSProvider: latency-aware routing, hedged requests and circuit breaking.
+
+Each backend keeps a rolling window of latencies and outcomes. Requests go to the
+fastest healthy backend; if it has not answered by its own latency percentile
+(`hedge_percentile`), the next backend is raced against it. Backends that fail
+`failure_threshold` times in a row are skipped for `open_sec`, then retried with
+a single half-open probe that runs beside the routed request (its result only
+updates health). Fail-soft: returns None when every backend fails.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, List, Tuple
+
+from ..types import TTSAudio, VoiceSpec, Prosody
+from ..interfaces import TTSProvider
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    idx = min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))
+    return float(s[idx])
+
+
+class _Backend:
+    __slots__ = ("name", "provider", "latencies_ms", "outcomes", "consecutive_failures",
+                 "state", "open_until", "probe_inflight", "requests", "wins", "hedged")
+
+    def __init__(self, name, provider, window):
+        self.name = name
+        self.provider = provider
+        self.latencies_ms = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.probe_inflight = False
+        self.requests = 0
+        self.wins = 0
+        self.hedged = 0
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - (sum(1 for ok in self.outcomes if ok) / len(self.outcomes))
+
+
+class FallbackTTSProvider(TTSProvider):
+    def __init__(self, backends: List[Tuple[str, TTSProvider]], *, hedge_percentile: float = 0.9,
+                 hedge_min_ms: float = 150.0, hedge_default_ms: float = 800.0, min_samples: int = 5,
+                 failure_threshold: int = 3, open_sec: float = 30.0, window: int = 32,
+                 clock=None, executor=None):
+        self._backends = [_Backend(name, p, max(4, int(window))) for name, p in backends if p is not None]
+        self.hedge_percentile = max(0.5, min(0.99, float(hedge_percentile)))
+        self.hedge_min_ms = max(0.0, float(hedge_min_ms))
+        self.hedge_default_ms = max(self.hedge_min_ms, float(hedge_default_ms))
+        self.min_samples = max(1, int(min_samples))
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.open_sec = max(0.0, float(open_sec))
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max(2, 2 * len(self._backends)), thread_name_prefix="tts-fallback")
+
+    # --- TTSProvider ---
+    def synthesize(self, text: str, voice: VoiceSpec, prosody: Prosody, *, seed: Optional[int] = None, request_id: Optional[str] = None) -> Optional[TTSAudio]:
+        if not text or not text.strip():
+            return None
+        try:
+            order, probes = self._route()
+            pending = {}
+
+            def launch(b, hedge=False):
+                with self._lock:
+                    b.requests += 1
+                    if hedge:
+                        b.hedged += 1
+                t0 = self._clock()
+                fut = self._executor.submit(b.provider.synthesize, text, voice, prosody, seed=seed, request_id=request_id)
+                fut.add_done_callback(lambda f, b=b, t0=t0: self._record(b, t0, f))
+                return fut
+
+            if not order:
+                # Nothing healthy: the probes carry the request.
+                order, probes = probes, []
+            for b in probes:
+                launch(b)
+            if not order:
+                return None
+            pending[launch(order[0])] = order[0]
+            launched = 1
+            hedge_after = self.hedge_delay_ms(order[0]) / 1000.0
+            while pending:
+                can_hedge = launched < len(order)
+                done, _ = wait(list(pending), timeout=hedge_after if can_hedge else None, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than its usual percentile: race the next backend.
+                    pending[launch(order[launched], hedge=True)] = order[launched]
+                    launched += 1
+                    hedge_after = None
+                    continue
+                for fut in done:
+                    b = pending.pop(fut)
+                    audio = self._result(fut)
+                    if audio:
+                        with self._lock:
+                            b.wins += 1
+                        return audio
+                # Failed outright: fall through to the next backend immediately.
+                if not pending and launched < len(order):
+                    pending[launch(order[launched])] = order[launched]
+                    launched += 1
+                    hedge_after = self.hedge_delay_ms(order[launched - 1]) / 1000.0
+            return None
+        except Exception:
+            return None
+
+    # --- routing / health ---
+    def hedge_delay_ms(self, backend: _Backend) -> float:
+        with self._lock:
+            samples = list(backend.latencies_ms)
+        if len(samples) < self.min_samples:
+            return self.hedge_default_ms
+        return max(self.hedge_min_ms, _percentile(samples, self.hedge_percentile))
+
+    def _route(self):
+        """Returns (closed backends ranked fastest-first, half-open backends due for a probe)."""
+        now = self._clock()
+        ranked = []
+        probes = []
+        with self._lock:
+            for idx, b in enumerate(self._backends):
+                if b.state == OPEN:
+                    if now < b.open_until:
+                        continue
+                    b.state = HALF_OPEN
+                    b.probe_inflight = False
+                if b.state == HALF_OPEN:
+                    if not b.probe_inflight:
+                        b.probe_inflight = True
+                        probes.append(b)
+                    continue
+                p50 = _percentile(b.latencies_ms, 0.5) if b.latencies_ms else 0.0
+                ranked.append((b.error_rate() > 0.5, p50, idx, b))
+        ranked.sort(key=lambda r: r[:3])
+        return [r[3] for r in ranked], probes
+
+    def _result(self, fut):
+        try:
+            return fut.result()
+        except Exception:
+            return None
+
+    def _record(self, b: _Backend, t0: float, fut) -> None:
+        ok = bool(self._result(fut))
+        elapsed_ms = (self._clock() - t0) * 1000.0
+        with self._lock:
+            b.outcomes.append(ok)
+            if ok:
+                b.latencies_ms.append(elapsed_ms)
+                b.consecutive_failures = 0
+                b.state = CLOSED
+            else:
+                b.consecutive_failures += 1
+                if b.state == HALF_OPEN or b.consecutive_failures >= self.failure_threshold:
+                    b.state = OPEN
+                    b.open_until = self._clock() + self.open_sec
+            b.probe_inflight = False
+
+    def metrics(self) -> dict:
+        out = {}
+        with self._lock:
+            for b in self._backends:
+                out[b.name] = {
+                    "state": b.state,
+                    "p50_ms": _percentile(b.latencies_ms, 0.5),
+                    "p90_ms": _percentile(b.latencies_ms, 0.9),
+                    "error_rate": round(b.error_rate(), 3),
+                    "requests": b.requests,
+                    "wins": b.wins,
+                    "hedged": b.hedged,
+                }
+        return out
@@ -0,0 +1,42 @@
+import os
+import tempfile
+from typing import Optional
+from ..types import TTSAudio, VoiceSpec, Prosody
+from ..interfaces import TTSProvider
+
+
+class StyleBertVits2TTSProvider(TTSProvider):
+    """Adapts the path-based audio.tts_style_bert_vits2.StyleBertVITS2 engine to TTSProvider (WAV bytes)."""
+
+    def __init__(self, model_path: str = "./models/sbv2", speaker_id: int = 0, engine=None):
+        if engine is None:
+            from audio.tts_style_bert_vits2 import StyleBertVITS2
+            engine = StyleBertVITS2(model_path=model_path, speaker_id=speaker_id)
+        self.engine = engine
+
+    def synthesize(self, text: str, voice: VoiceSpec, prosody: Prosody, *, seed: Optional[int] = None, request_id: Optional[str] = None) -> Optional[TTSAudio]:
+        if not text or not text.strip():
+            return None
+        fd, out_path = tempfile.mkstemp(suffix=".wav", prefix="sbv2_")
+        os.close(fd)
+        try:
+            p = prosody or {}
+            knobs = {
+                "pitch": p.get("pitch", 1.0),
+                "speed": p.get("speed", p.get("rate", 1.0)),
+                "energy": p.get("energy", 1.0),
+            }
+            if not self.engine.synthesize(text, knobs, out_path):
+                return None
+            with open(out_path, "rb") as f:
+                wav_bytes = f.read()
+            if not wav_bytes:
+                return None
+            return TTSAudio(sample_rate=0, pcm_bytes=wav_bytes, duration_ms=None, format="wav")
+        except Exception:
+            return None
+        finally:
+            try:
+                os.remove(out_path)
+            except Exception:
+                pass
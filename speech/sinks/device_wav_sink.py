@@ -1,11 +1,16 @@
+import logging
 import threading
 import queue
-import wave
+from collections import OrderedDict
 from typing import Optional
 from ..types import TTSAudio
 from ..interfaces import AudioSink, NullAudioSink
+from ..audio_format import DeviceFormat, normalize_audio
 
-def create_device_wav_sink(name_contains: str, *, enabled: bool = True) -> AudioSink:
+logger = logging.getLogger(__name__)
+
+
+def create_device_wav_sink(name_contains: str, *, enabled: bool = True, target_lufs: Optional[float] = None) -> AudioSink:
     try:
         import sounddevice as sd
         import numpy as np
@@ -13,28 +18,59 @@ def create_device_wav_sink(name_contains: str, *, enabled: bool = True) -> Audio
         return NullAudioSink()
     if not enabled:
         return NullAudioSink()
-    return DeviceWavSink(name_contains)
+    return DeviceWavSink(name_contains, target_lufs=target_lufs)
+
 
 class DeviceWavSink(AudioSink):
-    def __init__(self, name_contains: str, sample_rate_fallback: int = 48000, queue_max: int = 8):
+    """Plays TTS audio on the output device whose name contains `name_contains`.
+
+    Audio is converted to the device's native format once, when it enters the sink
+    (or earlier via NormalizingTTSProvider); the worker only hands int16 frames to the device.
+    With `target_lufs`, a loudness gain is analyzed at that point too and applied to the
+    frames during playback.
+    """
+
+    def __init__(self, name_contains: str, sample_rate_fallback: int = 48000, queue_max: int = 8,
+                 cache_max: int = 16, sd_module=None, target_lufs: Optional[float] = None):
         self.name_contains = name_contains
+        self.target_lufs = target_lufs
         self.sample_rate_fallback = sample_rate_fallback
+        self._sd = sd_module
         self._queue = queue.Queue(maxsize=queue_max)
+        self._cache = OrderedDict()  # (len, hash) of source bytes -> normalized TTSAudio
+        self._cache_max = max(0, int(cache_max))
+        self._cache_lock = threading.Lock()
+        self.dropped = 0
+        self.device_idx = None
+        self.format = DeviceFormat(sample_rate=sample_rate_fallback, channels=1)
+        sd = self._sounddevice()
+        if sd is not None:
+            self.device_idx = self._find_device(sd, name_contains)
+            self.format = self._native_format(sd, self.device_idx)
         self._thread = threading.Thread(target=self._worker, daemon=True)
         self._stop = threading.Event()
         self._thread.start()
 
+    def native_format(self) -> DeviceFormat:
+        return self.format
+
     def play(self, audio: TTSAudio) -> bool:
-        if not audio or getattr(audio, "format", None) != "wav" or not getattr(audio, "pcm_bytes", None):
+        if not audio or not getattr(audio, "pcm_bytes", None):
+            return False
+        ready = self._prepare(audio)
+        if ready is None:
+            self.dropped += 1
+            logger.warning("DeviceWavSink: dropping clip in unsupported format (format=%s)", getattr(audio, "format", None))
             return False
         try:
             # Drop oldest if full (deterministic)
             if self._queue.full():
                 try:
                     self._queue.get_nowait()
+                    self.dropped += 1
                 except Exception:
                     pass
-            self._queue.put_nowait(audio.pcm_bytes)
+            self._queue.put_nowait(ready)
             return True
         except Exception:
             return False
@@ -46,6 +82,69 @@ class DeviceWavSink(AudioSink):
         except Exception:
             pass
 
+    def interrupt(self) -> None:
+        while True:
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                break
+        sd = self._sounddevice()
+        if sd is not None:
+            try:
+                sd.stop()  # the worker's blocking sd.play returns
+            except Exception:
+                logger.debug("DeviceWavSink: stop failed", exc_info=True)
+
+    @staticmethod
+    def _cache_key(audio: TTSAudio):
+        return (len(audio.pcm_bytes), hash(audio.pcm_bytes), audio.format, audio.sample_rate, getattr(audio, "channels", 1))
+
+    def _remember(self, key, ready: TTSAudio) -> None:
+        if not self._cache_max:
+            return
+        with self._cache_lock:
+            self._cache[key] = ready
+            while len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+
+    def _prepare(self, audio: TTSAudio) -> Optional[TTSAudio]:
+        """Normalize (and analyze loudness) once per distinct clip; replays hit the cache."""
+        key = self._cache_key(audio)
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        try:
+            ready = normalize_audio(audio, self.format, self.target_lufs)
+        except Exception:
+            ready = None
+        if ready is not None:
+            self._remember(key, ready)
+        return ready
+
+    def _sounddevice(self):
+        if self._sd is not None:
+            return self._sd
+        try:
+            import sounddevice as sd
+            self._sd = sd
+        except ImportError:
+            return None
+        return self._sd
+
+    def _native_format(self, sd, device_idx) -> DeviceFormat:
+        try:
+            if device_idx is not None:
+                info = sd.query_devices(device_idx)
+                sr = int(info.get("default_samplerate") or self.sample_rate_fallback)
+                channels = max(1, min(2, int(info.get("max_output_channels", 1) or 1)))
+                return DeviceFormat(sample_rate=sr, channels=channels)
+        except Exception:
+            pass
+        return DeviceFormat(sample_rate=self.sample_rate_fallback, channels=1)
+
     def _find_device(self, sd, name_contains: str) -> Optional[int]:
         try:
             devices = sd.query_devices()
@@ -57,37 +156,32 @@ class DeviceWavSink(AudioSink):
         return None
 
     def _worker(self):
+        sd = self._sounddevice()
         try:
-            import sounddevice as sd
             import numpy as np
         except ImportError:
             return
-        device_idx = self._find_device(sd, self.name_contains)
+        if sd is None:
+            return
         while not self._stop.is_set():
             try:
-                wav_bytes = self._queue.get(timeout=0.1)
+                audio = self._queue.get(timeout=0.1)
             except queue.Empty:
                 continue
             try:
-                with wave.open(io.BytesIO(wav_bytes), 'rb') as wf:
-                    sr = wf.getframerate() or self.sample_rate_fallback
-                    n_channels = wf.getnchannels()
-                    sampwidth = wf.getsampwidth()
-                    frames = wf.readframes(wf.getnframes())
-                if sampwidth != 2:
-                    continue  # Only support 16-bit PCM
-                arr = np.frombuffer(frames, dtype=np.int16)
-                if n_channels > 1:
-                    arr = arr.reshape(-1, n_channels)
-                # Re-query device if not found
-                if device_idx is None:
-                    device_idx = self._find_device(sd, self.name_contains)
-                    if device_idx is None:
-                        continue  # Drop if still not found
-                try:
-                    sd.play(arr, sr, device=device_idx, blocking=True)
-                except Exception:
-                    continue
+                arr = np.frombuffer(audio.pcm_bytes, dtype="<i2").reshape(-1, audio.channels)
+                if audio.gain is not None and audio.gain != 1.0:
+                    # gain is peak-limited at analysis time, so float32 output cannot clip
+                    arr = arr.astype(np.float32) * np.float32(audio.gain / 32768.0)
+                # Re-query device if not found (format stays as negotiated at init)
+                if self.device_idx is None:
+                    self.device_idx = self._find_device(sd, self.name_contains)
+                    if self.device_idx is None:
+                        self.dropped += 1
+                        logger.warning("DeviceWavSink: output device %r not found, clip dropped", self.name_contains)
+                        continue
+                sd.play(arr, audio.sample_rate, device=self.device_idx, blocking=True)
             except Exception:
+                self.dropped += 1
+                logger.warning("DeviceWavSink: playback failed", exc_info=True)
                 continue
-import io
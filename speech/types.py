@@ -15,6 +15,8 @@ class TTSAudio:
     pcm_bytes: bytes
     duration_ms: Optional[int] = None
     format: str = "pcm_s16le"  # can be 'pcm_s16le' or 'wav'
+    channels: int = 1  # interleaved channel count for pcm_s16le (wav carries its own)
+    gain: Optional[float] = None  # playback loudness gain, set once at analysis (None = not analyzed)
 
 @dataclass(frozen=True)
 class SpeechMeta:
@@ -12,6 +12,7 @@ class ResourceWatcher:
         self.cooldown = cooldown  # seconds
         self.last_dominant = None
         self.last_danger = 0.0
+        self.last_metrics = {}
 
     def tick(self, now_ts=None):
         """
@@ -21,6 +22,7 @@ class ResourceWatcher:
         try:
             now = now_ts if now_ts is not None else time.time()
             metrics = probe_resources()
+            self.last_metrics = metrics
             state = evaluate_resource_state(metrics)
             danger = state['danger']
             dominant = state['dominant']
@@ -56,6 +58,20 @@ class ResourceWatcher:
             logging.debug(f"ResourceWatcher.tick fail-soft: {e}")
         return None
 
+    def sample(self):
+        """
+        Refresh last_metrics / last_danger only (no level change, never emits).
+        For callers that need a current reading between tick() calls. Fail-soft.
+        """
+        try:
+            metrics = probe_resources()
+            self.last_metrics = metrics
+            self.last_danger = evaluate_resource_state(metrics)['danger']
+            return metrics
+        except Exception as e:
+            logging.debug(f"ResourceWatcher.sample fail-soft: {e}")
+        return None
+
     def _danger_message(self, dominant):
         if dominant == "cpu":
             return "ちょっとCPUがやばいかも"
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+from speech import AsyncSpeechEngine, SpeechQueue, SpeechMeta, TTSAudio
+from speech.interfaces import TTSProvider, AudioSink
+
+
+class SlowTTS(TTSProvider):
+    def __init__(self, delay=0.05, duration_ms=60):
+        self.delay = delay
+        self.duration_ms = duration_ms
+        self.started = []
+        self.lock = threading.Lock()
+    def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+        with self.lock:
+            self.started.append((text, time.perf_counter()))
+        time.sleep(self.delay)
+        return TTSAudio(sample_rate=24000, pcm_bytes=text.encode(), duration_ms=self.duration_ms)
+
+
+class RecordingSink(AudioSink):
+    def __init__(self):
+        self.played = []
+    def play(self, audio):
+        self.played.append((audio.pcm_bytes.decode(), time.perf_counter()))
+        return True
+    def stop(self):
+        pass
+
+
+async def _wait_for(pred, timeout=2.0):
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        if pred():
+            return True
+        await asyncio.sleep(0.005)
+    return False
+
+
+def test_synthesis_overlaps_playback():
+    async def scenario():
+        tts, sink = SlowTTS(delay=0.05, duration_ms=150), RecordingSink()
+        eng = AsyncSpeechEngine(tts, sink, SpeechQueue(), lookahead=2)
+        for t in ("a", "b", "c"):
+            eng.submit_text(t)
+        assert await _wait_for(lambda: len(sink.played) == 3)
+        await eng.stop()
+        return tts, sink, eng
+    tts, sink, eng = asyncio.run(scenario())
+    assert [p[0] for p in sink.played] == ["a", "b", "c"]
+    started = dict(tts.started)
+    play_a = sink.played[0][1]
+    play_b = sink.played[1][1]
+    # b was synthesized while a was still playing
+    assert started["b"] < play_a + 0.15
+    # b starts right after a's playback window, no synthesis wait
+    assert play_b - play_a < 0.15 + 0.04
+    m = eng.metrics()
+    assert m["played"] == 3
+    assert m["synth_ms_p50"] > 0
+    assert m["queue_depth"] == 0
+
+
+def test_interrupt_cancels_inflight_synthesis():
+    async def scenario():
+        tts, sink = SlowTTS(delay=0.08, duration_ms=400), RecordingSink()
+        eng = AsyncSpeechEngine(tts, sink, SpeechQueue(), lookahead=2)
+        for t in ("a", "b", "c", "d"):
+            eng.submit_text(t)
+        assert await _wait_for(lambda: len(sink.played) == 1)
+        eng.submit_text("urgent", meta=SpeechMeta(can_interrupt=True))
+        assert await _wait_for(lambda: len(sink.played) == 2)
+        await asyncio.sleep(0.05)
+        await eng.stop()
+        return sink, eng
+    sink, eng = asyncio.run(scenario())
+    assert [p[0] for p in sink.played] == ["a", "urgent"]
+    m = eng.metrics()
+    assert m["interrupted"] == 1
+    assert m["queue_depth"] == 0
+
+
+def test_allow_overlap_keeps_lookahead():
+    async def scenario():
+        tts, sink = SlowTTS(delay=0.02, duration_ms=200), RecordingSink()
+        eng = AsyncSpeechEngine(tts, sink, SpeechQueue(), lookahead=2)
+        for t in ("a", "b"):
+            eng.submit_text(t)
+        assert await _wait_for(lambda: len(sink.played) == 1)
+        eng.submit_text("aside", meta=SpeechMeta(can_interrupt=True, allow_overlap=True))
+        assert await _wait_for(lambda: len(sink.played) == 3)
+        await eng.stop()
+        return sink
+    sink = asyncio.run(scenario())
+    assert [p[0] for p in sink.played] == ["a", "aside", "b"]
+
+
+def test_submit_from_thread_and_suppression_window():
+    async def scenario():
+        tts, sink = SlowTTS(delay=0.0, duration_ms=300), RecordingSink()
+        eng = AsyncSpeechEngine(tts, sink, SpeechQueue())
+        eng.start()
+        await asyncio.sleep(0)
+        th = threading.Thread(target=eng.submit_text, args=("x",))
+        th.start()
+        th.join()
+        assert await _wait_for(lambda: len(sink.played) == 1)
+        speaking = eng.is_speaking()
+        await eng.stop()
+        return speaking
+    assert asyncio.run(scenario()) is True
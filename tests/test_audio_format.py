@@ -0,0 +1,164 @@
+import io
+import time
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from speech import TTSAudio, VoiceSpec
+from speech.audio_format import (DeviceFormat, LoudnessNormalizingWavEngine, NormalizingTTSProvider, decode_audio,
+                                 normalize_audio, resample)
+from speech.interfaces import TTSProvider
+from speech.sinks.device_wav_sink import DeviceWavSink
+
+
+def _wav(samples, sr, width=2, channels=1):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(width)
+        wf.setframerate(sr)
+        wf.writeframes(samples)
+    return buf.getvalue()
+
+
+def _sine(sr, n, freq=440.0):
+    t = np.arange(n) / sr
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_decode_24bit_stereo_wav():
+    x = _sine(24000, 240)
+    v = (x * 8388607).astype(np.int32)
+    stereo = np.repeat(v[:, None], 2, axis=1).reshape(-1)
+    b = np.stack([stereo & 0xFF, (stereo >> 8) & 0xFF, (stereo >> 16) & 0xFF], axis=1).astype(np.uint8).tobytes()
+    frames, sr = decode_audio(TTSAudio(sample_rate=0, pcm_bytes=_wav(b, 24000, width=3, channels=2), format="wav"))
+    assert sr == 24000
+    assert frames.shape == (240, 2)
+    assert np.allclose(frames[:, 0], x, atol=1e-5)
+
+
+def test_normalize_resamples_to_device_format():
+    x = _sine(24000, 2400)
+    pcm = (x * 32767).astype("<i2").tobytes()
+    out = normalize_audio(TTSAudio(sample_rate=0, pcm_bytes=_wav(pcm, 24000), format="wav"), DeviceFormat(48000, 2))
+    assert out.format == "pcm_s16le" and out.sample_rate == 48000 and out.channels == 2
+    assert out.duration_ms == 100
+    arr = np.frombuffer(out.pcm_bytes, dtype="<i2").reshape(-1, 2)
+    assert arr.shape[0] == 4800
+    # interpolated signal follows the original at even indices
+    assert np.allclose(arr[::2, 0] / 32767.0, x, atol=2e-3)
+
+
+def test_native_audio_is_not_reconverted():
+    a = TTSAudio(sample_rate=48000, pcm_bytes=b"\x00\x00" * 10, format="pcm_s16le", channels=1)
+    assert normalize_audio(a, DeviceFormat(48000, 1)) is a
+
+
+def test_downsample_length_and_8bit():
+    frames = resample(np.zeros((44100, 1), np.float32), 44100, 16000)
+    assert frames.shape == (16000, 1)
+    u8 = bytes([128, 255, 0, 128])
+    out = normalize_audio(TTSAudio(sample_rate=0, pcm_bytes=_wav(u8, 8000, width=1), format="wav"), DeviceFormat(8000, 1))
+    arr = np.frombuffer(out.pcm_bytes, dtype="<i2")
+    assert arr[0] == 0 and arr[1] > 30000 and arr[2] < -30000
+
+
+class FakeSD:
+    def __init__(self):
+        self.played = []
+    def query_devices(self, idx=None):
+        devs = [{"name": "Speakers", "max_output_channels": 2, "default_samplerate": 44100.0},
+                {"name": "UA-4FX Out", "max_output_channels": 2, "default_samplerate": 48000.0}]
+        return devs if idx is None else devs[idx]
+    def play(self, arr, sr, device=None, blocking=True):
+        self.played.append((arr.shape, sr, device))
+
+
+def test_device_sink_plays_any_width_in_native_format():
+    sd = FakeSD()
+    sink = DeviceWavSink("ua-4fx", sd_module=sd)
+    try:
+        assert sink.native_format() == DeviceFormat(48000, 2)
+        x = (_sine(16000, 1600) * 2147483647).astype("<i4").tobytes()
+        assert sink.play(TTSAudio(sample_rate=0, pcm_bytes=_wav(x, 16000, width=4), format="wav"))
+        assert not sink.play(TTSAudio(sample_rate=0, pcm_bytes=b"not a wav", format="wav"))
+        assert sink.dropped == 1
+        end = time.time() + 1.0
+        while not sd.played and time.time() < end:
+            time.sleep(0.01)
+        assert sd.played == [((4800, 2), 48000, 1)]
+    finally:
+        sink.stop()
+
+
+def test_normalizing_provider_converts_at_synthesis():
+    class WavTTS(TTSProvider):
+        def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+            return TTSAudio(sample_rate=0, pcm_bytes=_wav(b"\x00\x00" * 240, 24000), format="wav")
+    p = NormalizingTTSProvider(WavTTS(), DeviceFormat(48000, 1))
+    out = p.synthesize("x", VoiceSpec(), {})
+    assert out.format == "pcm_s16le" and out.sample_rate == 48000
+
+
+def test_loudness_matches_bs1770_reference_and_batches():
+    from speech.loudness import analyze_batch, integrated_loudness
+    # a full-scale 997 Hz sine measures about -3 LUFS (mono)
+    x = np.sin(2 * np.pi * 997 * np.arange(48000 * 2) / 48000).astype(np.float32)[:, None]
+    assert abs(integrated_loudness(x, 48000) + 3.0) < 0.2
+    y = _sine(24000, 24000)[:, None] * 0.1
+    batch = analyze_batch([(x, 48000), (y, 24000), (np.zeros((10, 1), np.float32), 48000), (x * 0.1, 48000)])
+    assert batch[0] == pytest.approx(integrated_loudness(x, 48000))
+    assert batch[1] == pytest.approx(integrated_loudness(y, 24000))
+    assert batch[2] == float("-inf")
+    assert batch[3] == pytest.approx(batch[0] - 20.0, abs=0.01)
+
+
+def test_gain_stored_at_cache_time_and_applied_at_playback():
+    sd = FakeSD()
+    played = []
+    sd.play = lambda arr, sr, device=None, blocking=True: played.append(arr)
+    sink = DeviceWavSink("ua-4fx", sd_module=sd, target_lufs=-18.0)
+    try:
+        # _sine peaks at 0.5: quiet peaks at 0.1, loud at 0.8
+        quiet = (_sine(48000, 24000) * 0.2 * 32767).astype("<i2")
+        loud = (_sine(48000, 24000) * 1.6 * 32767).astype("<i2")
+        clips = [TTSAudio(sample_rate=48000, pcm_bytes=p.tobytes(), channels=1) for p in (quiet, loud)]
+        sink.format = DeviceFormat(48000, 1)
+        ready = [sink._prepare(c) for c in clips]
+        assert ready[0].gain > 1.0 > ready[1].gain
+        # both land on the same loudness after gain
+        assert 0.1 * ready[0].gain == pytest.approx(0.8 * ready[1].gain, rel=0.01)
+        assert sink._prepare(clips[0]) is ready[0]
+        assert sink.play(clips[0])
+        end = time.time() + 1.0
+        while not played and time.time() < end:
+            time.sleep(0.01)
+        assert played[0].dtype == np.float32
+        assert np.abs(played[0]).max() == pytest.approx(0.1 * ready[0].gain, rel=0.01)
+    finally:
+        sink.stop()
+
+
+def test_wav_engine_output_is_loudness_normalized_for_play_wav(tmp_path):
+    class WavEngine:
+        def __init__(self, level):
+            self.level = level
+        def synthesize(self, text, prosody, out_path):
+            with open(out_path, "wb") as f:
+                f.write(_wav((_sine(24000, 24000) * self.level * 32767).astype("<i2").tobytes(), 24000))
+            return True
+        def is_available(self):
+            return True
+
+    peaks = []
+    for level in (0.2, 1.6):
+        engine = LoudnessNormalizingWavEngine(WavEngine(level), -18.0)
+        path = str(tmp_path / f"{level}.wav")
+        assert engine.synthesize("x", {}, path) and engine.is_available()
+        frames, sr = decode_audio(TTSAudio(sample_rate=0, pcm_bytes=open(path, "rb").read(), format="wav"))
+        assert sr == 24000 and frames.shape == (24000, 1)
+        peaks.append(float(np.abs(frames).max()))
+    # quiet and loud clips land on the same loudness (same peak for the same waveform)
+    assert peaks[0] == pytest.approx(peaks[1], rel=0.01) and 0.1 < peaks[0] < 0.98
@@ -0,0 +1,105 @@
+from vrc.chatbox_scheduler import ChatboxScheduler, split_chatbox_text
+
+
+class FakeOsc:
+    def __init__(self):
+        self.sent = []
+    def send_chatbox(self, text, send_immediately=True, notify=True):
+        self.sent.append((text, notify))
+
+
+class Clock:
+    def __init__(self):
+        self.t = 100.0
+    def __call__(self):
+        return self.t
+
+
+def _sched(**kw):
+    osc, clock = FakeOsc(), Clock()
+    s = ChatboxScheduler(osc, time_fn=clock, **kw)
+    s._schedule_pump = lambda delay: None  # drive pacing by hand
+    return s, osc, clock
+
+
+def test_split_prefers_sentence_breaks():
+    text = "あ" * 100 + "。" + "い" * 100
+    parts = split_chatbox_text(text, 144)
+    assert parts == ["あ" * 100 + "。", "い" * 100]
+    assert all(len(p) <= 10 for p in split_chatbox_text("x" * 35, 10))
+
+
+def test_priority_and_pacing():
+    s, osc, clock = _sched(min_interval_sec=1.5)
+    s.send("debug line", "debug", notify=False)
+    s.send("reply line", "reply")
+    s.send("地震です", "emergency")
+    assert osc.sent == [("debug line", False)]  # first slot was free
+    clock.t += 1.0
+    s.pump()
+    assert len(osc.sent) == 1
+    clock.t += 0.5
+    s.pump()
+    clock.t += 1.5
+    s.pump()
+    assert [t for t, _ in osc.sent] == ["debug line", "地震です", "reply line"]
+    assert s.metrics()["max_wait_ms"] == 3000.0
+
+
+def test_dedupe_window_and_emergency_exempt():
+    s, osc, clock = _sched(min_interval_sec=0, dedupe_window_sec=30)
+    assert s.send("こんにちは")
+    assert not s.send("こんにちは")
+    assert s.send("緊急", "emergency") and s.send("緊急", "emergency")
+    clock.t += 31
+    assert s.send("こんにちは")
+    assert [t for t, _ in osc.sent] == ["こんにちは", "緊急", "緊急", "こんにちは"]
+    assert s.metrics()["deduped"] == 1
+
+
+def test_backpressure_drops_lowest_priority_newest():
+    s, osc, clock = _sched(min_interval_sec=10, queue_max=2)
+    s.send("first")  # sent immediately
+    s.send("d1", "debug")
+    s.send("d2", "debug")
+    s.send("r1", "reply")
+    m = s.metrics()
+    assert m["dropped"] == 1 and m["queue_depth"] == 2
+    assert m["queued_by_priority"] == {"emergency": 0, "reply": 1, "debug": 1}
+
+
+def test_state_machine_channel_uses_emergency_priority():
+    s, osc, clock = _sched(min_interval_sec=0)
+    ch = s.channel("emergency")
+    ch.send("津波です")
+    assert osc.sent == [("津波です", True)]
+
+
+def test_evicted_message_reports_false_and_is_not_deduped():
+    s, osc, clock = _sched(min_interval_sec=10, queue_max=2)
+    s.send("first")  # sent immediately
+    assert s.send("d1", "debug") and s.send("r1")
+    assert not s.send("r1")  # still queued
+    assert s.send("e1", "emergency")  # evicts d1
+    assert not s.send("r2")  # the newest, lowest entry: evicted at once
+    for _ in range(2):
+        clock.t += 10
+        s.pump()
+    assert [t for t, _ in osc.sent] == ["first", "e1", "r1"]
+    # dropped messages were never sent, so they can be sent again
+    clock.t += 10
+    assert s.send("d1", "debug") and s.send("r2")
+    assert not s.send("r1")  # sent 10 s ago
+    assert s.metrics()["dropped"] == 2
+
+
+def test_send_chatbox_errors_go_to_the_logger(monkeypatch, caplog):
+    import main
+
+    def broken(osc):
+        raise RuntimeError("no scheduler")
+    monkeypatch.setattr(main, "get_chatbox_scheduler", broken)
+    with caplog.at_level("WARNING", logger=main.logger.name):
+        main._send_chatbox("やあ", object())
+    rec = [r for r in caplog.records if "[reply] send error" in r.getMessage()]
+    assert rec and rec[0].exc_info and rec[0].exc_info[0] is RuntimeError
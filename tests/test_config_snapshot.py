@@ -0,0 +1,84 @@
+import dataclasses
+import os
+
+import pytest
+
+from audio.prosody_mapper import map_prosody
+from core.config_snapshot import ConfigStore, build_snapshot
+from core.content_broker import ContentBroker
+from core.emergency_chat_notifier import EmergencyChatNotifier
+
+
+class Clock:
+    def now(self):
+        return 0.0
+
+
+def write(path, text, bump):
+    path.write_text(text, encoding="utf-8")
+    # mtime resolution differs per filesystem; make the change visible explicitly
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+
+def test_snapshot_clamps_once_and_is_frozen():
+    snap = build_snapshot({
+        "audio": {"prosody": {"pitch_gain": 9, "speed_gain": "x"}},
+        "emergency_chat_max_chars": 999,
+        "disaster_beep_repeats": 0,
+        "content_broker": {"max_pending": 5, "interest": {"weights": {"tech": 2}}},
+    })
+    assert snap.prosody.pitch_gain == 0.3
+    assert snap.prosody.speed_gain == 0.20
+    assert snap.emergency_chat.max_chars == 220
+    assert snap.emergency_chat.beep_repeats == 1
+    assert snap.content_broker.max_pending == 5
+    assert snap.content_broker.interest.weights["tech"] == 2.0
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snap.prosody.pitch_gain = 0.1
+    with pytest.raises(TypeError):
+        snap.content_broker.interest.weights["tech"] = 0.0
+
+
+def test_store_swaps_on_change_and_keeps_old_snapshot_on_error(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "audio:\n  prosody:\n    pitch_gain: 0.1\n", 0)
+    store = ConfigStore(str(path))
+    seen = []
+    store.subscribe(seen.append)
+    first = store.current
+    assert first.version == 1 and first.prosody.pitch_gain == 0.1
+    assert store.reload() is False  # unchanged file
+
+    write(path, "audio:\n  prosody:\n    pitch_gain: 0.2\n", 1)
+    assert store.reload() is True
+    assert store.current.version == 2 and store.current.prosody.pitch_gain == 0.2
+    assert seen == [store.current]
+    assert first.prosody.pitch_gain == 0.1  # readers holding the old snapshot are unaffected
+
+    write(path, "audio: [unclosed\n", 2)
+    assert store.reload() is False
+    assert store.errors == 1
+    assert store.current.version == 2
+    assert len(seen) == 1
+
+
+def test_consumers_accept_snapshot():
+    raw = {
+        "audio": {"prosody": {"pitch_gain": 0.25, "energy_gain": 0.4}},
+        "emergency_chat_cooldown_sec": 30,
+        "content_broker": {"emit_cooldown_sec": 7, "used_ttl_sec": 50},
+    }
+    snap = build_snapshot(raw)
+    assert map_prosody(0.5, 0.4, 0.3, snap) == map_prosody(0.5, 0.4, 0.3, raw)
+    assert map_prosody(0.5, 0.4, 0.3, snap.prosody) == map_prosody(0.5, 0.4, 0.3, raw)
+
+    notifier = EmergencyChatNotifier(lambda msg: None, Clock(), {})
+    assert notifier.em_cd == 120
+    notifier.apply_config(snap)
+    assert notifier.em_cd == 30
+
+    broker = ContentBroker({"content_broker": {}})
+    broker.apply_config(snap)
+    assert broker.cfg.emit_cooldown_sec == 7
+    assert broker.used_ids.ttl_sec == 50
@@ -0,0 +1,52 @@
+import main
+from core.emission_context import DEFAULT_TEMPO, EmissionContext
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+    def __call__(self):
+        return self.t
+
+
+def test_tempo_cached_per_speaker_until_ttl():
+    calls = []
+    clock = Clock()
+
+    def tempo_fn(key, store, now, cfg):
+        calls.append(key)
+        return {"response_delay_ms": 100, "idle_interval_scale": 1.0, "prosody_speed_scale": 0.9}
+
+    ctx = EmissionContext({}, None, tempo_fn=tempo_fn, speaker_store=object(), tempo_ttl_sec=5.0, time_fn=clock)
+    assert ctx.tempo("a")["response_delay_ms"] == 100
+    ctx.tempo("a")
+    ctx.tempo("b")
+    assert calls == ["a", "b"]
+    clock.t = 5.0
+    ctx.tempo("a")
+    assert calls == ["a", "b", "a"]
+    assert ctx.tempo(None) is DEFAULT_TEMPO
+
+
+def test_emergency_level_ttl_and_fresh_flag():
+    clock = Clock()
+    levels = iter([("emergency", "resource_danger"), ("none", None)])
+    ctx = EmissionContext({"audio": {"enabled": False}}, None, emergency_fn=lambda: next(levels),
+                          emergency_ttl_sec=1.0, time_fn=clock)
+    assert not ctx.audio_enabled
+    assert ctx.emergency() == (("emergency", "resource_danger"), True)
+    clock.t = 0.5
+    assert ctx.emergency() == (("emergency", "resource_danger"), False)
+    clock.t = 1.0
+    assert ctx.emergency() == (("none", None), True)
+
+
+def test_main_context_rebuilt_on_config_reload(monkeypatch):
+    pm = {"arousal": "Arousal"}
+    monkeypatch.setattr(main, "cfg", {"speech": {"plan_lookahead": 9}})
+    ctx = main.emission_context(pm)
+    assert main.emission_context(pm) is ctx and ctx.plan_lookahead == 4
+    monkeypatch.setattr(main, "cfg", {"osc": {"param_ranges": {"arousal": [0.0, 0.5]}}})
+    ctx2 = main.emission_context(pm)
+    assert ctx2 is not ctx
+    assert ctx2.cmap.prepare({"osc": {"N_Arousal": 0.9}}, {}) == {"Arousal": 0.5}
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import main
+
+
+class Osc:
+    def __init__(self):
+        self.sent = []
+    def send_avatar_params(self, params):
+        self.sent.append(dict(params))
+    def send_chatbox(self, text, send_immediately=True, notify=False):
+        pass
+
+
+class St:
+    name = "TALK"
+
+
+class SM:
+    def __init__(self):
+        self.state = St()
+        self.done = 0
+    def mark_speech_done(self):
+        self.done += 1
+
+
+class SlowTTS:
+    def __init__(self):
+        self.calls = 0
+    def synthesize(self, text, prosody, out_path):
+        self.calls += 1
+        time.sleep(0.05)
+        return True
+
+
+async def _ticker(ticks, stop):
+    while not stop.is_set():
+        ticks.append(time.perf_counter())
+        await asyncio.sleep(0.005)
+
+
+def _run_with_ticker(coro):
+    ticks = []
+
+    async def main_():
+        stop = asyncio.Event()
+        t = asyncio.ensure_future(_ticker(ticks, stop))
+        await coro
+        stop.set()
+        await t
+
+    asyncio.run(main_())
+    return ticks
+
+
+def test_pause_is_awaited_and_loop_keeps_running(monkeypatch):
+    monkeypatch.setattr(main, "tts", None)
+    monkeypatch.setattr(main, "resource_watcher", None)
+    sm = SM()
+    chunk = {"id": "p1", "type": "say", "text": "", "pause_ms": 60}
+    ticks = _run_with_ticker(main.emit_chunk(chunk, Osc(), {}, St(), sm, mode="live"))
+    assert sm.done == 1
+    assert len(ticks) >= 5
+    stages = main.emit_stage_timings[-1]
+    assert stages["id"] == "p1" and stages["pause_ms"] >= 55 and "tts_ms" not in stages
+
+
+def test_blocking_tts_runs_on_executor(monkeypatch):
+    tts = SlowTTS()
+    played = []
+    monkeypatch.setattr(main, "tts", tts)
+    monkeypatch.setattr(main, "prefetcher", None)
+    monkeypatch.setattr(main, "resource_watcher", None)
+    monkeypatch.setattr(main, "play_wav", lambda path: played.append(path) or time.sleep(0.02))
+    monkeypatch.setattr(main, "map_prosody", lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    monkeypatch.setattr(main, "self_regulator", None)
+    sm = SM()
+    chunk = {"id": "t1", "type": "say", "text": "hello", "pause_ms": 0, "osc": {"N_Valence": 0.3}}
+    ticks = _run_with_ticker(main.emit_chunk(chunk, Osc(), {"valence": "Mood"}, St(), sm, mode="live"))
+    assert tts.calls == 1 and len(played) == 1
+    assert len(ticks) >= 5  # the loop was not blocked by synthesize/play_wav
+    stages = main.emit_stage_timings[-1]
+    assert stages["tts_ms"] >= 65 and stages["total_ms"] >= stages["tts_ms"]
+
+
+def test_resource_probe_runs_off_loop(monkeypatch):
+    class Watcher:
+        last_level = "warn"
+        def tick(self, now_ts=None):
+            time.sleep(0.05)
+            return "ちょっと重いかも"
+    monkeypatch.setattr(main, "tts", None)
+    monkeypatch.setattr(main, "resource_watcher", Watcher())
+    osc = Osc()
+    ticks = _run_with_ticker(main.emit_chunk({"id": "r1", "text": "x", "pause_ms": 0, "osc": {"N_Valence": 0.5}},
+                                             osc, {"valence": "Mood"}, St(), SM(), mode="live"))
+    assert len(ticks) >= 5
+    stages = main.emit_stage_timings[-1]
+    assert stages["id"] == "resource_alert" and stages["resource_ms"] >= 45
+    assert osc.sent == []  # replaced by the resource alert chunk, which carries no N_* params
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+
+from core.event_dispatcher import EventDispatcher, LatencyHistogram
+from core.sm_scheduler import DeferredScheduler
+from core.state_machine import State, StateMachine
+
+
+class RecordingSM:
+    def __init__(self):
+        self.vad_speaking = False
+        self.events = []
+    def on_event(self, event, payload=None, **kwargs):
+        self.events.append((event, payload))
+
+
+def test_coalesces_stt_final_while_speaking():
+    sm = RecordingSM()
+    d = EventDispatcher(sm)
+    d.post("stt_final", {"text": "a"})
+    sm.vad_speaking = True
+    d.post("stt_final", {"text": "b"})
+    assert not d.post("stt_final", {"text": "c"})
+    d.post("alert_new", {"id": 1})
+    assert d.queue_depth() == 3
+    d.drain()
+    assert sm.events == [("stt_final", {"text": "a"}), ("stt_final", {"text": "c"}), ("alert_new", {"id": 1})]
+    m = d.metrics()
+    assert m["coalesced"] == 1 and m["handled"] == 3 and m["queue_depth"] == 0
+    assert m["handle_ms"]["stt_final"]["count"] == 2
+
+
+def test_backpressure_keeps_critical_events():
+    sm = RecordingSM()
+    d = EventDispatcher(sm, queue_max=2)
+    d.post("alert_new", {"id": 1})
+    d.post("tick")
+    d.post("tick2")
+    d.drain()
+    assert [e for e, _ in sm.events] == ["alert_new", "tick2"]
+    assert d.metrics()["dropped"] == 1
+
+
+def test_histogram_buckets():
+    h = LatencyHistogram()
+    for ms in (0.01, 0.3, 0.3, 7.0, 5000.0):
+        h.add(ms)
+    assert h.percentile(0.5) == 0.5
+    assert h.percentile(1.0) == 5000.0
+    assert h.summary()["buckets"] == {"le_0.05": 1, "le_0.5": 2, "le_10": 1, "inf": 1}
+
+
+def test_asyncio_consumer_serializes_posts_from_threads():
+    sm = RecordingSM()
+    d = EventDispatcher(sm)
+
+    async def main():
+        d.start()
+        threads = [threading.Thread(target=lambda i=i: [d.post("evt", (i, k)) for k in range(50)]) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for _ in range(100):
+            if d.metrics()["handled"] == 200:
+                break
+            await asyncio.sleep(0.01)
+        d.stop()
+
+    asyncio.run(main())
+    assert len(sm.events) == 200
+    for i in range(4):
+        assert [k for _, (j, k) in sm.events if j == i] == list(range(50))  # per-producer order kept
+
+
+def test_state_machine_deferred_reply_runs_on_dispatcher():
+    clock = type("C", (), {"t": 0.0, "__call__": lambda self: self.t})()
+    sm = StateMachine()
+    sm.scheduler = DeferredScheduler(clock, auto=False)
+    d = EventDispatcher(sm)
+    sm.dispatcher = d
+    sm.post("stt_final", {"text": "hello"})
+    assert sm.state == State.IDLE and d.queue_depth() == 1
+    d.drain()
+    clock.t += 1.0
+    sm.scheduler.run_due()
+    assert sm.state == State.IDLE  # the timer only queued the transition
+    d.drain()
+    assert sm.state == State.TALK
+    assert "reply_due" in d.metrics()["handle_ms"]
+
+
+def test_backpressure_never_drops_deferred_calls():
+    clock = type("C", (), {"t": 0.0, "__call__": lambda self: self.t})()
+    sm = StateMachine()
+    sm.scheduler = DeferredScheduler(clock, auto=False)
+    d = EventDispatcher(sm, queue_max=2)
+    sm.dispatcher = d
+    sm.post("stt_final", {"text": "hello"})
+    d.drain()
+    clock.t += 1.0
+    sm.scheduler.run_due()  # queues reply_due
+    d.post("tick")
+    d.post("tick2")
+    assert d.metrics()["dropped"] == 1
+    d.drain()
+    assert sm.state == State.TALK and sm._reply_handle is None
+
+
+def test_runtime_producers_go_through_the_dispatcher(monkeypatch):
+    import main
+    import core.vad_stt_listener as vad_mod
+
+    class Listener:
+        def __init__(self, on_talk_start, on_talk_end, on_transcript, **kw):
+            self.cbs = (on_talk_start, on_talk_end, on_transcript)
+            self.started = False
+        def start(self):
+            self.started = True
+
+    class Osc:
+        def send_chatbox(self, text, send_immediately=True, notify=False):
+            pass
+
+    monkeypatch.setattr(vad_mod, "VadSttListener", Listener)
+    monkeypatch.setattr(main, "cfg", {}, raising=False)
+    monkeypatch.setattr(main, "osc", None, raising=False)
+    monkeypatch.setattr(main, "start_idle_prerender", lambda sm: None)
+    monkeypatch.setattr(main, "_vad_on_transcript", lambda text, latest: None)
+    monkeypatch.setattr(main, "_vad_on_talk_end", lambda sm, osc: None)
+    sm = StateMachine()
+
+    async def scenario():
+        started = main.start_runtime(sm, Osc())
+        d = started["dispatcher"]
+        on_talk_start, on_talk_end, on_transcript = started["vad"].cbs
+        assert started["vad"].started and sm.dispatcher is d
+        on_talk_start()
+        assert sm.vad_speaking is False  # queued, not set from the audio thread
+        await asyncio.sleep(0.02)
+        assert sm.vad_speaking is True
+        on_talk_end()
+        threading.Thread(target=on_transcript, args=("hello",)).start()
+        main.notify_chunk_done(sm)
+        for _ in range(100):
+            if d.metrics()["handled"] >= 4:
+                break
+            await asyncio.sleep(0.01)
+        d.stop()
+        return d.metrics()
+
+    m = asyncio.run(scenario())
+    assert {"vad_talk_start", "vad_talk_end", "stt_final", "tts_chunk_done"} <= set(m["handle_ms"])
+    assert sm.vad_speaking is False
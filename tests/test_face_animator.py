@@ -0,0 +1,111 @@
+from core.emotion_afterglow import EmotionAfterglow
+from osc.face_animator import FaceAnimator, ease_in_out
+from osc.presence_blink import PresenceBlink
+
+
+class Clock:
+    def __init__(self, t=1000.0):
+        self.t = t
+    def now(self):
+        return self.t
+
+
+class DummyOsc:
+    def __init__(self):
+        self.sent = []
+    def send_avatar_params(self, params):
+        self.sent.append(dict(params))
+
+
+def test_tween_eases_to_target_and_lands_exactly():
+    clock, osc = Clock(), DummyOsc()
+    anim = FaceAnimator(osc, {"face_anim_tween_sec": 1.0}, clock)
+    anim.set_target("Mood", 0.0, duration=0)
+    anim.tick()
+    anim.set_target("Mood", 1.0)
+    clock.t += 0.25
+    assert anim.tick()["Mood"] == ease_in_out(0.25)
+    clock.t += 0.25
+    assert anim.tick()["Mood"] == 0.5
+    clock.t += 1.0
+    anim.tick()
+    assert osc.sent[-1] == {"Mood": 1.0}
+    # settled: nothing more to send
+    assert anim.tick() == {}
+
+
+def test_small_steps_are_skipped_bounding_packets():
+    clock, osc = Clock(), DummyOsc()
+    anim = FaceAnimator(osc, {"face_anim_min_delta": 0.05}, clock)
+    anim.set_target("Mood", 0.0, duration=0)
+    anim.set_target("Mood", 0.1, duration=1.0, easing="linear")
+    sends = 0
+    for _ in range(25):
+        clock.t += 0.05
+        if anim.tick():
+            sends += 1
+    assert sends <= 3
+    assert osc.sent[-1]["Mood"] == 0.1
+
+
+def test_merges_offsets_blink_override_and_afterglow():
+    clock, osc = Clock(), DummyOsc()
+    anim = FaceAnimator(osc, {}, clock)
+    anim.set_targets({"face_valence": 0.0, "face_interest": 0.5}, duration=0)
+    anim.set_offset("drift", "face_valence", 0.04)
+    blink = PresenceBlink(anim.presence_sender("override"), {"enable_blink_hint": True, "blink_pulse_ms": 120}, clock)
+    blink.tick("IDLE", False)
+    out = anim.tick()
+    assert out == {"face_valence": 0.04, "face_interest": 0.5, "blink_hint": 1}
+    clock.t += 0.2
+    blink.tick("IDLE", False)
+    assert anim.tick() == {"blink_hint": 0}
+
+    ag = EmotionAfterglow(clock, {"enable_emotion_afterglow": True, "afterglow_tau_sec": 5.0},
+                          lambda x, lo, hi: max(lo, min(hi, x)))
+    anim.clear_offsets("drift")
+    anim.attach_afterglow(ag, "face_valence", "face_interest")
+    ag.on_emit_end(0.8, 0.9)
+    assert anim.tick()["face_valence"] == 0.8  # holds the emitted value first
+    clock.t += 5.0
+    v = anim.tick()["face_valence"]
+    assert 0.0 < v < 0.8  # then decays toward the target
+
+
+def test_start_runtime_runs_a_ticking_animator_with_presence(monkeypatch):
+    import asyncio
+
+    import main
+    from core.state_machine import State, StateMachine
+
+    class Osc(DummyOsc):
+        def send_chatbox(self, text, send_immediately=True, notify=False):
+            pass
+
+    monkeypatch.setattr(main, "cfg", {"enable_face_animator": True, "face_anim_tick_hz": 50, "face_anim_tween_sec": 0.0,
+                                      "enable_idle_face_drift": True, "enable_blink_hint": True,
+                                      "stt": {"listener_enabled": False}}, raising=False)
+    for name in ("osc", "face_animator", "presence_blink", "idle_face_drift", "osc_rate_controller"):
+        monkeypatch.setattr(main, name, None, raising=False)
+    monkeypatch.setattr(main, "start_idle_prerender", lambda sm: None)
+    sm = StateMachine()
+    sm.state = State.IDLE
+    osc = Osc()
+
+    async def scenario():
+        started = main.start_runtime(sm, osc)
+        anim = started["face_animator"]
+        main._send_chunk_params({"Mood": 0.4}, osc)
+        await asyncio.sleep(0.1)
+        started["dispatcher"].stop()
+        for t in main._face_tasks:
+            t.cancel()
+        return anim
+
+    anim = asyncio.run(scenario())
+    assert anim is not None and main.face_animator is anim and anim.ticks >= 3
+    assert main.presence_blink is not None and main.idle_face_drift is not None
+    # one bundle per tick: chunk target and idle drift arrive through the animator
+    assert osc.sent and all(isinstance(b, dict) for b in osc.sent)
+    merged = {k: v for b in osc.sent for k, v in b.items()}
+    assert merged["Mood"] == 0.4 and "face_valence" in merged and "face_interest" in merged
@@ -0,0 +1,172 @@
+import threading
+
+from speech import TTSAudio, VoiceSpec
+from speech.interfaces import TTSProvider
+from speech.idle_prerender import IdlePrerenderBuffer
+
+
+class ImmediateExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class CountingTTS(TTSProvider):
+    def __init__(self):
+        self.calls = []
+    def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+        self.calls.append(text)
+        return TTSAudio(sample_rate=16000, pcm_bytes=text.encode("utf-8"), duration_ms=100)
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+    def now(self):
+        return self.t
+
+
+class FakeWatcher:
+    warn = 0.75
+    def __init__(self, cpu):
+        self.last_level = "ok"
+        self.last_metrics = {"cpu": cpu}
+
+
+def _candidates():
+    return [{"text": "んー。"}, {"text": "ねえ。"}, {"text": "まだある"}]
+
+
+def test_prerenders_in_idle_and_serves_hit():
+    tts = CountingTTS()
+    buf = IdlePrerenderBuffer(tts, capacity=2, executor=ImmediateExecutor())
+    assert buf.tick("IDLE", _candidates) == 2
+    assert len(buf) == 2
+    # Serving the pre-rendered line does not call the real provider again
+    audio = buf.synthesize("んー。", VoiceSpec(), {})
+    assert audio.pcm_bytes == "んー。".encode("utf-8")
+    assert tts.calls == ["んー。", "ねえ。"]
+    # Unknown line falls through to the provider
+    buf.synthesize("ちがう", VoiceSpec(), {})
+    assert tts.calls[-1] == "ちがう"
+    assert buf.stats["hits"] == 1 and buf.stats["misses"] == 1
+
+
+def test_state_change_discards_buffer_and_inflight_results():
+    gate = threading.Event()
+    class SlowTTS(CountingTTS):
+        def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+            gate.wait(1.0)
+            return super().synthesize(text, voice, prosody)
+    tts = SlowTTS()
+    buf = IdlePrerenderBuffer(tts, capacity=1)
+    buf.tick("IDLE", _candidates)
+    assert buf.tick("TALK", _candidates) == 0
+    gate.set()
+    buf._executor.shutdown(wait=True)
+    assert len(buf) == 0
+    assert buf.take("んー。") is None
+
+
+def test_backs_off_exponentially_under_cpu_load():
+    clock = FakeClock()
+    rw = FakeWatcher(cpu=0.9)
+    tts = CountingTTS()
+    buf = IdlePrerenderBuffer(tts, rw, backoff_base_sec=5, backoff_max_sec=12,
+                              time_provider=clock, executor=ImmediateExecutor())
+    assert buf.tick("IDLE", _candidates) == 0
+    clock.t += 4
+    assert buf.tick("IDLE", _candidates) == 0 and buf.stats["backoffs"] == 1
+    clock.t += 1
+    buf.tick("IDLE", _candidates)
+    assert buf._backoff == 10
+    clock.t += 10
+    buf.tick("IDLE", _candidates)
+    assert buf._backoff == 12
+    rw.last_metrics["cpu"] = 0.2
+    clock.t += 12
+    assert buf.tick("IDLE", _candidates) == 2
+    assert tts.calls == ["んー。", "ねえ。"]
+
+
+def test_idle_buffer_samples_the_watcher_and_evicts_stale_lines():
+    clock = FakeClock()
+
+    class SamplingWatcher(FakeWatcher):
+        samples = 0
+        def sample(self):
+            # the emit path's tick() does not run while IDLE; the buffer samples on its own
+            self.samples += 1
+            self.last_metrics = {"cpu": 0.9 if self.samples == 1 else 0.1}
+            return self.last_metrics
+
+    rw = SamplingWatcher(cpu=0.1)
+    tts = CountingTTS()
+    buf = IdlePrerenderBuffer(tts, rw, capacity=2, max_age_sec=60, sample_sec=5, backoff_base_sec=5,
+                              time_provider=clock, executor=ImmediateExecutor())
+    assert buf.tick("IDLE", _candidates) == 0 and rw.samples == 1
+    clock.t += 5
+    assert buf.tick("IDLE", _candidates) == 2 and rw.samples == 2
+    # a line that is no longer a candidate makes room for the new one
+    clock.t += 10
+    assert buf.tick("IDLE", lambda: [{"text": "ねえ。"}, {"text": "あたらしい"}]) == 1
+    assert buf.take("んー。") is None and buf.stats["evicted"] == 1
+    # unspoken lines expire after max_age_sec, even with no candidates
+    clock.t += 61
+    assert buf.tick("IDLE", lambda: []) == 0 and len(buf) == 0 and buf.stats["evicted"] == 3
+    assert rw.samples == 4
+
+
+class WavEngine:
+    """main.tts stand-in: synthesize(text, prosody, out_path) writes a WAV file."""
+    def __init__(self):
+        self.calls = []
+    def synthesize(self, text, prosody, out_path):
+        import wave
+        self.calls.append(text)
+        with wave.open(out_path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(text.encode("utf-8").ljust(320, b"\0"))
+        return True
+
+
+class Osc:
+    def send_avatar_params(self, params):
+        pass
+
+
+def test_idle_line_is_played_from_the_buffer(monkeypatch, tmp_path):
+    import asyncio
+    import main
+    from core.state_machine import State, StateMachine
+    from speech.idle_prerender import WavFileTTSProvider
+
+    engine = WavEngine()
+    played = []
+    buf = IdlePrerenderBuffer(WavFileTTSProvider(engine, str(tmp_path)), capacity=1, executor=ImmediateExecutor())
+    monkeypatch.setattr(main, "tts", engine)
+    monkeypatch.setattr(main, "idle_prerender", buf)
+    monkeypatch.setattr(main, "play_wav", lambda path: played.append(open(path, "rb").read()))
+    monkeypatch.setattr(main, "map_prosody", lambda v, i, a, cfg=None: {"pitch": 1.0 + v, "speed": 1.0, "energy": 1.0})
+    monkeypatch.setattr(main, "prefetcher", None)
+    monkeypatch.setattr(main, "resource_watcher", None)
+    monkeypatch.setattr(main, "face_animator", None)
+    chunk = main.normalize_plan({"speech_plan": [{"id": "i1", "text": "んー。", "pause_ms": 0, "osc": {"N_Valence": 0.2}}]})[0]
+    candidates = lambda: [{"text": chunk["text"], "prosody": main._idle_line_prosody(chunk)}]
+    monkeypatch.setattr(main, "_idle_prerender_candidates", candidates)
+    sm = StateMachine()
+
+    async def ticked():
+        task = main.start_idle_prerender(sm, interval_sec=0.1)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        main._idle_prerender_task = None
+
+    asyncio.run(ticked())  # the runtime's tick loop rendered the line while IDLE
+    assert engine.calls == ["んー。"] and len(buf) == 1
+    engine.calls.clear()
+
+    asyncio.run(main.emit_chunk(chunk, Osc(), {}, State.IDLE, sm, mode="live"))
+    assert engine.calls == []  # no synthesis at speak time
+    assert buf.stats["hits"] == 1 and len(played) == 1 and played[0][:4] == b"RIFF"
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+
+import main
+from core.loop_profiler import LoopLagMonitor, LoopProfiler, SlowLoopWatchdog, fold_stack
+
+
+def blocking_call(s):
+    time.sleep(s)
+
+
+def test_fold_stack_names_repo_component_and_idle_waits():
+    ready, release = threading.Event(), threading.Event()
+
+    def target():
+        ready.set()
+        release.wait(2.0)
+
+    t = threading.Thread(target=target, name="waiter", daemon=True)
+    t.start()
+    ready.wait(1.0)
+    time.sleep(0.02)
+    stack, component, idle = fold_stack(sys._current_frames()[t.ident], "waiter")
+    release.set()
+    t.join(1.0)
+    assert stack.startswith("waiter;") and "tests.test_loop_profiler:target;threading:wait" in stack
+    assert component == "tests.test_loop_profiler" and idle
+
+
+def test_watchdog_catches_blocked_loop_with_stack():
+    prof = LoopProfiler(lag_interval_ms=10, slow_ms=40, sample_ms=5, profile_threads=True)
+
+    async def scenario():
+        prof.start()
+        await asyncio.sleep(0.05)
+        blocking_call(0.2)
+        await asyncio.sleep(0.05)
+        prof.stop()
+
+    asyncio.run(scenario())
+    rep = prof.report()
+    assert rep["lag"]["count"] > 3 and rep["lag"]["max_ms"] >= 150
+    assert len(rep["stalls"]) == 1
+    stall = rep["stalls"][0]
+    assert stall["component"] == "tests.test_loop_profiler"
+    assert stall["stack"].startswith("loop;") and stall["stack"].endswith("tests.test_loop_profiler:blocking_call")
+    assert 150 <= stall["lag_ms"] and abs(rep["loop_blocked_ms"]["tests.test_loop_profiler"] - stall["lag_ms"]) < 0.01
+    assert "loop" in rep["threads_ms"]
+    assert any(line.startswith("loop;") and line.rsplit(" ", 1)[1].isdigit() for line in prof.folded_lines())
+    json.dumps(rep)
+
+
+def test_watchdog_tick_without_stall_records_nothing():
+    mon = LoopLagMonitor(interval_ms=50)
+    wd = SlowLoopWatchdog(mon, slow_ms=100)
+    wd.tick()  # monitor not running
+    mon.expected = time.perf_counter()
+    wd.tick()
+    assert not wd.stalls and not wd.loop_blocked_ms and not wd.folded
+
+
+def test_start_loop_profiler_reads_config_and_dumps(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "cfg", {"loop_profiler": {"lag_interval_ms": 1, "slow_ms": 50000, "sample_ms": 7}}, raising=False)
+    monkeypatch.setattr(main, "emit_stage_timings", main.collections.deque([{"tts_ms": 10.0, "total_ms": 12.0, "id": "c1"},
+                                                                            {"tts_ms": 30.0, "total_ms": 31.0, "id": "c2"}]))
+
+    async def scenario():
+        prof = main.start_loop_profiler()
+        await asyncio.sleep(0.05)
+        prof.stop()
+        return prof
+
+    try:
+        prof = asyncio.run(scenario())
+        assert prof.monitor.interval == 0.005 and prof.watchdog.slow_ms == 10000.0 and prof.watchdog.sample_s == 0.007
+        rep = main.dump_loop_profile(str(tmp_path / "loop.json"), str(tmp_path / "loop.folded"))
+        assert json.loads((tmp_path / "loop.json").read_text(encoding="utf-8")) == rep
+        assert rep["emit_stages_ms"]["tts"] == {"count": 2, "total_ms": 40.0, "max_ms": 30.0}
+        assert rep["stalls"] == [] and (tmp_path / "loop.folded").exists()
+    finally:
+        main.loop_profiler = None
+
+
+def test_watchdog_stop_reports_a_stall_still_open():
+    ready, release = threading.Event(), threading.Event()
+
+    def blocked_loop():
+        ready.set()
+        while not release.is_set():
+            pass
+
+    t = threading.Thread(target=blocked_loop, daemon=True)
+    t.start()
+    ready.wait(1.0)
+    mon = LoopLagMonitor(interval_ms=10)
+    mon.loop_thread_id = t.ident
+    wd = SlowLoopWatchdog(mon, slow_ms=50, sample_ms=5)
+    mon.expected = time.perf_counter() - 0.2  # the loop is 200 ms overdue right now
+    try:
+        wd.tick()
+        wd.tick()
+        assert not wd.stalls
+        wd.stop()
+    finally:
+        release.set()
+        t.join(1.0)
+    assert len(wd.stalls) == 1 and wd.stalls[0]["samples"] == 2
+    assert wd.stalls[0]["component"] == "tests.test_loop_profiler"
+
+
+def test_run_profiles_the_session_and_dumps_on_shutdown(monkeypatch, tmp_path):
+    cfg_path = tmp_path / "config.yaml"
+    cfg_path.write_text("loop_profiler:\n  lag_interval_ms: 5\nstt:\n  listener_enabled: false\n", encoding="utf-8")
+    monkeypatch.setattr(main, "cfg", getattr(main, "cfg", {}), raising=False)
+    monkeypatch.setattr(main, "config_snapshot", main.config_snapshot)
+    monkeypatch.setattr(main, "build_osc_client", lambda cfg: None)
+    monkeypatch.setattr(main, "start_runtime", lambda sm, osc: {})
+
+    async def scenario():
+        stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, stop.set)
+        await main.run(str(cfg_path), str(tmp_path / "loop.json"), str(tmp_path / "loop.folded"), stop=stop)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        main.loop_profiler = None
+        if main.config_store is not None:
+            main.config_store.stop()
+            main.config_store = None
+    rep = json.loads((tmp_path / "loop.json").read_text(encoding="utf-8"))
+    assert rep["lag"]["interval_ms"] == 5.0 and rep["lag"]["count"] > 3
+    assert (tmp_path / "loop.folded").exists()
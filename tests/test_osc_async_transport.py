@@ -0,0 +1,61 @@
+import asyncio
+import socket
+import threading
+
+from osc.rate_controller import OscRateController
+from vrc.osc_async_transport import AsyncOscTransport
+from vrc.osc_client import OscClient
+from vrc.osc_codec import decode_packet
+
+
+def _receiver():
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(1.0)
+    return rx
+
+
+def test_private_loop_thread_safe_enqueue_feeds_rate_controller():
+    rx = _receiver()
+    rc = OscRateController({})
+    t = AsyncOscTransport("127.0.0.1", rx.getsockname()[1], latency_sink=rc.observe_latency).start()
+    try:
+        c = OscClient(port=rx.getsockname()[1], max_hz=0, transport=t, rate_controller=rc)
+        threads = [threading.Thread(target=c.send_chatbox, args=(f"msg{i}",)) for i in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        got = sorted(decode_packet(rx.recvfrom(65535)[0])[0][1][0] for _ in range(4))
+        assert got == ["msg0", "msg1", "msg2", "msg3"]
+        c.send_avatar_params({"Mood": 0.5})
+        rx.recvfrom(65535)
+    finally:
+        t.stop()
+        rx.close()
+    m = t.metrics()
+    assert m["sent"] == 5 and m["dropped"] == 0
+    # only the transport's measured send latency, not the client's enqueue time
+    assert len(rc._latencies) == 5 and all(ms >= 0 for ms in rc._latencies)
+
+
+def test_runs_on_caller_loop_and_drops_oldest_when_full():
+    rx = _receiver()
+
+    async def scenario():
+        t = AsyncOscTransport("127.0.0.1", rx.getsockname()[1], queue_max=2).start()
+        # enqueued from the loop thread before the writer ran: only the newest two survive
+        for i in range(5):
+            t.enqueue(bytes([i]) * 4)
+        await asyncio.sleep(0.05)
+        m = t.metrics()
+        await t._close()
+        return m
+
+    try:
+        m = asyncio.run(scenario())
+        assert m["sent"] == 2 and m["dropped"] == 3
+        assert rx.recvfrom(64)[0] == b"\x03" * 4
+        assert rx.recvfrom(64)[0] == b"\x04" * 4
+    finally:
+        rx.close()
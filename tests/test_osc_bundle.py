@@ -0,0 +1,42 @@
+import socket
+import struct
+
+from vrc.osc_client import OscClient
+from vrc.osc_codec import BUNDLE_TAG, decode_packet, encode_message, ntp_timetag, pack_bundles
+
+
+def test_message_and_bundle_roundtrip():
+    m = encode_message("/avatar/parameters/Mood", 0.5)
+    assert len(m) % 4 == 0
+    assert decode_packet(m) == [("/avatar/parameters/Mood", [0.5])]
+    msgs = [("/a", 1), ("/b", [True, "hi", 2.0])]
+    (dgram,) = pack_bundles(msgs, timetag=ntp_timetag(0.5))
+    assert dgram.startswith(BUNDLE_TAG)
+    assert struct.unpack_from(">Q", dgram, 8)[0] == (2208988800 << 32) | (1 << 31)
+    assert decode_packet(dgram) == [("/a", [1]), ("/b", [True, "hi", 2.0])]
+
+
+def test_pack_bundles_splits_at_mtu():
+    msgs = [(f"/avatar/parameters/P{i:03d}", float(i)) for i in range(100)]
+    dgrams = pack_bundles(msgs, mtu=256)
+    assert len(dgrams) > 1
+    assert all(len(d) <= 256 for d in dgrams)
+    assert [a for d in dgrams for a, _ in decode_packet(d)] == [a for a, _ in msgs]
+
+
+def test_chunk_diffs_arrive_as_one_datagram():
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(1.0)
+    try:
+        c = OscClient(port=rx.getsockname()[1], max_hz=0)
+        c.send_avatar_params({"N_Valence": 0.2, "N_Interest": 0.4, "N_Arousal": 0.6, "N_Gesture": 0.1, "N_Look": 0.8})
+        data, _ = rx.recvfrom(65535)
+        assert len(decode_packet(data)) == 5
+        assert c.packets_sent == 1
+        # unchanged values are not resent; only the diff goes out
+        c.send_avatar_params({"N_Valence": 0.2, "N_Look": 0.9})
+        data, _ = rx.recvfrom(65535)
+        assert decode_packet(data) == [("/avatar/parameters/N_Look", [0.8999999761581421])]
+    finally:
+        rx.close()
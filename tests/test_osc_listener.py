@@ -0,0 +1,80 @@
+import socket
+import time
+
+from core.memory.avatar_store import AvatarStore
+from vrc.osc_client import OscClient
+from vrc.osc_codec import encode_message, pack_bundles
+from vrc.osc_listener import AvatarStateMirror, OscListener
+
+
+def _wait(pred, timeout=1.0):
+    end = time.time() + timeout
+    while not pred() and time.time() < end:
+        time.sleep(0.01)
+    return pred()
+
+
+def test_listener_mirrors_params_avatar_change_and_typing():
+    store = AvatarStore()
+    mirror = AvatarStateMirror()
+    changes = []
+    lst = OscListener(mirror, port=0, avatar_store=store, on_avatar_change=changes.append).start()
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        assert lst.wait_ready()
+        tx.sendto(pack_bundles([("/avatar/parameters/Mood", 0.25), ("/avatar/parameters/Blink", True)])[0], lst.addr)
+        tx.sendto(encode_message("/chatbox/typing", True), lst.addr)
+        assert _wait(lambda: mirror.received == 3)
+        snap = mirror.snapshot()
+        assert snap["params"] == {"Mood": 0.25, "Blink": True} and snap["typing"] is True
+        # avatar change resets the table and is recorded in AvatarStore
+        tx.sendto(encode_message("/avatar/change", "avtr_123"), lst.addr)
+        tx.sendto(b"garbage", lst.addr)
+        assert _wait(lambda: changes == ["avtr_123"])
+        assert mirror.params == {}
+        assert store.get_avatar_stats("self", "avtr_123")["seen_count"] == 1
+        assert _wait(lambda: lst.malformed == 1)
+    finally:
+        tx.close()
+        lst.stop()
+
+
+def test_client_diffs_against_mirrored_state():
+    mirror = AvatarStateMirror()
+    sent = []
+
+    class Recording(OscClient):
+        def _send_bundled(self, diffs, timetag=1):
+            sent.append(dict(diffs))
+
+    c = Recording(max_hz=0, state_mirror=mirror)
+    c.send_avatar_params({"Mood": 0.3})
+    # avatar reports the value back as float32: no resend
+    mirror.apply("/avatar/parameters/Mood", [0.30000001192092896])
+    c.send_avatar_params({"Mood": 0.3})
+    # avatar reset the parameter behind our back: the same value is sent again
+    mirror.apply("/avatar/parameters/Mood", [0.0])
+    c.send_avatar_params({"Mood": 0.3})
+    assert sent == [{"Mood": 0.3}, {"Mood": 0.3}]
+
+
+def test_avatar_change_resends_everything_and_is_stored_on_disk(monkeypatch, tmp_path):
+    import main
+    sent = []
+    monkeypatch.setattr(main, "speaker_store", None, raising=False)
+    monkeypatch.setattr(OscClient, "_send_bundled", lambda self, diffs, timetag=1: sent.append(dict(diffs)))
+    db = tmp_path / "data" / "avatar.sqlite"
+    c = main.build_osc_client({"osc": {"listen": True, "listen_port": 0, "max_hz": 0, "rate_control": False,
+                                       "avatar_db": str(db)}})
+    lst = main.osc_listener
+    try:
+        assert lst.wait_ready()
+        c.send_avatar_params({"Mood": 0.3})
+        lst._on_datagram(encode_message("/avatar/change", "avtr_9"))
+        # the new avatar loaded its defaults: the unchanged value goes out again
+        c.send_avatar_params({"Mood": 0.3})
+    finally:
+        lst.stop()
+        main.osc_listener = None
+    assert sent == [{"Mood": 0.3}, {"Mood": 0.3}]
+    assert AvatarStore(str(db)).get_avatar_stats("self", "avtr_9")["seen_count"] == 1
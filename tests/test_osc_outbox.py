@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from vrc.osc_client import OscClient
+
+
+class RecordingOsc(OscClient):
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.batches = []
+
+    def _send_bundled(self, diffs, timetag=1):
+        self.batches.append(dict(diffs))
+
+
+def test_writes_inside_interval_are_coalesced_not_dropped():
+    c = RecordingOsc(max_hz=20.0)
+    c.send_avatar_params({"Mood": 0.1, "InterestLevel": 0.2})
+    # debug-mode style second send immediately after: corrected value must still arrive
+    c.send_avatar_params({"Mood": 0.3})
+    c.send_avatar_params({"Mood": 0.4, "Look": 0.5})
+    assert c.batches == [{"Mood": 0.1, "InterestLevel": 0.2}]
+    assert c.pending() == {"Mood": 0.4, "Look": 0.5}
+    assert c.coalesced == 1
+    end = time.time() + 1.0
+    while len(c.batches) < 2 and time.time() < end:
+        time.sleep(0.01)
+    assert c.batches[1] == {"Mood": 0.4, "Look": 0.5}
+    assert c.pending() == {}
+
+
+def test_flush_from_running_loop_and_counts_drops():
+    async def scenario():
+        c = RecordingOsc(max_hz=50.0)
+        c.send_avatar_params({"A": 1.0})
+        c.send_avatar_params({"A": 2.0, "B": "not-a-number"})
+        assert c.dropped == 1
+        await asyncio.sleep(0.1)
+        return c
+    c = asyncio.run(scenario())
+    assert c.batches == [{"A": 1.0}, {"A": 2.0}]
+
+
+def test_close_delivers_final_state():
+    c = RecordingOsc(max_hz=1.0)
+    c.send_avatar_params({"A": 1.0})
+    c.send_avatar_params({"A": 0.0})
+    c.close()
+    assert c.batches == [{"A": 1.0}, {"A": 0.0}]
@@ -0,0 +1,50 @@
+import asyncio
+
+import main
+from vrc.osc_param_map import compile_params_map
+
+PM = {"valence": "Mood", "interest": "InterestLevel", "arousal": "Arousal", "gesture": "Gesture", "look_x": "LookX",
+      "state": "State"}
+
+
+def test_resolves_aliases_and_clamps():
+    cmap = compile_params_map(PM, {"arousal": [0.0, 0.5]})
+    assert cmap.resolve("N_Look") == "LookX" and cmap.resolve("N_LookX") == "LookX"
+    assert cmap.resolve("n_arousal") is None  # not an N_ key
+    assert cmap.resolve("N_AROUSAL") == "Arousal"  # other casings are learned
+    assert cmap.resolve("N_Glitch") is None  # unmapped
+    out = cmap.prepare({"osc": {"N_Arousal": 0.9, "N_Gesture": 2, "N_State": "3", "N_Look": -4.0, "N_Unknown": 1}}, {})
+    assert out == {"Arousal": 0.5, "Gesture": 2, "State": 3, "LookX": -1.0}
+
+
+def test_valence_and_interest_rules_match_emit_chunk():
+    cmap = compile_params_map(PM, face_valence=main.get_face_valence)
+    out = cmap.prepare({"osc": {"N_Valence": 0.5}, "interest": 2.0}, {})
+    assert out == {"Mood": main.get_face_valence(0.5, 1.0), "InterestLevel": 1.0}
+    assert cmap.prepare({"valence": -0.4}, {}) == {"Mood": -0.4}
+    legacy = {"_legacy": {"look_x": 0.2, "arousal": 0.7}}
+    assert cmap.prepare(legacy, {}) == {"LookX": 0.2, "Arousal": 0.7, "Mood": 0.0}
+
+
+class Osc:
+    def __init__(self):
+        self.sent = []
+    def send_avatar_params(self, params):
+        self.sent.append(dict(params))
+
+
+class St:
+    name = "TALK"
+
+
+class SM:
+    state = St()
+
+
+def test_emit_chunk_live_mode_sends_compiled_params():
+    osc = Osc()
+    chunk = {"id": "c1", "type": "say", "text": "", "pause_ms": 0, "osc": {"N_Valence": 0.5, "N_Arousal": 0.2}}
+    asyncio.run(main.emit_chunk(chunk, osc, PM, St(), SM(), mode="live"))
+    assert osc.sent == [{"Mood": 0.5, "Arousal": 0.2}]
+    # compiled once per params_map
+    assert main.compiled_params_map(PM) is main.compiled_params_map(PM)
@@ -0,0 +1,157 @@
+from osc.face_animator import FaceAnimator
+from osc.rate_controller import OscRateController, fair_shares
+from vrc.osc_client import OscClient
+
+
+class Clock:
+    def __init__(self, t=1000.0):
+        self.t = t
+    def now(self):
+        return self.t
+
+
+class DummyOsc:
+    def __init__(self):
+        self.sent = []
+    def send_avatar_params(self, params):
+        self.sent.append(dict(params))
+
+
+def test_fair_shares_redistributes_unused_budget():
+    shares = fair_shares(30, {"chunk": 5, "drift": 100, "blink": 100}, {"chunk": 4, "drift": 1, "blink": 1})
+    assert shares["chunk"] == 5
+    assert abs(shares["drift"] - 12.5) < 1e-9 and abs(shares["blink"] - 12.5) < 1e-9
+    shares = fair_shares(10, {"chunk": 100, "drift": 100}, {"chunk": 4, "drift": 1})
+    assert abs(shares["chunk"] - 8) < 1e-9 and abs(shares["drift"] - 2) < 1e-9
+
+
+def test_aimd_decreases_on_slow_sends_and_recovers():
+    clock = Clock()
+    rc = OscRateController({"osc_budget_pps": 30}, clock)
+    rc.allow("chunk")
+    for _ in range(5):
+        rc.observe_send(80.0)
+    clock.t += 1.0
+    rc.allow("chunk")
+    assert rc.last_decision == "decrease" and abs(rc.budget - 21.0) < 1e-9
+    for _ in range(30):
+        rc.observe_send(1.0)
+    clock.t += 1.0
+    rc.allow("chunk")
+    assert rc.last_decision == "increase" and abs(rc.budget - 22.0) < 1e-9
+    rc.observe_send(1.0, pressure=0.9)
+    clock.t += 1.0
+    rc.allow("chunk")
+    assert rc.last_decision == "decrease"
+
+
+def test_token_bucket_denies_over_share_and_reports_metrics():
+    clock = Clock()
+    rc = OscRateController({"osc_budget_pps": 4, "osc_budget_burst_sec": 0.5}, clock)
+    granted = sum(rc.allow("blink") for _ in range(5))
+    assert granted == 1
+    assert rc.retry_after("blink") > 0
+    clock.t += 0.5
+    assert rc.allow("blink")
+    m = rc.metrics()
+    assert m["budget_pps"] == 4.0
+    assert m["sources"]["blink"]["granted"] == 2 and m["sources"]["blink"]["denied"] == 4
+
+
+def test_face_animator_holds_denied_source_for_later_tick():
+    clock, osc = Clock(), DummyOsc()
+    rc = OscRateController({"osc_budget_pps": 2, "osc_budget_min_pps": 1}, clock)
+    anim = FaceAnimator(osc, {}, clock, rate_controller=rc)
+    anim.set_target("Mood", 0.5, duration=0)
+    assert anim.tick() == {"Mood": 0.5}
+    anim.set_target("Mood", 0.9, duration=0)
+    assert anim.tick() == {}  # no tokens left for "chunk"
+    clock.t += 1.0
+    assert anim.tick() == {"Mood": 0.9}
+
+
+def test_osc_client_reports_send_duration():
+    clock = Clock()
+    rc = OscRateController({}, clock)
+    client = OscClient(port=9, max_hz=0, rate_controller=rc)
+    try:
+        client.send_avatar_params({"Mood": 0.5}, source="chunk")
+    finally:
+        client.close()
+    assert client.packets_sent == 1
+    assert len(rc._latencies) == 1 and rc._latencies[0] >= 0.0
+    assert rc.metrics()["sources"]["chunk"]["granted"] == 1
+
+
+def test_osc_client_takes_pressure_from_the_controller_or_transport():
+    seen = []
+    rc = OscRateController({}, Clock(), pressure_fn=lambda sock: seen.append(sock) or 0.8)
+    client = OscClient(port=9, max_hz=0, rate_controller=rc)
+    try:
+        client.send_avatar_params({"Mood": 0.5}, source="chunk")
+    finally:
+        client.close()
+    assert len(seen) == 1 and rc.metrics()["pressure"] == 0.8
+
+    class Transport:
+        def enqueue(self, dgram):
+            pass
+        def pressure(self):
+            return 0.25
+        def stop(self):
+            pass
+
+    rc = OscRateController({}, Clock(), pressure_fn=lambda sock: 1.0)
+    client = OscClient(port=9, max_hz=0, transport=Transport(), rate_controller=rc)
+    client.send_avatar_params({"Mood": 0.5}, source="chunk")
+    assert rc.metrics()["pressure"] == 0.25
+
+
+def test_chunk_params_spend_the_chunk_budget(monkeypatch):
+    import main
+    rc = OscRateController({}, Clock())
+    client = OscClient(port=9, max_hz=0, rate_controller=rc)
+    monkeypatch.setattr(main, "face_animator", None)
+    try:
+        main._send_chunk_params({"Mood": 0.5}, client)
+        main._send_chunk_params({"Mood": -0.5}, client, snap=True)
+    finally:
+        client.close()
+    sources = rc.metrics()["sources"]
+    assert list(sources) == ["chunk"] and sources["chunk"]["granted"] == 1  # the snap is not budgeted
+    assert client.packets_sent == 2
+
+
+def test_runtime_presence_sources_share_the_controller_budget(monkeypatch):
+    import asyncio
+
+    import main
+    from core.state_machine import State, StateMachine
+
+    monkeypatch.setattr(main, "cfg", {"enable_face_animator": True, "face_anim_tick_hz": 50,
+                                      "enable_idle_face_drift": True, "stt": {"listener_enabled": False}}, raising=False)
+    for name in ("face_animator", "presence_blink", "idle_face_drift", "osc_rate_controller"):
+        monkeypatch.setattr(main, name, None, raising=False)
+    osc = main.build_osc_client({"osc": {"transport": "async", "port": 9, "max_hz": 0}})
+    rc = main.osc_rate_controller
+    # the async transport's measured latency feeds the controller, nothing else governs
+    assert rc is not None and osc.transport.latency_sink == rc.observe_latency
+    assert not hasattr(main, "presence_backpressure")
+    sm = StateMachine()
+    sm.state = State.IDLE
+
+    async def scenario():
+        anim = main.start_face_animator(sm, osc)
+        main._send_chunk_params({"Mood": 0.4}, osc)
+        await asyncio.sleep(0.1)
+        for t in main._face_tasks:
+            t.cancel()
+        return anim
+
+    try:
+        anim = asyncio.run(scenario())
+    finally:
+        osc.close()
+    assert anim.rate_controller is rc
+    assert {"chunk", "drift"} <= set(rc.metrics()["sources"])
+    assert rc._latencies  # transport send latency reached the controller
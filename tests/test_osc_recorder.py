@@ -0,0 +1,84 @@
+import socket
+
+from vrc.osc_client import OscClient
+from vrc.osc_codec import decode_packet
+from vrc.osc_recorder import OscRecorder, analyze, read_log, replay
+
+
+class Clock:
+    def __init__(self):
+        self.t = 50.0
+    def __call__(self):
+        return self.t
+
+
+def _record(path):
+    clock = Clock()
+    rec = OscRecorder(str(path), time_fn=clock)
+    client = OscClient(max_hz=0, transport=rec)
+    client.send_avatar_params({"Mood": 0.5, "Gesture": 1})
+    clock.t += 0.5
+    client.send_avatar_params({"Mood": 0.5, "Gesture": 2})  # Mood unchanged -> not sent
+    clock.t += 0.5
+    client._send_bundled({"Mood": 0.5})  # a redundant send that bypasses the diff
+    client.send_chatbox("hi")
+    client.close()
+    return rec
+
+
+def test_records_every_datagram_with_timestamps(tmp_path):
+    path = tmp_path / "osc.log"
+    rec = _record(path)
+    records = list(read_log(str(path)))
+    assert rec.recorded == len(records) == 4
+    assert [t for t, _ in records] == [0.0, 0.5, 1.0, 1.0]
+    assert decode_packet(records[1][1]) == [("/avatar/parameters/Gesture", [2])]
+
+
+def test_analyze_reports_rates_churn_and_redundancy(tmp_path):
+    path = tmp_path / "osc.log"
+    _record(path)
+    report = analyze(read_log(str(path)))
+    assert report["packets"] == 4 and report["duration_sec"] == 1.0
+    assert report["pps_avg"] == 4.0 and report["pps_peak"] == 2
+    assert report["params"]["Mood"] == {"sends": 2, "changes": 1, "redundant": 1, "churn_per_sec": 1.0}
+    assert report["params"]["Gesture"]["changes"] == 2
+    assert report["redundant_sends"] == 1
+    assert report["other_addresses"] == {"/chatbox/input": 1}
+
+
+def test_replay_resends_at_scaled_speed(tmp_path):
+    path = tmp_path / "osc.log"
+    _record(path)
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(1.0)
+    clock, sleeps = Clock(), []
+
+    def fake_sleep(d):
+        sleeps.append(round(d, 6))
+        clock.t += d
+
+    try:
+        n = replay(read_log(str(path)), "127.0.0.1", rx.getsockname()[1], speed=2.0, sleep=fake_sleep, time_fn=clock)
+        got = [rx.recvfrom(65535)[0] for _ in range(n)]
+    finally:
+        rx.close()
+    assert n == 4
+    assert sleeps == [0.25, 0.25]
+    assert got == [d for _, d in read_log(str(path))]
+
+
+def test_log_is_flushed_periodically_not_only_on_stop(tmp_path):
+    path = tmp_path / "osc.log"
+    clock = Clock()
+    rec = OscRecorder(str(path), time_fn=clock, flush_every=3, flush_interval_sec=1.0)
+    for _ in range(3):
+        rec.enqueue(b"/a\x00\x00,\x00\x00\x00")
+    assert len(list(read_log(str(path)))) == 3  # by count, while still recording
+    rec.enqueue(b"/b\x00\x00,\x00\x00\x00")
+    assert len(list(read_log(str(path)))) == 3
+    clock.t += 1.0
+    rec.enqueue(b"/c\x00\x00,\x00\x00\x00")
+    assert len(list(read_log(str(path)))) == 5  # by time
+    rec.stop()
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+
+import main
+from speech.plan_pipeline import PlanPipeline
+
+
+def _chunks(n, pause_ms=20, text="x"):
+    return [{"id": f"c{i}", "text": text, "pause_ms": pause_ms, "osc": {"N_Valence": 0.1 * i}} for i in range(n)]
+
+
+def _pipeline(events, synth_s=0.03, play_s=0.04, lookahead=2, tmp_path="./tmp"):
+    lock = threading.Lock()
+
+    def log(*e):
+        with lock:
+            events.append(e)
+
+    def synthesize(text, prosody, path):
+        log("synth_start", prosody["i"])
+        time.sleep(synth_s)
+        log("synth_end", prosody["i"])
+        return True
+
+    def play(path):
+        log("play", path)
+        time.sleep(play_s)
+
+    return PlanPipeline(
+        prepare=lambda c: ({"Mood": c["osc"]["N_Valence"]}, {"i": int(c["id"][1:])}),
+        synthesize=synthesize,
+        play=play,
+        send_osc=lambda params, c: log("osc", c["id"]),
+        on_chunk_done=lambda c: log("done", c["id"]),
+        lookahead=lookahead,
+        tmp_dir=str(tmp_path),
+    )
+
+
+def test_osc_lands_with_audio_start_and_synthesis_runs_ahead(tmp_path):
+    events = []
+    report = asyncio.run(_pipeline(events, tmp_path=tmp_path).run(_chunks(4)))
+    # the face change is sent right before that chunk's audio starts
+    order = [e[1] if e[0] == "osc" else e[0] for e in events if e[0] in ("osc", "play")]
+    assert order == ["c0", "play", "c1", "play", "c2", "play", "c3", "play"]
+    # chunk 1 and 2 are synthesized before chunk 0 finishes playing
+    assert events.index(("synth_end", 2)) < events.index(("done", "c0"))
+    assert [r["id"] for r in report["chunks"]] == ["c0", "c1", "c2", "c3"]
+    # gap after the first chunk is the pause, not pause + synthesis
+    assert 15 <= report["max_gap_ms"] < 45
+
+
+def test_chunks_without_audio_keep_pacing(tmp_path):
+    events = []
+    p = _pipeline(events, tmp_path=tmp_path)
+    p.synthesize = None
+    t0 = time.perf_counter()
+    report = asyncio.run(p.run(_chunks(3, pause_ms=30)))
+    assert [e for e in events if e[0] == "play"] == []
+    assert [e[1] for e in events if e[0] == "osc"] == ["c0", "c1", "c2"]
+    assert time.perf_counter() - t0 >= 0.085  # three pauses
+    assert report["chunks"][1]["gap_ms"] >= 25
+
+
+def test_emit_plan_wires_main(monkeypatch, tmp_path):
+    played = []
+
+    class TTS:
+        def synthesize(self, text, prosody, path):
+            return True
+
+    class Osc:
+        def __init__(self):
+            self.sent = []
+        def send_avatar_params(self, params):
+            self.sent.append(dict(params))
+
+    class St:
+        name = "TALK"
+
+    class SM:
+        state = St()
+        done = 0
+        def mark_speech_done(self):
+            SM.done += 1
+
+    monkeypatch.setattr(main, "tts", TTS())
+    monkeypatch.setattr(main, "play_wav", played.append)
+    monkeypatch.setattr(main, "map_prosody", lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    monkeypatch.setattr(main, "resource_watcher", None)
+    monkeypatch.setattr(main, "self_regulator", None)
+    osc = Osc()
+    report = asyncio.run(main.emit_plan({"speech_plan": _chunks(2, pause_ms=0)}, osc, {"valence": "Mood"}, St(), SM(),
+                                        mode="live"))
+    assert len(played) == 2 and SM.done == 2
+    assert osc.sent == [{"Mood": 0.0}, {"Mood": 0.1}]
+    assert len(report["chunks"]) == 2
+
+
+def test_response_delay_is_added_to_the_plan_pause(monkeypatch):
+    class TTS:
+        def synthesize(self, text, prosody, path):
+            return True
+
+    class Osc:
+        def send_avatar_params(self, params):
+            pass
+
+    class St:
+        name = "TALK"
+
+    class SM:
+        state = St()
+        def mark_speech_done(self):
+            pass
+
+    monkeypatch.setattr(main, "tts", TTS())
+    monkeypatch.setattr(main, "play_wav", lambda path: None)
+    monkeypatch.setattr(main, "map_prosody", lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    monkeypatch.setattr(main, "resource_watcher", None)
+    monkeypatch.setattr(main, "self_regulator", None)
+    monkeypatch.setattr(main.EmissionContext, "tempo", lambda self, key: {"response_delay_ms": 60, "prosody_speed_scale": 1.0})
+    report = asyncio.run(main.emit_plan({"speech_plan": _chunks(2, pause_ms=10)}, Osc(), {"valence": "Mood"}, St(), SM(),
+                                        mode="live"))
+    assert report["chunks"][1]["gap_ms"] >= 65
+
+
+def test_cancelled_plan_synthesis_never_writes_the_next_plans_file(tmp_path):
+    release = threading.Event()
+    written = []
+
+    def synthesize(text, prosody, path):
+        if text == "slow":
+            release.wait(2.0)  # still running after its plan was cancelled
+        with open(path, "w") as f:
+            f.write(text)
+        written.append(path)
+        return True
+
+    played = []
+
+    def play(path):
+        with open(path) as f:
+            played.append(f.read())
+
+    def pipeline():
+        return PlanPipeline(prepare=lambda c: ({}, {"speed": 1.0}), synthesize=synthesize, play=play,
+                            send_osc=lambda params, c: None, tmp_dir=str(tmp_path))
+
+    async def scenario():
+        first = pipeline()
+        task = asyncio.ensure_future(first.run(_chunks(1, text="slow")))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await pipeline().run(_chunks(1, text="alert"))
+        release.set()
+
+    asyncio.run(scenario())
+    deadline = time.time() + 2.0
+    while len(written) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert played == ["alert"]
+    assert written[0] != written[1]
+    time.sleep(0.05)
+    assert list(tmp_path.iterdir()) == []  # both plans' files are removed
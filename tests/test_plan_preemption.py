@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+import main
+from core.state_machine import State, StateMachine
+from speech.plan_pipeline import PlanPipeline
+
+
+class StoppablePlay:
+    """play(path) blocks like play_wav until the clip ends or stop() cuts it."""
+
+    def __init__(self, clip_s=2.0):
+        self.clip_s = clip_s
+        self.cut = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        self.started.set()
+        self.cut.wait(self.clip_s)
+
+    def stop(self):
+        self.cut.set()
+
+
+def _chunks(n):
+    return [{"id": f"c{i}", "text": "x", "pause_ms": 10, "osc": {"N_Valence": 0.1}} for i in range(n)]
+
+
+def test_preempt_cancels_mid_chunk_from_another_thread(tmp_path):
+    play = StoppablePlay()
+    preempted = []
+    p = PlanPipeline(prepare=lambda c: ({}, {"p": 1}), synthesize=lambda text, prosody, path: True, play=play,
+                     send_osc=lambda params, c: None, on_preempt=lambda reason, c: preempted.append((reason, c["id"])),
+                     stop_audio=play.stop, tmp_dir=str(tmp_path))
+    assert not p.preempt()  # nothing running
+
+    def interrupter():
+        play.started.wait(1.0)
+        assert p.preempt("alert_new")
+
+    threading.Thread(target=interrupter, daemon=True).start()
+    t0 = time.perf_counter()
+    report = asyncio.run(p.run(_chunks(3)))
+    assert time.perf_counter() - t0 < 1.0  # not the 2 s clip, nor the rest of the plan
+    assert play.calls == 1 and preempted == [("alert_new", "c0")]
+    assert report["preempted"] == "alert_new" and 0 <= report["preempt_ms"] < 500
+    assert [r["id"] for r in report["chunks"]] == ["c0"]
+
+
+class Osc:
+    def __init__(self):
+        self.sent = []
+    def send_avatar_params(self, params):
+        self.sent.append(dict(params))
+
+
+class SimTTS:
+    def synthesize(self, text, prosody, path):
+        return True
+
+
+def test_alert_during_plan_snaps_to_alert(monkeypatch, tmp_path):
+    play = StoppablePlay()
+    monkeypatch.setattr(main, "tts", SimTTS())
+    monkeypatch.setattr(main, "play_wav", play)
+    monkeypatch.setattr(main, "map_prosody", lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    monkeypatch.setattr(main, "_stop_audio", play.stop)
+    monkeypatch.setattr(main, "resource_watcher", None)
+    monkeypatch.setattr(main, "face_animator", None)
+    sm = StateMachine()
+    sm.state = State.TALK
+    main.attach_preemption(sm)
+    osc = Osc()
+    pm = {"valence": "Mood", "state": "State", "arousal": "Arousal"}
+
+    async def scenario():
+        task = asyncio.ensure_future(main.emit_plan(_chunks(3), osc, pm, State.TALK, sm, mode="live"))
+        while not play.started.is_set():
+            await asyncio.sleep(0.005)
+        sm.on_event("alert_new", {"id": "eq1"})
+        return await task
+
+    report = asyncio.run(scenario())
+    assert report["preempted"] == "alert_new"
+    assert sm.state == State.ALERT and sm._pending_alert == {"id": "eq1"}
+    assert osc.sent[-1]["State"] == 5 and osc.sent[-1]["Arousal"] == 0.85
+    assert main.preempt_latency_ms[-1] == report["preempt_ms"]
+    assert main._active_plan is None
+
+
+def test_emergency_trigger_preempts_the_plan(monkeypatch, tmp_path):
+    play = StoppablePlay()
+    monkeypatch.setattr(main, "tts", SimTTS())
+    monkeypatch.setattr(main, "play_wav", play)
+    monkeypatch.setattr(main, "map_prosody", lambda v, i, a, cfg=None: {"pitch": 1.0, "speed": 1.0, "energy": 1.0})
+    monkeypatch.setattr(main, "_stop_audio", play.stop)
+    monkeypatch.setattr(main, "resource_watcher", None)
+    monkeypatch.setattr(main, "face_animator", None)
+    sm = StateMachine()
+    sm.state = State.TALK
+    main.attach_preemption(sm)
+    osc = Osc()
+    pm = {"valence": "Mood", "state": "State", "arousal": "Arousal"}
+
+    async def scenario():
+        task = asyncio.ensure_future(main.emit_plan(_chunks(3), osc, pm, State.TALK, sm, mode="live"))
+        while not play.started.is_set():
+            await asyncio.sleep(0.005)
+        sm.on_event("emergency_trigger", {"message_ja": "地震です"})
+        return await task
+
+    t0 = time.perf_counter()
+    report = asyncio.run(scenario())
+    assert time.perf_counter() - t0 < 1.0 and play.calls == 1
+    assert report["preempted"] == "emergency" and sm.state == State.ALERT
+    assert osc.sent[-1]["State"] == 5
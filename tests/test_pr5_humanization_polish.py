@@ -1,6 +1,7 @@
 import time
 import pytest
-from core.state_machine import StateMachine, State
+from core.sm_scheduler import DeferredScheduler
+from core.state_machine import StateMachine, State, reply_delay_sec
 
 class DummySM(StateMachine):
     def __init__(self, cfg=None, session_id="sess", turn_index=0):
@@ -37,17 +38,52 @@ def make_cfg(enabled=True, aliases=None):
         }
     }
 
+class ManualClock:
+    def __init__(self):
+        self.t = 100.0
+    def __call__(self):
+        return self.t
+
 def test_pr5_deterministic_delay_and_skip(monkeypatch):
     sm = DummySM(cfg=make_cfg(), session_id="sess1", turn_index=1)
-    # Patch time.sleep to record delay
-    delays = []
-    monkeypatch.setattr("time.sleep", lambda d: delays.append(d))
-    # Should always delay deterministically
+    clock = ManualClock()
+    sm.scheduler = DeferredScheduler(clock, auto=False)
+    # The reply delay must never block the caller
+    monkeypatch.setattr("time.sleep", lambda d: pytest.fail("stt_final must not sleep"))
     sm.on_event("stt_final", {"text": "美空 教えて"})
-    assert any(0.19 < d < 0.7 for d in delays)
+    delay = reply_delay_sec("美空 教えて")
+    assert 0.19 < delay < 0.7
+    assert delay == reply_delay_sec("美空 教えて")  # deterministic
+    assert not sm._entered_talk
+    clock.t += delay - 0.01
+    sm.scheduler.run_due()
+    assert not sm._entered_talk
+    clock.t += 0.01
+    sm.scheduler.run_due()
     # Should not skip reply if density low
     assert sm._entered_talk
 
+def test_pr5_burst_supersedes_pending_reply():
+    sm = DummySM(cfg=make_cfg(), session_id="sess1b", turn_index=1)
+    clock = ManualClock()
+    sm.scheduler = DeferredScheduler(clock, auto=False)
+    for i in range(5):
+        sm.on_event("stt_final", {"text": f"美空 {i}"})
+        clock.t += 0.05
+    assert sm.scheduler.pending() == 1
+    clock.t += 1.0
+    assert sm.scheduler.run_due() == 1 and sm._entered_talk
+
+def test_pr5_alert_during_reply_delay_wins():
+    sm = DummySM(cfg=make_cfg(), session_id="sess1c", turn_index=1)
+    clock = ManualClock()
+    sm.scheduler = DeferredScheduler(clock, auto=False)
+    sm.on_event("stt_final", {"text": "美空 教えて"})
+    sm.on_event("alert_new", {"id": "a1"})
+    clock.t += 1.0
+    sm.scheduler.run_due()
+    assert sm.state == State.ALERT and not sm._entered_talk
+
 def test_pr5_skip_on_density(monkeypatch):
     sm = DummySM(cfg=make_cfg(), session_id="sess2", turn_index=2)
     # Simulate high density
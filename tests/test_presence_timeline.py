@@ -0,0 +1,79 @@
+import math
+
+from core.determinism import DeterministicRNG
+from osc.presence_idle_drift import IdleFaceDrift, clamp
+from osc.presence_timeline import PresenceTimeline, phase_from_seed
+
+CFG = {'presence_seed': 42, 'blink_min_sec': 3.0, 'blink_max_sec': 8.0, 'presence_window_sec': 30.0,
+       'idle_face_drift_amp': 0.04, 'idle_face_drift_period_sec': 50.0, 'idle_face_drift_tick_hz': 0.2}
+
+
+def _blinks(tl, start, end, step=0.05):
+    out, t = [], start
+    while t < end:
+        if tl.blink_due(t):
+            tl.consume_blink(t)
+            out.append(round(t, 2))
+        t += step
+    return out
+
+
+def test_blink_schedule_is_seeded_and_spans_windows():
+    a = _blinks(PresenceTimeline(CFG), 1000.0, 1100.0)
+    b = _blinks(PresenceTimeline(CFG), 1000.0, 1100.0)
+    assert a == b
+    assert a[0] == 1000.0
+    gaps = [y - x for x, y in zip(a, a[1:])]
+    assert all(2.9 <= g <= 8.1 for g in gaps)
+    assert len(set(round(g, 1) for g in gaps)) > 1  # one RNG stream, not the same interval every time
+    # the first interval is the seed's first draw, as before
+    assert abs(a[1] - (1000.0 + DeterministicRNG(42 + 12345).uniform(3.0, 8.0))) < 0.06
+
+
+def test_missed_blinks_collapse_into_one():
+    tl = PresenceTimeline(CFG)
+    assert tl.blink_due(1000.0)
+    tl.consume_blink(1000.0)
+    assert tl.blink_due(1200.0)  # several windows later
+    tl.consume_blink(1200.0)
+    assert not tl.blink_due(1200.0)
+
+
+def test_drift_grid_matches_formula():
+    tl = PresenceTimeline(CFG)
+    k = tl.drift_index(1000.0)
+    assert k == 0
+    for k in (0, 1, 7, 20):  # 20 is past the first 30 s window
+        t = 1000.0 + k / 0.2
+        v, i = tl.drift_at(k)
+        assert abs(v - 0.04 * math.sin(2 * math.pi * t / 50.0 + phase_from_seed(42, "valence"))) < 1e-12
+        assert abs(i - (0.5 + 0.032 * math.sin(2 * math.pi * t / 50.0 + phase_from_seed(42, "interest")))) < 1e-12
+    assert tl.drift_index(1012.0) == 2
+
+
+class Osc:
+    def __init__(self):
+        self.calls = []
+    def send(self, address, value):
+        self.calls.append((address, value))
+    def send_param(self, name, value):
+        self.calls.append((name, value))
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+    def now(self):
+        return self.t
+
+
+def test_drift_sends_once_per_grid_step_through_one_path():
+    osc, clock = Osc(), Clock()
+    cfg = dict(CFG, enable_idle_face_drift=True)
+    drift = IdleFaceDrift(osc, clock, cfg, clamp, lambda: "IDLE", lambda: False)
+    for _ in range(20):  # 10 s at 2 Hz -> grid steps 0, 1 (and 2 at t=1010)
+        drift.tick()
+        clock.t += 0.5
+    drift.tick()
+    assert len(osc.calls) == 6
+    assert {a for a, _ in osc.calls} == {'/avatar/parameters/face_valence', '/avatar/parameters/face_interest'}
@@ -0,0 +1,134 @@
+import asyncio
+
+import main
+from core.alert_engine import build_alert_speech_plan
+from core.speech_brain import make_speech_plan
+from core.speech_plan import AROUSAL, Chunk, SpeechPlan
+from vrc.osc_param_map import compile_params_map
+
+PM = {"valence": "Mood", "interest": "InterestLevel", "arousal": "Arousal", "gesture": "Gesture",
+      "look_x": "LookX", "state": "State"}
+
+
+def normalized_dicts(plan):
+    """normalize_plan's dicts before Chunk: v1.2 keys only, `_legacy` is the builder's dict."""
+    return [{"id": c.get("id"), "type": c.get("type", "say"), "text": c.get("text", ""),
+             "pause_ms": int(c.get("pause_ms", 120)), "osc": c.get("osc"), "_legacy": c}
+            for c in plan["speech_plan"]]
+
+
+def test_chunk_round_trips_the_dict_shapes():
+    d = {"id": "c1", "type": "say", "text": "やあ", "pause_ms": 140, "confidence_tag": "med",
+         "osc": {"N_State": "TALK", "N_Arousal": 0.3, "N_Gesture": 2, "N_Look": 0.75, "N_Custom": "x"}}
+    c = Chunk.from_dict(d)
+    assert c.to_dict() == d
+    assert dict(c) == d and c["osc"]["N_Gesture"] == 2 and c.vals[AROUSAL] == 0.3
+    assert c.get("interest") is None and "N_Valence" not in c["osc"]
+    assert c["_legacy"] is d and Chunk()["_legacy"]["look_x"] == 0.0
+    assert c.face_scalars() == (0.0, 0.0, 0.3)
+
+    legacy = build_alert_speech_plan({"type": "earthquake", "severity": 5}, {})["chunks"]
+    plan = SpeechPlan.from_plan({"chunks": legacy})
+    assert [c.to_legacy() for c in plan] == legacy
+    assert plan[0].id == "c1" and plan[0]["osc"]["N_Look"] == (legacy[0]["look_x"] + 1.0) / 2.0
+    assert SpeechPlan.from_plan(plan) is plan and plan.as_dict()["speech_plan"] is plan.chunks
+
+
+def test_compiled_params_match_dict_chunks():
+    cmap = compile_params_map(PM, face_valence=main.get_face_valence)
+    plans = [
+        make_speech_plan("今日は雨だね。傘を忘れた。", curiosity=0.4, seed=3, use_agents=False),
+        build_alert_speech_plan({"type": "tsunami", "severity": 9}, {}),
+        {"speech_plan": [{"id": "x", "osc": {"N_Valence": 0.5, "N_State": "3"}, "interest": 2.0},
+                         {"id": "y", "valence": -0.4}]},
+    ]
+    for plan in plans:
+        dicts = plan["speech_plan"]
+        assert [cmap.prepare(Chunk.from_dict(d), {}) for d in dicts] == [cmap.prepare(d, {}) for d in normalized_dicts(plan)]
+
+
+def test_unknown_top_level_keys_stay_out_of_emission():
+    cmap = compile_params_map(dict(PM, look_y="LookY"), face_valence=main.get_face_valence)
+    d = {"id": "x", "text": "t", "osc": {"N_Valence": 0.5}, "interest": 2.0, "speaker_key": "k"}
+    c = Chunk.from_dict(d)
+    assert "interest" not in c and c.get("speaker_key") is None and "speaker_key" not in c.to_dict()
+    assert cmap.prepare(c, {}) == {"Mood": 0.5}
+    # nothing mapped: _legacy is read as the builder's dict, keys outside look_x/valence/... included
+    d = {"id": "y", "text": "t", "look_y": 0.4, "arousal": 0.7}
+    assert cmap.prepare(Chunk.from_dict(d), {}) == cmap.prepare(normalized_dicts({"speech_plan": [d]})[0], {})
+    assert cmap.prepare(Chunk.from_dict(d), {})["LookY"] == 0.4
+
+
+class Osc:
+    def __init__(self):
+        self.sent = []
+    def send_avatar_params(self, params):
+        self.sent.append(dict(params))
+
+
+class St:
+    name = "TALK"
+
+
+class SM:
+    state = St()
+
+
+def test_normalize_plan_feeds_emit_chunk():
+    chunks = main.normalize_plan({"speech_plan": [{"id": "c1", "text": "", "pause_ms": 0,
+                                                   "osc": {"N_Valence": 0.5, "N_Arousal": 0.2}}]})
+    assert type(chunks[0]) is Chunk
+    osc = Osc()
+    asyncio.run(main.emit_chunk(chunks[0], osc, PM, St(), SM(), mode="live"))
+    assert osc.sent == [{"Mood": 0.5, "Arousal": 0.2}]
+
+
+def test_integer_and_numpy_osc_values_go_to_the_array():
+    np = __import__("pytest").importorskip("numpy")
+    cmap = compile_params_map(PM, face_valence=main.get_face_valence)
+    for osc in ({"N_Valence": 1, "N_Interest": 1, "N_Gesture": 2, "N_State": 3},
+                {"N_Valence": np.float64(0.85), "N_Interest": np.int64(1), "N_Arousal": np.float32(0.5)},
+                {"N_Valence": "0.5", "N_Arousal": 0.25}):
+        d = {"id": "c1", "text": "x", "osc": osc}
+        c = Chunk.from_dict(d)
+        assert c.face_scalars() == main._face_scalars(d) == main._face_scalars(c)
+        assert cmap.prepare(c, {}) == cmap.prepare(d, {})
+    c = Chunk.from_dict({"osc": {"N_Valence": 1, "N_Gesture": 2, "N_State": "TALK"}})
+    assert c.face_scalars() == (1.0, 0.0, 0.0) and not c.osc_extra
+    assert type(c["osc"]["N_Gesture"]) is int and c.to_dict()["osc"] == {"N_State": "TALK", "N_Valence": 1, "N_Gesture": 2}
+    assert type(cmap.prepare(c, {})["Gesture"]) is int
+    assert Chunk.from_dict({"osc": {"N_Valence": True}}).osc_extra == {"N_Valence": True}
+
+
+def test_next_chunk_prefetch_accepts_a_chunk(monkeypatch, tmp_path):
+    from audio.prosody_mapper import map_prosody
+    from audio.prosody_signature import prosody_signature
+    from audio.tts_prefetcher import TTSPrefetcher
+
+    class TTS:
+        def __init__(self):
+            self.calls = []
+        def synthesize(self, text, prosody, out_path):
+            self.calls.append((text, prosody))
+            with open(out_path, "wb") as f:
+                f.write(b"RIFF")
+            return True
+
+    tts = TTS()
+    prefetcher = TTSPrefetcher(tts, cache_dir=str(tmp_path))
+    monkeypatch.setattr(main, "prefetcher", prefetcher)
+    monkeypatch.setattr(main, "map_prosody", map_prosody)
+    monkeypatch.setattr(main, "prosody_signature", prosody_signature)
+    nxt = main.normalize_plan({"speech_plan": [{"id": "c2", "text": "つぎ", "osc": {"N_Valence": 0.5}}]})[0]
+
+    class NextSM:
+        def get_next_chunk(self):
+            return nxt
+
+    main._prefetch_next_chunk(NextSM(), main.ProsodyConfig.from_dict({}))
+    sig = prosody_signature(0.5, 0.0, 0.0)
+    for _ in range(200):
+        if prefetcher.get(nxt, sig):
+            break
+        __import__("time").sleep(0.01)
+    assert prefetcher.get(nxt, sig) and tts.calls[0][0] == "つぎ" and tts.calls[0][1]
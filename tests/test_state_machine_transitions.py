@@ -0,0 +1,49 @@
+import pytest
+
+import core.state_machine as sm_mod
+from core.sm_scheduler import DeferredScheduler
+from core.state_machine import ANY, State, StateMachine
+
+
+def make_sm():
+    sm = StateMachine()
+    sm.scheduler = DeferredScheduler(lambda: 0.0, auto=False)
+    return sm
+
+
+def test_table_rows_resolve_per_state():
+    by_state = sm_mod._COMPILED["net_query"]
+    assert by_state[State.TALK.value][0][1] is StateMachine._on_net_query_deferred
+    assert by_state[ANY][0][1] is StateMachine._on_net_query
+    assert sm_mod._COMPILED["search_result"][ANY] == ()
+
+
+def test_unknown_guard_rejected():
+    with pytest.raises(ValueError):
+        sm_mod._compile_transitions({(ANY, "x"): [(("nope",), "name_confirm_no")]})
+
+
+def test_guard_evaluated_once_per_event(monkeypatch):
+    calls = []
+    real = sm_mod._GUARDS["speaking"]
+    monkeypatch.setitem(sm_mod._GUARDS, "speaking", lambda sm, p: calls.append(1) or real(sm, p))
+    monkeypatch.setitem(sm_mod._COMPILED, "stt_final", sm_mod._compile_transitions({
+        (ANY, "stt_final"): [(("speaking", "emergency_flag"), "stt_while_speaking"),
+                             (("speaking",), "stt_suppressed"), (("!speaking",), "stt_final")],
+    })["stt_final"])
+    sm = make_sm()
+    sm.on_event("stt_final", {"text": "hi"})
+    assert calls == [1]
+    assert sm.scheduler.pending() == 1
+
+
+def test_search_state_blocks_reply_and_greet():
+    sm = make_sm()
+    sm.state = State.SEARCH
+    sm.pending_greet = {"alias": "x"}
+    sm.on_event("stt_final", {"text": "hi", "speaker_alias": "a"})
+    assert sm.pending_greet is None and sm.scheduler.pending() == 0
+    sm.on_event("search_result", {"ok": True})
+    assert sm.state == State.TALK
+    sm.on_event("search_result", {"ok": True})  # no row for TALK: ignored
+    assert sm.state == State.TALK
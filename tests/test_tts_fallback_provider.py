@@ -0,0 +1,76 @@
+import threading
+import time
+
+from speech import VoiceSpec, TTSAudio
+from speech.interfaces import TTSProvider
+from speech.providers.fallback_provider import FallbackTTSProvider, OPEN, CLOSED
+
+
+class FakeTTS(TTSProvider):
+    def __init__(self, tag, delay=0.0, fail=False):
+        self.tag = tag
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.lock = threading.Lock()
+    def synthesize(self, text, voice, prosody, *, seed=None, request_id=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            return None
+        return TTSAudio(sample_rate=24000, pcm_bytes=self.tag.encode(), format="wav")
+
+
+def _say(p, text="こんにちは"):
+    a = p.synthesize(text, VoiceSpec(), {})
+    return a.pcm_bytes.decode() if a else None
+
+
+def test_routes_to_fastest_backend():
+    slow, fast = FakeTTS("slow", delay=0.03), FakeTTS("fast", delay=0.0)
+    p = FallbackTTSProvider([("slow", slow), ("fast", fast)], hedge_default_ms=1000, min_samples=1)
+    # first calls explore both backends (no samples yet)
+    _say(p)
+    _say(p)
+    time.sleep(0.05)
+    results = [_say(p) for _ in range(5)]
+    assert results[-1] == "fast"
+    assert p.metrics()["fast"]["wins"] >= 4
+
+
+def test_failure_falls_through_and_circuit_opens():
+    now = [100.0]
+    broken, ok = FakeTTS("broken", fail=True), FakeTTS("ok")
+    p = FallbackTTSProvider([("broken", broken), ("ok", ok)], failure_threshold=1, open_sec=30.0,
+                            clock=lambda: now[0])
+    assert _say(p) == "ok"
+    assert p.metrics()["broken"]["state"] == OPEN
+    calls = broken.calls
+    assert _say(p) == "ok"
+    assert broken.calls == calls  # skipped while open
+    # half-open probe after cooldown; success closes the breaker
+    now[0] += 31.0
+    broken.fail = False
+    assert _say(p) == "ok"
+    time.sleep(0.02)
+    assert p.metrics()["broken"]["state"] == CLOSED
+
+
+def test_hedges_slow_primary():
+    primary, backup = FakeTTS("primary"), FakeTTS("backup", delay=0.005)
+    p = FallbackTTSProvider([("primary", primary), ("backup", backup)], hedge_min_ms=10, min_samples=3)
+    for _ in range(4):
+        _say(p)
+    # primary gets stuck; backup answers after the hedge delay
+    primary.delay = 0.5
+    t0 = time.perf_counter()
+    assert _say(p) == "backup"
+    assert time.perf_counter() - t0 < 0.3
+    assert p.metrics()["backup"]["hedged"] == 1
+
+
+def test_all_failing_returns_none():
+    p = FallbackTTSProvider([("a", FakeTTS("a", fail=True)), ("b", FakeTTS("b", fail=True))])
+    assert _say(p) is None
+    assert _say(p, "  ") is None
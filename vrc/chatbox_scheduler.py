@@ -0,0 +1,206 @@
+"""Central chatbox scheduler.
+
+All chatbox text goes through one queue so VRChat's chatbox limits are respected:
+- priority: emergency > reply > debug (FIFO within a priority)
+- pacing: at most one message per `min_interval_sec`
+- splitting: text longer than `max_chars` (VRChat: 144) is split, preferring sentence breaks
+- dedupe: identical text within `dedupe_window_sec` of being sent, or still queued, is
+  skipped (hash set, O(1) per message); emergency text is exempt because
+  EmergencyChatNotifier applies its own cooldowns
+- backpressure: when the queue is full the lowest-priority, newest entry is dropped; a
+  message that loses a part this way is dropped whole (and never counts as sent for dedupe)
+
+Sends happen immediately when the pacing slot is free; otherwise a flush is scheduled on
+the running asyncio loop, or on a timer thread when there is none.
+"""
+import asyncio
+import hashlib
+import heapq
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"emergency": 0, "reply": 1, "debug": 2}
+VRC_CHATBOX_MAX_CHARS = 144
+_BREAKS = "。！？!?\n、,， "
+
+
+def split_chatbox_text(text: str, max_chars: int = VRC_CHATBOX_MAX_CHARS) -> List[str]:
+    """Split into parts of at most max_chars, cutting after the last sentence break when possible."""
+    text = str(text).strip()
+    parts = []
+    while len(text) > max_chars:
+        window = text[:max_chars]
+        cut = max(window.rfind(c) for c in _BREAKS)
+        if cut < max_chars // 2:
+            cut = max_chars - 1
+        parts.append(text[:cut + 1].strip())
+        text = text[cut + 1:].strip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+class _Channel:
+    """`.send(text)` bound to one priority (for StateMachine.chatbox and similar callers)."""
+
+    def __init__(self, scheduler, priority):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def send(self, text, notify: bool = True) -> bool:
+        return self.scheduler.send(text, self.priority, notify=notify)
+
+    enqueue = send
+
+
+class ChatboxScheduler:
+    def __init__(self, osc, *, min_interval_sec: float = 1.5, max_chars: int = VRC_CHATBOX_MAX_CHARS,
+                 dedupe_window_sec: float = 30.0, queue_max: int = 16,
+                 time_fn: Callable[[], float] = time.monotonic):
+        self.osc = osc
+        self.min_interval = max(0.0, float(min_interval_sec))
+        self.max_chars = max(8, int(max_chars))
+        self.dedupe_window = max(0.0, float(dedupe_window_sec))
+        self.queue_max = max(1, int(queue_max))
+        self._time = time_fn
+        self._lock = threading.RLock()
+        self._heap = []  # (priority, seq, text, notify, enqueued_ts, digest, msg_seq)
+        self._seq = 0
+        self._recent = OrderedDict()  # digest -> sent ts, oldest first
+        self._queued = Counter()  # digest -> parts waiting in the heap
+        self._last_sent = None
+        self._pump_handle = None
+        self.stats = {"enqueued": 0, "sent": 0, "split": 0, "deduped": 0, "dropped": 0, "send_failed": 0,
+                      "max_queue_depth": 0, "max_wait_ms": 0.0}
+
+    def channel(self, priority: str) -> _Channel:
+        return _Channel(self, priority)
+
+    def send(self, text, priority: str = "reply", notify: bool = True) -> bool:
+        """Queue text for the chatbox. Returns False if it was empty, a duplicate or dropped by the queue bound."""
+        if text is None or not str(text).strip():
+            return False
+        prio = PRIORITIES.get(priority, PRIORITIES["reply"])
+        with self._lock:
+            now = self._time()
+            self._expire(now)
+            digest = None
+            if prio != PRIORITIES["emergency"]:
+                digest = hashlib.blake2b(str(text).strip().encode("utf-8"), digest_size=8).digest()
+                if digest in self._recent or self._queued[digest]:
+                    self.stats["deduped"] += 1
+                    return False
+            parts = split_chatbox_text(text, self.max_chars)
+            if len(parts) > 1:
+                self.stats["split"] += 1
+            self._seq += 1
+            msg_seq = self._seq
+            evicted = False
+            for part in parts:
+                victim = self._push(prio, part, notify, now, digest, msg_seq)
+                evicted |= victim is not None and victim[6] == msg_seq
+            if evicted:
+                self._drop_message(msg_seq)
+            self.pump()
+        return not evicted
+
+    def _push(self, prio, text, notify, now, digest=None, msg_seq=None):
+        """Queue one part. Returns the entry dropped by the queue bound, if any."""
+        self._seq += 1
+        heapq.heappush(self._heap, (prio, self._seq, text, notify, now, digest, msg_seq))
+        self._count_queued(digest, 1)
+        self.stats["enqueued"] += 1
+        victim = None
+        if len(self._heap) > self.queue_max:
+            # drop the lowest-priority, newest entry
+            victim = max(self._heap)
+            self._heap.remove(victim)
+            heapq.heapify(self._heap)
+            self._count_queued(victim[5], -1)
+            self.stats["dropped"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._heap))
+        return victim
+
+    def _drop_message(self, msg_seq) -> None:
+        """Remove the rest of a message that lost a part to the queue bound."""
+        rest = [e for e in self._heap if e[6] == msg_seq]
+        if not rest:
+            return
+        self._heap = [e for e in self._heap if e[6] != msg_seq]
+        heapq.heapify(self._heap)
+        for e in rest:
+            self._count_queued(e[5], -1)
+        self.stats["dropped"] += len(rest)
+
+    def _count_queued(self, digest, n) -> None:
+        if digest is None:
+            return
+        self._queued[digest] += n
+        if self._queued[digest] <= 0:
+            del self._queued[digest]
+
+    def _expire(self, now):
+        while self._recent:
+            ts = next(iter(self._recent.values()))
+            if now - ts < self.dedupe_window:
+                break
+            self._recent.popitem(last=False)
+
+    def pump(self) -> int:
+        """Send what the pacing allows now; schedule the rest. Returns the number sent."""
+        sent = 0
+        with self._lock:
+            self._cancel_pump()
+            while self._heap:
+                now = self._time()
+                if self._last_sent is not None and now - self._last_sent < self.min_interval:
+                    self._schedule_pump(self.min_interval - (now - self._last_sent))
+                    break
+                _, _, text, notify, ts, digest, _ = heapq.heappop(self._heap)
+                self._count_queued(digest, -1)
+                self._last_sent = now
+                self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], (now - ts) * 1000.0)
+                try:
+                    self.osc.send_chatbox(text, send_immediately=True, notify=notify)
+                    if digest is not None and digest not in self._recent:
+                        # dedupe window starts when the message is actually sent
+                        self._recent[digest] = now
+                    self.stats["sent"] += 1
+                    sent += 1
+                except Exception:
+                    self.stats["send_failed"] += 1
+                    logger.warning("chatbox send failed", exc_info=True)
+        return sent
+
+    def _schedule_pump(self, delay: float) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self._pump_handle = loop.call_later(delay, self.pump)
+        else:
+            t = threading.Timer(delay, self.pump)
+            t.daemon = True
+            self._pump_handle = t
+            t.start()
+
+    def _cancel_pump(self) -> None:
+        h, self._pump_handle = self._pump_handle, None
+        if h is not None:
+            try:
+                h.cancel()
+            except Exception:
+                pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            m = dict(self.stats)
+            m["queue_depth"] = len(self._heap)
+            m["queued_by_priority"] = {name: sum(1 for e in self._heap if e[0] == p) for name, p in PRIORITIES.items()}
+            return m
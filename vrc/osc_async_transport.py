@@ -0,0 +1,179 @@
+"""asyncio UDP transport for OSC datagrams.
+
+Any thread may call `enqueue()`; a single writer coroutine on the loop drains the
+queue through a `DatagramProtocol` transport, so sends never block the caller and
+never interleave. Each send's enqueue->sendto latency is measured and passed to
+`latency_sink` (e.g. `OscRateController.observe_latency`), so loop congestion shows
+up as OSC latency. If no loop is given, the transport runs its own in a daemon thread.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p * (len(s) - 1))))]
+
+
+class _OscProtocol(asyncio.DatagramProtocol):
+    def __init__(self, owner):
+        self.owner = owner
+
+    def error_received(self, exc):
+        self.owner.errors += 1
+        logger.debug("OSC transport error: %s", exc)
+
+    def connection_lost(self, exc):
+        self.owner._transport = None
+
+
+class AsyncOscTransport:
+    def __init__(self, ip: str = "127.0.0.1", port: int = 9000, *, queue_max: int = 256,
+                 latency_sink: Optional[Callable[[float], None]] = None, sample_window: int = 128):
+        self.addr = (ip, port)
+        self.queue_max = max(1, int(queue_max))
+        self.latency_sink = latency_sink
+        self._loop = None
+        self._thread = None
+        self._transport = None
+        self._queue = None
+        self._writer = None
+        self._ready = threading.Event()
+        self._latency_ms = deque(maxlen=sample_window)
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+    # --- lifecycle ---
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> "AsyncOscTransport":
+        """Attach to `loop` (or the running loop); without one, run a private loop thread."""
+        if self._loop is not None:
+            return self
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="osc-transport", daemon=True)
+            self._thread.start()
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        if self._on_loop():
+            loop.create_task(self._open())
+        else:
+            asyncio.run_coroutine_threadsafe(self._open(), loop)
+        return self
+
+    async def _open(self):
+        try:
+            self._transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _OscProtocol(self), remote_addr=self.addr)
+            self._writer = self._loop.create_task(self._write_loop())
+        except Exception:
+            logger.warning("OSC transport could not open %s:%s", *self.addr, exc_info=True)
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout: float = 1.0) -> bool:
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Drain what is queued, close the socket, and stop a private loop."""
+        loop = self._loop
+        if loop is None:
+            return
+        if self._on_loop():
+            loop.create_task(self._close())
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout)
+        except Exception:
+            pass
+        if self._thread is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout)
+            loop.close()
+        self._loop = None
+
+    async def _close(self):
+        if self._writer is not None:
+            await self._queue.join()
+            self._writer.cancel()
+        if self._transport is not None:
+            self._transport.close()
+
+    # --- sending ---
+    def enqueue(self, dgram: bytes) -> None:
+        """Thread-safe, non-blocking. The oldest queued datagram is dropped when full."""
+        if self._loop is None:
+            self.start()
+        item = (dgram, time.perf_counter())
+        if self._on_loop():
+            self._put(item)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._put, item)
+            except RuntimeError:
+                self.dropped += 1
+
+    def _put(self, item) -> None:
+        if self._queue.qsize() >= self.queue_max:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self._queue.put_nowait(item)
+
+    async def _write_loop(self):
+        while True:
+            dgram, t0 = await self._queue.get()
+            try:
+                if self._transport is None:
+                    self.dropped += 1
+                    continue
+                self._transport.sendto(dgram)
+                self.sent += 1
+                ms = (time.perf_counter() - t0) * 1000.0
+                self._latency_ms.append(ms)
+                if self.latency_sink is not None:
+                    try:
+                        self.latency_sink(ms)
+                    except Exception:
+                        pass
+            except Exception:
+                self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def pressure(self) -> float:
+        """Queue fill ratio (0..1)."""
+        return (self._queue.qsize() / self.queue_max) if self._queue is not None else 0.0
+
+    def metrics(self) -> dict:
+        lat = list(self._latency_ms)
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "latency_ms_p50": _percentile(lat, 0.5),
+            "latency_ms_p95": _percentile(lat, 0.95),
+        }
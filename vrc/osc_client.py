@@ -2,10 +2,32 @@
 
 Sends only numeric avatar parameters under the configured prefix and enforces rate limiting.
 Provides a helper to send chatbox input for visible text (chatbox strings are NOT sent as avatar params).
+Avatar parameter diffs go out as OSC `#bundle` datagrams (one per call, split at the MTU)
+so a chunk's parameters land on the avatar together.
+
+Writes arriving inside the `max_hz` interval are not discarded: they are merged into a
+pending outbox (last write wins per parameter) that is flushed when the interval ends,
+from the running asyncio loop if there is one, otherwise from a timer thread.
+
+With `transport` (an AsyncOscTransport), every datagram is handed to its asyncio
+writer instead of being sent from the calling thread; an OscRecorder transport logs
+each datagram before passing it on. With `state_mirror` (an
+AvatarStateMirror fed by OscListener), diffs are computed against the avatar's
+reported state rather than what was last sent; `forget_sent()` (main calls it on
+`/avatar/change`) resends everything to the new avatar. With `rate_controller` (an
+OscRateController), every send reports its buffer pressure (the transport's queue
+fill, or the controller's `socket_pressure()` for our socket) and, when we send
+ourselves, its duration (a transport reports its own send latency), and
+callers that pass `source=` spend from that source's share of the packet budget.
 """
+import asyncio
 import logging
+import socket
+import threading
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from .osc_codec import DEFAULT_MTU, IMMEDIATELY, encode_message, pack_bundles
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +46,9 @@ except Exception:
 
 
 class OscClient:
-    def __init__(self, ip: str = "127.0.0.1", port: int = 9000, prefix: str = "/avatar/parameters", max_hz: float = 10.0):
+    def __init__(self, ip: str = "127.0.0.1", port: int = 9000, prefix: str = "/avatar/parameters", max_hz: float = 10.0,
+                 bundle: bool = True, mtu: int = DEFAULT_MTU, transport=None, state_mirror=None,
+                 rate_controller=None):
         self.ip = ip
         self.port = port
         self.prefix = prefix.rstrip("/")
@@ -33,6 +57,18 @@ class OscClient:
         self._last_send_time = 0.0
         self._last_sent: Dict[str, Any] = {}
         self._client = SimpleUDPClient(ip, port)
+        self.bundle = bundle
+        self.mtu = max(64, int(mtu))
+        self._sock = None
+        self.transport = transport
+        self.state_mirror = state_mirror
+        self.rate_controller = rate_controller
+        self.packets_sent = 0
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._flush_handle = None  # asyncio TimerHandle or threading.Timer
+        self.coalesced = 0  # pending writes overwritten before they were sent
+        self.dropped = 0  # writes lost (non-numeric or failed send)
         logger.debug("OscClient initialized to %s:%s prefix=%s max_hz=%.1f", ip, port, self.prefix, max_hz)
 
     def _can_send(self) -> bool:
@@ -42,16 +78,14 @@ class OscClient:
             return False
         return True
 
-    def send_avatar_params(self, params: Dict[str, Any]) -> None:
+    def send_avatar_params(self, params: Dict[str, Any], source: Optional[str] = None) -> None:
         """Send only numeric diffs to /avatar/parameters/<name>.
 
         - params: mapping param_name->numeric (int/float/bool)
         - ignores non-numeric values
+        - inside the rate-limit interval the values are coalesced and sent when it ends
+        - source: budget class for the rate controller (None = not budgeted)
         """
-        now = time.time()
-        if not self._can_send():
-            return
-
         # filter non-numeric
         numeric = {}
         for k, v in params.items():
@@ -62,22 +96,143 @@ class OscClient:
                     # try to coerce
                     numeric[k] = float(v)
                 except Exception:
+                    self.dropped += 1
                     logger.warning("Skipping non-numeric param %s=%r", k, v)
 
-        diffs = {k: v for k, v in numeric.items() if self._last_sent.get(k) != v}
-        if not diffs:
-            logger.debug("No numeric diffs to send")
-            return
+        with self._lock:
+            for k, v in numeric.items():
+                if k in self._pending:
+                    self.coalesced += 1
+                self._pending[k] = v
+            rc = self.rate_controller
+            if rc is not None and source is not None and not rc.allow(source):
+                self._schedule_flush(rc.retry_after(source))
+            elif self._can_send():
+                self.flush()
+            else:
+                self._schedule_flush()
+
+    def flush(self) -> None:
+        """Send whatever is pending now (ignores the rate limit)."""
+        with self._lock:
+            self._cancel_flush()
+            pending, self._pending = self._pending, {}
+            diffs = {k: v for k, v in pending.items() if self._differs(k, v)}
+            if not diffs:
+                logger.debug("No numeric diffs to send")
+                return
+            t0 = time.perf_counter()
+            try:
+                if self.bundle:
+                    self._send_bundled(diffs)
+                else:
+                    for k, v in diffs.items():
+                        address = f"{self.prefix}/{k}"
+                        self._send_message(address, v)
+                self._last_sent.update(diffs)
+                self._last_send_time = time.time()
+                self._observe((time.perf_counter() - t0) * 1000.0)
+                logger.info("Sent avatar params diffs: %s", diffs)
+            except Exception:
+                self.dropped += len(diffs)
+                logger.exception("Failed sending avatar params")
+
+    def _differs(self, name: str, value) -> bool:
+        current = self._last_sent.get(name)
+        if self.state_mirror is not None:
+            mirrored = self.state_mirror.get(name)
+            if mirrored is not None:
+                current = mirrored
+        if current is None:
+            return True
+        if isinstance(value, float) or isinstance(current, float):
+            # VRChat reports float32; compare with float32 resolution
+            try:
+                return abs(float(current) - float(value)) > 1e-6
+            except Exception:
+                return True
+        return current != value
+
+    def forget_sent(self) -> None:
+        """Drop what was last sent, so every parameter is sent again (e.g. after an avatar change)."""
+        with self._lock:
+            self._last_sent.clear()
 
+    def pending(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._pending)
+
+    def close(self) -> None:
+        """Deliver the final state and release the socket."""
+        self.flush()
+        if self.transport is not None:
+            self.transport.stop()
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+            self._sock = None
+
+    def _observe(self, duration_ms: float) -> None:
+        if self.rate_controller is None:
+            return
         try:
-            for k, v in diffs.items():
-                address = f"{self.prefix}/{k}"
-                self._client.send_message(address, v)
-            self._last_sent.update(diffs)
-            self._last_send_time = now
-            logger.info("Sent avatar params diffs: %s", diffs)
+            if self.transport is not None:
+                # enqueue() returns at once: the transport reports the real send latency
+                # through its latency_sink, so only its queue fill is reported here
+                self.rate_controller.observe_pressure(self.transport.pressure())
+            else:
+                self.rate_controller.observe_send(duration_ms, self.rate_controller.socket_pressure(self._sock))
         except Exception:
-            logger.exception("Failed sending avatar params")
+            pass
+
+    def _schedule_flush(self, delay: Optional[float] = None) -> None:
+        if self._flush_handle is not None:
+            return
+        if delay is None:
+            delay = max(0.0, self._min_interval - (time.time() - self._last_send_time))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self._flush_handle = loop.call_later(delay, self.flush)
+        else:
+            t = threading.Timer(delay, self.flush)
+            t.daemon = True
+            self._flush_handle = t
+            t.start()
+
+    def _cancel_flush(self) -> None:
+        h, self._flush_handle = self._flush_handle, None
+        if h is not None:
+            try:
+                h.cancel()
+            except Exception:
+                pass
+
+    def _send_bundled(self, diffs: Dict[str, Any], timetag: int = IMMEDIATELY) -> None:
+        """All diffs in as few datagrams as the MTU allows (usually one)."""
+        messages = [(f"{self.prefix}/{k}", v) for k, v in diffs.items()]
+        for dgram in pack_bundles(messages, self.mtu, timetag):
+            self._send_datagram(dgram)
+
+    def _send_message(self, address: str, value) -> None:
+        if self.transport is not None:
+            self._send_datagram(encode_message(address, value))
+        else:
+            self._client.send_message(address, value)
+            self.packets_sent += 1
+
+    def _send_datagram(self, dgram: bytes) -> None:
+        if self.transport is not None:
+            self.transport.enqueue(dgram)
+        else:
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.sendto(dgram, (self.ip, self.port))
+        self.packets_sent += 1
 
     def send_chatbox(self, text: str, send_immediately: bool = True, notify: bool = True) -> None:
         """Send a string to the chatbox input (does not update avatar params).
@@ -86,7 +241,7 @@ class OscClient:
         """
         try:
             payload = [str(text), bool(send_immediately), bool(notify)]
-            self._client.send_message("/chatbox/input", payload)
+            self._send_message("/chatbox/input", payload)
             logger.info("Sent chatbox text (send_immediately=%s notify=%s)", send_immediately, notify)
         except Exception:
             logger.exception("Failed sending chatbox text")
@@ -0,0 +1,119 @@
+"""Minimal OSC 1.0 encoder/decoder (messages and #bundle), no python-osc needed.
+
+Covers what VRChat uses: int32 'i', float32 'f', string 's', bool 'T'/'F'.
+`pack_bundles` groups messages into as few `#bundle` datagrams as fit under the MTU.
+"""
+import struct
+from typing import Any, Iterable, List, Sequence, Tuple
+
+BUNDLE_TAG = b"#bundle\x00"
+IMMEDIATELY = 1  # OSC timetag meaning "process on receipt"
+NTP_EPOCH_OFFSET = 2208988800  # 1900-01-01 -> 1970-01-01 in seconds
+BUNDLE_HEADER_LEN = 16  # "#bundle\0" + 8-byte timetag
+DEFAULT_MTU = 1400  # stays under a 1500-byte Ethernet MTU with IP/UDP headers
+
+Message = Tuple[str, Sequence[Any]]
+
+
+def _pad(b: bytes) -> bytes:
+    return b + b"\x00" * (4 - len(b) % 4)
+
+
+def _osc_string(s: str) -> bytes:
+    return _pad(s.encode("utf-8"))
+
+
+def encode_message(address: str, args: Any) -> bytes:
+    if not isinstance(args, (list, tuple)):
+        args = [args]
+    tags = ","
+    data = b""
+    for a in args:
+        if isinstance(a, bool):
+            tags += "T" if a else "F"
+        elif isinstance(a, int):
+            tags += "i"
+            data += struct.pack(">i", a)
+        elif isinstance(a, float):
+            tags += "f"
+            data += struct.pack(">f", a)
+        elif isinstance(a, str):
+            tags += "s"
+            data += _osc_string(a)
+        else:
+            raise TypeError(f"unsupported OSC argument {a!r}")
+    return _osc_string(address) + _osc_string(tags) + data
+
+
+def ntp_timetag(ts: float) -> int:
+    """64-bit NTP timetag for a unix timestamp."""
+    secs = int(ts)
+    frac = int((ts - secs) * (1 << 32)) & 0xFFFFFFFF
+    return ((secs + NTP_EPOCH_OFFSET) << 32) | frac
+
+
+def encode_bundle(elements: Iterable[bytes], timetag: int = IMMEDIATELY) -> bytes:
+    out = [BUNDLE_TAG, struct.pack(">Q", timetag)]
+    for e in elements:
+        out.append(struct.pack(">i", len(e)))
+        out.append(e)
+    return b"".join(out)
+
+
+def pack_bundles(messages: Iterable[Message], mtu: int = DEFAULT_MTU, timetag: int = IMMEDIATELY) -> List[bytes]:
+    """Encode messages into bundles no larger than `mtu` (a single oversized message still gets its own)."""
+    dgrams = []
+    batch = []
+    size = BUNDLE_HEADER_LEN
+    for address, args in messages:
+        m = encode_message(address, args)
+        need = 4 + len(m)
+        if batch and size + need > mtu:
+            dgrams.append(encode_bundle(batch, timetag))
+            batch, size = [], BUNDLE_HEADER_LEN
+        batch.append(m)
+        size += need
+    if batch:
+        dgrams.append(encode_bundle(batch, timetag))
+    return dgrams
+
+
+def _read_string(data: bytes, i: int) -> Tuple[str, int]:
+    end = data.index(b"\x00", i)
+    return data[i:end].decode("utf-8"), (end // 4 + 1) * 4
+
+
+def decode_message(data: bytes) -> Message:
+    address, i = _read_string(data, 0)
+    tags, i = _read_string(data, i) if i < len(data) else (",", i)
+    args = []
+    for t in tags[1:]:
+        if t == "i":
+            args.append(struct.unpack_from(">i", data, i)[0])
+            i += 4
+        elif t == "f":
+            args.append(struct.unpack_from(">f", data, i)[0])
+            i += 4
+        elif t == "s":
+            s, i = _read_string(data, i)
+            args.append(s)
+        elif t == "T":
+            args.append(True)
+        elif t == "F":
+            args.append(False)
+        else:
+            raise ValueError(f"unsupported OSC type tag {t!r}")
+    return address, args
+
+
+def decode_packet(data: bytes) -> List[Message]:
+    """Flatten a datagram (message or nested bundles) into (address, args) messages."""
+    if not data.startswith(BUNDLE_TAG):
+        return [decode_message(data)]
+    out = []
+    i = BUNDLE_HEADER_LEN
+    while i + 4 <= len(data):
+        (n,) = struct.unpack_from(">i", data, i)
+        out.extend(decode_packet(data[i + 4:i + 4 + n]))
+        i += 4 + n
+    return out
@@ -0,0 +1,152 @@
+"""Inbound OSC listener (VRChat output, default port 9001) and avatar state mirror.
+
+VRChat reports the local avatar's parameters, `/avatar/change` (new avatar id) and
+chatbox typing on its output port. The mirror keeps that as an in-memory table so
+OscClient can diff against what the avatar actually has instead of what we last
+sent. An avatar change resets the table (VRChat reloads defaults) and is recorded
+in AvatarStore when one is given.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .osc_codec import decode_packet
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarStateMirror:
+    def __init__(self, prefix: str = "/avatar/parameters", time_fn: Callable[[], float] = time.time):
+        self.prefix = prefix.rstrip("/") + "/"
+        self._time = time_fn
+        self._lock = threading.Lock()
+        self.params: Dict[str, Any] = {}
+        self.avatar_id: Optional[str] = None
+        self.avatar_changed_at = 0.0
+        self.typing = False
+        self.updated_at = 0.0
+        self.received = 0
+
+    def apply(self, address: str, args) -> Optional[str]:
+        """Apply one inbound message. Returns the new avatar id on /avatar/change, else None."""
+        value = args[0] if args else None
+        now = self._time()
+        with self._lock:
+            self.received += 1
+            self.updated_at = now
+            if address.startswith(self.prefix):
+                self.params[address[len(self.prefix):]] = value
+            elif address == "/avatar/change":
+                self.avatar_id = str(value) if value is not None else None
+                self.avatar_changed_at = now
+                self.params.clear()
+                return self.avatar_id
+            elif address == "/chatbox/typing":
+                self.typing = bool(value)
+        return None
+
+    def get(self, name: str, default=None):
+        with self._lock:
+            return self.params.get(name, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"avatar_id": self.avatar_id, "typing": self.typing, "params": dict(self.params),
+                    "updated_at": self.updated_at}
+
+
+class _ListenerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, owner):
+        self.owner = owner
+
+    def datagram_received(self, data, addr):
+        self.owner._on_datagram(data)
+
+
+class OscListener:
+    def __init__(self, mirror: AvatarStateMirror, ip: str = "127.0.0.1", port: int = 9001, *,
+                 avatar_store=None, self_key: str = "self", on_avatar_change: Optional[Callable[[str], None]] = None):
+        self.mirror = mirror
+        self.addr = (ip, port)
+        self.avatar_store = avatar_store
+        self.self_key = self_key
+        self.on_avatar_change = on_avatar_change
+        self.malformed = 0
+        self._loop = None
+        self._thread = None
+        self._transport = None
+        self._ready = threading.Event()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> "OscListener":
+        """Listen on `loop` (or the running loop); without one, run a private loop thread."""
+        if self._loop is not None:
+            return self
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="osc-listener", daemon=True)
+            self._thread.start()
+        self._loop = loop
+        try:
+            running = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            running = False
+        if running:
+            loop.create_task(self._open())
+        else:
+            asyncio.run_coroutine_threadsafe(self._open(), loop)
+        return self
+
+    async def _open(self):
+        try:
+            self._transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _ListenerProtocol(self), local_addr=self.addr)
+            self.addr = self._transport.get_extra_info("sockname")[:2]
+        except Exception:
+            logger.warning("OSC listener could not bind %s:%s", *self.addr, exc_info=True)
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout: float = 1.0) -> bool:
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        if self._transport is not None:
+            loop.call_soon_threadsafe(self._transport.close)
+        if self._thread is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout)
+            loop.close()
+        self._loop = None
+
+    def _on_datagram(self, data: bytes) -> None:
+        try:
+            messages = decode_packet(data)
+        except Exception:
+            self.malformed += 1
+            return
+        for address, args in messages:
+            avatar_id = self.mirror.apply(address, args)
+            if avatar_id:
+                self._record_avatar(avatar_id)
+
+    def _record_avatar(self, avatar_id: str) -> None:
+        if self.avatar_store is not None:
+            try:
+                self.avatar_store.record_avatar_seen(self.self_key, avatar_id)
+            except Exception:
+                logger.debug("avatar_store.record_avatar_seen failed", exc_info=True)
+        if self.on_avatar_change is not None:
+            try:
+                self.on_avatar_change(avatar_id)
+            except Exception:
+                pass
@@ -0,0 +1,208 @@
+"""Compiled mapping from abstract chunk OSC keys (N_*) to avatar parameters.
+
+Speech plans carry OSC values as `{"N_Valence": 0.4, "N_LookX": 0.1, ...}`; config maps
+the lower-case names (`valence`, `look_x`, ...) to the avatar's parameter names.
+`CompiledParamMap` resolves every known N_* key once into `(param, lo, hi, kind)`, so
+`prepare()` is one dict lookup and one clamp per value with no string work.
+Other spellings are resolved on first sight and memoized (misses included).
+"""
+from collections.abc import Mapping
+from functools import lru_cache
+from numbers import Integral, Real
+from typing import Any, Callable, Dict, Optional
+
+# N_<name>.lower() -> params_map key
+ALIASES = {
+    "state": "state",
+    "gesture": "gesture",
+    "lookx": "look_x",
+    "looky": "look_y",
+    "look": "look_x",
+    "arousal": "arousal",
+    "valence": "valence",
+    "glitch": "glitch",
+    "interest": "interest",
+}
+# spellings used by the plan builders
+CANONICAL_KEYS = ("N_State", "N_Gesture", "N_LookX", "N_LookY", "N_Look", "N_Arousal", "N_Valence", "N_Glitch", "N_Interest")
+DEFAULT_RANGES = {
+    "valence": (-1.0, 1.0),
+    "interest": (-1.0, 1.0),
+    "arousal": (0.0, 1.0),
+    "glitch": (0.0, 1.0),
+    "look_x": (-1.0, 1.0),
+    "look_y": (-1.0, 1.0),
+}
+INT_KEYS = ("state", "gesture")
+LEGACY_KEYS = ("look_x", "look_y", "arousal", "valence", "glitch")
+
+_FLOAT, _INT = 0, 1
+
+
+@lru_cache(maxsize=64)
+def _int_or_none(s: str) -> Optional[int]:
+    # plans repeat the same few strings ("TALK", "3"); don't pay for a failed int() each chunk
+    try:
+        return int(s)
+    except Exception:
+        return None
+
+
+class CompiledParamMap:
+    __slots__ = ("source", "valence", "interest", "_ranges", "_table", "_legacy", "_face_valence", "_slots")
+
+    def __init__(self, params_map: Dict[str, str], ranges: Optional[Dict[str, Any]] = None,
+                 face_valence: Optional[Callable[[float, float], float]] = None):
+        self.source = params_map
+        self.valence = params_map.get("valence")
+        self.interest = params_map.get("interest")
+        self._face_valence = face_valence
+        self._ranges = dict(DEFAULT_RANGES)
+        for k, v in (ranges or {}).items():
+            try:
+                lo, hi = float(v[0]), float(v[1])
+                self._ranges[k] = (min(lo, hi), max(lo, hi))
+            except Exception:
+                pass
+        self._table = {}
+        self._slots = None
+        for key in CANONICAL_KEYS:
+            self._resolve(key)
+        self._legacy = tuple((k, params_map[k]) for k in LEGACY_KEYS if params_map.get(k))
+
+    def _resolve(self, key):
+        entry = False
+        if isinstance(key, str) and key.startswith("N_"):
+            name = ALIASES.get(key[2:].lower())
+            param = self.source.get(name) if name else None
+            if param:
+                lo, hi = self._ranges.get(name, (float("-inf"), float("inf")))
+                entry = (param, lo, hi, _INT if name in INT_KEYS else _FLOAT)
+        self._table[key] = entry
+        return entry
+
+    def resolve(self, key: str) -> Optional[str]:
+        """Avatar parameter name for an N_* key (None if unmapped)."""
+        e = self._table.get(key)
+        if e is None:
+            e = self._resolve(key)
+        return e[0] if e else None
+
+    def _apply(self, items, out) -> None:
+        table = self._table
+        for k, v in items:
+            e = table.get(k)
+            if e is None:
+                e = self._resolve(k)
+            if not e:
+                continue
+            param, lo, hi, kind = e
+            if kind == _INT:
+                if isinstance(v, str):
+                    v = _int_or_none(v)
+                    if v is None:
+                        continue
+                elif not isinstance(v, (int, float)):
+                    if not isinstance(v, Real):  # numpy scalars are Real
+                        continue
+                    v = int(v) if isinstance(v, Integral) else float(v)
+            else:
+                if not isinstance(v, (int, float)):
+                    if not isinstance(v, Real):
+                        continue
+                    v = float(v)
+                if v < lo:
+                    v = lo
+                elif v > hi:
+                    v = hi
+            out[param] = v
+
+    def _apply_vals(self, chunk, out):
+        """Slotted chunk (core.speech_plan.Chunk): floats straight from the fixed array."""
+        fields = chunk.OSC_FIELDS
+        slots = self._slots
+        if slots is None or slots[0] is not fields:
+            entries = []
+            for i, k in enumerate(fields):
+                e = self._table.get(k)
+                if e is None:
+                    e = self._resolve(k)
+                if e:
+                    entries.append((i,) + e)
+            slots = self._slots = (fields, tuple(entries), fields.index("N_Valence"))
+        vals = chunk.vals
+        ints = chunk.ints
+        if chunk.state is not None:
+            self._apply((("N_State", chunk.state),), out)
+        for i, param, lo, hi, kind in slots[1]:
+            v = vals[i]
+            if v != v:  # not set
+                continue
+            if kind != _INT:
+                if v < lo:
+                    v = lo
+                elif v > hi:
+                    v = hi
+            elif ints >> i & 1:
+                v = int(v)
+            out[param] = v
+        if chunk.osc_extra:
+            self._apply(chunk.osc_extra.items(), out)
+        v = vals[slots[2]]
+        if v == v:
+            return v
+        return chunk.osc_extra.get("N_Valence") if chunk.osc_extra else None
+
+    def prepare(self, chunk: dict, out: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill `out` with the avatar params for one chunk and return it.
+
+        - N_* values from chunk["osc"] (a dict or other Mapping), clamped to the
+          configured range (state/gesture are integers; numeric strings are accepted);
+          a core.speech_plan.Chunk is read from its value array directly
+        - chunk["interest"] overrides the interest param (clamped to [-1, 1])
+        - with both valence and interest, valence goes through `face_valence`
+        - with nothing mapped, chunk["_legacy"] values are used
+        """
+        vals = None if type(chunk) is dict else getattr(chunk, "vals", None)
+        if vals is not None:
+            base = self._apply_vals(chunk, out)
+        else:
+            base = None
+            osc_map = chunk.get("osc")
+            if osc_map and (type(osc_map) is dict or isinstance(osc_map, Mapping)):
+                self._apply(osc_map.items(), out)
+                base = osc_map.get("N_Valence")
+        interest = chunk.get("interest")
+        if interest is not None and self.interest:
+            try:
+                iv = float(interest)
+                out[self.interest] = -1.0 if iv < -1.0 else 1.0 if iv > 1.0 else iv
+            except Exception:
+                interest = None
+        if self.valence:
+            if base is None:
+                base = chunk.get("valence")
+            if base is not None:
+                try:
+                    base = float(base)
+                    if interest is not None and self._face_valence is not None:
+                        iv = float(interest)
+                        out[self.valence] = self._face_valence(base, 0.0 if iv < 0.0 else 1.0 if iv > 1.0 else iv)
+                    else:
+                        out[self.valence] = base
+                except Exception:
+                    pass
+        if not out:
+            legacy = chunk.get("_legacy")
+            if legacy:
+                for k, param in self._legacy:
+                    try:
+                        out[param] = float(legacy.get(k, 0.0))
+                    except Exception:
+                        pass
+        return out
+
+
+def compile_params_map(params_map: Dict[str, str], ranges: Optional[Dict[str, Any]] = None,
+                       face_valence: Optional[Callable[[float, float], float]] = None) -> CompiledParamMap:
+    return CompiledParamMap(params_map or {}, ranges, face_valence)
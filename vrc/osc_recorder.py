@@ -0,0 +1,212 @@
+"""Record outbound OSC traffic to a compact binary log, replay it, and analyze it.
+
+`OscRecorder` is an OscClient transport: every datagram handed to `enqueue()` is
+appended to the log with a monotonic timestamp and then passed on to `inner` (e.g. an
+AsyncOscTransport) or sent to `forward=(ip, port)`; with neither it only records.
+The log is flushed every `flush_every` records or `flush_interval_sec`, whichever comes
+first, so a crash loses at most that much of the tail (read_log skips a torn record).
+
+Log format (big-endian):
+    header  b"OSCLOG" + version (u8) + reserved (u8) + start wall time (f64)
+    record  t (f64, seconds since the recording started) + length (u16) + datagram
+
+`analyze()` reports packets/messages per second, per-parameter churn (sends that
+changed the value) and redundant sends (same value as the previous send), which is
+what `osc.max_hz` and the presence modules are tuned against.
+"""
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from .osc_codec import decode_packet
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OSCLOG"
+VERSION = 1
+_HEADER = struct.Struct(">6sBBd")
+_RECORD = struct.Struct(">dH")
+
+Record = Tuple[float, bytes]
+
+
+class OscRecorder:
+    def __init__(self, path: str, *, inner=None, forward: Optional[Tuple[str, int]] = None,
+                 time_fn: Callable[[], float] = time.monotonic, flush_every: int = 64,
+                 flush_interval_sec: float = 1.0):
+        self.path = path
+        self.inner = inner
+        self.forward = forward
+        self._time = time_fn
+        self._lock = threading.Lock()
+        self._fh = open(path, "wb")
+        self._fh.write(_HEADER.pack(MAGIC, VERSION, 0, time.time()))
+        self._t0 = time_fn()
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = max(0.0, float(flush_interval_sec))
+        self._unflushed = 0
+        self._flushed_at = self._t0
+        self._sock = None
+        self.recorded = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def enqueue(self, dgram: bytes) -> None:
+        if len(dgram) > 0xFFFF:
+            self.errors += 1
+        else:
+            with self._lock:
+                if self._fh is not None:
+                    now = self._time()
+                    self._fh.write(_RECORD.pack(now - self._t0, len(dgram)))
+                    self._fh.write(dgram)
+                    self.recorded += 1
+                    self.bytes += len(dgram)
+                    self._unflushed += 1
+                    if self._unflushed >= self.flush_every or now - self._flushed_at >= self.flush_interval:
+                        self._fh.flush()
+                        self._unflushed = 0
+                        self._flushed_at = now
+        if self.inner is not None:
+            self.inner.enqueue(dgram)
+        elif self.forward is not None:
+            try:
+                if self._sock is None:
+                    self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self._sock.sendto(dgram, self.forward)
+            except Exception:
+                self.errors += 1
+                logger.debug("OSC forward failed", exc_info=True)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+                self._unflushed = 0
+                self._flushed_at = self._time()
+
+    def stop(self) -> None:
+        with self._lock:
+            fh, self._fh = self._fh, None
+        if fh is not None:
+            fh.close()
+        if self.inner is not None:
+            self.inner.stop()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def pressure(self) -> float:
+        if self.inner is not None and hasattr(self.inner, "pressure"):
+            return self.inner.pressure()
+        return 0.0
+
+    def metrics(self) -> dict:
+        m = dict(self.inner.metrics()) if self.inner is not None and hasattr(self.inner, "metrics") else {}
+        m.update({"recorded": self.recorded, "recorded_bytes": self.bytes, "record_errors": self.errors})
+        return m
+
+
+def read_log(path: str) -> Iterator[Record]:
+    """Yield (seconds since start, datagram) from a recorder log."""
+    with open(path, "rb") as fh:
+        head = fh.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            raise ValueError(f"{path}: not an OSC log")
+        magic, version, _, _ = _HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not an OSC log (or unsupported version {version})")
+        while True:
+            rec = fh.read(_RECORD.size)
+            if len(rec) < _RECORD.size:
+                return
+            t, n = _RECORD.unpack(rec)
+            data = fh.read(n)
+            if len(data) < n:
+                return  # truncated tail (recorder was killed)
+            yield t, data
+
+
+def replay(records: Iterable[Record], ip: str = "127.0.0.1", port: int = 9000, *, speed: float = 1.0,
+           sleep: Callable[[float], None] = time.sleep, time_fn: Callable[[], float] = time.monotonic) -> int:
+    """Re-send datagrams with their recorded spacing divided by `speed` (0 = as fast as possible)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = 0
+    start = None
+    try:
+        for t, data in records:
+            if speed > 0:
+                if start is None:
+                    start = time_fn() - t / speed
+                delay = start + t / speed - time_fn()
+                if delay > 0:
+                    sleep(delay)
+            sock.sendto(data, (ip, port))
+            sent += 1
+    finally:
+        sock.close()
+    return sent
+
+
+def analyze(records: Iterable[Record], prefix: str = "/avatar/parameters") -> dict:
+    """Traffic summary: rates, per-parameter churn and redundant sends."""
+    prefix = prefix.rstrip("/") + "/"
+    packets = messages = nbytes = 0
+    first = last = None
+    per_second = Counter()
+    last_value = {}
+    sends, changes, redundant = Counter(), Counter(), Counter()
+    other = Counter()
+    for t, data in records:
+        packets += 1
+        nbytes += len(data)
+        first = t if first is None else first
+        last = t
+        per_second[int(t)] += 1
+        try:
+            msgs = decode_packet(data)
+        except Exception:
+            other["<undecodable>"] += 1
+            continue
+        for address, args in msgs:
+            messages += 1
+            if not address.startswith(prefix):
+                other[address] += 1
+                continue
+            name = address[len(prefix):]
+            value = tuple(args)
+            sends[name] += 1
+            if last_value.get(name) == value:
+                redundant[name] += 1
+            else:
+                changes[name] += 1
+                last_value[name] = value
+    duration = (last - first) if packets > 1 else 0.0
+    span = max(duration, 1e-9)
+    params = {
+        name: {
+            "sends": sends[name],
+            "changes": changes[name],
+            "redundant": redundant[name],
+            "churn_per_sec": round(changes[name] / span, 3) if duration else None,
+        }
+        for name in sorted(sends, key=lambda n: -sends[n])
+    }
+    total_param_sends = sum(sends.values())
+    return {
+        "duration_sec": round(duration, 3),
+        "packets": packets,
+        "messages": messages,
+        "bytes": nbytes,
+        "pps_avg": round(packets / span, 3) if duration else None,
+        "pps_peak": max(per_second.values()) if per_second else 0,
+        "messages_per_packet": round(messages / packets, 3) if packets else 0.0,
+        "redundant_sends": sum(redundant.values()),
+        "redundant_ratio": round(sum(redundant.values()) / total_param_sends, 3) if total_param_sends else 0.0,
+        "params": params,
+        "other_addresses": dict(other),
+    }